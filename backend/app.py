@@ -1,56 +1,91 @@
-from fastapi import FastAPI, HTTPException
+if __name__ == "__main__":
+    # `python app.py` arranca `uvicorn app:app`: si este fichero fuera el módulo
+    # principal, cada proceso del ejecutor de simulaciones (spawn) lo volvería a
+    # importar y repetiría toda la inicialización de los servicios
+    import os
+    import sys
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "app:app", "--host", "0.0.0.0", "--port", "8000",
+                              "--app-dir", os.path.dirname(os.path.abspath(__file__))])
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+from contextlib import asynccontextmanager
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import hashlib
 import json
-from services.nasa_api import NASAApiService
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import CancelledError
+from services.nasa_api_async import AsyncNASAApiService
 from services.demographic_service import DemographicService
+from services.asteroid_catalog import AsteroidCatalog
+from services.asteroid_query import AsteroidQuery, AsteroidQueryIndex, QueryIndexCache
+from services import casualty_heatmap as casualty_heatmap_model
+from services.casualty_heatmap import TILE_FORMATS, CasualtyHeatmapGenerator
+from services.feed_refresher import FeedRefresher
+from services.feed_store import NeoFeedStore
+from services.neo_ingest import load_catalog_columns
+from services.paths import CACHE_DIR
+from services.simulation_cache import SimulationResultCache, model_version, normalize_scenario
+from services.simulation_executor import (PRIORITY_BATCH, PRIORITY_INTERACTIVE, SimulationExecutor, SimulationJob,
+                                          SimulationTimeout, without_service)
+from services.land_mask import LandMask
+from services.population_grid import PopulationGrid
+from services.spatial_index import CityIndex
+
+logger = logging.getLogger(__name__)
+
+# El motor de simulación vive en la raíz del repositorio (simulation/)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from simulation.monte_carlo import MonteCarloSimulator
+from simulation import physics as physics_model
+from simulation.physics import COMPOSITION_DENSITIES, ImpactPhysics, impact_physics
+from simulation import effects_table as effects_table_model
+from simulation.effects_table import ImpactEffectsTable
+from simulation.orbit_propagation import OrbitalElements, datetime_to_jd, find_close_approaches, parse_sbdb_elements
+from simulation.impact_corridor import (DEFAULT_SIGMA_XI, DEFAULT_SIGMA_ZETA, sample_impact_corridor,
+                                        velocity_from_orbit, velocity_from_radiant)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicializar y liberar recursos compartidos de la aplicación"""
+    feed_refresher.start()
+    # Procesos de simulación calientes antes de la primera petición
+    await run_in_threadpool(simulation_executor.start)
+    # Entradas de versiones anteriores del modelo que ya no pueden acertarse
+    removed = await run_in_threadpool(simulation_cache.prune)
+    if removed:
+        logger.info(f"Cache de simulaciones: {removed} entradas obsoletas eliminadas")
+    yield
+    await feed_refresher.stop()
+    await nasa_service.aclose()
+    demographic_service.resolver.shutdown()
+    await run_in_threadpool(simulation_executor.shutdown)
 
-app = FastAPI(title="Meteor Madness API", version="1.0.0")
+app = FastAPI(title="Meteor Madness API", version="1.0.0", lifespan=lifespan)
 
-# Inicializar servicios
-nasa_service = NASAApiService()
+# Inicializar servicios (cliente NASA asíncrono para no bloquear el event loop)
+nasa_service = AsyncNASAApiService(feed_store=NeoFeedStore())
+feed_refresher = FeedRefresher(nasa_service)
 demographic_service = DemographicService()
+# Cálculo de víctimas en procesos con la rejilla y la máscara en memoria compartida
+simulation_executor = SimulationExecutor(demographic_service)
 
 # Función helper para buscar asteroides
 def find_asteroid_by_id(asteroid_id: str):
-    """Buscar asteroide por ID en datos NASA y samples"""
-    try:
-        # Buscar primero en datos de NASA
-        nasa_asteroids = nasa_service.get_processed_asteroids(limit=50)
-        nasa_asteroid = next((a for a in nasa_asteroids if a["id"] == asteroid_id), None)
-        
-        if nasa_asteroid:
-            # Convertir formato NASA a formato estándar
-            return {
-                "id": nasa_asteroid["id"],
-                "name": nasa_asteroid["name"],
-                "diameter": nasa_asteroid["estimated_diameter_km_max"],
-                "velocity": nasa_asteroid["relative_velocity_km_s"],
-                "distance_from_earth": nasa_asteroid["miss_distance_km"],
-                "risk_level": "High" if nasa_asteroid["is_potentially_hazardous_asteroid"] else "Low",
-                "impact_probability": 0.001 if nasa_asteroid["is_potentially_hazardous_asteroid"] else 0.0001,
-                "source": "nasa"
-            }
-        else:
-            # Buscar en samples como fallback
-            sample_asteroid = next((a for a in sample_asteroids if a["id"] == asteroid_id), None)
-            if sample_asteroid:
-                sample_asteroid["source"] = "sample"
-                return sample_asteroid
-            else:
-                return None
-    except Exception as e:
-        print(f"Error buscando asteroide {asteroid_id}: {e}")
-        # Fallback final a samples
-        sample_asteroid = next((a for a in sample_asteroids if a["id"] == asteroid_id), None)
-        if sample_asteroid:
-            sample_asteroid["source"] = "sample"
-            return sample_asteroid
-        return None
+    """Buscar asteroide por ID en el catálogo en memoria (NASA, históricos y samples)"""
+    return asteroid_catalog.get(asteroid_id)
 
 # Configurar CORS
 app.add_middleware(
@@ -59,6 +94,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Data-Source", "X-Data-Age-Seconds", "X-Next-Cursor"],
 )
 
 # Modelos de datos
@@ -80,6 +116,105 @@ class SimulationRequest(BaseModel):
     asteroid_diameter: Optional[float] = None
     asteroid_composition: Optional[str] = None
     asteroid_density: Optional[float] = None
+    # "exact" (núcleo físico) o "table" (tabla precalculada interpolada)
+    physics_mode: str = "exact"
+
+# Límite de escenarios por petición de /api/simulation/batch
+MAX_BATCH_SCENARIOS = 10000
+
+class SimulationGrid(BaseModel):
+    """Rejilla diámetro × velocidad × ubicación para asteroides personalizados"""
+    diameters: List[float] = Field(max_length=MAX_BATCH_SCENARIOS)  # km
+    velocities: List[float] = Field(max_length=MAX_BATCH_SCENARIOS)  # km/s
+    locations: List[dict] = Field(max_length=MAX_BATCH_SCENARIOS)  # [{"lat": float, "lon": float}, ...]
+    impact_angle: float = 45
+    asteroid_composition: Optional[str] = "rocky"
+    asteroid_density: Optional[float] = None
+    
+    def size(self) -> int:
+        """Número de escenarios de la rejilla (sin generarlos)"""
+        return len(self.diameters) * len(self.velocities) * len(self.locations)
+    
+    def expand(self) -> List[SimulationRequest]:
+        """Generar un escenario por combinación (agrupados por ubicación)"""
+        return [
+            SimulationRequest(
+                asteroid_id="custom-asteroid",
+                impact_location=location,
+                impact_angle=self.impact_angle,
+                impact_velocity=velocity,
+                asteroid_diameter=diameter,
+                asteroid_composition=self.asteroid_composition,
+                asteroid_density=self.asteroid_density
+            )
+            for location in self.locations
+            for diameter in self.diameters
+            for velocity in self.velocities
+        ]
+
+class BatchSimulationRequest(BaseModel):
+    scenarios: Optional[List[SimulationRequest]] = None
+    grid: Optional[SimulationGrid] = None
+
+class MonteCarloRequest(BaseModel):
+    asteroid_id: str
+    impact_location: dict  # {"lat": float, "lon": float}
+    impact_velocity: Optional[float] = None
+    n_samples: int = 100000
+    seed: Optional[int] = None
+    # Campos opcionales para asteroides personalizados
+    asteroid_diameter: Optional[float] = None
+    asteroid_composition: Optional[str] = None
+    # Distribuciones opcionales: {"type": "uniform", "low": ..., "high": ...}
+    diameter_distribution: Optional[dict] = None
+    density_distribution: Optional[dict] = None
+    velocity_distribution: Optional[dict] = None
+    angle_distribution: Optional[dict] = None
+
+class OrbitRecord(BaseModel):
+    """Elementos keplerianos (eclíptica J2000, grados, época en JD) como los de SBDB"""
+    designation: str
+    a: float  # AU
+    e: float
+    i: float
+    om: float
+    w: float
+    ma: float
+    epoch: float
+    moid: Optional[float] = None  # AU
+
+class CloseApproachScreenRequest(BaseModel):
+    objects: List[OrbitRecord]
+    start_date: Optional[str] = None  # YYYY-MM-DD, hoy por defecto
+    years: float = 10
+    max_distance_au: float = 0.05
+    step_days: float = 1.0
+
+class ImpactCorridorRequest(BaseModel):
+    asteroid_id: str  # ID del catálogo o "custom-asteroid"
+    epoch: str  # instante del encuentro en UTC, ISO 8601 ("2029-04-13T21:46")
+    # Dirección de llegada: elementos SBDB de `designation` o un radiante {"ra": °, "dec": °}
+    designation: Optional[str] = None
+    radiant: Optional[dict] = None
+    v_inf: Optional[float] = None  # km/s (por defecto la velocidad del catálogo)
+    asteroid_diameter: Optional[float] = None
+    asteroid_composition: Optional[str] = None
+    # Nube de incertidumbre en el plano B (radios de captura) y en el tiempo
+    center: List[float] = [0.0, 0.0]
+    sigma: List[float] = [DEFAULT_SIGMA_XI, DEFAULT_SIGMA_ZETA]
+    time_sigma_hours: float = 0.0
+    n_samples: int = 2000
+    seed: Optional[int] = None
+    max_points: int = 500
+
+class HeatmapRequest(BaseModel):
+    asteroid_id: str  # ID del catálogo o "custom-asteroid"
+    impact_velocity: float
+    impact_angle: float = 45
+    asteroid_diameter: Optional[float] = None
+    asteroid_composition: Optional[str] = None
+    asteroid_density: Optional[float] = None
+    resolution: float = 1.0  # grados por celda de la rejilla global
 
 class SimulationResult(BaseModel):
     crater_diameter: float
@@ -110,6 +245,46 @@ sample_asteroids = [
     }
 ]
 
+# Catálogo indexado por ID, actualizado cada vez que se refresca el feed de NASA
+asteroid_catalog = AsteroidCatalog(
+    sample_asteroids=sample_asteroids,
+    historical_asteroids=nasa_service._get_historical_dangerous_asteroids()
+)
+nasa_service.add_refresh_listener(asteroid_catalog.update_nasa)
+
+# Catálogo completo de NeoWs descargado con `python -m services.neo_ingest` (si existe)
+try:
+    asteroid_catalog.set_bulk_catalog(load_catalog_columns())
+except Exception as e:
+    logger.warning(f"No se pudo cargar el catálogo NeoWs completo: {e}")
+
+monte_carlo_simulator = MonteCarloSimulator(max_samples=1_000_000)
+
+# Índice ordenado de la instantánea del feed para /api/asteroids
+asteroid_query_index = QueryIndexCache()
+# Los datos de muestra pasan por las mismas consultas cuando no hay instantánea
+sample_query_index = AsteroidQueryIndex.from_api_records(sample_asteroids)
+MAX_ASTEROIDS_PAGE = 500
+
+# Límites de la búsqueda local de aproximaciones (objetos por petición y años de ventana)
+MAX_SCREEN_OBJECTS = 20000
+MAX_SCREEN_YEARS = 100
+
+# Muestras máximas por corredor de impacto
+MAX_CORRIDOR_SAMPLES = 50000
+
+# Resolución más fina de los mapas de víctimas (la de la rejilla de población)
+MIN_HEATMAP_RESOLUTION = 0.25
+
+# Tipo de región demográfica -> tipo de terreno del simulador
+REGION_TERRAIN = {
+    "ocean": "ocean",
+    "urban_major": "urban",
+    "urban_large": "urban",
+    "urban_medium": "urban",
+    "urban_small": "urban"
+}
+
 @app.get("/")
 async def root():
     return {"message": "Meteor Madness API - NASA Hackathon 2025"}
@@ -147,7 +322,7 @@ async def test_coordinate_mapping(lat: float, lon: float):
         conversion_error = abs(lat - back_lat) + abs(lon - back_lon)
         
         # Obtener info demográfica
-        demo_info = demographic_service.calculate_population_density(lat, lon)
+        demo_info = await run_in_threadpool(demographic_service.calculate_population_density, lat, lon)
         
         # Determinar región geográfica esperada
         expected_region = "Unknown"
@@ -207,7 +382,7 @@ async def test_coordinate_mapping(lat: float, lon: float):
 async def get_demographic_info(lat: float, lon: float):
     """Obtener información demográfica para coordenadas específicas"""
     try:
-        demo_info = demographic_service.calculate_population_density(lat, lon)
+        demo_info = await run_in_threadpool(demographic_service.calculate_population_density, lat, lon)
         return {
             "status": "success",
             "coordinates": {"lat": lat, "lon": lon},
@@ -230,7 +405,7 @@ async def test_nasa_connection():
         api_key = os.getenv('NASA_API_KEY', 'DEMO_KEY')
         
         # Probar nuestro servicio optimizado
-        processed_asteroids = nasa_service.get_processed_asteroids(limit=3)
+        processed_asteroids = await nasa_service.get_processed_asteroids(limit=3)
         
         return {
             "status": "success",
@@ -246,113 +421,156 @@ async def test_nasa_connection():
             "error_message": str(e)
         }
 
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    """Estadísticas de aciertos/fallos del cache de NASA API"""
+    return {
+        "status": "success",
+        "nasa_api": nasa_service.get_cache_stats(),
+        "asteroid_catalog": asteroid_catalog.get_stats(),
+        "feed_refresher": feed_refresher.get_status(),
+        "geocode": demographic_service.get_cache_stats(),
+        "simulation_results": simulation_cache.get_stats(),
+        "effects_table": effects_table.get_stats() if effects_table is not None else None,
+        "simulation_executor": simulation_executor.get_stats(),
+        "demographic_sources": demographic_service.get_source_stats(),
+        "circuit_breakers": {**nasa_service.get_circuit_stats(), **demographic_service.get_circuit_stats()}
+    }
+
 @app.get("/api/asteroids", response_model=List[Asteroid])
-async def get_asteroids():
-    """Obtener lista de asteroides conocidos desde NASA API (optimizado)"""
+async def get_asteroids(
+    response: Response,
+    min_diameter: Optional[float] = Query(None, description="Diámetro mínimo (km)"),
+    max_diameter: Optional[float] = Query(None, description="Diámetro máximo (km)"),
+    min_velocity: Optional[float] = Query(None, description="Velocidad mínima (km/s)"),
+    max_velocity: Optional[float] = Query(None, description="Velocidad máxima (km/s)"),
+    min_distance_au: Optional[float] = Query(None, description="Distancia mínima de aproximación (AU)"),
+    max_distance_au: Optional[float] = Query(None, description="Distancia máxima de aproximación (AU)"),
+    date_from: Optional[str] = Query(None, description="Aproximación desde (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Aproximación hasta (YYYY-MM-DD)"),
+    hazardous: Optional[bool] = Query(None, description="Solo peligrosos (true) o no peligrosos (false)"),
+    min_risk_score: Optional[int] = Query(None, description="Puntuación de riesgo mínima (0-11)"),
+    sort: str = Query("default", description="default, diameter, velocity, distance, date, magnitude o risk; '-' para descendente"),
+    limit: int = Query(15, ge=1, le=MAX_ASTEROIDS_PAGE),
+    cursor: Optional[str] = Query(None, description="Cursor X-Next-Cursor de la página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por comas")
+):
+    """Obtener asteroides de la última instantánea del feed de NASA con filtros, orden y paginación"""
+    # Nunca se espera a NASA: el feed se refresca en segundo plano
+    snapshot = feed_refresher.get_snapshot()
+    
+    query = AsteroidQuery(
+        min_diameter=min_diameter, max_diameter=max_diameter,
+        min_velocity=min_velocity, max_velocity=max_velocity,
+        min_distance_au=min_distance_au, max_distance_au=max_distance_au,
+        date_from=date_from, date_to=date_to, hazardous=hazardous, min_risk_score=min_risk_score,
+        sort=sort, limit=limit, cursor=cursor,
+        fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    )
+    if snapshot["asteroids"]:
+        index = asteroid_query_index.get(snapshot["asteroids"])
+        headers = {"X-Data-Source": "nasa", "X-Data-Age-Seconds": str(snapshot["age_seconds"])}
+        if snapshot["stale"]:
+            headers["X-Data-Stale"] = "true"
+    else:
+        logger.info("Sin instantánea válida del feed de NASA, usando datos de muestra")
+        index = sample_query_index
+        headers = {"X-Data-Source": "sample"}
+    
     try:
-        # Obtener datos procesados y limitados de NASA
-        processed_asteroids = nasa_service.get_processed_asteroids(limit=15)
-        
-        if not processed_asteroids:
-            print("No se obtuvieron asteroides procesados, usando datos de muestra")
-            return sample_asteroids
-        
-        # Convertir a formato de nuestra API
-        asteroids = []
-        for neo in processed_asteroids:
-            asteroids.append({
-                "id": neo['id'],
-                "name": neo['name'],
-                "diameter": neo['estimated_diameter_km_max'],
-                "velocity": neo['relative_velocity_km_s'],
-                "distance_from_earth": neo['miss_distance_km'],
-                "risk_level": "High" if neo['is_potentially_hazardous_asteroid'] else "Low",
-                "impact_probability": 0.001 if neo['is_potentially_hazardous_asteroid'] else 0.0001
-            })
-        
-        print(f"✅ Devolviendo {len(asteroids)} asteroides reales de NASA")
-        return asteroids
-        
-    except Exception as e:
-        # Si hay error con NASA API, usar datos de muestra como fallback
-        print(f"❌ Error conectando con NASA API: {e}")
-        return sample_asteroids
+        asteroids, next_cursor = index.query(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    
+    # Con proyección los registros no tienen todos los campos del modelo Asteroid
+    if query.fields:
+        return JSONResponse(content=asteroids, headers=headers)
+    
+    response.headers.update(headers)
+    return asteroids
 
 @app.get("/api/asteroids/{asteroid_id}", response_model=Asteroid)
 async def get_asteroid(asteroid_id: str):
     """Obtener información de un asteroide específico"""
-    asteroid = next((a for a in sample_asteroids if a["id"] == asteroid_id), None)
+    asteroid = find_asteroid_by_id(asteroid_id)
     if not asteroid:
         raise HTTPException(status_code=404, detail="Asteroid not found")
     return asteroid
 
-@app.post("/api/simulation", response_model=SimulationResult)
-async def run_simulation(simulation_request: SimulationRequest):
-    """Ejecutar simulación de impacto de asteroide"""
+# Tabla de efectos para physics_mode="table" (se carga o genera en el primer uso)
+IMPACT_TABLE_PATH = os.getenv('IMPACT_TABLE_PATH', os.path.join(CACHE_DIR, 'impact_effects_table.npy'))
+effects_table: Optional[ImpactEffectsTable] = None
+effects_table_lock = threading.Lock()
+
+def get_effects_table() -> ImpactEffectsTable:
+    """Tabla de efectos mapeada en memoria, compartida por todas las peticiones"""
+    global effects_table
+    with effects_table_lock:
+        if effects_table is None:
+            effects_table = ImpactEffectsTable.load_or_build(IMPACT_TABLE_PATH)
+        return effects_table
+
+def resolve_asteroid_parameters(simulation_request: SimulationRequest):
+    """Obtener diámetro, velocidad, composición y densidad para una simulación"""
     
     # Verificar si es un asteroide personalizado (del Asteroid Launcher)
     if simulation_request.asteroid_id == "custom-asteroid":
         # Usar datos personalizados del request
-        diameter = getattr(simulation_request, 'asteroid_diameter', 1.0)
+        diameter = simulation_request.asteroid_diameter or 1.0
         velocity = simulation_request.impact_velocity
-        composition = getattr(simulation_request, 'asteroid_composition', 'rocky')
-        density = getattr(simulation_request, 'asteroid_density', 2500)
+        composition = simulation_request.asteroid_composition or "rocky"
+        density = simulation_request.asteroid_density  # None = la de la composición
     else:
-        # Buscar asteroide primero en datos reales de NASA
-        try:
-            nasa_asteroids = nasa_service.get_processed_asteroids(limit=50)
-            asteroid = next((a for a in nasa_asteroids if a["id"] == simulation_request.asteroid_id), None)
-            
-            if asteroid:
-                diameter = asteroid["estimated_diameter_km_max"]
-                velocity = simulation_request.impact_velocity
-                composition = "rocky"
-                density = 2500
-            else:
-                # Si no se encuentra en NASA, buscar en sample_asteroids como fallback
-                sample_asteroid = next((a for a in sample_asteroids if a["id"] == simulation_request.asteroid_id), None)
-                if not sample_asteroid:
-                    raise HTTPException(status_code=404, detail=f"Asteroid {simulation_request.asteroid_id} not found in NASA data or samples")
-                
-                diameter = sample_asteroid["diameter"]
-                velocity = simulation_request.impact_velocity
-                composition = "rocky"
-                density = 2500
-                
-        except Exception as e:
-            print(f"Error buscando asteroide en NASA API: {e}")
-            # Fallback a sample_asteroids
-            asteroid = next((a for a in sample_asteroids if a["id"] == simulation_request.asteroid_id), None)
-            if not asteroid:
-                raise HTTPException(status_code=404, detail="Asteroid not found")
-            
-            diameter = asteroid["diameter"]
-            velocity = simulation_request.impact_velocity
-            composition = "rocky"
-            density = 2500
-    
-    # Energía cinética: E = 0.5 * m * v²
-    # Masa estimada basada en densidad promedio de asteroides (2.5 g/cm³)
-    volume = (4/3) * np.pi * (diameter/2)**3  # km³
-    mass = volume * 2.5e12  # kg (densidad 2.5 g/cm³)
-    energy_joules = 0.5 * mass * (velocity * 1000)**2  # Joules
-    energy_megatons = energy_joules / 4.184e15  # Conversión a megatones TNT
-    
-    # Diámetro del cráter (fórmula empírica corregida)
-    # Fórmula basada en estudios reales: D_crater ≈ D_asteroid * factor_velocidad
-    crater_diameter_km = 1.8 * diameter * (velocity / 12)**0.78  # km directamente
-    
-    # Obtener coordenadas del impacto
+        # Buscar en el catálogo en memoria (NASA, históricos y samples) sin acceder a la red
+        asteroid = find_asteroid_by_id(simulation_request.asteroid_id)
+        if not asteroid:
+            raise HTTPException(status_code=404, detail=f"Asteroid {simulation_request.asteroid_id} not found in NASA data or samples")
+        
+        diameter = asteroid["diameter"]
+        velocity = simulation_request.impact_velocity
+        composition = asteroid.get("composition", "rocky")
+        density = None
+    
+    return diameter, velocity, composition, density
+
+def scenario_physics(simulation_request: SimulationRequest) -> ImpactPhysics:
+    """Energía y cráter de un escenario con el núcleo físico elegido en physics_mode"""
+    diameter, velocity, composition, density = resolve_asteroid_parameters(simulation_request)
+    # Núcleo físico común con ImpactSimulator (camino escalar) o su tabla precalculada
+    if simulation_request.physics_mode == "exact":
+        return impact_physics(diameter, velocity, simulation_request.impact_angle, density, composition)
+    if simulation_request.physics_mode == "table":
+        return get_effects_table().impact_physics(diameter, velocity, simulation_request.impact_angle,
+                                                  density, composition)
+    raise HTTPException(status_code=400, detail=f"Unknown physics_mode: {simulation_request.physics_mode}")
+
+def submit_scenario(simulation_request: SimulationRequest, demo_info: Optional[dict] = None,
+                    priority: int = PRIORITY_INTERACTIVE) -> Tuple[ImpactPhysics, SimulationJob]:
+    """
+    Calcular la física y encolar el cálculo de víctimas en el ejecutor de simulaciones
+
+    Los datos demográficos (que pueden requerir red) se resuelven aquí; los
+    procesos de trabajo solo integran la población.
+
+    Returns:
+        Tupla (física del impacto, trabajo con el resultado de estimate_casualties)
+    """
+    physics = scenario_physics(simulation_request)
     impact_lat = simulation_request.impact_location.get("lat", 0)
     impact_lon = simulation_request.impact_location.get("lon", 0)
-    
-    # Calcular víctimas usando servicio demográfico
-    casualty_analysis = demographic_service.estimate_casualties(
-        lat=impact_lat,
-        lon=impact_lon,
-        crater_diameter_km=crater_diameter_km,
-        energy_megatons=energy_megatons
-    )
+    if demo_info is None:
+        demo_info = demographic_service.calculate_population_density(impact_lat, impact_lon)
+    job = simulation_executor.submit(DemographicService.estimate_casualties, impact_lat, impact_lon,
+                                     physics.crater_diameter_km, physics.energy_megatons, demo_info,
+                                     priority=priority)
+    return physics, job
+
+def scenario_result(physics: ImpactPhysics, casualty_analysis: dict) -> SimulationResult:
+    """Resultado de una simulación a partir de la física y del análisis de víctimas"""
+    energy_megatons, crater_diameter_km = physics.energy_megatons, physics.crater_diameter_km
     
     casualties_estimate = casualty_analysis.get("total_casualties", 0)
     affected_area = casualty_analysis.get("casualties_by_zone", {}).get("moderate_damage_zone", {}).get("radius_km", crater_diameter_km * 3) ** 2 * np.pi
@@ -380,29 +598,439 @@ async def run_simulation(simulation_request: SimulationRequest):
         economic_damage=economic_damage
     )
 
+def canonical_scenario(simulation_request: SimulationRequest) -> SimulationRequest:
+    """
+    Escenario equivalente con los parámetros resueltos y cuantizados
+
+    Los asteroides del catálogo se sustituyen por sus propiedades, así que la
+    clave del cache cambia si el catálogo actualiza el diámetro.
+    """
+    diameter, velocity, composition, density = resolve_asteroid_parameters(simulation_request)
+    params = normalize_scenario(
+        lat=simulation_request.impact_location.get("lat", 0),
+        lon=simulation_request.impact_location.get("lon", 0),
+        angle=simulation_request.impact_angle,
+        velocity=velocity,
+        diameter=diameter,
+        composition=composition,
+        density=density
+    )
+    return SimulationRequest(
+        asteroid_id="custom-asteroid",
+        impact_location={"lat": params["lat"], "lon": params["lon"]},
+        impact_angle=params["angle"],
+        impact_velocity=params["velocity"],
+        asteroid_diameter=params["diameter"],
+        asteroid_composition=params["composition"],
+        asteroid_density=params["density"],
+        physics_mode=simulation_request.physics_mode
+    )
+
+# Cache de resultados: la versión cubre la física, el cálculo de víctimas y los datos de población
+simulation_cache = SimulationResultCache(model_version=model_version(
+    code=[physics_model, effects_table_model, DemographicService, PopulationGrid, LandMask, CityIndex,
+          resolve_asteroid_parameters, scenario_physics, submit_scenario, scenario_result],
+    data_paths=[
+        getattr(demographic_service.population_grid, "path", None),
+        getattr(demographic_service.land_mask, "path", None),
+        os.getenv('WORLD_CITIES_PATH')
+    ],
+    settings={"nominatim": demographic_service.enable_nominatim}
+))
+
+@app.post("/api/simulation", response_model=SimulationResult)
+async def run_simulation(simulation_request: SimulationRequest, request: Request, response: Response):
+    """
+    Ejecutar simulación de impacto de asteroide
+    
+    Los resultados se cachean por parámetros normalizados y versión del modelo.
+    La respuesta lleva un ETag (salvo si los datos demográficos están degradados);
+    si el cliente lo reenvía en If-None-Match se responde 304 sin recalcular nada.
+    """
+    scenario = canonical_scenario(simulation_request)
+    key = simulation_cache.key(scenario.model_dump())
+    if simulation_cache.matches(request.headers.get("if-none-match"), key):
+        return Response(status_code=304, headers={"ETag": simulation_cache.etag(key), "Cache-Control": "no-cache"})
+    
+    def compute():
+        lat, lon = scenario.impact_location["lat"], scenario.impact_location["lon"]
+        demo_info = demographic_service.calculate_population_density(lat, lon)
+        # La integración de población corre en un proceso; este hilo solo espera
+        physics, job = submit_scenario(scenario, demo_info=demo_info, priority=PRIORITY_INTERACTIVE)
+        result = scenario_result(physics, job.result()).model_dump()
+        # Sin data_source los datos demográficos son el valor de emergencia: no se guardan
+        return result, "data_source" in demo_info
+    
+    # La consulta demográfica es bloqueante: se ejecuta fuera del event loop
+    try:
+        result, cacheable = await run_in_threadpool(simulation_cache.get_or_compute, key, compute)
+    except SimulationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CancelledError:
+        raise HTTPException(status_code=503, detail="Simulation cancelled")
+    if cacheable:
+        response.headers.update({"ETag": simulation_cache.etag(key), "Cache-Control": "no-cache"})
+    else:
+        # Resultado con datos de emergencia: ni se cachea ni se puede revalidar
+        response.headers["Cache-Control"] = "no-store"
+    return result
+
+@app.post("/api/simulation/batch")
+async def run_simulation_batch(batch_request: BatchSimulationRequest):
+    """
+    Ejecutar muchos escenarios en una sola petición
+    
+    Devuelve NDJSON (una línea JSON por escenario) a medida que se calculan.
+    Los datos demográficos se consultan una sola vez por ubicación y los
+    cálculos de víctimas se reparten entre los procesos del ejecutor con
+    prioridad de lote, manteniendo el orden de las líneas.
+    """
+    scenarios = list(batch_request.scenarios or [])
+    # El tamaño se comprueba antes de expandir la rejilla (el producto puede ser enorme)
+    total = len(scenarios) + (batch_request.grid.size() if batch_request.grid is not None else 0)
+    if not total:
+        raise HTTPException(status_code=400, detail="Batch must contain scenarios or a grid")
+    if total > MAX_BATCH_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Batch too large ({total} > {MAX_BATCH_SCENARIOS} scenarios)")
+    if batch_request.grid is not None:
+        scenarios.extend(batch_request.grid.expand())
+    
+    def finish(line: dict, physics: Optional[ImpactPhysics], job: Optional[SimulationJob]) -> str:
+        if job is not None:
+            try:
+                line["result"] = scenario_result(physics, job.result()).model_dump()
+            except Exception as e:
+                line["error"] = str(e) or type(e).__name__
+        return json.dumps(line) + "\n"
+    
+    def generate():
+        demographics = {}
+        # Trabajos en vuelo: suficientes para ocupar todos los procesos sin acaparar la cola
+        pending = deque()
+        window = 2 * max(1, simulation_executor.workers)
+        try:
+            for index, scenario in enumerate(scenarios):
+                lat = scenario.impact_location.get("lat", 0)
+                lon = scenario.impact_location.get("lon", 0)
+                line = {"index": index, "scenario": scenario.model_dump(exclude_none=True)}
+                physics = job = None
+                try:
+                    if (lat, lon) not in demographics:
+                        demographics[(lat, lon)] = demographic_service.calculate_population_density(lat, lon)
+                    physics, job = submit_scenario(scenario, demo_info=demographics[(lat, lon)],
+                                                   priority=PRIORITY_BATCH)
+                except HTTPException as e:
+                    line["error"] = e.detail
+                except Exception as e:
+                    line["error"] = str(e)
+                pending.append((line, physics, job))
+                while len(pending) > window or (pending and pending[0][2] is None):
+                    yield finish(*pending.popleft())
+            while pending:
+                yield finish(*pending.popleft())
+        finally:
+            # Cliente desconectado: no seguir calculando lo que ya nadie leerá
+            for _, _, job in pending:
+                if job is not None:
+                    job.cancel()
+    
+    # Starlette itera el generador síncrono en un hilo aparte
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.post("/api/simulation/monte-carlo")
+async def run_monte_carlo_simulation(request: MonteCarloRequest):
+    """Simulación Monte Carlo con incertidumbre en diámetro, densidad, velocidad y ángulo"""
+    
+    if request.asteroid_id == "custom-asteroid":
+        diameter_max = request.asteroid_diameter or 1.0
+        diameter_min = diameter_max
+        base_velocity = request.impact_velocity
+        composition = request.asteroid_composition or "rocky"
+    else:
+        asteroid = find_asteroid_by_id(request.asteroid_id)
+        if not asteroid:
+            raise HTTPException(status_code=404, detail=f"Asteroid {request.asteroid_id} not found in NASA data or samples")
+        diameter_max = asteroid["diameter"]
+        diameter_min = asteroid.get("diameter_min", diameter_max)
+        base_velocity = request.impact_velocity or asteroid["velocity"]
+        composition = request.asteroid_composition or asteroid.get("composition", "rocky")
+    
+    if not base_velocity and not request.velocity_distribution:
+        raise HTTPException(status_code=400, detail="impact_velocity is required for custom asteroids")
+    
+    # Distribuciones por defecto: rango de diámetro de NeoWs, ±20% densidad, ±10% velocidad
+    mean_density = COMPOSITION_DENSITIES.get(composition, 2500)
+    diameter = request.diameter_distribution or (
+        {"type": "uniform", "low": diameter_min, "high": diameter_max}
+        if diameter_min < diameter_max else {"type": "fixed", "value": diameter_max}
+    )
+    density = request.density_distribution or {
+        "type": "normal", "mean": mean_density, "std": 0.2 * mean_density, "low": 500, "high": 8000
+    }
+    velocity = request.velocity_distribution or {
+        "type": "normal", "mean": base_velocity, "std": 0.1 * base_velocity, "low": 11.2, "high": 72
+    }
+    
+    impact_lat = request.impact_location.get("lat", 0)
+    impact_lon = request.impact_location.get("lon", 0)
+    
+    def map_chunks(fn, tasks):
+        # Los bloques se reparten entre los procesos calientes del ejecutor
+        return simulation_executor.map(without_service, [(fn, task) for task in tasks],
+                                       priority=PRIORITY_INTERACTIVE)
+    
+    def run():
+        region_type = demographic_service.calculate_population_density(impact_lat, impact_lon).get("region_type")
+        return monte_carlo_simulator.run(
+            diameter=diameter,
+            density=density,
+            velocity=velocity,
+            angle=request.angle_distribution,
+            composition=composition,
+            terrain=REGION_TERRAIN.get(region_type, "land"),
+            n_samples=request.n_samples,
+            seed=request.seed,
+            map_chunks=map_chunks
+        )
+    
+    try:
+        result = await run_in_threadpool(run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SimulationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CancelledError:
+        raise HTTPException(status_code=503, detail="Simulation cancelled")
+    
+    result["asteroid_id"] = request.asteroid_id
+    result["impact_location"] = {"lat": impact_lat, "lon": impact_lon}
+    return result
+
+def summarize_corridor(corridor, casualties: dict, physics, max_points: int) -> dict:
+    """Víctimas esperadas y peor caso del corredor, con puntos ordenados a lo largo de él"""
+    total = casualties["total_casualties"]
+    worst = int(np.argmax(total))
+    # Puntos ordenados por ζ (a lo largo de la línea de variaciones), submuestreados
+    order = np.argsort(corridor.zeta)
+    keep = order[np.unique(np.linspace(0, len(order) - 1, max(1, min(max_points, len(order)))).astype(int))]
+    
+    def point(index: int) -> dict:
+        return {
+            "lat": round(float(corridor.lat[index]), 4),
+            "lon": round(float(corridor.lon[index]), 4),
+            "impact_angle": round(float(corridor.impact_angle[index]), 2),
+            "energy_megatons": float(physics.energy_megatons[index]),
+            "casualties": int(total[index]),
+            "ocean": bool(casualties["is_ocean"][index])
+        }
+    
+    return {
+        "n_samples": len(corridor),
+        "v_inf_kms": round(corridor.v_inf, 3),
+        "impact_velocity_kms": round(corridor.impact_velocity, 3),
+        "capture_radius_km": round(corridor.capture_radius, 1),
+        "impact_fraction": corridor.impact_fraction,
+        "mean_energy_megatons": float(np.mean(physics.energy_megatons)),
+        "mean_crater_diameter_km": float(np.mean(physics.crater_diameter_km)),
+        "expected_casualties": float(total.mean()),
+        "worst_case": point(worst),
+        "casualty_percentiles": {f"p{q}": float(np.percentile(total, q)) for q in (50, 90, 99)},
+        "ocean_fraction": float(casualties["is_ocean"].mean()),
+        "tsunami_fraction": float(casualties["tsunami_risk"].mean()),
+        "corridor": [point(int(index)) for index in keep]
+    }
+
+@app.post("/api/impact-corridor")
+async def compute_impact_corridor(request: ImpactCorridorRequest):
+    """
+    Corredor de riesgo de un asteroide: puntos de impacto plausibles según la
+    geometría de llegada y la rotación terrestre, con víctimas en todo el corredor
+    """
+    if not 1 <= request.n_samples <= MAX_CORRIDOR_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"n_samples must be between 1 and {MAX_CORRIDOR_SAMPLES}")
+    if len(request.center) != 2 or len(request.sigma) != 2:
+        raise HTTPException(status_code=400, detail="center and sigma must have two values (xi, zeta)")
+    
+    if request.asteroid_id == "custom-asteroid":
+        diameter = request.asteroid_diameter or 1.0
+        composition = request.asteroid_composition or "rocky"
+        catalog_velocity = None
+    else:
+        asteroid = find_asteroid_by_id(request.asteroid_id)
+        if not asteroid:
+            raise HTTPException(status_code=404, detail=f"Asteroid {request.asteroid_id} not found in NASA data or samples")
+        diameter = request.asteroid_diameter or asteroid["diameter"]
+        composition = request.asteroid_composition or asteroid.get("composition", "rocky")
+        catalog_velocity = asteroid.get("velocity")
+    
+    try:
+        epoch_jd = datetime_to_jd(datetime.fromisoformat(request.epoch.replace("Z", "")))
+        if request.designation:
+            sbdb = await nasa_service.get_small_body_data(request.designation)
+            if not sbdb:
+                raise HTTPException(status_code=502, detail=f"SBDB data unavailable for {request.designation}")
+            v_inf = velocity_from_orbit(parse_sbdb_elements(sbdb), epoch_jd)
+        elif request.radiant is not None:
+            speed = request.v_inf or catalog_velocity
+            if not speed:
+                raise ValueError("v_inf is required for custom asteroids")
+            v_inf = velocity_from_radiant(speed, float(request.radiant["ra"]), float(request.radiant["dec"]))
+        else:
+            raise ValueError("Either designation or radiant is required")
+    except (KeyError, TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def sample():
+        corridor = sample_impact_corridor(v_inf, epoch_jd, n_samples=request.n_samples, center=request.center,
+                                          sigma=request.sigma, time_sigma_hours=request.time_sigma_hours,
+                                          seed=request.seed)
+        # Misma física que /api/simulation, con el ángulo de entrada de cada muestra
+        physics = impact_physics(diameter, corridor.impact_velocity, corridor.impact_angle, composition=composition)
+        return corridor, physics
+    
+    try:
+        corridor, physics = await run_in_threadpool(sample)
+        casualties = await simulation_executor.run(DemographicService.estimate_casualties_batch,
+                                                   corridor.lat, corridor.lon, physics.crater_diameter_km,
+                                                   physics.energy_megatons, priority=PRIORITY_INTERACTIVE)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SimulationTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    result = summarize_corridor(corridor, casualties, physics, request.max_points)
+    
+    result["asteroid_id"] = request.asteroid_id
+    result["epoch"] = request.epoch
+    return result
+
+# Mapas de víctimas: teselas en disco por impactor y versión del modelo
+HEATMAP_DIR = os.getenv('HEATMAP_DIR', os.path.join(CACHE_DIR, 'heatmaps'))
+# Los bloques de filas se calculan en los procesos del ejecutor de simulaciones
+heatmap_generator = CasualtyHeatmapGenerator(demographic_service, executor=simulation_executor)
+heatmap_version = model_version(code=[casualty_heatmap_model],
+                                settings={"simulation": simulation_cache.model_version})
+
+def heatmap_path(heatmap_id: str) -> str:
+    """Directorio de un mapa (404 si el identificador no es válido o no existe)"""
+    if not all(part and all(c in "0123456789abcdef" for c in part) for part in heatmap_id.split("-", 1)):
+        raise HTTPException(status_code=404, detail=f"Heatmap {heatmap_id} not found")
+    path = os.path.join(HEATMAP_DIR, heatmap_id)
+    if not os.path.isfile(os.path.join(path, "metadata.json")):
+        raise HTTPException(status_code=404, detail=f"Heatmap {heatmap_id} not found")
+    return path
+
+def heatmap_response(heatmap_id: str, metadata: dict) -> dict:
+    return {
+        "status": "success",
+        "heatmap_id": heatmap_id,
+        "tile_url": f"/api/heatmap/{heatmap_id}/tiles/{{z}}/{{x}}/{{y}}.png",
+        **metadata
+    }
+
+@app.post("/api/heatmap")
+async def create_casualty_heatmap(request: HeatmapRequest):
+    """
+    Mapa global de víctimas de un impactor (impacto en el centro de cada celda)
+
+    Se calcula una vez por impactor, resolución y versión del modelo; las
+    peticiones repetidas reutilizan las teselas ya escritas en disco.
+    """
+    if not MIN_HEATMAP_RESOLUTION <= request.resolution <= 10:
+        raise HTTPException(status_code=400,
+                            detail=f"resolution must be between {MIN_HEATMAP_RESOLUTION} and 10 degrees")
+    if abs(180 / request.resolution - round(180 / request.resolution)) > 1e-6:
+        raise HTTPException(status_code=400, detail="resolution must divide 180 degrees")
+
+    scenario = canonical_scenario(SimulationRequest(
+        asteroid_id=request.asteroid_id,
+        impact_location={"lat": 0, "lon": 0},
+        impact_angle=request.impact_angle,
+        impact_velocity=request.impact_velocity,
+        asteroid_diameter=request.asteroid_diameter,
+        asteroid_composition=request.asteroid_composition,
+        asteroid_density=request.asteroid_density
+    ))
+    params = scenario.model_dump(exclude={"asteroid_id", "impact_location", "physics_mode"})
+    params["resolution"] = round(request.resolution, 6)
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":")).encode()
+    heatmap_id = f"{heatmap_version}-{hashlib.sha256(encoded).hexdigest()[:32]}"
+    directory = os.path.join(HEATMAP_DIR, heatmap_id)
+
+    metadata_path = os.path.join(directory, "metadata.json")
+    if os.path.isfile(metadata_path):
+        with open(metadata_path) as f:
+            return heatmap_response(heatmap_id, json.load(f))
+
+    def run():
+        physics = impact_physics(scenario.asteroid_diameter, scenario.impact_velocity, scenario.impact_angle,
+                                 scenario.asteroid_density, scenario.asteroid_composition)
+        # Se escribe en un directorio temporal y se publica con un rename atómico
+        os.makedirs(HEATMAP_DIR, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".tmp-", dir=HEATMAP_DIR)
+        try:
+            metadata = heatmap_generator.generate(physics.crater_diameter_km, physics.energy_megatons, staging,
+                                                  resolution_deg=request.resolution,
+                                                  extra={"impactor": params, "asteroid_id": request.asteroid_id})
+            os.rename(staging, directory)
+        except OSError:
+            # Otra petición publicó el mismo mapa mientras se calculaba
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isfile(metadata_path):
+                raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return metadata
+
+    try:
+        metadata = await run_in_threadpool(run)
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except CancelledError:
+        raise HTTPException(status_code=503, detail="Heatmap cancelled")
+    return heatmap_response(heatmap_id, metadata)
+
+@app.get("/api/heatmap/{heatmap_id}")
+async def get_casualty_heatmap(heatmap_id: str):
+    """Metadatos de un mapa de víctimas ya calculado"""
+    with open(os.path.join(heatmap_path(heatmap_id), "metadata.json")) as f:
+        return heatmap_response(heatmap_id, json.load(f))
+
+@app.get("/api/heatmap/{heatmap_id}/tiles/{z}/{x}/{tile}")
+async def get_casualty_heatmap_tile(heatmap_id: str, z: int, x: int, tile: str):
+    """Tesela {y}.png (escala de color) o {y}.npy (víctimas en float32) de un mapa"""
+    y, _, extension = tile.partition(".")
+    if not y.isdigit() or extension not in TILE_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Tile {tile} not found")
+    path = os.path.join(heatmap_path(heatmap_id), str(z), str(x), f"{int(y)}.{extension}")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Tile {z}/{x}/{tile} not found")
+    media_type = "image/png" if extension == "png" else "application/octet-stream"
+    # El contenido de un identificador no cambia nunca
+    return FileResponse(path, media_type=media_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
 @app.get("/api/risk-analysis/{asteroid_id}")
 async def get_risk_analysis(asteroid_id: str):
     """Obtener análisis de riesgos detallado"""
-    asteroid = find_asteroid_by_id(asteroid_id)
-    if not asteroid:
+    # Factores precalculados para todo el catálogo al refrescar el feed
+    risk = asteroid_catalog.get_risk(asteroid_id)
+    if not risk:
         raise HTTPException(status_code=404, detail=f"Asteroid {asteroid_id} not found in NASA or sample data")
     
-    # Calcular factores de riesgo
-    size_factor = min(asteroid["diameter"] / 10, 1.0)  # Normalizado a 10km max
-    velocity_factor = min(asteroid["velocity"] / 30, 1.0)  # Normalizado a 30km/s max
-    distance_factor = max(0, 1 - (asteroid["distance_from_earth"] / 50000000))  # 50M km threshold
-    
-    overall_risk = (size_factor + velocity_factor + distance_factor) / 3
+    overall_risk = risk["overall_risk_score"]
+    distance_factor = risk["proximity"]
     
     return {
         "asteroid_id": asteroid_id,
         "overall_risk_score": overall_risk,
         "risk_factors": {
-            "size": size_factor,
-            "velocity": velocity_factor,
+            "size": risk["size"],
+            "velocity": risk["velocity"],
             "proximity": distance_factor
         },
-        "mitigation_urgency": "HIGH" if overall_risk > 0.7 else "MEDIUM" if overall_risk > 0.4 else "LOW",
+        "risk_score": risk["risk_score"],
+        "risk_level": risk["risk_level"],
+        "mitigation_urgency": risk["mitigation_urgency"],
         "estimated_detection_time": "6 months" if distance_factor > 0.8 else "2 years",
         "recommended_actions": [
             "Continuous monitoring",
@@ -411,6 +1039,55 @@ async def get_risk_analysis(asteroid_id: str):
         ]
     }
 
+def scan_close_approaches(records: List[dict], start_date: Optional[str], years: float,
+                          max_distance_au: float, step_days: float = 1.0) -> dict:
+    """Propagar las órbitas y buscar aproximaciones a la Tierra en la ventana pedida"""
+    if not 0 < years <= MAX_SCREEN_YEARS:
+        raise ValueError(f"years debe estar entre 0 y {MAX_SCREEN_YEARS}")
+    if not 0 < max_distance_au <= 1 or not 0 < step_days <= 5:
+        raise ValueError("max_distance_au debe estar en (0, 1] y step_days en (0, 5]")
+    start_jd = datetime_to_jd(start_date or datetime.utcnow())
+    end_jd = start_jd + years * 365.25
+    approaches = find_close_approaches(OrbitalElements.from_records(records), start_jd, end_jd,
+                                       max_distance_au=max_distance_au, step_days=step_days)
+    return {
+        "model": "two-body",
+        "window": {"start_jd": start_jd, "end_jd": end_jd, "years": years},
+        "max_distance_au": max_distance_au,
+        "objects_screened": len(records),
+        "close_approaches": approaches
+    }
+
+@app.get("/api/close-approaches/{designation}")
+async def predict_close_approaches(designation: str, start_date: Optional[str] = None,
+                                   years: float = Query(10, gt=0), max_distance_au: float = Query(0.05, gt=0)):
+    """Aproximaciones a la Tierra predichas localmente a partir de los elementos SBDB"""
+    sbdb = await nasa_service.get_small_body_data(designation)
+    if not sbdb:
+        raise HTTPException(status_code=502, detail=f"SBDB data unavailable for {designation}")
+    try:
+        elements = parse_sbdb_elements(sbdb)
+        result = await run_in_threadpool(scan_close_approaches, [elements], start_date, years, max_distance_au)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result["designation"] = elements["designation"]
+    result["moid_au"] = elements["moid"]
+    return result
+
+@app.post("/api/close-approaches/screen")
+async def screen_close_approaches(request: CloseApproachScreenRequest):
+    """Cribar muchos objetos a la vez con sus elementos orbitales, sin consultar CAD"""
+    if not request.objects:
+        raise HTTPException(status_code=400, detail="objects must not be empty")
+    if len(request.objects) > MAX_SCREEN_OBJECTS:
+        raise HTTPException(status_code=400, detail=f"Too many objects (max {MAX_SCREEN_OBJECTS})")
+    records = [record.model_dump() for record in request.objects]
+    try:
+        return await run_in_threadpool(scan_close_approaches, records, request.start_date, request.years,
+                                       request.max_distance_au, request.step_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/mitigation-strategies/{asteroid_id}")
 async def get_mitigation_strategies(asteroid_id: str):
     """Obtener estrategias de mitigación disponibles"""
@@ -458,7 +1135,3 @@ async def get_mitigation_strategies(asteroid_id: str):
         "recommended_strategy": strategies[0]["name"] if strategies else "Monitoring",
         "decision_timeline": "Immediate action required" if asteroid["risk_level"] == "HIGH" else "Plan within 2 years"
     }
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
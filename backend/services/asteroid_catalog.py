@@ -0,0 +1,301 @@
+"""
+Catálogo en memoria de asteroides indexado por ID
+Combina datos de NASA, asteroides históricos y datos de ejemplo
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+
+from services.risk_scoring import AU_KM, risk_factors, risk_levels, risk_scores
+
+logger = logging.getLogger(__name__)
+
+# Prioridad de las fuentes cuando un mismo ID aparece en varias
+SOURCE_PRIORITY = ("nasa", "historical", "sample")
+
+
+def nasa_to_api_record(neo: Dict[str, Any], source: str = "nasa") -> Dict[str, Any]:
+    """
+    Convertir un asteroide procesado de NASA al formato estándar de la API
+
+    Args:
+        neo: Asteroide devuelto por NASAApiService.get_processed_asteroids
+        source: Fuente del registro ("nasa" o "historical")
+
+    Returns:
+        Dict con el formato de la API (id, name, diameter, velocity...)
+    """
+    is_hazardous = neo.get("is_potentially_hazardous_asteroid", False)
+    return {
+        "id": neo["id"],
+        "name": neo["name"],
+        "diameter": neo["estimated_diameter_km_max"],
+        "diameter_min": neo.get("estimated_diameter_km_min", neo["estimated_diameter_km_max"]),
+        "velocity": neo["relative_velocity_km_s"],
+        "distance_from_earth": neo["miss_distance_km"],
+        "risk_level": "High" if is_hazardous else "Low",
+        "impact_probability": 0.001 if is_hazardous else 0.0001,
+        "is_potentially_hazardous": is_hazardous,
+        "absolute_magnitude_h": neo.get("absolute_magnitude_h"),
+        "source": source
+    }
+
+
+class ColumnarCatalog:
+    """
+    Catálogo en columnas NumPy (una fila por asteroide) con la puntuación de
+    riesgo y los factores de /api/risk-analysis calculados para todas las
+    filas en una sola pasada vectorizada.
+    """
+
+    # Columnas de entrada
+    BASE_COLUMNS = ("id", "name", "diameter_km", "diameter_km_avg", "velocity_kms",
+                    "distance_km", "is_hazardous", "absolute_magnitude_h")
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        Args:
+            columns: Arrays de igual longitud con las columnas BASE_COLUMNS
+        """
+        self.columns = {name: np.asarray(columns[name]) for name in self.BASE_COLUMNS}
+        self._rows = {asteroid_id: row for row, asteroid_id in enumerate(self.columns["id"].tolist())}
+        self.rescore()
+
+    @classmethod
+    def from_api_records(cls, records: Iterable[Dict[str, Any]]) -> "ColumnarCatalog":
+        """Construir desde registros en formato de la API (los del índice por ID)"""
+        records = list(records)
+        diameter = np.array([record["diameter"] for record in records], dtype=np.float64)
+        diameter_min = np.array([record.get("diameter_min", record["diameter"]) for record in records],
+                                dtype=np.float64)
+        return cls({
+            "id": np.array([record["id"] for record in records], dtype=np.str_),
+            "name": np.array([record.get("name", "") for record in records], dtype=np.str_),
+            "diameter_km": diameter,
+            "diameter_km_avg": (diameter_min + diameter) / 2,
+            "velocity_kms": np.array([record["velocity"] for record in records], dtype=np.float64),
+            "distance_km": np.array([record["distance_from_earth"] for record in records], dtype=np.float64),
+            "is_hazardous": np.array([bool(record.get("is_potentially_hazardous", False)) for record in records],
+                                     dtype=np.bool_),
+            "absolute_magnitude_h": np.array([np.nan if record.get("absolute_magnitude_h") is None
+                                              else record["absolute_magnitude_h"] for record in records],
+                                             dtype=np.float64)
+        })
+
+    @classmethod
+    def from_ingested(cls, columns: Dict[str, np.ndarray]) -> "ColumnarCatalog":
+        """Construir desde las columnas de services.neo_ingest.load_catalog_columns"""
+        diameter = columns["estimated_diameter_km_max"]
+        return cls({
+            "id": columns["id"],
+            "name": columns["name"],
+            "diameter_km": diameter,
+            "diameter_km_avg": (columns["estimated_diameter_km_min"] + diameter) / 2,
+            "velocity_kms": columns["relative_velocity_km_s"],
+            "distance_km": columns["miss_distance_km"],
+            "is_hazardous": columns["is_potentially_hazardous_asteroid"],
+            "absolute_magnitude_h": columns["absolute_magnitude_h"]
+        })
+
+    def merge(self, other: "ColumnarCatalog") -> "ColumnarCatalog":
+        """Unir con otro catálogo; las filas de este tienen prioridad por ID"""
+        if not len(other):
+            return self
+        extra = ~np.isin(other.columns["id"], self.columns["id"])
+        return ColumnarCatalog({name: np.concatenate([self.columns[name], other.columns[name][extra]])
+                                for name in self.BASE_COLUMNS})
+
+    def rescore(self):
+        """Recalcular puntuación, nivel y factores de riesgo de todas las filas"""
+        columns = self.columns
+        columns["distance_au"] = columns["distance_km"] / AU_KM
+        columns["risk_score"] = risk_scores(columns["diameter_km_avg"], columns["velocity_kms"],
+                                            columns["distance_au"], columns["is_hazardous"])
+        columns["risk_level"] = risk_levels(columns["risk_score"])
+        factors = risk_factors(columns["diameter_km"], columns["velocity_kms"], columns["distance_km"])
+        columns["size_factor"] = factors["size"]
+        columns["velocity_factor"] = factors["velocity"]
+        columns["proximity_factor"] = factors["proximity"]
+        columns["overall_risk"] = factors["overall"]
+        columns["mitigation_urgency"] = factors["mitigation_urgency"]
+
+    def row(self, asteroid_id: str) -> Optional[int]:
+        return self._rows.get(asteroid_id)
+
+    def get_risk(self, asteroid_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Puntuación y factores precalculados de un asteroide
+
+        Returns:
+            Dict con risk_score, risk_level, factores y urgencia, o None si no existe
+        """
+        row = self.row(asteroid_id)
+        if row is None:
+            return None
+        columns = self.columns
+        return {
+            "risk_score": int(columns["risk_score"][row]),
+            "risk_level": str(columns["risk_level"][row]),
+            "overall_risk_score": float(columns["overall_risk"][row]),
+            "size": float(columns["size_factor"][row]),
+            "velocity": float(columns["velocity_factor"][row]),
+            "proximity": float(columns["proximity_factor"][row]),
+            "mitigation_urgency": str(columns["mitigation_urgency"][row])
+        }
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        levels, counts = np.unique(self.columns["risk_level"], return_counts=True)
+        return {"rows": len(self), "risk_levels": {str(level): int(count) for level, count in zip(levels, counts)}}
+
+
+class AsteroidCatalog:
+    """
+    Índice de asteroides por ID con búsquedas O(1) que nunca acceden a la red.
+    Los datos de NASA se actualizan de forma incremental cada vez que se
+    refresca el feed.
+    """
+
+    def __init__(self, sample_asteroids: Iterable[Dict[str, Any]] = (),
+                 historical_asteroids: Iterable[Dict[str, Any]] = ()):
+        """
+        Inicializar el catálogo
+
+        Args:
+            sample_asteroids: Asteroides de ejemplo en formato de la API
+            historical_asteroids: Asteroides históricos en formato procesado de NASA
+        """
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Dict[str, Dict[str, Any]]] = {source: {} for source in SOURCE_PRIORITY}
+        self._index: Dict[str, Dict[str, Any]] = {}
+
+        for asteroid in sample_asteroids:
+            record = dict(asteroid)
+            record["source"] = "sample"
+            self._sources["sample"][record["id"]] = record
+
+        for asteroid in historical_asteroids:
+            record = nasa_to_api_record(asteroid, source="historical")
+            self._sources["historical"][record["id"]] = record
+
+        for asteroid_id in self._all_ids():
+            self._reindex(asteroid_id)
+        
+        # Vista en columnas: índice por ID + catálogo completo de NeoWs (opcional)
+        self._bulk = ColumnarCatalog.from_api_records([])
+        self.columnar = ColumnarCatalog.from_api_records([])
+        self.rescore_seconds = 0.0
+        self._rebuild_columnar()
+
+    def _all_ids(self) -> set:
+        ids = set()
+        for records in self._sources.values():
+            ids.update(records)
+        return ids
+
+    def _rebuild_columnar(self):
+        """Reconstruir y puntuar la vista en columnas (los registros del índice tienen prioridad)"""
+        start = time.perf_counter()
+        with self._lock:
+            records = list(self._index.values())
+        self.columnar = ColumnarCatalog.from_api_records(records).merge(self._bulk)
+        self.rescore_seconds = time.perf_counter() - start
+    
+    def set_bulk_catalog(self, columns: Dict[str, np.ndarray]):
+        """
+        Añadir el catálogo completo descargado de /neo/browse a la vista en columnas
+
+        Args:
+            columns: Columnas de services.neo_ingest.load_catalog_columns
+        """
+        self._bulk = ColumnarCatalog.from_ingested(columns)
+        self._rebuild_columnar()
+        logger.info(f"Catálogo NeoWs completo: {len(self._bulk)} objetos")
+    
+    def get_risk(self, asteroid_id: str) -> Optional[Dict[str, Any]]:
+        """Riesgo precalculado de un asteroide del índice o del catálogo completo"""
+        return self.columnar.get_risk(asteroid_id)
+    
+    def _reindex(self, asteroid_id: str):
+        """Recalcular la entrada del índice con la fuente de mayor prioridad (requiere el lock)"""
+        for source in SOURCE_PRIORITY:
+            record = self._sources[source].get(asteroid_id)
+            if record is not None:
+                self._index[asteroid_id] = record
+                return
+        self._index.pop(asteroid_id, None)
+
+    def update_nasa(self, processed_asteroids: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Actualizar de forma incremental los registros de NASA tras refrescar el feed
+
+        Args:
+            processed_asteroids: Lista completa devuelta por el procesamiento del feed
+
+        Returns:
+            Dict con el número de registros modificados y eliminados
+        """
+        historical = self._sources["historical"]
+        new_records = {}
+        for neo in processed_asteroids:
+            try:
+                # Los históricos añadidos por el servicio ya están con su propia fuente
+                if historical.get(neo["id"]) == nasa_to_api_record(neo, source="historical"):
+                    continue
+                new_records[neo["id"]] = nasa_to_api_record(neo)
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Registro NASA inválido para el catálogo: {e}")
+
+        with self._lock:
+            current = self._sources["nasa"]
+            removed = [asteroid_id for asteroid_id in current if asteroid_id not in new_records]
+            changed = [asteroid_id for asteroid_id, record in new_records.items()
+                       if current.get(asteroid_id) != record]
+
+            for asteroid_id in removed:
+                del current[asteroid_id]
+                self._reindex(asteroid_id)
+            for asteroid_id in changed:
+                current[asteroid_id] = new_records[asteroid_id]
+                self._reindex(asteroid_id)
+
+        if changed or removed:
+            self._rebuild_columnar()
+        
+        stats = {"changed": len(changed), "removed": len(removed), "total": len(self._index)}
+        logger.info(f"Catálogo actualizado: {stats}")
+        return stats
+
+    def get(self, asteroid_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Buscar un asteroide por ID sin acceder a la red
+
+        Args:
+            asteroid_id: ID del asteroide
+
+        Returns:
+            Copia del registro en formato de la API o None si no existe
+        """
+        record = self._index.get(asteroid_id)
+        return dict(record) if record is not None else None
+
+    def __contains__(self, asteroid_id: str) -> bool:
+        return asteroid_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Número de registros por fuente y de la vista en columnas"""
+        stats = {source: len(records) for source, records in self._sources.items()}
+        stats["total"] = len(self._index)
+        stats["bulk"] = len(self._bulk)
+        stats["columnar"] = self.columnar.get_stats()
+        stats["rescore_ms"] = round(1000 * self.rescore_seconds, 2)
+        return stats
@@ -0,0 +1,312 @@
+"""
+Consultas filtradas, ordenadas y paginadas sobre la lista de asteroides procesados
+Cada clave de ordenación tiene un índice ordenado precalculado, de modo que una
+página se obtiene recorriendo el índice desde el cursor y no todo el catálogo
+"""
+
+import base64
+import json
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from services.asteroid_catalog import nasa_to_api_record
+from services.risk_scoring import AU_KM, risk_scores
+
+logger = logging.getLogger(__name__)
+
+# Claves de ordenación admitidas -> columna numérica
+SORT_KEYS = {
+    "default": "default_rank",
+    "diameter": "diameter",
+    "velocity": "velocity",
+    "distance": "distance_from_earth",
+    "date": "close_approach_day",
+    "magnitude": "absolute_magnitude_h",
+    "risk": "risk_score"
+}
+
+# Campos que se pueden pedir con `fields`
+PROJECTABLE_FIELDS = ("id", "name", "diameter", "diameter_min", "velocity", "distance_from_earth",
+                      "risk_level", "impact_probability", "is_potentially_hazardous",
+                      "absolute_magnitude_h", "source", "close_approach_date", "risk_score")
+
+# Filas evaluadas por bloque al recorrer el índice
+SCAN_CHUNK = 256
+
+# Separación entre peligrosos y no peligrosos en la clave `default` (mayor que
+# cualquier diámetro en km)
+DEFAULT_RANK_SPAN = 1e6
+
+
+@dataclass
+class AsteroidQuery:
+    """Filtros por rango (None = sin límite), ordenación, página y proyección"""
+    min_diameter: Optional[float] = None
+    max_diameter: Optional[float] = None
+    min_velocity: Optional[float] = None
+    max_velocity: Optional[float] = None
+    min_distance_au: Optional[float] = None
+    max_distance_au: Optional[float] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    hazardous: Optional[bool] = None
+    min_risk_score: Optional[int] = None
+    sort: str = "default"
+    limit: int = 15
+    cursor: Optional[str] = None
+    fields: Optional[Sequence[str]] = None
+
+
+def _to_day(date: Optional[str]) -> float:
+    """Fecha YYYY-MM-DD como número de día (NaN si falta o no es válida)"""
+    if not date:
+        return math.nan
+    try:
+        return float(np.datetime64(date[:10], 'D').astype(np.int64))
+    except ValueError:
+        return math.nan
+
+
+def _encode_cursor(payload: Dict[str, Any]) -> str:
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, dict) or "s" not in payload or "id" not in payload:
+            raise ValueError
+        return payload
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+class AsteroidQueryIndex:
+    """
+    Índice inmutable de una instantánea de asteroides procesados.
+
+    Para cada clave de SORT_KEYS y sentido guarda la permutación que ordena
+    las filas por (valor, id), con los valores ausentes (NaN) al final. Los cursores
+    son de tipo keyset (último valor e id devueltos), así que siguen siendo
+    válidos aunque la instantánea cambie entre dos páginas. Por eso la clave
+    `default` (peligrosos primero, luego por diámetro descendente) se calcula a
+    partir de las columnas y no de la posición en la lista.
+    """
+
+    def __init__(self, processed_asteroids: List[Dict[str, Any]]):
+        """
+        Args:
+            processed_asteroids: Lista de NASAApiService.get_processed_asteroids
+        """
+        records = []
+        for neo in processed_asteroids:
+            record = nasa_to_api_record(neo)
+            record["close_approach_date"] = neo.get("close_approach_date", "")
+            records.append(record)
+        self._build(records)
+
+    @classmethod
+    def from_api_records(cls, api_records: List[Dict[str, Any]]) -> "AsteroidQueryIndex":
+        """
+        Crear el índice a partir de registros ya en formato de la API (datos de muestra)
+
+        Args:
+            api_records: Registros con id, name, diameter, velocity, distance_from_earth y risk_level
+
+        Returns:
+            AsteroidQueryIndex con los campos ausentes completados
+        """
+        records = []
+        for api_record in api_records:
+            record = dict(api_record)
+            record.setdefault("diameter_min", record["diameter"])
+            record.setdefault("is_potentially_hazardous", str(record.get("risk_level", "")).upper() == "HIGH")
+            record.setdefault("absolute_magnitude_h", None)
+            record.setdefault("source", "sample")
+            record.setdefault("close_approach_date", "")
+            records.append(record)
+        index = cls.__new__(cls)
+        index._build(records)
+        return index
+
+    def _build(self, records: List[Dict[str, Any]]):
+        """Calcular las columnas y las permutaciones de ordenación"""
+        self.records = records
+        self.ids = np.array([record["id"] for record in records], dtype=np.str_)
+        columns = {
+            "diameter": np.array([record["diameter"] for record in records], dtype=np.float64),
+            "velocity": np.array([record["velocity"] for record in records], dtype=np.float64),
+            "distance_from_earth": np.array([record["distance_from_earth"] for record in records],
+                                            dtype=np.float64),
+            "close_approach_day": np.array([_to_day(record["close_approach_date"]) for record in records],
+                                           dtype=np.float64),
+            "absolute_magnitude_h": np.array([np.nan if record.get("absolute_magnitude_h") is None
+                                              else record["absolute_magnitude_h"] for record in records],
+                                             dtype=np.float64),
+            "hazardous": np.array([record["is_potentially_hazardous"] for record in records], dtype=bool)
+        }
+        columns["default_rank"] = np.where(columns["hazardous"], 0.0, DEFAULT_RANK_SPAN) - columns["diameter"]
+        diameter_min = np.array([record["diameter_min"] for record in records], dtype=np.float64)
+        columns["risk_score"] = risk_scores((diameter_min + columns["diameter"]) / 2, columns["velocity"],
+                                            columns["distance_from_earth"] / AU_KM,
+                                            columns["hazardous"]).astype(np.float64)
+        for record, score in zip(records, columns["risk_score"]):
+            record["risk_score"] = int(score)
+        self.columns = columns
+
+        # Permutaciones por (valor, id) con los valores ausentes al final; las
+        # descendentes ordenan por -valor para mantener el mismo criterio
+        self._orders = {}
+        for key, column in SORT_KEYS.items():
+            missing = np.isnan(columns[column])
+            for descending in (False, True):
+                values = -columns[column] if descending else columns[column]
+                order = np.lexsort((self.ids, np.where(missing, 0.0, values), missing))
+                self._orders[key, descending] = (order, values[order], self.ids[order])
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @staticmethod
+    def parse_sort(sort: str) -> Tuple[str, bool]:
+        """'-diameter' -> ('diameter', descendente)"""
+        descending = sort.startswith("-")
+        key = sort.lstrip("-")
+        if key not in SORT_KEYS:
+            raise ValueError(f"Ordenación no válida '{sort}'. Opciones: {', '.join(SORT_KEYS)}")
+        return key, descending
+
+    @staticmethod
+    def _bounds(query: AsteroidQuery) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+        """Límites de los filtros por columna, en las unidades del índice"""
+        def day(date: Optional[str]) -> Optional[float]:
+            if not date:
+                return None
+            value = _to_day(date)
+            if math.isnan(value):
+                raise ValueError(f"Fecha no válida '{date}' (formato YYYY-MM-DD)")
+            return value
+
+        def scaled(value: Optional[float], scale: float) -> Optional[float]:
+            return None if value is None else value * scale
+
+        bounds = {
+            "diameter": (query.min_diameter, query.max_diameter),
+            "velocity": (query.min_velocity, query.max_velocity),
+            "distance_from_earth": (scaled(query.min_distance_au, AU_KM), scaled(query.max_distance_au, AU_KM)),
+            "close_approach_day": (day(query.date_from), day(query.date_to)),
+            "risk_score": (query.min_risk_score, None)
+        }
+        return {column: limits for column, limits in bounds.items() if limits != (None, None)}
+
+    def _filter_mask(self, rows: np.ndarray, bounds, hazardous: Optional[bool]) -> np.ndarray:
+        """Evaluar los filtros sobre un bloque de filas"""
+        mask = np.ones(len(rows), dtype=bool)
+        for column, (low, high) in bounds.items():
+            values = self.columns[column][rows]
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+        if hazardous is not None:
+            mask &= self.columns["hazardous"][rows] == hazardous
+        return mask
+
+    def _key_range(self, key: str, descending: bool, bounds) -> Tuple[int, int]:
+        """Tramo del recorrido que cumple el filtro sobre la propia clave de ordenación"""
+        _, values, _ = self._orders[key, descending]
+        low, high = bounds.get(SORT_KEYS[key], (None, None))
+        if descending:
+            low, high = (None if high is None else -high), (None if low is None else -low)
+        start = 0 if low is None else int(np.searchsorted(values, low, side='left'))
+        end = len(values) if high is None else int(np.searchsorted(values, high, side='right'))
+        return start, end
+
+    def _start_position(self, key: str, descending: bool, cursor: Optional[str]) -> int:
+        """Posición del recorrido siguiente a la última fila devuelta (keyset)"""
+        if not cursor:
+            return 0
+        payload = _decode_cursor(cursor)
+        if payload["s"] != ("-" if descending else "") + key:
+            raise ValueError("El cursor pertenece a otra ordenación")
+
+        _, values, ids = self._orders[key, descending]
+        if payload.get("v") is None:
+            # Último valor ausente: las filas NaN están al final, ordenadas por id
+            lo, hi = int(np.count_nonzero(~np.isnan(values))), len(values)
+        else:
+            lo = int(np.searchsorted(values, payload["v"], side='left'))
+            hi = int(np.searchsorted(values, payload["v"], side='right'))
+
+        # Dentro del bloque de valores iguales las filas van por id
+        return lo + int(np.searchsorted(ids[lo:hi], payload["id"], side='right'))
+
+    def query(self, query: AsteroidQuery) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Ejecutar una consulta
+
+        Returns:
+            Tupla (registros de la página, cursor de la siguiente página o None)
+
+        Raises:
+            ValueError: si la ordenación, el cursor o los campos no son válidos
+        """
+        key, descending = self.parse_sort(query.sort)
+        order, values, ids = self._orders[key, descending]
+        unknown = [field for field in query.fields or () if field not in PROJECTABLE_FIELDS]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+
+        bounds = self._bounds(query)
+        limit = max(1, query.limit)
+        start, end = self._key_range(key, descending, bounds)
+        position = max(start, self._start_position(key, descending, query.cursor))
+        page: List[int] = []
+        last = None
+        while position < end and len(page) < limit:
+            rows = order[position:min(end, position + SCAN_CHUNK)]
+            selected = np.nonzero(self._filter_mask(rows, bounds, query.hazardous))[0][:limit - len(page)]
+            page.extend(rows[selected].tolist())
+            if len(selected):
+                last = position + int(selected[-1])
+            position += len(rows)
+
+        next_cursor = None
+        if len(page) == limit and last is not None and last + 1 < end:
+            value = float(values[last])
+            next_cursor = _encode_cursor({"s": ("-" if descending else "") + key,
+                                          "v": None if math.isnan(value) else value,
+                                          "id": str(ids[last])})
+
+        return [self._project(self.records[row], query.fields) for row in page], next_cursor
+
+    @staticmethod
+    def _project(record: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+        if not fields:
+            return dict(record)
+        return {field: record[field] for field in fields}
+
+
+class QueryIndexCache:
+    """Índice de la instantánea actual, reconstruido solo cuando cambia la lista"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source: Optional[List[Dict[str, Any]]] = None
+        self._index: Optional[AsteroidQueryIndex] = None
+        self.builds = 0
+
+    def get(self, processed_asteroids: List[Dict[str, Any]]) -> AsteroidQueryIndex:
+        with self._lock:
+            if self._source is not processed_asteroids:
+                self._index = AsteroidQueryIndex(processed_asteroids)
+                self._source = processed_asteroids
+                self.builds += 1
+            return self._index
@@ -0,0 +1,219 @@
+"""
+Cache en memoria con expiración por tiempo (TTL)
+Usado para evitar descargas repetidas de las APIs externas
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+# Marca de una carga asíncrona fallida o cancelada
+_FAILED = object()
+
+
+class _Flight:
+    """Carga en curso compartida por los hilos que piden la misma clave"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.completed = False
+
+
+class TTLCache:
+    """
+    Cache LRU acotado con expiración por tiempo y deduplicación de peticiones
+    concurrentes (single-flight): si varios hilos piden la misma clave ausente,
+    solo uno ejecuta la carga y el resto espera su resultado.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = 300, max_entries: int = 32):
+        """
+        Inicializar el cache
+
+        Args:
+            ttl_seconds: Segundos de validez de cada entrada (None = sin expiración)
+            max_entries: Número máximo de entradas antes de desalojar la menos usada
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # clave -> (expira_en, valor)
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._async_inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+        # Contadores de uso
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_waits = 0
+
+    def _expiry(self) -> float:
+        if self.ttl_seconds is None:
+            return float("inf")
+        return time.monotonic() + self.ttl_seconds
+
+    def _lookup(self, key: Hashable):
+        """Buscar una entrada vigente (requiere tener el lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any):
+        """Guardar una entrada desalojando las más antiguas (requiere el lock)"""
+        self._entries[key] = (self._expiry(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor vigente sin cargarlo"""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Guardar un valor en el cache"""
+        with self._lock:
+            self._store(key, value)
+
+    def invalidate(self, key: Hashable = None):
+        """Eliminar una clave (o todo el cache si no se indica clave)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any],
+                    should_cache: Callable[[Any], bool] = bool) -> Any:
+        """
+        Obtener un valor del cache o cargarlo con `loader`
+
+        Args:
+            key: Clave de la entrada
+            loader: Función sin argumentos que produce el valor
+            should_cache: Predicado para decidir si el resultado se guarda
+                          (por defecto no se guardan resultados vacíos)
+
+        Returns:
+            Valor cacheado o recién cargado
+        """
+        while True:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    return value
+
+                flight = self._inflight.get(key)
+                if flight is None:
+                    # Este hilo se encarga de la carga
+                    self.misses += 1
+                    flight = _Flight()
+                    self._inflight[key] = flight
+                    owner = True
+                else:
+                    self.shared_waits += 1
+                    owner = False
+
+            if not owner:
+                # Esperar el resultado de la carga en curso
+                flight.event.wait()
+                if flight.completed:
+                    return flight.value
+                # La carga compartida lanzó una excepción: reintentar
+                continue
+
+            try:
+                value = loader()
+                flight.value = value
+                flight.completed = True
+                if should_cache(value):
+                    with self._lock:
+                        self._store(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight.event.set()
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                                should_cache: Callable[[Any], bool] = bool) -> Any:
+        """
+        Variante asíncrona de get_or_load: las corrutinas que piden la misma
+        clave ausente esperan una única carga en curso
+
+        Args:
+            key: Clave de la entrada
+            loader: Función sin argumentos que devuelve una corrutina con el valor
+            should_cache: Predicado para decidir si el resultado se guarda
+
+        Returns:
+            Valor cacheado o recién cargado
+        """
+        while True:
+            with self._lock:
+                found, value = self._lookup(key)
+                if found:
+                    self.hits += 1
+                    return value
+
+                future = self._async_inflight.get(key)
+                if future is None:
+                    self.misses += 1
+                    future = asyncio.get_running_loop().create_future()
+                    self._async_inflight[key] = future
+                    owner = True
+                else:
+                    self.shared_waits += 1
+                    owner = False
+
+            if not owner:
+                value = await asyncio.shield(future)
+                if value is _FAILED:
+                    # La carga compartida falló o se canceló: reintentar
+                    continue
+                return value
+
+            value = _FAILED
+            try:
+                value = await loader()
+                if should_cache(value):
+                    with self._lock:
+                        self._store(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._async_inflight.pop(key, None)
+                future.set_result(value)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener contadores de uso del cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "shared_waits": self.shared_waits
+            }
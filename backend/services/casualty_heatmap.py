@@ -0,0 +1,480 @@
+"""
+Mapa global de víctimas para un impactor
+Evalúa la lógica de DemographicService.estimate_casualties_batch en todas las
+celdas de una rejilla lat/lon. Las sumas de población por zonas son
+correlaciones de la rejilla de densidad con núcleos radiales; como el núcleo
+solo depende de la latitud, cada fila se resuelve con FFT a lo largo de la
+longitud. El resultado se escribe como teselas NPY/PNG por nivel de zoom.
+"""
+
+import json
+import math
+import os
+import struct
+import zlib
+from typing import Any, Dict, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from services.demographic_service import EARTH_RADIUS_KM, ZONE_MORTALITIES, ZONE_RADIUS_FACTORS
+from services.population_grid import SUBSAMPLES
+from services.simulation_executor import PRIORITY_BATCH
+
+logger = logging.getLogger(__name__)
+
+# Teselas de TILE_SIZE × TILE_SIZE píxeles en el esquema geodésico
+# (nivel z: 2^(z+1) × 2^z teselas, fila 0 al norte)
+TILE_SIZE = 256
+TILE_FORMATS = ("npy", "png")
+
+# Rejillas de hasta este número de celdas (1° global) se calculan en un solo bloque
+SINGLE_PROCESS_CELLS = 360 * 180
+
+# Exposición costera (tierra a menos de 1000 km) evaluada sobre la máscara
+# agregada a esta resolución, igual que las celdas gruesas de los lotes
+COASTAL_RADIUS_KM = 1000.0
+COASTAL_RESOLUTION_DEG = 1.0
+
+# Anillos con que se integra la celda central (como PopulationGrid.radial_profile)
+CENTER_RINGS = 64
+
+# Celdas con más víctimas que se devuelven en el resumen
+HOTSPOTS = 10
+
+
+def _grid_axis(resolution: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Centros de celda (latitudes, longitudes) de una rejilla global"""
+    rows = int(round(180.0 / resolution))
+    lats = -90.0 + (np.arange(rows) + 0.5) * resolution
+    lons = -180.0 + (np.arange(2 * rows) + 0.5) * resolution
+    return lats, lons
+
+
+class _RowCorrelator:
+    """Correlación circular por filas de un campo lat/lon con núcleos radiales"""
+
+    def __init__(self, fields: np.ndarray, resolution: float):
+        """
+        Args:
+            fields: Campos (F, filas, columnas) o (filas, columnas) en celdas regulares
+                    (fila 0 en -90°, columna 0 en -180°)
+            resolution: Grados por celda
+        """
+        fields = np.asarray(fields, dtype=np.float64)
+        if fields.ndim == 2:
+            fields = fields[None]
+        _, self.rows, self.cols = fields.shape
+        self.resolution = resolution
+        self.row_lat = -90.0 + (np.arange(self.rows) + 0.5) * resolution
+        self.spectra = np.fft.rfft(fields, axis=2)
+
+    def row_of(self, lat) -> np.ndarray:
+        return np.clip(((np.asarray(lat) + 90.0) / self.resolution).astype(np.int64), 0, self.rows - 1)
+
+    def col_of(self, lon) -> np.ndarray:
+        return ((np.asarray(lon) + 180.0) / self.resolution).astype(np.int64) % self.cols
+
+    def window(self, lat: float, radius_km: float, subsamples: int = 1):
+        """
+        Celdas vecinas de un punto (en el centro de su columna) dentro de un radio
+
+        Returns:
+            Tupla (filas, desplazamientos_de_columna, distancias_km) con
+            distancias de forma (filas, desplazamientos, subsamples²)
+        """
+        radius_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+        max_lat = min(89.9, abs(lat) + radius_deg)
+        half_rows = int(math.ceil(radius_deg / self.resolution)) + 1
+        half_cols = int(math.ceil(radius_deg / max(math.cos(math.radians(max_lat)), 1e-6) / self.resolution)) + 1
+        row = int(self.row_of(lat))
+        rows = np.arange(max(0, row - half_rows), min(self.rows, row + half_rows + 1))
+        if 2 * half_cols + 1 >= self.cols:
+            offsets = np.arange(-(self.cols // 2), self.cols - self.cols // 2)
+        else:
+            offsets = np.arange(-half_cols, half_cols + 1)
+
+        sub = ((np.arange(subsamples) + 0.5) / subsamples - 0.5) * self.resolution if subsamples > 1 else np.zeros(1)
+        sub_lat, sub_lon = (grid.ravel() for grid in np.meshgrid(sub, sub, indexing='ij'))
+        lat1 = math.radians(lat)
+        lat2 = np.radians(self.row_lat[rows][:, None, None] + sub_lat[None, None, :])
+        dlon = np.radians(offsets[None, :, None] * self.resolution + sub_lon[None, None, :])
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+        return rows, offsets, 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def correlate(self, rows: np.ndarray, offsets: np.ndarray, kernels: np.ndarray) -> np.ndarray:
+        """
+        Σ_filas Σ_desplazamientos campo[fila, c + desplazamiento] · núcleo para todas las columnas c
+
+        Args:
+            rows: Filas de la ventana
+            offsets: Desplazamientos de columna de la ventana
+            kernels: Núcleos (K, len(rows), len(offsets)), uno por campo (K = F)
+                     o compartidos por todos los campos (K, filas, desplazamientos) con F = 1
+
+        Returns:
+            Array (K, columnas)
+        """
+        full = np.zeros(kernels.shape[:2] + (self.cols,))
+        full[:, :, offsets % self.cols] = kernels
+        spectra = np.conj(np.fft.rfft(full, axis=2))
+        fields = self.spectra[:, rows] if len(self.spectra) == len(kernels) else self.spectra[0, rows][None]
+        return np.fft.irfft((fields * spectra).sum(axis=1), n=self.cols, axis=1)
+
+
+def _coarsen_factor(rows: int, resolution: float, target: float) -> int:
+    """Mayor divisor de `rows` que no supera la resolución objetivo"""
+    factor = 1
+    for candidate in range(1, rows + 1):
+        if rows % candidate == 0 and resolution * candidate <= target + 1e-9:
+            factor = candidate
+    return factor
+
+
+def _compute_rows(service, context: Dict[str, Any], row_indices: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Víctimas de un bloque de filas de la rejilla de salida
+
+    Trabajo del ejecutor de simulaciones: la rejilla de población y la máscara
+    tierra/agua se leen del DemographicService del proceso (memoria compartida)
+    """
+    out_lats, out_lons = context["out_lats"], context["out_lons"]
+    radii = context["crater_diameter_km"] * np.asarray(ZONE_RADIUS_FACTORS)
+    mortalities = np.asarray(ZONE_MORTALITIES)
+    energy = context["energy_megatons"]
+    energy_factor = min(1.0, max(0.1, energy / 100.0))
+
+    grid = service.population_grid
+    density = _RowCorrelator(grid.density, grid.resolution)
+    edges = np.radians(np.linspace(-90.0, 90.0, density.rows + 1))
+    cell_area = EARTH_RADIUS_KM ** 2 * math.radians(density.resolution) * np.diff(np.sin(edges))
+    out_cols = density.col_of(out_lons)
+
+    n = len(row_indices)
+    zone_casualties = np.zeros((n, len(out_lons), 3))
+    affected = np.zeros((n, len(out_lons)))
+    severe_water = np.asarray(context["point_ocean"][row_indices], dtype=np.float64)
+    coastal_land = 1.0 - severe_water
+
+    # Zonas: núcleos por fila de la rejilla de población (distancias desde el centro de la celda)
+    by_row = {}
+    for k, i in enumerate(row_indices):
+        by_row.setdefault(int(density.row_of(out_lats[i])), []).append(k)
+    for row, members in by_row.items():
+        lat = float(density.row_lat[row])
+        rows, offsets, distances = density.window(lat, float(radii[-1]), SUBSAMPLES)
+        area = (cell_area[rows] / SUBSAMPLES ** 2)[:, None]
+        zone = np.minimum(np.searchsorted(radii, distances), 2)
+        inside = distances <= radii[-1]
+        kernels = [(np.where(inside & (zone == z), mortalities[z] * (1 - 0.5 * distances / radii[z]), 0.0)).sum(axis=2) * area
+                   for z in range(3)]
+        kernels.append(inside.sum(axis=2) * area)
+
+        # Celda central como disco de igual área en anillos
+        center = (row - rows[0], int(np.nonzero(offsets == 0)[0][0]))
+        ring_edges = np.linspace(0.0, min(math.sqrt(cell_area[row] / math.pi), radii[-1]), CENTER_RINGS + 1)
+        ring_area = math.pi * np.diff(ring_edges ** 2)
+        ring_distance = (ring_edges[:-1] + ring_edges[1:]) / 2
+        ring_zone = np.minimum(np.searchsorted(radii, ring_distance), 2)
+        for z in range(3):
+            in_zone = ring_zone == z
+            kernels[z][center] = float((ring_area[in_zone] * mortalities[z] *
+                                        (1 - 0.5 * ring_distance[in_zone] / radii[z])).sum())
+        kernels[3][center] = float(ring_area.sum())
+
+        values = np.maximum(density.correlate(rows, offsets, np.stack(kernels)), 0.0)[:, out_cols]
+        zone_casualties[members] = np.trunc(energy_factor * values[:3].T)[None]
+        affected[members] = values[3][None]
+
+    # Agua en la zona de daño severo y tierra a 1000 km (solo relevantes con tsunamis)
+    if energy >= 50 and service.land_mask is not None:
+        mask_resolution = service.land_mask.resolution
+        land = np.unpackbits(service.land_mask.packed, axis=1).astype(np.float64)
+        if math.degrees(radii[1] / EARTH_RADIUS_KM) >= mask_resolution:
+            severe_water = _water_fraction_rows(land, mask_resolution, out_lats[row_indices], out_lons,
+                                                float(radii[1]), severe_water)
+        factor = _coarsen_factor(land.shape[0], mask_resolution, COASTAL_RESOLUTION_DEG)
+        coarse = land.reshape(land.shape[0] // factor, factor, land.shape[1] // factor, factor).mean(axis=(1, 3))
+        coastal_land = 1.0 - _water_fraction_rows(coarse, mask_resolution * factor, out_lats[row_indices], out_lons,
+                                                  COASTAL_RADIUS_KM, 1.0 - coastal_land)
+
+    tsunami_risk = context["region_ocean"][row_indices] | (severe_water >= 0.5)
+    per_megaton = 0 if energy < 50 else 100 if energy < 500 else 150 if energy < 2000 else 200
+    coastal_exposure = np.clip(coastal_land / 0.25, 0.1, 1.0)
+    tsunami = np.where(tsunami_risk, np.trunc(energy * per_megaton * coastal_exposure), 0.0)
+
+    if context["crater_diameter_km"] < 0.01:
+        zone_casualties[:] = 0
+        affected[:] = 0
+        tsunami[:] = 0
+    return {
+        "total_casualties": zone_casualties.sum(axis=2) + tsunami,
+        "tsunami_casualties": tsunami,
+        "affected_population": np.trunc(affected)
+    }
+
+
+def _water_fraction_rows(land: np.ndarray, resolution: float, lats: np.ndarray, lons: np.ndarray,
+                         radius_km: float, fallback: np.ndarray) -> np.ndarray:
+    """
+    Fracción de agua a menos de `radius_km` de cada punto (filas `lats` × columnas `lons`)
+
+    Las celdas se ponderan por cos φ como en LandMask.water_fraction; los
+    puntos sin celdas dentro del radio conservan `fallback`.
+    """
+    weights = np.cos(np.radians(-90.0 + (np.arange(land.shape[0]) + 0.5) * resolution))[:, None]
+    correlator = _RowCorrelator(np.stack([land * weights, np.broadcast_to(weights, land.shape)]), resolution)
+    cols = correlator.col_of(lons)
+    result = np.array(fallback, dtype=np.float64)
+    for k, lat in enumerate(lats):
+        rows, offsets, distances = correlator.window(float(lat), radius_km)
+        inside = (distances[..., 0] <= radius_km).astype(np.float64)
+        land_sum, weight_sum = correlator.correlate(rows, offsets, np.stack([inside, inside]))[:, cols]
+        valid = weight_sum > 1e-12
+        result[k, valid] = np.clip(1.0 - land_sum[valid] / weight_sum[valid], 0.0, 1.0)
+    return result
+
+
+def _resample_max(raster: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """Remuestrear a (rows, cols): máximo de las celdas agrupadas o vecino más cercano"""
+    for axis, size in ((0, rows), (1, cols)):
+        length = raster.shape[axis]
+        if size >= length:
+            index = ((np.arange(size) + 0.5) * length / size).astype(np.int64)
+            raster = np.take(raster, index, axis=axis)
+        else:
+            starts = np.searchsorted((np.arange(length) + 0.5) * size / length, np.arange(size))
+            raster = np.maximum.reduceat(raster, starts, axis=axis)
+    return raster
+
+
+def _colorize(values: np.ndarray, scale: float) -> np.ndarray:
+    """RGBA (uint8) en escala logarítmica: transparente sin víctimas, de amarillo a rojo oscuro"""
+    level = np.clip(np.log10(values + 1.0) / scale, 0.0, 1.0) if scale > 0 else np.zeros(values.shape)
+    rgba = np.empty(values.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = np.round(255 - 80 * level ** 2)
+    rgba[..., 1] = np.round(230 * (1 - level))
+    rgba[..., 2] = np.round(60 * (1 - level))
+    rgba[..., 3] = np.where(values >= 1.0, np.round(90 + 165 * level), 0)
+    return rgba
+
+
+def encode_png(rgba: np.ndarray) -> bytes:
+    """Codificar una imagen RGBA (alto, ancho, 4) uint8 como PNG sin dependencias externas"""
+    height, width, _ = rgba.shape
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) +
+            chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+class CasualtyHeatmapGenerator:
+    """Mapas de víctimas por celda para un impactor y su salida en teselas"""
+
+    def __init__(self, demographic_service, tile_size: int = TILE_SIZE, executor=None):
+        """
+        Args:
+            demographic_service: DemographicService con rejilla de población
+            tile_size: Lado de las teselas en píxeles
+            executor: SimulationExecutor entre cuyos procesos se reparten los
+                      bloques de filas (None = en el hilo que llama)
+        """
+        self.demographic_service = demographic_service
+        self.tile_size = tile_size
+        self.executor = executor
+
+    def compute(self, crater_diameter_km: float, energy_megatons: float,
+                resolution_deg: float = 1.0, chunks: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Víctimas de un impacto centrado en cada celda de una rejilla global
+
+        Misma lógica que estimate_casualties_batch (zonas, letalidad degradada,
+        tsunamis) con el impacto en el centro de cada celda de salida.
+
+        Args:
+            crater_diameter_km: Diámetro del cráter
+            energy_megatons: Energía liberada
+            resolution_deg: Tamaño de celda de la rejilla de salida
+            chunks: Bloques de filas (por defecto uno para rejillas de hasta 1° y uno
+                    por proceso del ejecutor para las finas)
+
+        Returns:
+            Dict con lats, lons y arrays (filas de sur a norte × columnas):
+            total_casualties, tsunami_casualties, affected_population
+
+        Raises:
+            ValueError: si la resolución no divide 180° o no hay rejilla de población
+        """
+        rows = 180.0 / resolution_deg
+        if resolution_deg <= 0 or abs(rows - round(rows)) > 1e-6:
+            raise ValueError("La resolución debe dividir 180° en un número entero de filas")
+        service = self.demographic_service
+        grid = service.population_grid
+        if grid is None:
+            raise ValueError("El mapa de víctimas necesita la rejilla de población")
+
+        out_lats, out_lons = _grid_axis(resolution_deg)
+        lat_mesh, lon_mesh = np.meshgrid(out_lats, out_lons, indexing='ij')
+        point_ocean = ~service.is_land(lat_mesh, lon_mesh)
+        # Los campos grandes (densidad y máscara) no viajan con los trabajos
+        context = {
+            "out_lats": out_lats,
+            "out_lons": out_lons,
+            "crater_diameter_km": float(crater_diameter_km),
+            "energy_megatons": float(energy_megatons),
+            "point_ocean": point_ocean,
+            "region_ocean": point_ocean | (grid.density_at(lat_mesh, lon_mesh) <= 0)
+        }
+
+        executor = self.executor
+        if chunks is None:
+            fine = lat_mesh.size > SINGLE_PROCESS_CELLS and executor is not None
+            chunks = max(1, executor.workers) if fine else 1
+        chunks = max(1, min(chunks, len(out_lats)))
+        # Un bloque contiguo de filas por trabajo: cada uno transforma los campos una sola vez
+        tasks = [(context, rows) for rows in np.array_split(np.arange(len(out_lats)), chunks)]
+        if executor is not None:
+            # Mapas largos: prioridad de lote y sin el plazo de las simulaciones
+            parts = executor.map(_compute_rows, tasks, priority=PRIORITY_BATCH, timeout=0)
+        else:
+            parts = [_compute_rows(service, *task) for task in tasks]
+
+        result = {name: np.concatenate([part[name] for part in parts]).astype(np.int64)
+                  for name in ("total_casualties", "tsunami_casualties", "affected_population")}
+        result.update(lats=out_lats, lons=out_lons)
+        return result
+
+    def zoom_levels(self, cols: int) -> int:
+        """Nivel máximo: el primero cuyo ancho en píxeles cubre la rejilla"""
+        level = 0
+        while 2 ** (level + 1) * self.tile_size < cols:
+            level += 1
+        return level
+
+    def write_tiles(self, raster: np.ndarray, directory: str,
+                    formats: Sequence[str] = TILE_FORMATS) -> Dict[str, Any]:
+        """
+        Escribir un raster global como teselas {z}/{x}/{y}.npy|png
+
+        Cada nivel se obtiene por máximo de las celdas que agrupa (así los
+        focos siguen visibles al alejar) o por vecino más cercano al ampliar.
+        Las PNG usan una escala logarítmica común a todos los niveles.
+
+        Args:
+            raster: Valores (filas de sur a norte × columnas, columnas = 2 × filas)
+            directory: Directorio de salida
+            formats: Subconjunto de TILE_FORMATS
+
+        Returns:
+            Metadatos de las teselas (también guardados en metadata.json)
+        """
+        unknown = set(formats) - set(TILE_FORMATS)
+        if unknown:
+            raise ValueError(f"Formatos de tesela no soportados: {sorted(unknown)}")
+        north_up = np.asarray(raster, dtype=np.float32)[::-1]
+        max_level = self.zoom_levels(north_up.shape[1])
+        scale = float(np.log10(north_up.max() + 1.0))
+        size = self.tile_size
+
+        for level in range(max_level + 1):
+            tiles_x, tiles_y = 2 ** (level + 1), 2 ** level
+            image = _resample_max(north_up, tiles_y * size, tiles_x * size)
+            for x in range(tiles_x):
+                os.makedirs(os.path.join(directory, str(level), str(x)), exist_ok=True)
+                for y in range(tiles_y):
+                    tile = image[y * size:(y + 1) * size, x * size:(x + 1) * size]
+                    base = os.path.join(directory, str(level), str(x), str(y))
+                    if "npy" in formats:
+                        np.save(f"{base}.npy", tile)
+                    if "png" in formats:
+                        with open(f"{base}.png", "wb") as f:
+                            f.write(encode_png(_colorize(tile, scale)))
+
+        metadata = {
+            "scheme": "geodetic",
+            "tile_size": size,
+            "min_zoom": 0,
+            "max_zoom": max_level,
+            "formats": list(formats),
+            "bounds": [-180.0, -90.0, 180.0, 90.0],
+            "max_value": float(north_up.max()),
+            "png_scale": "log10(value + 1) / log10(max_value + 1)"
+        }
+        with open(os.path.join(directory, "metadata.json"), "w") as f:
+            json.dump(metadata, f)
+        return metadata
+
+    def generate(self, crater_diameter_km: float, energy_megatons: float, directory: str,
+                 resolution_deg: float = 1.0, formats: Sequence[str] = TILE_FORMATS,
+                 chunks: Optional[int] = None, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Calcular el mapa y escribir las teselas y el raster completo (casualties.npy)
+
+        Args:
+            extra: Datos adicionales para metadata.json (p. ej. el impactor)
+
+        Returns:
+            Metadatos con el resumen y los focos de más víctimas
+        """
+        result = self.compute(crater_diameter_km, energy_megatons, resolution_deg, chunks)
+        total = result["total_casualties"]
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "casualties.npy"), total)
+        metadata = self.write_tiles(total, directory, formats)
+
+        top = np.argsort(total, axis=None)[::-1][:HOTSPOTS]
+        rows, cols = np.unravel_index(top, total.shape)
+        metadata.update(extra or {})
+        metadata.update({
+            "resolution_deg": resolution_deg,
+            "crater_diameter_km": float(crater_diameter_km),
+            "energy_megatons": float(energy_megatons),
+            "max_casualties": int(total.max()),
+            "mean_casualties": float(total.mean()),
+            "hotspots": [{"lat": float(result["lats"][r]), "lon": float(result["lons"][c]),
+                          "casualties": int(total[r, c])} for r, c in zip(rows, cols)]
+        })
+        with open(os.path.join(directory, "metadata.json"), "w") as f:
+            json.dump(metadata, f)
+        return metadata
+
+
+if __name__ == "__main__":
+    # Uso (desde backend/): python -m services.casualty_heatmap --diameter 0.5 --velocity 20 --output heatmap/
+    import argparse
+    import sys
+    import time
+    from services.demographic_service import DemographicService
+    from services.simulation_executor import SimulationExecutor
+
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+    from simulation.physics import impact_physics
+
+    parser = argparse.ArgumentParser(description="Generar el mapa global de víctimas de un impactor")
+    parser.add_argument("--diameter", type=float, required=True, help="km")
+    parser.add_argument("--velocity", type=float, required=True, help="km/s")
+    parser.add_argument("--angle", type=float, default=45.0)
+    parser.add_argument("--composition", default="rocky")
+    parser.add_argument("--density", type=float, default=None)
+    parser.add_argument("--resolution", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=None, help="Procesos (SIMULATION_WORKERS o núcleos)")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    physics = impact_physics(args.diameter, args.velocity, args.angle, args.density, args.composition)
+    service = DemographicService(enable_nominatim=False)
+    executor = SimulationExecutor(service, workers=args.workers, timeout=0)
+    generator = CasualtyHeatmapGenerator(service, executor=executor)
+    start = time.perf_counter()
+    try:
+        summary = generator.generate(physics.crater_diameter_km, physics.energy_megatons, args.output,
+                                     resolution_deg=args.resolution)
+    finally:
+        executor.shutdown()
+    print(f"Mapa {args.resolution}° en {time.perf_counter() - start:.1f} s -> {args.output}")
+    print(f"Máximo: {summary['max_casualties']:,} víctimas en {summary['hotspots'][0]}")
@@ -0,0 +1,223 @@
+"""
+Cortocircuito (circuit breaker) por servicio externo
+Cuando NASA o Nominatim fallan o limitan peticiones, las llamadas pasan
+directamente al cache o a la estimación local en lugar de esperar su timeout
+"""
+
+import email.utils
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """El servicio externo está en pausa: no se realiza la petición"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuito '{name}' abierto, reintento en {retry_in:.0f} s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Segundos de espera de una cabecera Retry-After (número o fecha HTTP)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Estados:
+    - closed: las peticiones pasan; `failure_threshold` fallos seguidos lo abren
+    - open: las peticiones se rechazan sin tocar la red hasta que vence la pausa
+    - half_open: pasa una petición de prueba; si va bien se cierra, si no se
+      vuelve a abrir con el doble de pausa (hasta `max_recovery_timeout`)
+
+    Un HTTP 429 abre el circuito durante el Retry-After indicado, y una
+    cabecera X-RateLimit-Remaining igual o menor que `rate_limit_reserve`
+    lo abre durante `rate_limit_cooldown` antes de agotar la cuota.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 max_recovery_timeout: float = 600.0, rate_limit_reserve: int = 0,
+                 rate_limit_cooldown: float = 300.0):
+        """
+        Inicializar el circuito
+
+        Args:
+            name: Nombre del servicio (para logs y estadísticas)
+            failure_threshold: Fallos consecutivos que abren el circuito
+            recovery_timeout: Pausa inicial antes de la petición de prueba (segundos)
+            max_recovery_timeout: Pausa máxima tras fallos repetidos de la prueba
+            rate_limit_reserve: Peticiones restantes a partir de las cuales se deja de llamar
+            rate_limit_cooldown: Pausa al agotar la cuota sin Retry-After (segundos)
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.rate_limit_reserve = rate_limit_reserve
+        self.rate_limit_cooldown = rate_limit_cooldown
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._backoff = recovery_timeout
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+
+        # Contadores de uso
+        self.rejected = 0
+        self.failures = 0
+        self.successes = 0
+        self.rate_limited = 0
+        self.trips = 0
+        self.rate_limit_remaining: Optional[int] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        """Estado efectivo: un circuito abierto con la pausa vencida pasa a semiabierto"""
+        if self._state == OPEN and now >= self._open_until:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def _open(self, seconds: float, reason: str):
+        """Abrir el circuito durante `seconds` (requiere el lock)"""
+        now = time.monotonic()
+        self._open_until = max(self._open_until if self._state == OPEN else 0.0, now + seconds)
+        if self._state != OPEN:
+            self.trips += 1
+            logger.warning(f"Circuito '{self.name}' abierto {seconds:.0f} s: {reason}")
+        self._state = OPEN
+        self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        """Segundos hasta que se permita la siguiente petición"""
+        with self._lock:
+            if self._current_state(time.monotonic()) != OPEN:
+                return 0.0
+            return max(0.0, self._open_until - time.monotonic())
+
+    def allow_request(self) -> bool:
+        """
+        Decidir si se puede llamar al servicio (en semiabierto solo una prueba)
+
+        Una prueba cuyo resultado no se registra (p. ej. una tarea cancelada)
+        deja de bloquear el circuito pasado `recovery_timeout`.
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and (not self._probe_in_flight or
+                                       now - self._probe_started >= self.recovery_timeout):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Como allow_request, pero lanzando CircuitOpenError si no se permite"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record_success(self):
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            if self._state != CLOSED:
+                logger.info(f"Circuito '{self.name}' cerrado de nuevo")
+            self._state = CLOSED
+            self._backoff = self.recovery_timeout
+            self._probe_in_flight = False
+
+    def record_failure(self, retry_after: Optional[float] = None):
+        """
+        Registrar un fallo (error de red, timeout o 5xx)
+
+        Args:
+            retry_after: Pausa indicada por el servidor, si la hay
+        """
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            state = self._current_state(time.monotonic())
+            if state == HALF_OPEN:
+                # La prueba falló: pausa cada vez más larga
+                self._backoff = min(self._backoff * 2, self.max_recovery_timeout)
+                self._open(retry_after or self._backoff, "falló la petición de prueba")
+            elif state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                self._open(retry_after or self._backoff, f"{self._consecutive_failures} fallos seguidos")
+
+    def record_response(self, status_code: int, headers: Optional[Mapping[str, str]] = None):
+        """
+        Registrar una respuesta HTTP teniendo en cuenta los límites de peticiones
+
+        Los 4xx distintos de 429 son errores de la petición, no del servicio,
+        y cuentan como éxito a efectos del circuito.
+        """
+        headers = headers or {}
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+
+        if status_code == 429:
+            with self._lock:
+                self.rate_limited += 1
+                self._open(retry_after or self.rate_limit_cooldown, "límite de peticiones (HTTP 429)")
+            return
+        if status_code >= 500:
+            self.record_failure(retry_after)
+            return
+
+        self.record_success()
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is None:
+            return
+        try:
+            remaining = int(remaining)
+        except ValueError:
+            return
+        with self._lock:
+            self.rate_limit_remaining = remaining
+            if remaining <= self.rate_limit_reserve:
+                self.rate_limited += 1
+                self._open(retry_after or self.rate_limit_cooldown,
+                           f"quedan {remaining} peticiones de la cuota")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "retry_in_seconds": round(max(0.0, self._open_until - now), 1) if state == OPEN else 0.0,
+                "consecutive_failures": self._consecutive_failures,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "rate_limited": self.rate_limited,
+                "trips": self.trips,
+                "rate_limit_remaining": self.rate_limit_remaining
+            }
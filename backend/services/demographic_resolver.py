@@ -0,0 +1,177 @@
+"""
+Consulta concurrente de fuentes demográficas con un presupuesto de tiempo
+La latencia de una consulta queda acotada por el plazo y no por la fuente más lenta
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DemographicSource:
+    """
+    Fuente de datos demográficos
+
+    Args:
+        name: Nombre de la fuente (clave en los resultados y estadísticas)
+        fetch: Función (lat, lon) -> dict o None
+        remote: True si hace E/S de red (se ejecuta en el pool con plazo);
+                las fuentes locales se ejecutan directamente en el hilo llamante
+    """
+    name: str
+    fetch: Callable[[float, float], Optional[Dict[str, Any]]]
+    remote: bool = False
+
+
+class _SourceStats:
+    """Contadores de una fuente (protegidos por el lock del resolver)"""
+
+    def __init__(self):
+        self.calls = 0
+        self.successes = 0
+        self.empty = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        finished = self.calls - self.timeouts
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "empty": self.empty,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "success_rate": round(self.successes / self.calls, 3) if self.calls else 0.0,
+            "avg_latency_ms": round(1000 * self.total_latency / finished, 2) if finished else 0.0,
+            "max_latency_ms": round(1000 * self.max_latency, 2)
+        }
+
+
+class DemographicResolver:
+    """
+    Lanza todas las fuentes habilitadas a la vez y devuelve las respuestas que
+    llegan antes del plazo. Las fuentes que no terminan a tiempo se cancelan
+    (si aún no habían empezado) o se abandonan, y cuentan como timeout.
+    """
+
+    def __init__(self, sources: List[DemographicSource], deadline_seconds: Optional[float] = None,
+                 max_workers: int = 8):
+        """
+        Inicializar el resolver
+
+        Args:
+            sources: Fuentes en orden de preferencia
+            deadline_seconds: Plazo total por consulta (DEMOGRAPHIC_DEADLINE_MS o 300 ms)
+            max_workers: Hilos para las fuentes remotas
+        """
+        if deadline_seconds is None:
+            deadline_seconds = float(os.getenv('DEMOGRAPHIC_DEADLINE_MS', 300)) / 1000.0
+
+        self.sources = list(sources)
+        self.deadline_seconds = deadline_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._stats = {source.name: _SourceStats() for source in self.sources}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                    thread_name_prefix="demographic-source")
+            return self._executor
+
+    def _timed_fetch(self, source: DemographicSource, lat: float, lon: float, deadline: float):
+        """
+        Ejecutar una fuente registrando su latencia y resultado
+
+        Las respuestas que llegan después del plazo solo cuentan para la
+        latencia máxima: ya se contaron como timeout en `resolve`.
+        """
+        start = time.perf_counter()
+        try:
+            result = source.fetch(lat, lon)
+            outcome = "successes" if result else "empty"
+        except Exception as e:
+            logger.warning(f"Fuente demográfica '{source.name}' falló: {e}")
+            result, outcome = None, "errors"
+
+        latency = time.perf_counter() - start
+        with self._lock:
+            stats = self._stats[source.name]
+            if time.monotonic() <= deadline:
+                setattr(stats, outcome, getattr(stats, outcome) + 1)
+                stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+        return result
+
+    def resolve(self, lat: float, lon: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Consultar todas las fuentes dentro del plazo
+
+        Returns:
+            {nombre_de_fuente: resultado} solo con las fuentes que respondieron
+            a tiempo con datos
+        """
+        deadline = time.monotonic() + self.deadline_seconds
+        with self._lock:
+            for source in self.sources:
+                self._stats[source.name].calls += 1
+
+        # Las remotas primero, para que avancen mientras se calculan las locales
+        remote = [source for source in self.sources if source.remote]
+        futures = {}
+        if remote:
+            executor = self._get_executor()
+            futures = {executor.submit(self._timed_fetch, source, lat, lon, deadline): source for source in remote}
+
+        results = {}
+        for source in self.sources:
+            if not source.remote:
+                result = self._timed_fetch(source, lat, lon, deadline)
+                if result:
+                    results[source.name] = result
+
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if result:
+                    results[futures[future].name] = result
+
+        for future in pending:
+            future.cancel()
+            name = futures[future].name
+            with self._lock:
+                self._stats[name].timeouts += 1
+            logger.info(f"Fuente demográfica '{name}' sin respuesta en {self.deadline_seconds * 1000:.0f} ms")
+
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Latencia y tasa de éxito por fuente"""
+        with self._lock:
+            return {
+                "deadline_ms": round(self.deadline_seconds * 1000),
+                "sources": {name: stats.to_dict() for name, stats in self._stats.items()}
+            }
+
+    def shutdown(self):
+        """Detener el pool sin esperar a las fuentes abandonadas"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -4,17 +4,57 @@ Utiliza datos de población mundial por coordenadas geográficas
 """
 
 import math
+import os
 import requests
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 import logging
 
+import numpy as np
+
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.demographic_resolver import DemographicResolver, DemographicSource
+from services.geocode_cache import GeocodeCache
+from services.land_mask import LandMask
+from services.population_grid import PopulationGrid
+from services.spatial_index import CityIndex
+
 logger = logging.getLogger(__name__)
 
+EARTH_RADIUS_KM = 6371.0
+
+# Tamaño (grados) de las celdas en que se agrupa la exposición costera de los lotes
+COASTAL_CELL_DEG = 2.0
+
+# Zonas de daño: radio exterior (× diámetro del cráter) y letalidad base
+ZONE_RADIUS_FACTORS = (0.5, 2.0, 4.0)
+ZONE_MORTALITIES = (0.85, 0.45, 0.08)
+
 class DemographicService:
     """Servicio para calcular densidad poblacional y estimar víctimas"""
     
-    def __init__(self):
-        """Inicializar servicio demográfico"""
+    def __init__(self, population_grid: Optional[PopulationGrid] = None,
+                 use_population_grid: bool = True, enable_nominatim: Optional[bool] = None,
+                 city_index: Optional[CityIndex] = None, land_mask: Optional[LandMask] = None,
+                 use_land_mask: bool = True, geocode_cache: Optional[GeocodeCache] = None,
+                 deadline_seconds: Optional[float] = None,
+                 nominatim_breaker: Optional[CircuitBreaker] = None):
+        """
+        Inicializar servicio demográfico
+        
+        Args:
+            population_grid: Rejilla de población ya cargada (por defecto se abre o
+                             genera la de data/cache)
+            use_population_grid: False para usar solo las estimaciones por ciudad
+            enable_nominatim: Enriquecer con Nominatim (por defecto NOMINATIM_ENRICHMENT o False)
+            city_index: Índice espacial de ciudades (por defecto las ciudades principales
+                        más la tabla WORLD_CITIES_PATH si existe)
+            land_mask: Máscara tierra/agua ya cargada (por defecto se abre o genera
+                       desde data/geo/land_simplified.geojson)
+            use_land_mask: False para usar solo los rectángulos continentales
+            geocode_cache: Cache de geocodificación inversa (por defecto data/cache/geocode.sqlite3)
+            deadline_seconds: Plazo para reunir las fuentes (DEMOGRAPHIC_DEADLINE_MS o 300 ms)
+            nominatim_breaker: Circuito de Nominatim (por defecto 3 fallos seguidos lo abren 60 s)
+        """
         # APIs disponibles para datos demográficos
         self.population_apis = {
             "worldpop": "https://api.worldpop.org",  # WorldPop - datos de población global
@@ -72,6 +112,38 @@ class DemographicService:
             # Oceanía
             "sydney": {"lat": -33.8688, "lon": 151.2093, "population": 5312000, "density": 2100}
         }
+        
+        # Nominatim es una consulta de red bloqueante: solo como enriquecimiento opcional
+        if enable_nominatim is None:
+            enable_nominatim = os.getenv('NOMINATIM_ENRICHMENT', 'false').lower() in ('1', 'true', 'yes')
+        self.enable_nominatim = enable_nominatim
+        self.geocode_cache = geocode_cache
+        self.nominatim_breaker = nominatim_breaker or CircuitBreaker(
+            "nominatim", failure_threshold=3, recovery_timeout=60.0
+        )
+        
+        # Índice espacial de ciudades para búsquedas de vecinos y por radio
+        self.city_index = city_index or self._load_city_index()
+        
+        # Máscara tierra/agua (debe cargarse antes de generar la rejilla de población)
+        if land_mask is None and use_land_mask:
+            land_mask = LandMask.load_or_build()
+        self.land_mask = land_mask
+        
+        # Rejilla local de densidad de población (búsquedas en memoria, sin red)
+        if population_grid is None and use_population_grid:
+            population_grid = PopulationGrid.load_or_build(cities=self.major_cities, is_land=self.is_land)
+        self.population_grid = population_grid
+        
+        # Fuentes consultadas a la vez, en orden de preferencia
+        sources = []
+        if self.population_grid is not None:
+            sources.append(DemographicSource("population_grid", self._grid_demographic_data))
+        if self.enable_nominatim:
+            sources.append(DemographicSource("nominatim_osm", self._get_real_demographic_data, remote=True))
+        if self.population_grid is None:
+            sources.append(DemographicSource("local_estimation", self._local_estimation_data))
+        self.resolver = DemographicResolver(sources, deadline_seconds=deadline_seconds)
     
     def calculate_population_density(self, lat: float, lon: float) -> Dict[str, Any]:
         """
@@ -97,32 +169,21 @@ class DemographicService:
                     "data_source": "local_estimation"
                 }
             
-            # Intentar obtener datos reales primero
-            real_data = self._get_real_demographic_data(lat, lon)
-            if real_data:
-                return real_data
-            
-            # Fallback a estimaciones locales
-            logger.info(f"Usando estimaciones locales para {lat}, {lon}")
-            
-            # Buscar ciudad principal más cercana
-            nearest_city = self._find_nearest_major_city(lat, lon)
-            
-            # Determinar tipo de región basado en proximidad a ciudades
-            region_info = self._classify_region(lat, lon, nearest_city)
-            
-            # Calcular población estimada en radio de 50km
-            population_50km = self._estimate_population_in_radius(lat, lon, 50, region_info["density"])
-            
-            return {
-                "density_per_km2": region_info["density"],
-                "region_type": region_info["type"],
-                "nearest_major_city": nearest_city,
-                "estimated_population_50km": population_50km,
-                "country": self._estimate_country(lat, lon),
-                "coordinates": {"lat": lat, "lon": lon},
-                "data_source": "local_estimation"
-            }
+            # Todas las fuentes a la vez, con un plazo común
+            results = self.resolver.resolve(lat, lon)
+            base_source = next((source.name for source in self.resolver.sources if source.name in results), None)
+            if base_source is None:
+                return self._local_estimation_data(lat, lon)
+            
+            result = results[base_source]
+            osm_data = results.get("nominatim_osm")
+            if osm_data and base_source != "nominatim_osm":
+                # Enriquecimiento con nombres de lugar de Nominatim
+                result = dict(result)
+                result["country"] = osm_data.get("country", result["country"])
+                result["location_info"] = osm_data.get("location_info")
+                result["data_source"] = f"{base_source}+nominatim_osm"
+            return result
             
         except Exception as e:
             logger.error(f"Error calculando densidad poblacional: {e}")
@@ -135,8 +196,56 @@ class DemographicService:
                 "country": "Unknown"
             }
     
+    def _grid_demographic_data(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Datos demográficos a partir de la rejilla de población"""
+        density = self.population_grid.density_at(lat, lon)
+        region_type = self._classify_density(density)
+        
+        result = {
+            "density_per_km2": round(density, 1),
+            "region_type": region_type,
+            "nearest_major_city": self._find_nearest_major_city(lat, lon),
+            "estimated_population_50km": int(self.population_grid.population_within(lat, lon, 50)),
+            "country": self._estimate_country(lat, lon),
+            "coordinates": {"lat": lat, "lon": lon},
+            "data_source": "population_grid"
+        }
+        
+        return result
+    
+    def _local_estimation_data(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Estimación local basada en la proximidad a ciudades conocidas"""
+        logger.info(f"Usando estimaciones locales para {lat}, {lon}")
+        
+        # Buscar ciudad principal más cercana
+        nearest_city = self._find_nearest_major_city(lat, lon)
+        
+        # Determinar tipo de región basado en proximidad a ciudades
+        region_info = self._classify_region(lat, lon, nearest_city)
+        
+        # Calcular población estimada en radio de 50km
+        population_50km = self._estimate_population_in_radius(lat, lon, 50, region_info["density"])
+        
+        return {
+            "density_per_km2": region_info["density"],
+            "region_type": region_info["type"],
+            "nearest_major_city": nearest_city,
+            "estimated_population_50km": population_50km,
+            "country": self._estimate_country(lat, lon),
+            "coordinates": {"lat": lat, "lon": lon},
+            "data_source": "local_estimation"
+        }
+    
+    def _classify_density(self, density: float) -> str:
+        """Tipo de región según la densidad (umbrales de regional_density_estimates)"""
+        for region_type in ("urban_major", "urban_large", "urban_medium", "urban_small",
+                            "suburban", "rural_populated", "rural_sparse"):
+            if density >= self.regional_density_estimates[region_type]:
+                return region_type
+        return "desert" if density > 0 else "ocean"
+    
     def estimate_casualties(self, lat: float, lon: float, crater_diameter_km: float, 
-                          energy_megatons: float) -> Dict[str, Any]:
+                          energy_megatons: float, demo_info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Estimar víctimas basado en ubicación del impacto
         
@@ -145,6 +254,8 @@ class DemographicService:
             lon: Longitud del impacto
             crater_diameter_km: Diámetro del cráter en km
             energy_megatons: Energía liberada en megatones TNT
+            demo_info: Resultado previo de calculate_population_density para
+                       estas coordenadas (evita repetir la consulta)
             
         Returns:
             Dict con estimaciones de víctimas
@@ -158,8 +269,9 @@ class DemographicService:
                     "note": "Impacto demasiado pequeño para causar víctimas significativas"
                 }
             
-            # Obtener información demográfica
-            demo_info = self.calculate_population_density(lat, lon)
+            # Obtener información demográfica (si no se proporcionó)
+            if demo_info is None:
+                demo_info = self.calculate_population_density(lat, lon)
             
             # Calcular zonas de impacto (radios más realistas)
             immediate_radius = crater_diameter_km / 2  # Radio de destrucción total
@@ -170,35 +282,43 @@ class DemographicService:
             density = demo_info["density_per_km2"]
             logger.info(f"DEBUG - Ubicación: {lat},{lon} | Densidad: {density} p/km² | Tipo: {demo_info.get('region_type', 'unknown')} | Fuente: {demo_info.get('data_source', 'unknown')}")
             
-            # Calcular población en cada zona
-            immediate_pop = self._estimate_population_in_radius(lat, lon, immediate_radius, density)
-            severe_pop = self._estimate_population_in_radius(lat, lon, severe_damage_radius, density)
-            moderate_pop = self._estimate_population_in_radius(lat, lon, moderate_damage_radius, density)
-            
             # Factor de escalado basado en energía (impactos pequeños son menos letales)
             energy_factor = min(1.0, max(0.1, energy_megatons / 100.0))
             
+            # Población y víctimas de las tres zonas en una sola pasada
+            zone_populations, zone_casualties = self._integrate_zones(
+                lat, lon,
+                radii=[immediate_radius, severe_damage_radius, moderate_damage_radius],
+                base_mortalities=ZONE_MORTALITIES,
+                energy_factor=energy_factor,
+                density=density
+            )
+            immediate_pop, severe_pop, moderate_pop = np.cumsum(zone_populations)
+            immediate_casualties, severe_casualties, moderate_casualties = (int(c) for c in zone_casualties)
+            
             # DEBUG: Mostrar cálculos intermedios
             logger.info(f"DEBUG - Radios: inmediato={immediate_radius:.2f}km, severo={severe_damage_radius:.2f}km, moderado={moderate_damage_radius:.2f}km")
             logger.info(f"DEBUG - Poblaciones: inmediata={immediate_pop:.0f}, severa={severe_pop:.0f}, moderada={moderate_pop:.0f}")
             logger.info(f"DEBUG - Factor energía: {energy_factor:.3f} (de {energy_megatons:.2f} MT)")
             
-            # Calcular letalidad basada en distancia real del impacto
-            immediate_casualties = self._calculate_casualties_by_distance(
-                lat, lon, immediate_radius, immediate_pop, 0.85, energy_factor
-            )
-            severe_casualties = self._calculate_casualties_by_distance(
-                lat, lon, severe_damage_radius, severe_pop - immediate_pop, 0.45, energy_factor
-            )
-            moderate_casualties = self._calculate_casualties_by_distance(
-                lat, lon, moderate_damage_radius, moderate_pop - severe_pop, 0.08, energy_factor
-            )
-            
             total_casualties = immediate_casualties + severe_casualties + moderate_casualties
             total_affected = int(moderate_pop)
             
+            # Todas las ciudades dentro de las zonas de daño (no solo la más cercana)
+            affected_cities = self._cities_in_damage_zones(lat, lon, {
+                "immediate_zone": immediate_radius,
+                "severe_damage_zone": severe_damage_radius,
+                "moderate_damage_zone": moderate_damage_radius
+            })
+            major_city_hit = any(city["zone"] != "moderate_damage_zone" and city["population"] > 1000000
+                                 for city in affected_cities)
+            
+            # Agua dentro de la zona de daño severo: impactos costeros también generan tsunamis
+            water_fraction = self.water_fraction(lat, lon, severe_damage_radius)
+            tsunami_risk = demo_info["region_type"] == "ocean" or water_fraction >= 0.5
+            
             # Factores adicionales por tipo de región
-            if demo_info["region_type"] == "ocean":
+            if tsunami_risk:
                 # Impacto oceánico: tsunamis
                 tsunami_casualties = self._estimate_tsunami_casualties(lat, lon, energy_megatons)
                 total_casualties += tsunami_casualties
@@ -227,10 +347,12 @@ class DemographicService:
                     }
                 },
                 "region_info": demo_info,
+                "affected_cities": affected_cities,
                 "additional_effects": {
-                    "tsunami_risk": demo_info["region_type"] == "ocean",
+                    "tsunami_risk": tsunami_risk,
+                    "water_fraction": round(water_fraction, 3),
                     "wildfire_risk": demo_info["region_type"] in ["rural_populated", "agricultural"],
-                    "infrastructure_damage": demo_info["region_type"] in ["urban_major", "urban_large"]
+                    "infrastructure_damage": demo_info["region_type"] in ["urban_major", "urban_large"] or major_city_hit
                 }
             }
             
@@ -241,7 +363,132 @@ class DemographicService:
                 "error": str(e)
             }
     
+    def estimate_casualties_batch(self, lats, lons, crater_diameter_km, energy_megatons) -> Dict[str, np.ndarray]:
+        """
+        Versión por lotes de estimate_casualties para muchos puntos de impacto
+
+        Aplica las mismas zonas, letalidades y riesgo de tsunami, pero agrupa
+        los puntos por celda de la rejilla de población: el perfil radial de
+        cada celda se calcula una vez y las zonas de todos sus puntos se
+        evalúan con sumas acumuladas. Las fracciones de agua se toman en el
+        primer punto de cada celda (la exposición costera, por celdas de
+        COASTAL_CELL_DEG). No consulta Nominatim.
+
+        Args:
+            lats: Latitudes de los impactos
+            lons: Longitudes de los impactos
+            crater_diameter_km: Diámetro del cráter (escalar o uno por punto)
+            energy_megatons: Energía liberada (escalar o una por punto)
+
+        Returns:
+            Dict de arrays: total_casualties, total_affected_population,
+            zone_casualties (N, 3), tsunami_casualties, tsunami_risk, is_ocean
+        """
+        lats, lons, crater, energy = np.broadcast_arrays(
+            np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64),
+            np.asarray(crater_diameter_km, dtype=np.float64), np.asarray(energy_megatons, dtype=np.float64)
+        )
+        lats, lons, crater, energy = (array.ravel() for array in (lats, lons, crater, energy))
+        n = len(lats)
+
+        # Mismos radios y letalidades que estimate_casualties
+        radii = crater[:, None] * np.array(ZONE_RADIUS_FACTORS)
+        base_mortalities = np.array(ZONE_MORTALITIES)
+        energy_factor = np.clip(energy / 100.0, 0.1, 1.0)
+        is_ocean = ~self.is_land(lats, lons)
+
+        # Población acumulada y Σ población·distancia hasta cada radio
+        cumulative_population = np.zeros((n, 3))
+        cumulative_moment = np.zeros((n, 3))
+        region_ocean = is_ocean.copy()
+        severe_water = np.zeros(n)
+        coastal_land = np.ones(n)
+
+        if self.population_grid is not None:
+            row, col = self.population_grid.cell_index(lats, lons)
+            cells = row * self.population_grid.cols + col
+            # Con rejilla el tipo de región sale de la densidad de la celda
+            region_ocean |= self.population_grid.density_at(lats, lons) <= 0
+        else:
+            cells = np.round(lats, 2) * 1e6 + np.round(lons, 2)
+
+        # Radios de daño severo menores que una celda de la máscara: basta el propio punto
+        small_severe = np.zeros(n, dtype=bool)
+        if self.land_mask is not None:
+            small_severe = np.degrees(radii[:, 1] / EARTH_RADIUS_KM) < self.land_mask.resolution
+            severe_water[small_severe] = is_ocean[small_severe]
+        
+        _, first, inverse = np.unique(cells, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='stable')
+        groups = np.split(order, np.cumsum(np.bincount(inverse))[:-1])
+
+        for representative, members in zip(first, groups):
+            lat, lon = float(lats[representative]), float(lons[representative])
+            outer = float(radii[members, 2].max())
+            if outer <= 0:
+                continue
+            if self.population_grid is not None:
+                distances, populations = self.population_grid.radial_profile(lat, lon, outer)
+                sort = np.argsort(distances)
+                distances, populations = distances[sort], populations[sort]
+                population_sum = np.concatenate([[0.0], np.cumsum(populations)])
+                moment_sum = np.concatenate([[0.0], np.cumsum(populations * distances)])
+                counts = np.searchsorted(distances, radii[members], side='right')
+                cumulative_population[members] = population_sum[counts]
+                cumulative_moment[members] = moment_sum[counts]
+            elif not is_ocean[representative]:
+                # Disco de densidad uniforme (con el factor de distribución no uniforme)
+                density = self._local_estimation_data(lat, lon)["density_per_km2"]
+                effective = density * self._distribution_factor(density)
+                cumulative_population[members] = effective * math.pi * radii[members] ** 2
+                cumulative_moment[members] = effective * 2 * math.pi * radii[members] ** 3 / 3
+
+            if not small_severe[representative]:
+                severe_water[members] = self.water_fraction(lat, lon, float(radii[representative, 1]))
+        
+        # La exposición costera (tierra a 1000 km) varía poco: una consulta por celda gruesa
+        exposed = np.nonzero(energy >= 50)[0]
+        if len(exposed):
+            coarse = (np.floor(lats[exposed] / COASTAL_CELL_DEG) * 1000 +
+                      np.floor(lons[exposed] / COASTAL_CELL_DEG))
+            _, coarse_first, coarse_inverse = np.unique(coarse, return_index=True, return_inverse=True)
+            land = np.array([1.0 - self.water_fraction(float(lats[exposed[k]]), float(lons[exposed[k]]), 1000)
+                             for k in coarse_first])
+            coastal_land[exposed] = land[coarse_inverse.ravel()]
+
+        # Letalidad base × (1 - 0.5·d/R) × energía dentro de cada zona (d <= R)
+        zone_population = np.diff(cumulative_population, axis=1, prepend=0.0)
+        zone_moment = np.diff(cumulative_moment, axis=1, prepend=0.0)
+        safe_radii = np.where(radii > 0, radii, 1.0)
+        zone_casualties = np.trunc(base_mortalities * energy_factor[:, None] *
+                                   np.maximum(zone_population - 0.5 * zone_moment / safe_radii, 0.0))
+
+        tsunami_risk = region_ocean | (severe_water >= 0.5)
+        per_megaton = np.select([energy < 50, energy < 500, energy < 2000], [0, 100, 150], 200)
+        coastal_exposure = np.clip(coastal_land / 0.25, 0.1, 1.0)
+        tsunami_casualties = np.where(tsunami_risk, np.trunc(energy * per_megaton * coastal_exposure), 0.0)
+
+        # Impactos demasiado pequeños para causar víctimas significativas
+        significant = crater >= 0.01
+        zone_casualties[~significant] = 0
+        total = np.where(significant, zone_casualties.sum(axis=1) + tsunami_casualties, 0.0)
+        return {
+            "total_casualties": total.astype(np.int64),
+            "total_affected_population": np.where(significant, cumulative_population[:, 2], 0.0).astype(np.int64),
+            "zone_casualties": zone_casualties.astype(np.int64),
+            "tsunami_casualties": np.where(significant, tsunami_casualties, 0.0).astype(np.int64),
+            "tsunami_risk": tsunami_risk & significant,
+            "is_ocean": is_ocean
+        }
+
     def _is_ocean(self, lat: float, lon: float) -> bool:
+        """Determinar si las coordenadas están en océano (máscara tierra/agua si está disponible)"""
+        if self.land_mask is not None:
+            return not self.land_mask.is_land(lat, lon)
+        return self._is_ocean_by_regions(lat, lon)
+    
+    def _is_ocean_by_regions(self, lat: float, lon: float) -> bool:
         """Determinar si las coordenadas están en océano usando áreas continentales conocidas"""
         
         # Definir continentes principales con rangos corregidos y más precisos
@@ -277,45 +524,98 @@ class DemographicService:
         # Si no está en ningún continente, es océano
         return True
     
+    def is_land(self, lats, lons) -> np.ndarray:
+        """Versión vectorizada de `not _is_ocean` para arrays de coordenadas"""
+        if self.land_mask is not None:
+            return self.land_mask.is_land_array(lats, lons)
+        return ~np.vectorize(self._is_ocean_by_regions, otypes=[bool])(lats, lons)
+    
+    def water_fraction(self, lat: float, lon: float, radius_km: float) -> float:
+        """Fracción de agua a menos de `radius_km` (0/1 según el punto si no hay máscara)"""
+        if self.land_mask is not None:
+            return self.land_mask.water_fraction(lat, lon, radius_km)
+        return 1.0 if self._is_ocean_by_regions(lat, lon) else 0.0
+    
+    def _load_city_index(self) -> CityIndex:
+        """Índice con las ciudades principales y, si existe, la tabla mundial de ciudades"""
+        path = os.getenv('WORLD_CITIES_PATH')
+        if path and os.path.exists(path):
+            try:
+                return CityIndex.from_csv(path, base_cities=self.major_cities,
+                                          min_population=int(os.getenv('WORLD_CITIES_MIN_POPULATION', 1000)))
+            except Exception as e:
+                logger.warning(f"No se pudo cargar la tabla de ciudades {path}: {e}")
+        return CityIndex(self.major_cities)
+    
     def _find_nearest_major_city(self, lat: float, lon: float) -> Dict[str, Any]:
         """Encontrar la ciudad principal más cercana"""
-        min_distance = float('inf')
-        nearest_city = None
-        
-        for city_name, city_data in self.major_cities.items():
-            distance = self._calculate_distance(lat, lon, city_data["lat"], city_data["lon"])
-            if distance < min_distance:
-                min_distance = distance
-                nearest_city = {
-                    "name": city_name,
-                    "distance_km": distance,
-                    "population": city_data["population"],
-                    "density": city_data["density"]
-                }
+        nearest = self.city_index.nearest(lat, lon, k=1)
+        if not nearest:
+            return None
         
-        return nearest_city
+        city = nearest[0]
+        return {
+            "name": city["name"],
+            "distance_km": city["distance_km"],
+            "population": city["population"],
+            "density": city.get("density", self.regional_density_estimates["urban_small"])
+        }
     
-    def _classify_region(self, lat: float, lon: float, nearest_city: Dict) -> Dict[str, Any]:
-        """Clasificar tipo de región basado en proximidad a ciudades"""
-        if not nearest_city:
-            return {"type": "rural_sparse", "density": self.regional_density_estimates["rural_sparse"]}
+    def _classify_region(self, lat: float, lon: float, nearest_city: Dict,
+                         search_radius_km: float = 500) -> Dict[str, Any]:
+        """
+        Clasificar tipo de región basado en proximidad a ciudades
         
-        distance = nearest_city["distance_km"]
-        city_population = nearest_city["population"]
+        Se evalúan todas las ciudades del índice dentro de `search_radius_km`
+        (no solo la más cercana) y se toma la clasificación más urbana.
+        """
+        cities = self.city_index.within_radius(lat, lon, search_radius_km)
+        if nearest_city and not cities:
+            cities = [nearest_city]
+        if not cities:
+            return {"type": "rural_sparse", "density": self.regional_density_estimates["rural_sparse"]}
         
-        # Clasificación basada en distancia y tamaño de ciudad
+        ranking = ["urban_major", "urban_large", "urban_medium", "suburban", "rural_populated", "rural_sparse"]
+        best = min((self._classify_by_city(city["distance_km"], city["population"]) for city in cities),
+                   key=ranking.index)
+        return {"type": best, "density": self.regional_density_estimates[best]}
+    
+    def _classify_by_city(self, distance: float, city_population: float) -> str:
+        """Clasificación basada en distancia y tamaño de una ciudad"""
         if distance < 25 and city_population > 20000000:
-            return {"type": "urban_major", "density": self.regional_density_estimates["urban_major"]}
+            return "urban_major"
         elif distance < 50 and city_population > 10000000:
-            return {"type": "urban_large", "density": self.regional_density_estimates["urban_large"]}
+            return "urban_large"
         elif distance < 100 and city_population > 5000000:
-            return {"type": "urban_medium", "density": self.regional_density_estimates["urban_medium"]}
+            return "urban_medium"
         elif distance < 200 and city_population > 1000000:
-            return {"type": "suburban", "density": self.regional_density_estimates["suburban"]}
+            return "suburban"
         elif distance < 500:
-            return {"type": "rural_populated", "density": self.regional_density_estimates["rural_populated"]}
+            return "rural_populated"
         else:
-            return {"type": "rural_sparse", "density": self.regional_density_estimates["rural_sparse"]}
+            return "rural_sparse"
+    
+    def _cities_in_damage_zones(self, lat: float, lon: float, radii: Dict[str, float]) -> list:
+        """
+        Ciudades del índice dentro de cada zona de daño
+        
+        Args:
+            radii: {nombre_de_zona: radio_km} en orden creciente de radio
+            
+        Returns:
+            Lista de ciudades (más cercanas primero) con la zona en que caen
+        """
+        zones = list(radii.items())
+        affected = []
+        for city in self.city_index.within_radius(lat, lon, zones[-1][1]):
+            zone = next(name for name, radius in zones if city["distance_km"] <= radius)
+            affected.append({
+                "name": city["name"],
+                "distance_km": round(city["distance_km"], 1),
+                "population": city["population"],
+                "zone": zone
+            })
+        return affected
     
     def _estimate_population_in_radius(self, lat: float, lon: float, radius_km: float, density: float) -> float:
         """Estimar población en un radio específico usando áreas graduales"""
@@ -323,27 +623,33 @@ class DemographicService:
         area_km2 = math.pi * (radius_km ** 2)
         base_population = area_km2 * density
         
-        # Factor de corrección por distribución no uniforme
+        return base_population * self._distribution_factor(density)
+    
+    def _distribution_factor(self, density: float) -> float:
+        """Factor de corrección por distribución no uniforme"""
         # En ciudades reales, la densidad no es uniforme - más densa en el centro
         if density > 10000:  # Ciudades muy densas
-            distribution_factor = 0.7  # 70% de la densidad teórica
+            return 0.7  # 70% de la densidad teórica
         elif density > 1000:  # Ciudades medianas
-            distribution_factor = 0.8  # 80% de la densidad teórica
+            return 0.8  # 80% de la densidad teórica
         else:  # Áreas rurales
-            distribution_factor = 0.9  # 90% de la densidad teórica (más uniforme)
-            
-        return base_population * distribution_factor
+            return 0.9  # 90% de la densidad teórica (más uniforme)
     
     def _estimate_tsunami_casualties(self, lat: float, lon: float, energy_megatons: float) -> int:
         """Estimar víctimas adicionales por tsunami (impactos oceánicos)"""
         if energy_megatons < 50:
             return 0  # Sin tsunamis significativos
         elif energy_megatons < 500:
-            return int(energy_megatons * 100)  # 100 víctimas por megatón
+            per_megaton = 100  # 100 víctimas por megatón
         elif energy_megatons < 2000:
-            return int(energy_megatons * 150)  # Tsunami regional
+            per_megaton = 150  # Tsunami regional
         else:
-            return int(energy_megatons * 200)  # Máximo 200 víctimas por megatón
+            per_megaton = 200  # Máximo 200 víctimas por megatón
+        
+        # Exposición costera: tierra a menos de 1000 km (plena con un 25% o más)
+        land_fraction = 1.0 - self.water_fraction(lat, lon, 1000)
+        coastal_exposure = min(1.0, max(0.1, land_fraction / 0.25))
+        return int(energy_megatons * per_megaton * coastal_exposure)
     
     def _estimate_country(self, lat: float, lon: float) -> str:
         """Estimación simplificada de país basada en coordenadas"""
@@ -376,54 +682,48 @@ class DemographicService:
         
         return R * c
     
-    def _calculate_casualties_by_distance(self, impact_lat: float, impact_lon: float, 
-                                        radius_km: float, population: float, 
-                                        base_mortality: float, energy_factor: float) -> int:
+    def _integrate_zones(self, lat: float, lon: float, radii, base_mortalities,
+                         energy_factor: float, density: float) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Calcular víctimas basado en distancia real del impacto con letalidad degradada
+        Integrar población y víctimas por zonas concéntricas con letalidad degradada
+        
+        La letalidad de cada zona es base × max(0.1, 1 - 0.5·d/R) × energía, con
+        d la distancia al impacto y R el radio exterior de la zona. Con rejilla
+        de población se suman las celdas reales; sin ella se integra una
+        densidad uniforme en anillos finos.
         
         Args:
-            impact_lat: Latitud del impacto
-            impact_lon: Longitud del impacto  
-            radius_km: Radio de la zona de daño
-            population: Población en la zona
-            base_mortality: Tasa de mortalidad base para la zona
+            lat: Latitud del impacto
+            lon: Longitud del impacto
+            radii: Radios exteriores de las zonas en km (crecientes)
+            base_mortalities: Tasa de mortalidad base de cada zona
             energy_factor: Factor de escalado por energía
+            density: Densidad a usar si no hay rejilla (personas/km²)
             
         Returns:
-            Número de víctimas estimadas
+            Tupla (población por zona, víctimas por zona), sin acumular
         """
-        if population <= 0:
-            return 0
-            
-        # Simular distribución de población dentro del radio
-        # En lugar de asumir mortalidad uniforme, usar degradación por distancia
+        radii = np.asarray(radii, dtype=np.float64)
+        base_mortalities = np.asarray(base_mortalities, dtype=np.float64)
         
-        total_casualties = 0
+        if self.population_grid is not None:
+            distances, populations = self.population_grid.radial_profile(lat, lon, radii[-1])
+        else:
+            distances, populations = self._uniform_profile(radii[-1], density)
         
-        # Dividir el área en anillos concéntricos para simular distancia variable
-        num_rings = max(3, int(radius_km))  # Mínimo 3 anillos, más para áreas grandes
+        # Zona de cada elemento: la primera cuyo radio lo contiene
+        zone = np.minimum(np.searchsorted(radii, distances), len(radii) - 1)
+        mortality = base_mortalities[zone] * np.maximum(0.1, 1 - 0.5 * distances / radii[zone]) * energy_factor
         
-        for ring in range(num_rings):
-            ring_inner_radius = (ring / num_rings) * radius_km
-            ring_outer_radius = ((ring + 1) / num_rings) * radius_km
-            
-            # Population in this ring (proportional to area)
-            ring_area = math.pi * (ring_outer_radius**2 - ring_inner_radius**2)
-            total_area = math.pi * radius_km**2
-            ring_population = population * (ring_area / total_area)
-            
-            # Letalidad degradada por distancia
-            avg_distance = (ring_inner_radius + ring_outer_radius) / 2
-            distance_factor = max(0.1, 1 - (avg_distance / radius_km) * 0.5)  # Reduce 50% en el borde
-            
-            # Mortalidad final para este anillo
-            ring_mortality = base_mortality * distance_factor * energy_factor
-            ring_casualties = int(ring_population * ring_mortality)
-            
-            total_casualties += ring_casualties
-            
-        return total_casualties
+        zone_populations = np.bincount(zone, weights=populations, minlength=len(radii))
+        zone_casualties = np.bincount(zone, weights=populations * mortality, minlength=len(radii))
+        return zone_populations, zone_casualties
+    
+    def _uniform_profile(self, radius_km: float, density: float, rings: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+        """Anillos de densidad uniforme (con el factor de distribución no uniforme)"""
+        edges = np.linspace(0.0, radius_km, rings + 1)
+        populations = density * self._distribution_factor(density) * math.pi * np.diff(edges ** 2)
+        return (edges[:-1] + edges[1:]) / 2, populations
     
     def _get_real_demographic_data(self, lat: float, lon: float) -> Dict[str, Any]:
         """
@@ -442,6 +742,8 @@ class DemographicService:
             if nominatim_data:
                 return nominatim_data
                 
+        except CircuitOpenError as e:
+            logger.debug(f"Nominatim omitido para {lat}, {lon}: {e}")
         except Exception as e:
             logger.warning(f"Error obteniendo datos reales para {lat}, {lon}: {e}")
         
@@ -471,21 +773,46 @@ class DemographicService:
         return None
     
     def _query_nominatim_api(self, lat: float, lon: float) -> Dict[str, Any]:
-        """Consultar Nominatim (OpenStreetMap) para información geográfica"""
+        """Consultar Nominatim (OpenStreetMap) pasando por el cache de geocodificación"""
+        if self.geocode_cache is None:
+            self.geocode_cache = GeocodeCache()
+        
+        result = self.geocode_cache.get_or_fetch(lat, lon, self._fetch_nominatim)
+        if result is None:
+            return None
+        
+        # El resultado es de la celda cuantizada: ajustar a las coordenadas pedidas
+        result = dict(result)
+        result["coordinates"] = {"lat": lat, "lon": lon}
+        return result
+    
+    def _fetch_nominatim(self, lat: float, lon: float) -> Dict[str, Any]:
+        """Descargar y procesar la geocodificación inversa de Nominatim"""
+        url = "https://nominatim.openstreetmap.org/reverse"
+        params = {
+            "format": "json",
+            "lat": lat,
+            "lon": lon,
+            "zoom": 10,
+            "addressdetails": 1
+        }
+        headers = {
+            "User-Agent": "MeteorMadness-HackNASA/1.0"
+        }
+        
+        # Con el circuito abierto no se llama (ni se guarda un fallo en el cache)
+        self.nominatim_breaker.check()
         try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                "format": "json",
-                "lat": lat,
-                "lon": lon,
-                "zoom": 10,
-                "addressdetails": 1
-            }
-            headers = {
-                "User-Agent": "MeteorMadness-HackNASA/1.0"
-            }
-            
             response = requests.get(url, params=params, headers=headers, timeout=5)
+        except requests.exceptions.RequestException as e:
+            self.nominatim_breaker.record_failure()
+            logger.error(f"Error consultando Nominatim: {e}")
+            return None
+        
+        self.nominatim_breaker.record_response(response.status_code, response.headers)
+        if response.status_code == 429:
+            raise CircuitOpenError(self.nominatim_breaker.name, self.nominatim_breaker.retry_in())
+        try:
             if response.status_code == 200:
                 data = response.json()
                 return self._process_nominatim_response(data, lat, lon)
@@ -495,6 +822,20 @@ class DemographicService:
         
         return None
     
+    def get_source_stats(self) -> Dict[str, Any]:
+        """Latencia y tasa de éxito de cada fuente demográfica"""
+        return self.resolver.get_stats()
+    
+    def get_circuit_stats(self) -> Dict[str, Any]:
+        """Estado del circuito de Nominatim"""
+        return {"nominatim": self.nominatim_breaker.get_stats()}
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Estadísticas del cache de geocodificación"""
+        if self.geocode_cache is None:
+            return {"enabled": self.enable_nominatim, "fetches": 0, "hit_rate": 0.0}
+        return {"enabled": self.enable_nominatim, **self.geocode_cache.get_stats()}
+    
     def _process_nominatim_response(self, data: dict, lat: float, lon: float) -> Dict[str, Any]:
         """Procesar respuesta de Nominatim para extraer datos demográficos"""
         try:
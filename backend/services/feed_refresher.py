@@ -0,0 +1,182 @@
+"""
+Refresco en segundo plano del feed de asteroides de NASA
+Las peticiones siempre reciben la última instantánea válida (stale-while-revalidate)
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FeedRefresher:
+    """
+    Tarea de fondo que refresca periódicamente la lista de asteroides procesados.
+    Si un refresco falla se sigue sirviendo la instantánea anterior hasta que
+    supera la antigüedad máxima permitida. Opcionalmente, las instantáneas
+    guardadas en disco se siguen sirviendo después (marcadas como antiguas),
+    para despliegues sin red.
+    """
+
+    def __init__(self, nasa_service, interval_seconds: Optional[float] = None,
+                 max_staleness_seconds: Optional[float] = None,
+                 retry_seconds: Optional[float] = None, serve_stale_offline: Optional[bool] = None):
+        """
+        Inicializar el refresco
+
+        Args:
+            nasa_service: Instancia de AsyncNASAApiService
+            interval_seconds: Segundos entre refrescos correctos (FEED_REFRESH_INTERVAL o 300)
+            max_staleness_seconds: Antigüedad máxima servible (FEED_MAX_STALENESS o 3600)
+            retry_seconds: Espera tras un refresco fallido (FEED_REFRESH_RETRY o 30)
+            serve_stale_offline: Servir el feed guardado en disco aunque supere la
+                                 antigüedad máxima (FEED_SERVE_STALE_OFFLINE, desactivado)
+        """
+        self.nasa_service = nasa_service
+        self.interval_seconds = interval_seconds if interval_seconds is not None else \
+            float(os.getenv('FEED_REFRESH_INTERVAL', 300))
+        self.max_staleness_seconds = max_staleness_seconds if max_staleness_seconds is not None else \
+            float(os.getenv('FEED_MAX_STALENESS', 3600))
+        self.retry_seconds = retry_seconds if retry_seconds is not None else \
+            float(os.getenv('FEED_REFRESH_RETRY', 30))
+        if serve_stale_offline is None:
+            serve_stale_offline = os.getenv('FEED_SERVE_STALE_OFFLINE', 'false').lower() in ('1', 'true', 'yes')
+        self.serve_stale_offline = serve_stale_offline
+
+        self._asteroids: List[Dict[str, Any]] = []
+        self._fetched_at: Optional[float] = None
+        # La instantánea está también en el almacén en disco del servicio
+        self._on_disk = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.last_error: Optional[str] = None
+        self.refresh_count = 0
+        self.failure_count = 0
+
+    async def refresh(self) -> bool:
+        """
+        Ejecutar un refresco inmediato
+
+        Returns:
+            True si se obtuvo una instantánea nueva
+        """
+        error = None
+        try:
+            asteroids = await self.nasa_service.refresh_processed_asteroids()
+        except Exception as e:
+            asteroids = None
+            error = str(e)
+            logger.error(f"Error refrescando el feed de NASA: {e}")
+
+        if not asteroids:
+            self.failure_count += 1
+            self.last_error = error or "empty_feed"
+            age = self.get_age_seconds()
+            if age is None and self.warm_start() and self.get_snapshot()["usable"]:
+                logger.warning("Refresco del feed fallido, se sirve el feed guardado en disco")
+            elif age is None and self._fetched_at is not None:
+                logger.warning("Refresco del feed fallido y el feed guardado en disco supera la antigüedad máxima")
+            elif age is None:
+                logger.warning("Refresco del feed fallido y sin instantánea previa")
+            else:
+                logger.warning(f"Refresco del feed fallido, se mantiene la instantánea de hace {age:.0f} s")
+            return False
+
+        self._asteroids = asteroids
+        self._fetched_at = time.time()
+        self._on_disk = getattr(self.nasa_service, "feed_store", None) is not None
+        self.last_error = None
+        self.refresh_count += 1
+        logger.info(f"Feed de NASA refrescado: {len(asteroids)} asteroides")
+        return True
+
+    async def _run(self):
+        """Bucle de refresco periódico"""
+        while True:
+            ok = await self.refresh()
+            await asyncio.sleep(self.interval_seconds if ok else self.retry_seconds)
+
+    def warm_start(self) -> bool:
+        """
+        Cargar la instantánea inicial desde el almacén en disco sin acceder a la red
+
+        Returns:
+            True si había datos guardados
+        """
+        loader = getattr(self.nasa_service, "load_stored_processed_asteroids", None)
+        if loader is None or self._fetched_at is not None:
+            return False
+
+        try:
+            asteroids, stored_at = loader()
+        except Exception as e:
+            logger.warning(f"No se pudo cargar el feed guardado: {e}")
+            return False
+
+        if not asteroids:
+            return False
+
+        self._asteroids = asteroids
+        self._fetched_at = stored_at
+        self._on_disk = True
+        logger.info(f"Instantánea inicial cargada desde disco: {len(asteroids)} asteroides")
+        return True
+
+    def start(self):
+        """Cargar el feed guardado y lanzar la tarea de fondo (dentro del event loop)"""
+        self.warm_start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detener la tarea de fondo"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_age_seconds(self) -> Optional[float]:
+        """Antigüedad de la instantánea actual en segundos (None si no hay datos)"""
+        if self._fetched_at is None:
+            return None
+        return round(time.time() - self._fetched_at, 1)
+
+    def get_snapshot(self) -> Dict[str, Any]:
+        """
+        Obtener la última instantánea válida sin esperar a la red
+
+        Returns:
+            Dict con la lista de asteroides, su antigüedad, si sigue siendo
+            servible y si supera la antigüedad máxima (solo servible desde disco
+            con serve_stale_offline)
+        """
+        age = self.get_age_seconds()
+        fresh = age is not None and age <= self.max_staleness_seconds
+        usable = fresh or (age is not None and self.serve_stale_offline and self._on_disk)
+        return {
+            "asteroids": self._asteroids if usable else [],
+            "age_seconds": age,
+            "fetched_at": self._fetched_at,
+            "usable": usable,
+            "stale": usable and not fresh
+        }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado del refresco para diagnóstico"""
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "age_seconds": self.get_age_seconds(),
+            "asteroid_count": len(self._asteroids),
+            "interval_seconds": self.interval_seconds,
+            "max_staleness_seconds": self.max_staleness_seconds,
+            "serve_stale_offline": self.serve_stale_offline,
+            "refresh_count": self.refresh_count,
+            "failure_count": self.failure_count,
+            "last_error": self.last_error
+        }
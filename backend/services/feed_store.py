@@ -0,0 +1,131 @@
+"""
+Almacén persistente del feed NeoWs por fecha de aproximación
+Permite descargar solo los días que faltan y arrancar sin acceso a la red
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from services.paths import CACHE_DIR
+from services.sqlite_store import SQLiteKeyValueStore
+
+logger = logging.getLogger(__name__)
+
+# El feed de NeoWs admite como máximo 7 días entre start_date y end_date
+MAX_FEED_SPAN_DAYS = 7
+
+
+class NeoFeedStore:
+    """
+    Guarda `near_earth_objects` de NeoWs en SQLite con una fila por fecha.
+    Los días pasados apenas cambian y se conservan más tiempo que los
+    recientes o futuros, cuyas aproximaciones todavía se actualizan.
+    """
+
+    def __init__(self, path: Optional[str] = None, recent_ttl_seconds: float = 3600,
+                 past_ttl_seconds: float = 7 * 24 * 3600, recent_days: int = 2):
+        """
+        Inicializar el almacén
+
+        Args:
+            path: Fichero SQLite (por defecto NEO_FEED_STORE_PATH o data/cache/neo_feed.sqlite3)
+            recent_ttl_seconds: Validez de los días recientes o futuros
+            past_ttl_seconds: Validez de los días ya pasados
+            recent_days: Días hacia atrás desde hoy que se consideran recientes
+        """
+        self.path = path or os.getenv('NEO_FEED_STORE_PATH', os.path.join(CACHE_DIR, 'neo_feed.sqlite3'))
+        self.recent_ttl_seconds = recent_ttl_seconds
+        self.past_ttl_seconds = past_ttl_seconds
+        self.recent_days = recent_days
+        self._store = SQLiteKeyValueStore(self.path, table="neo_feed_days")
+
+    @staticmethod
+    def _date_range(start_date: str, end_date: str) -> List[str]:
+        """Fechas YYYY-MM-DD entre start_date y end_date (ambas incluidas)"""
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+    def _ttl_for(self, date: str, today) -> float:
+        day = datetime.strptime(date, "%Y-%m-%d").date()
+        if day >= today - timedelta(days=self.recent_days):
+            return self.recent_ttl_seconds
+        return self.past_ttl_seconds
+
+    def stale_dates(self, start_date: str, end_date: str, now: Optional[float] = None) -> List[str]:
+        """
+        Fechas de la ventana que faltan en el almacén o han caducado
+
+        Args:
+            start_date: Fecha de inicio (YYYY-MM-DD)
+            end_date: Fecha final (YYYY-MM-DD)
+            now: Instante de referencia (por defecto time.time())
+
+        Returns:
+            Lista ordenada de fechas a descargar
+        """
+        now = time.time() if now is None else now
+        today = datetime.fromtimestamp(now).date()
+        dates = self._date_range(start_date, end_date)
+        updated = self._store.get_updated_at(dates)
+        return [date for date in dates
+                if date not in updated or now - updated[date] > self._ttl_for(date, today)]
+
+    def plan_fetch(self, start_date: str, end_date: str, now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """
+        Agrupar las fechas a descargar en rangos contiguos admitidos por el feed
+
+        Returns:
+            Lista de tuplas (start_date, end_date)
+        """
+        ranges = []
+        for date in self.stale_dates(start_date, end_date, now):
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+            if ranges:
+                range_start, range_end = ranges[-1]
+                if day - range_end == timedelta(days=1) and (day - range_start).days <= MAX_FEED_SPAN_DAYS:
+                    ranges[-1] = (range_start, day)
+                    continue
+            ranges.append((day, day))
+        return [(start.isoformat(), end.isoformat()) for start, end in ranges]
+
+    def save_feed(self, raw_data: Dict[str, Any], start_date: str, end_date: str):
+        """
+        Guardar un feed descargado, una fila por fecha
+
+        Args:
+            raw_data: Respuesta del feed NEO
+            start_date: Fecha de inicio pedida
+            end_date: Fecha final pedida (los días sin objetos se guardan vacíos)
+        """
+        neo_objects = raw_data.get('near_earth_objects', {})
+        days = {date: [] for date in self._date_range(start_date, end_date)}
+        days.update(neo_objects)
+        self._store.put_many(days)
+        logger.info(f"Guardados {len(days)} días del feed NEO en {self.path}")
+
+    def load_feed(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """
+        Reconstruir un feed con el formato de NeoWs a partir de los días guardados
+
+        Returns:
+            Dict con `near_earth_objects`, `element_count` y la fecha de la
+            actualización más antigua, o {} si no hay ningún día guardado
+        """
+        stored = self._store.get_many(self._date_range(start_date, end_date))
+        if not stored:
+            return {}
+
+        neo_objects = {date: objects for date, (objects, _) in sorted(stored.items())}
+        return {
+            "near_earth_objects": neo_objects,
+            "element_count": sum(len(objects) for objects in neo_objects.values()),
+            "stored_at": min(updated_at for _, updated_at in stored.values())
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del almacén"""
+        return {"path": self.path, "stored_days": len(self._store)}
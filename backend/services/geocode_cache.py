@@ -0,0 +1,156 @@
+"""
+Cache de geocodificación inversa con coordenadas cuantizadas
+Evita repetir consultas a Nominatim para clics cercanos entre sí
+"""
+
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+import logging
+
+from services.cache import TTLCache
+from services.circuit_breaker import CircuitOpenError
+from services.paths import CACHE_DIR
+from services.sqlite_store import SQLiteKeyValueStore
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodeCache:
+    """
+    Cache en dos niveles (LRU en memoria + SQLite en disco) de resultados de
+    geocodificación inversa. Las coordenadas se redondean a `precision_deg`,
+    de modo que dos puntos de la misma celda comparten resultado. Los fallos
+    también se guardan (cache negativo) durante un tiempo más corto.
+    """
+
+    def __init__(self, precision_deg: Optional[float] = None, path: Optional[str] = None,
+                 memory_entries: int = 4096, ttl_seconds: float = 30 * 24 * 3600,
+                 negative_ttl_seconds: float = 3600, persist: bool = True):
+        """
+        Inicializar el cache
+
+        Args:
+            precision_deg: Tamaño de la celda de cuantización (GEOCODE_CACHE_PRECISION o 0.01 ≈ 1 km)
+            path: Fichero SQLite (GEOCODE_CACHE_PATH o data/cache/geocode.sqlite3)
+            memory_entries: Entradas máximas en memoria
+            ttl_seconds: Validez de un resultado correcto
+            negative_ttl_seconds: Validez de un fallo o timeout
+            persist: False para no usar el nivel en disco
+        """
+        if precision_deg is None:
+            precision_deg = float(os.getenv('GEOCODE_CACHE_PRECISION', 0.01))
+        if precision_deg <= 0:
+            raise ValueError("precision_deg debe ser positiva")
+
+        self.precision_deg = precision_deg
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.memory = TTLCache(ttl_seconds=None, max_entries=memory_entries)
+
+        self.path = None
+        self._store = None
+        if persist:
+            self.path = path or os.getenv('GEOCODE_CACHE_PATH', os.path.join(CACHE_DIR, 'geocode.sqlite3'))
+            try:
+                self._store = SQLiteKeyValueStore(self.path, table="reverse_geocode")
+            except Exception as e:
+                logger.warning(f"Cache de geocodificación solo en memoria ({self.path}): {e}")
+
+        # Contadores de uso
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.fetches = 0
+
+    def key(self, lat: float, lon: float) -> str:
+        """Clave de la celda que contiene el punto"""
+        lon = (lon + 180.0) % 360.0 - 180.0
+        return f"{self.precision_deg:g}:{round(lat / self.precision_deg)}:{round(lon / self.precision_deg)}"
+
+    def _is_fresh(self, entry: Dict[str, Any], now: float) -> bool:
+        ttl = self.negative_ttl_seconds if entry["value"] is None else self.ttl_seconds
+        return now - entry["stored_at"] <= ttl
+
+    def get_or_fetch(self, lat: float, lon: float,
+                     fetcher: Callable[[float, float], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """
+        Obtener el resultado de la celda o calcularlo con `fetcher`
+
+        Args:
+            lat: Latitud
+            lon: Longitud
+            fetcher: Función (lat, lon) -> dict o None si la consulta falló
+
+        Returns:
+            Resultado cacheado o recién obtenido (None si la celda está en cache negativo)
+            
+        Raises:
+            CircuitOpenError: si `fetcher` no consultó al servicio por tener el circuito abierto
+        """
+        key = self.key(lat, lon)
+        entry = self.memory.get(key)
+        if entry is not None and self._is_fresh(entry, time.time()):
+            self.memory_hits += 1
+            if entry["value"] is None:
+                self.negative_hits += 1
+            return entry["value"]
+
+        # Un único hilo consulta cada celda; el resto recibe su resultado
+        if entry is not None:
+            self.memory.invalidate(key)
+        entry = self.memory.get_or_load(key, lambda: self._load(key, lat, lon, fetcher),
+                                        should_cache=lambda _: True)
+        return entry["value"]
+
+    def _load(self, key: str, lat: float, lon: float, fetcher) -> Dict[str, Any]:
+        """Buscar en disco y, si no hay resultado vigente, llamar a `fetcher`"""
+        now = time.time()
+        if self._store is not None:
+            stored = self._store.get(key)
+            if stored is not None:
+                value, stored_at = stored
+                entry = {"value": value, "stored_at": stored_at}
+                if self._is_fresh(entry, now):
+                    self.disk_hits += 1
+                    if value is None:
+                        self.negative_hits += 1
+                    return entry
+
+        self.fetches += 1
+        try:
+            value = fetcher(lat, lon)
+        except CircuitOpenError:
+            # No se consultó al servicio: no es un resultado que deba cachearse
+            self.fetches -= 1
+            raise
+        except Exception as e:
+            logger.warning(f"Geocodificación inversa fallida para {lat}, {lon}: {e}")
+            value = None
+
+        entry = {"value": value, "stored_at": now}
+        if self._store is not None:
+            try:
+                self._store.put(key, value, updated_at=now)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar la geocodificación de {key}: {e}")
+        return entry
+
+    def clear(self):
+        """Vaciar el nivel en memoria (el disco se conserva)"""
+        self.memory.invalidate()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso, incluida la tasa de aciertos"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.fetches
+        return {
+            "precision_deg": self.precision_deg,
+            "memory_entries": self.memory.get_stats()["entries"],
+            "stored_entries": len(self._store) if self._store is not None else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "fetches": self.fetches,
+            "hit_rate": round(hits / total, 3) if total else 0.0
+        }
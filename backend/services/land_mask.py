@@ -0,0 +1,233 @@
+"""
+Máscara global tierra/agua en bits empaquetados
+Sustituye los rectángulos de `_is_ocean` por un raster mapeado en memoria
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+
+from services.paths import CACHE_DIR, DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Resolución por defecto de la máscara (grados por celda)
+DEFAULT_RESOLUTION_DEG = 0.1
+
+# Contornos simplificados de continentes e islas principales incluidos en el repositorio
+DEFAULT_GEOJSON_PATH = os.path.join(DATA_DIR, 'geo', 'land_simplified.geojson')
+
+
+def default_mask_path(resolution: float = DEFAULT_RESOLUTION_DEG) -> str:
+    """Ruta de la máscara (LAND_MASK_PATH o data/cache/land_mask_<res>.npy)"""
+    return os.getenv('LAND_MASK_PATH', os.path.join(CACHE_DIR, f'land_mask_{resolution:g}.npy'))
+
+
+class LandMask:
+    """
+    Máscara de tierra con un bit por celda (1 = tierra), filas desde -90° de
+    latitud y columnas desde -180° de longitud empaquetadas con np.packbits.
+    La resolución se deduce de la forma: filas = 180 / resolución.
+    """
+
+    def __init__(self, packed: np.ndarray, path: Optional[str] = None):
+        """
+        Args:
+            packed: Array uint8 de forma (filas, 2 × filas / 8)
+            path: Fichero de origen (solo informativo)
+        """
+        rows, packed_cols = packed.shape
+        if packed_cols * 8 != 2 * rows:
+            raise ValueError(f"Forma de máscara inválida {packed.shape}")
+
+        self.packed = packed
+        self.path = path
+        self.rows = rows
+        self.cols = 2 * rows
+        self.resolution = 180.0 / rows
+        self.row_lat = -90.0 + (np.arange(rows) + 0.5) * self.resolution
+        self.col_lon = -180.0 + (np.arange(self.cols) + 0.5) * self.resolution
+
+    @classmethod
+    def load(cls, path: str) -> "LandMask":
+        """Abrir un fichero .npy mapeado en memoria"""
+        return cls(np.load(path, mmap_mode='r'), path=path)
+
+    @classmethod
+    def load_or_build(cls, path: Optional[str] = None, geojson_path: Optional[str] = None,
+                      resolution: float = DEFAULT_RESOLUTION_DEG) -> Optional["LandMask"]:
+        """
+        Abrir la máscara o generarla desde el GeoJSON si el fichero no existe
+
+        Returns:
+            LandMask o None si no hay fichero ni contornos para construirlo
+        """
+        path = path or default_mask_path(resolution)
+        try:
+            if not os.path.exists(path):
+                geojson_path = geojson_path or DEFAULT_GEOJSON_PATH
+                if not os.path.exists(geojson_path):
+                    return None
+                logger.info(f"Generando máscara tierra/agua en {path} desde {geojson_path}")
+                save_mask(rasterize_geojson(geojson_path, resolution), path)
+            return cls.load(path)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar la máscara tierra/agua {path}: {e}")
+            return None
+
+    def _cell(self, lat, lon):
+        row = np.clip(((np.asarray(lat) + 90.0) / self.resolution).astype(np.int64), 0, self.rows - 1)
+        col = (((np.asarray(lon) + 180.0) / self.resolution).astype(np.int64)) % self.cols
+        return row, col
+
+    def _bits(self, rows, cols) -> np.ndarray:
+        """Valores 0/1 de las celdas (filas, columnas) con difusión NumPy"""
+        return (np.asarray(self.packed[rows, cols >> 3]) >> (7 - (cols & 7))) & 1
+
+    def is_land(self, lat: float, lon: float) -> bool:
+        """Consulta O(1) de un punto"""
+        row = min(max(int((lat + 90.0) / self.resolution), 0), self.rows - 1)
+        col = int((lon + 180.0) / self.resolution) % self.cols
+        return bool((self.packed[row, col >> 3] >> (7 - (col & 7))) & 1)
+
+    def is_land_array(self, lats, lons) -> np.ndarray:
+        """Consulta vectorizada para arrays de puntos (misma forma que la entrada)"""
+        rows, cols = self._cell(lats, lons)
+        return self._bits(rows, cols).astype(bool)
+
+    def water_fraction(self, lat: float, lon: float, radius_km: float) -> float:
+        """
+        Fracción de la superficie a menos de `radius_km` del punto que es agua
+
+        Las celdas se ponderan por su área (cos φ). Radios menores que una
+        celda devuelven el valor de la celda del punto.
+        """
+        radius_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+        if radius_deg < self.resolution:
+            return 0.0 if self.is_land(lat, lon) else 1.0
+
+        row, col = self._cell(lat, lon)
+        half_rows = int(math.ceil(radius_deg / self.resolution)) + 1
+        max_lat = min(89.9, abs(lat) + radius_deg)
+        half_cols = int(math.ceil(radius_deg / max(math.cos(math.radians(max_lat)), 1e-6) / self.resolution)) + 1
+
+        rows = np.arange(max(0, int(row) - half_rows), min(self.rows, int(row) + half_rows + 1))
+        if 2 * half_cols + 1 >= self.cols:
+            cols = np.arange(self.cols)
+        else:
+            cols = np.arange(int(col) - half_cols, int(col) + half_cols + 1) % self.cols
+
+        lat1 = math.radians(lat)
+        lat2 = np.radians(self.row_lat[rows])[:, None]
+        dlon = np.radians(self.col_lon[cols] - lon)[None, :]
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+        inside = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0))) <= radius_km
+
+        weights = np.broadcast_to(np.cos(lat2), inside.shape)[inside]
+        if weights.sum() <= 0:
+            return 0.0 if self.is_land(lat, lon) else 1.0
+        land = self._bits(rows[:, None], cols[None, :])[inside]
+        return float(1.0 - (land * weights).sum() / weights.sum())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "shape": [self.rows, self.cols], "resolution_deg": self.resolution}
+
+
+def _polygon_rings(geometry: Dict[str, Any]) -> List[List[np.ndarray]]:
+    """Anillos (exterior + huecos) de cada polígono de una geometría GeoJSON"""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    return [[np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon] for polygon in polygons]
+
+
+def _fill_polygon(mask: np.ndarray, rings: Iterable[np.ndarray], resolution: float):
+    """
+    Rellenar un polígono por líneas de barrido (regla par-impar, huecos incluidos)
+
+    Para cada fila se calculan los cruces de todas las aristas con la latitud
+    del centro de la fila y se marcan las celdas entre pares de cruces.
+    """
+    rings = list(rings)
+    x0 = np.concatenate([ring[:-1, 0] for ring in rings])
+    y0 = np.concatenate([ring[:-1, 1] for ring in rings])
+    x1 = np.concatenate([ring[1:, 0] for ring in rings])
+    y1 = np.concatenate([ring[1:, 1] for ring in rings])
+
+    rows = mask.shape[0]
+    row_lo = max(0, int(math.floor((y0.min() + 90.0) / resolution)))
+    row_hi = min(rows - 1, int(math.ceil((y0.max() + 90.0) / resolution)))
+    for row in range(row_lo, row_hi + 1):
+        y = -90.0 + (row + 0.5) * resolution
+        crosses = (y0 <= y) != (y1 <= y)
+        if not crosses.any():
+            continue
+        t = (y - y0[crosses]) / (y1[crosses] - y0[crosses])
+        xs = np.sort(x0[crosses] + t * (x1[crosses] - x0[crosses]))
+        for start, end in zip(xs[0::2], xs[1::2]):
+            col_start = max(0, int(math.ceil((start + 180.0) / resolution - 0.5)))
+            col_end = min(mask.shape[1], int(math.floor((end + 180.0) / resolution - 0.5)) + 1)
+            mask[row, col_start:col_end] = True
+
+
+def rasterize_geojson(geojson_path: str, resolution: float = DEFAULT_RESOLUTION_DEG) -> np.ndarray:
+    """
+    Convertir contornos GeoJSON de tierra en una máscara empaquetada
+
+    Sirve tanto para el contorno simplificado incluido en data/geo como para
+    ficheros de Natural Earth (p. ej. ne_50m_land.geojson). Las geometrías con
+    la propiedad `"water": true` (lagos y mares interiores) se restan.
+
+    Returns:
+        Array uint8 empaquetado de forma (180/res, 360/res/8)
+    """
+    rows = int(round(180.0 / resolution))
+    if (2 * rows) % 8:
+        raise ValueError("360 / resolución debe ser múltiplo de 8")
+
+    with open(geojson_path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    land = np.zeros((rows, 2 * rows), dtype=bool)
+    water = np.zeros_like(land)
+    for feature in collection.get("features", []):
+        target = water if (feature.get("properties") or {}).get("water") else land
+        for rings in _polygon_rings(feature["geometry"]):
+            _fill_polygon(target, rings, resolution)
+
+    return np.packbits(land & ~water, axis=1)
+
+
+def save_mask(packed: np.ndarray, path: str):
+    """Guardar la máscara como .npy (escritura atómica)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, packed)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    # Uso (desde backend/): python -m services.land_mask --geojson ne_50m_land.geojson --resolution 0.05
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generar la máscara tierra/agua")
+    parser.add_argument("--geojson", default=DEFAULT_GEOJSON_PATH)
+    parser.add_argument("--resolution", type=float, default=DEFAULT_RESOLUTION_DEG)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    output = args.output or default_mask_path(args.resolution)
+    save_mask(rasterize_geojson(args.geojson, args.resolution), output)
+    print(f"Máscara guardada en {output}")
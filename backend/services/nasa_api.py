@@ -7,11 +7,16 @@ import os
 import requests
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
+from urllib.parse import urlparse
 import json
 import logging
 from dotenv import load_dotenv
 
+from services.cache import TTLCache
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from services.risk_scoring import risk_levels, risk_scores
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -19,15 +24,23 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Errores de red, HTTP o de decodificación JSON, y peticiones no realizadas por circuito abierto
+REQUEST_ERRORS = (requests.exceptions.RequestException, ValueError, CircuitOpenError)
+
 class NASAApiService:
     """Servicio para interactuar con las APIs de la NASA"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache_ttl: Optional[float] = None,
+                 cache_max_entries: int = 16, feed_store=None, request_timeout: Optional[float] = None):
         """
         Inicializar el servicio de NASA API
         
         Args:
             api_key: Clave API de NASA (opcional, carga desde .env)
+            cache_ttl: Segundos de validez del cache del feed (por defecto CACHE_TTL o 600)
+            cache_max_entries: Número máximo de ventanas de fechas cacheadas
+            feed_store: NeoFeedStore opcional para persistir el feed por fecha en disco
+            request_timeout: Timeout por petición en segundos (por defecto NASA_API_TIMEOUT o 10)
         """
         self.api_key = api_key or os.getenv('NASA_API_KEY', 'DEMO_KEY')
         self.base_urls = {
@@ -39,6 +52,114 @@ class NASAApiService:
         # Configurar sesión HTTP
         self.session = requests.Session()
         self.session.params = {"api_key": self.api_key}
+        if request_timeout is None:
+            request_timeout = float(os.getenv('NASA_API_TIMEOUT', 10))
+        self.request_timeout = request_timeout
+        
+        # Un circuito por servidor (api.nasa.gov y ssd-api.jpl.nasa.gov)
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        for url in self.base_urls.values():
+            host = urlparse(url).netloc
+            if host not in self.circuit_breakers:
+                self.circuit_breakers[host] = CircuitBreaker(
+                    host,
+                    failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+                    recovery_timeout=float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', 30)),
+                    rate_limit_reserve=int(os.getenv('NASA_RATE_LIMIT_RESERVE', 0))
+                )
+        
+        # Cache por ventana de fechas (start_date, end_date)
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv('CACHE_TTL', 600))
+        self.feed_cache = TTLCache(ttl_seconds=cache_ttl, max_entries=cache_max_entries)
+        self.processed_cache = TTLCache(ttl_seconds=cache_ttl, max_entries=cache_max_entries)
+        
+        # Almacén en disco opcional (solo se descargan los días que faltan)
+        self.feed_store = feed_store
+        
+        # Funciones a notificar cuando se procesa un feed nuevo
+        self._refresh_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        
+    def add_refresh_listener(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        """
+        Registrar una función que recibe la lista completa de asteroides
+        procesados cada vez que se descarga un feed nuevo
+        
+        Args:
+            listener: Función que recibe la lista de asteroides procesados
+        """
+        self._refresh_listeners.append(listener)
+    
+    def _notify_refresh(self, processed_asteroids: List[Dict[str, Any]]):
+        """Notificar a los listeners registrados sin propagar sus errores"""
+        for listener in self._refresh_listeners:
+            try:
+                listener(processed_asteroids)
+            except Exception as e:
+                logger.warning(f"Error notificando refresco del feed: {e}")
+    
+    def _default_feed_window(self, start_date: str = None, end_date: str = None):
+        """Completar la ventana de fechas por defecto (últimos 7 días)"""
+        if not start_date:
+            start_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+        if not end_date:
+            end_date = datetime.now().strftime("%Y-%m-%d")
+        return start_date, end_date
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        Obtener contadores de aciertos/fallos de los caches del servicio
+        
+        Returns:
+            Dict con estadísticas del cache del feed y de asteroides procesados
+        """
+        stats = {
+            "neo_feed": self.feed_cache.get_stats(),
+            "processed_asteroids": self.processed_cache.get_stats()
+        }
+        if self.feed_store is not None:
+            stats["feed_store"] = self.feed_store.get_stats()
+        return stats
+    
+    def get_circuit_stats(self) -> Dict[str, Any]:
+        """Estado de los circuitos de cada servidor de NASA/JPL"""
+        return {host: breaker.get_stats() for host, breaker in self.circuit_breakers.items()}
+    
+    def _circuit_breaker(self, url: str) -> CircuitBreaker:
+        """Circuito del servidor de una URL"""
+        return self.circuit_breakers[urlparse(url).netloc]
+    
+    def _get_json(self, url: str, params: Dict[str, Any] = None, use_api_key: bool = True) -> Any:
+        """
+        Realizar un GET con timeout a través del circuito del servidor
+        
+        Args:
+            url: URL a consultar
+            params: Parámetros de la petición
+            use_api_key: Usar la sesión con la clave de NASA (solo para api.nasa.gov)
+            
+        Returns:
+            Respuesta JSON decodificada
+            
+        Raises:
+            CircuitOpenError: si el servidor está en pausa (no se hace la petición)
+        """
+        breaker = self._circuit_breaker(url)
+        breaker.check()
+        http = self.session if use_api_key else requests
+        try:
+            response = http.get(url, params=params, timeout=self.request_timeout)
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+        breaker.record_response(response.status_code, response.headers)
+        response.raise_for_status()
+        return response.json()
+    
+    def clear_cache(self):
+        """Vaciar los caches del feed para forzar una nueva descarga"""
+        self.feed_cache.invalidate()
+        self.processed_cache.invalidate()
         
     def get_neo_feed(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
         """
@@ -53,11 +174,61 @@ class NASAApiService:
         """
         
         # Si no se proporcionan fechas, usar los últimos 7 días
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-        if not end_date:
-            end_date = datetime.now().strftime("%Y-%m-%d")
+        start_date, end_date = self._default_feed_window(start_date, end_date)
+        
+        # Las respuestas vacías (errores) no se cachean
+        return self.feed_cache.get_or_load(
+            (start_date, end_date),
+            lambda: self._load_neo_feed(start_date, end_date)
+        )
+    
+    def _load_neo_feed(self, start_date: str, end_date: str, strict: bool = False) -> Dict[str, Any]:
+        """
+        Obtener el feed combinando el almacén en disco con la descarga de los
+        días que faltan o han caducado
+        
+        Args:
+            start_date: Fecha de inicio (YYYY-MM-DD)
+            end_date: Fecha final (YYYY-MM-DD)
+            strict: Devolver {} si alguna descarga falla en lugar de usar datos guardados
             
+        Returns:
+            Dict con el feed en formato NeoWs
+        """
+        if self.feed_store is None:
+            return self._fetch_neo_feed(start_date, end_date)
+        
+        for range_start, range_end in self.feed_store.plan_fetch(start_date, end_date):
+            raw_data = self._fetch_neo_feed(range_start, range_end)
+            if raw_data:
+                self.feed_store.save_feed(raw_data, range_start, range_end)
+            elif strict:
+                return {}
+            else:
+                logger.warning(f"No se pudo descargar {range_start}..{range_end}, usando datos guardados")
+        
+        return self.feed_store.load_feed(start_date, end_date)
+    
+    def load_stored_processed_asteroids(self):
+        """
+        Procesar el feed guardado en disco sin acceder a la red (arranque en caliente)
+        
+        Returns:
+            Tupla (lista de asteroides procesados, instante de la actualización más
+            antigua) o (None, None) si no hay datos guardados
+        """
+        if self.feed_store is None:
+            return None, None
+        
+        raw_data = self.feed_store.load_feed(*self._default_feed_window())
+        if not raw_data:
+            return None, None
+        
+        _, processed = self._process_feed(raw_data)
+        return processed, raw_data["stored_at"]
+    
+    def _fetch_neo_feed(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Descargar el feed NEO de NASA sin pasar por el cache"""
         url = f"{self.base_urls['neo']}/feed"
         params = {
             "start_date": start_date,
@@ -66,10 +237,8 @@ class NASAApiService:
         }
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self._get_json(url, params)
+        except REQUEST_ERRORS as e:
             logger.error(f"Error al obtener NEO feed: {e}")
             return {}
     
@@ -84,53 +253,82 @@ class NASAApiService:
             Lista de asteroides procesados y listos para usar
         """
         try:
-            # Obtener datos RAW de NASA (últimos 7 días)
-            raw_data = self.get_neo_feed()
+            start_date, end_date = self._default_feed_window()
             
-            # Procesar asteroides recientes
-            processed_asteroids = []
-            if raw_data and 'near_earth_objects' in raw_data:
-                neo_objects = raw_data['near_earth_objects']
-                
-                # Iterar por todas las fechas y asteroides
-                for date_key, asteroids_list in neo_objects.items():
-                    for asteroid in asteroids_list:
-                        try:
-                            processed_asteroid = self._process_asteroid_data(asteroid)
-                            if processed_asteroid:
-                                processed_asteroids.append(processed_asteroid)
-                        except Exception as e:
-                            logger.warning(f"Error procesando asteroide {asteroid.get('id', 'unknown')}: {e}")
-                            continue
-            
-            # Agregar algunos asteroides históricos peligrosos conocidos para demo
-            historical_dangerous = self._get_historical_dangerous_asteroids()
-            processed_asteroids.extend(historical_dangerous)
-            
-            # Remover duplicados por ID
-            seen_ids = set()
-            unique_asteroids = []
-            for asteroid in processed_asteroids:
-                if asteroid['id'] not in seen_ids:
-                    seen_ids.add(asteroid['id'])
-                    unique_asteroids.append(asteroid)
+            def load():
+                # Obtener datos RAW de NASA (últimos 7 días)
+                return self._process_feed(self.get_neo_feed(start_date, end_date))
             
-            # Ordenar: primero peligrosos, luego por tamaño
-            unique_asteroids.sort(key=lambda x: (
-                -int(x.get('is_potentially_hazardous_asteroid', False)),
-                -x.get('estimated_diameter_km_max', 0)
-            ))
-            
-            total_found = len(unique_asteroids)
-            result = unique_asteroids[:limit]
+            # Solo se cachea la lista si el feed se descargó correctamente
+            _, unique_asteroids = self.processed_cache.get_or_load(
+                (start_date, end_date), load, should_cache=lambda entry: bool(entry[0])
+            )
             
-            logger.info(f"Procesados {len(result)} asteroides de {total_found} únicos encontrados")
-            return result
+            return self._limit_processed(unique_asteroids, limit)
             
         except Exception as e:
             logger.error(f"Error procesando asteroides: {e}")
             return []
     
+    def _process_feed(self, raw_data: Dict[str, Any]):
+        """Procesar un feed y notificar a los listeners si la descarga fue correcta"""
+        processed = self._build_processed_asteroids(raw_data)
+        if raw_data:
+            self._notify_refresh(processed)
+        return raw_data, processed
+    
+    def _limit_processed(self, unique_asteroids: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Recortar la lista procesada al límite solicitado"""
+        result = unique_asteroids[:limit]
+        logger.info(f"Procesados {len(result)} asteroides de {len(unique_asteroids)} únicos encontrados")
+        return result
+    
+    def _build_processed_asteroids(self, raw_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Procesar el feed RAW en la lista completa de asteroides ordenada
+        
+        Args:
+            raw_data: Respuesta del feed NEO (puede estar vacía)
+            
+        Returns:
+            Lista sin duplicados, primero peligrosos y luego por tamaño
+        """
+        # Procesar asteroides recientes
+        processed_asteroids = []
+        if raw_data and 'near_earth_objects' in raw_data:
+            neo_objects = raw_data['near_earth_objects']
+            
+            # Iterar por todas las fechas y asteroides
+            for date_key, asteroids_list in neo_objects.items():
+                for asteroid in asteroids_list:
+                    try:
+                        processed_asteroid = self._process_asteroid_data(asteroid)
+                        if processed_asteroid:
+                            processed_asteroids.append(processed_asteroid)
+                    except Exception as e:
+                        logger.warning(f"Error procesando asteroide {asteroid.get('id', 'unknown')}: {e}")
+                        continue
+        
+        # Agregar algunos asteroides históricos peligrosos conocidos para demo
+        historical_dangerous = self._get_historical_dangerous_asteroids()
+        processed_asteroids.extend(historical_dangerous)
+        
+        # Remover duplicados por ID
+        seen_ids = set()
+        unique_asteroids = []
+        for asteroid in processed_asteroids:
+            if asteroid['id'] not in seen_ids:
+                seen_ids.add(asteroid['id'])
+                unique_asteroids.append(asteroid)
+        
+        # Ordenar: primero peligrosos, luego por tamaño
+        unique_asteroids.sort(key=lambda x: (
+            -int(x.get('is_potentially_hazardous_asteroid', False)),
+            -x.get('estimated_diameter_km_max', 0)
+        ))
+        
+        return unique_asteroids
+    
     def _get_historical_dangerous_asteroids(self) -> List[Dict[str, Any]]:
         """
         Obtener asteroides históricos peligrosos conocidos para la demostración
@@ -256,10 +454,8 @@ class NASAApiService:
         url = f"{self.base_urls['neo']}/neo/{asteroid_id}"
         
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self._get_json(url)
+        except REQUEST_ERRORS as e:
             logger.error(f"Error al obtener detalles del asteroide {asteroid_id}: {e}")
             return {}
     
@@ -286,25 +482,19 @@ class NASAApiService:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Convertir a formato más usable
-            if "data" in data and "fields" in data:
-                fields = data["fields"]
-                objects = []
-                for row in data["data"]:
-                    obj = dict(zip(fields, row))
-                    objects.append(obj)
-                return objects
+            return self._parse_cad_response(self._get_json(url, params, use_api_key=False))
             
-            return []
-            
-        except requests.exceptions.RequestException as e:
+        except REQUEST_ERRORS as e:
             logger.error(f"Error al obtener datos CAD: {e}")
             return []
     
+    def _parse_cad_response(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Convertir la respuesta tabular de CAD (fields + data) en lista de dicts"""
+        if "data" in data and "fields" in data:
+            fields = data["fields"]
+            return [dict(zip(fields, row)) for row in data["data"]]
+        return []
+    
     def get_small_body_data(self, designation: str) -> Dict[str, Any]:
         """
         Obtener datos detallados de un cuerpo pequeño usando JPL SBDB
@@ -323,10 +513,8 @@ class NASAApiService:
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self._get_json(url, params, use_api_key=False)
+        except REQUEST_ERRORS as e:
             logger.error(f"Error al obtener datos SBDB para {designation}: {e}")
             return {}
     
@@ -381,17 +569,37 @@ class NASAApiService:
                         asteroid["distance_au"] = float(closest["miss_distance"]["astronomical"])
                         asteroid["distance_km"] = float(closest["miss_distance"]["kilometers"])
                     
-                    # Calcular nivel de riesgo
-                    asteroid["risk_level"] = self._calculate_risk_level(asteroid)
-                    
                     asteroids.append(asteroid)
                     
                 except Exception as e:
                     logger.warning(f"Error al parsear objeto NEO: {e}")
                     continue
         
+        # Calcular nivel de riesgo de todos los objetos en una pasada
+        for asteroid, level in zip(asteroids, self._calculate_risk_levels(asteroids)):
+            asteroid["risk_level"] = level
+        
         return asteroids
     
+    def _calculate_risk_levels(self, asteroids: List[Dict[str, Any]]) -> List[str]:
+        """
+        Calcular el nivel de riesgo de una lista de asteroides (vectorizado)
+        
+        Args:
+            asteroids: Asteroides con diameter_km_avg, velocity_kms, distance_au
+                       e is_potentially_hazardous (los ausentes cuentan como 0 o lejanos)
+            
+        Returns:
+            Lista de "HIGH", "MEDIUM" o "LOW"
+        """
+        scores = risk_scores(
+            [asteroid.get("diameter_km_avg", 0) for asteroid in asteroids],
+            [asteroid.get("velocity_kms", 0) for asteroid in asteroids],
+            [asteroid.get("distance_au", float('inf')) for asteroid in asteroids],
+            [asteroid.get("is_potentially_hazardous", False) for asteroid in asteroids]
+        )
+        return risk_levels(scores).tolist()
+    
     def _calculate_risk_level(self, asteroid: Dict[str, Any]) -> str:
         """
         Calcular nivel de riesgo basado en características del asteroide
@@ -403,46 +611,7 @@ class NASAApiService:
             "HIGH", "MEDIUM", o "LOW"
         """
         
-        score = 0
-        
-        # Factor tamaño
-        diameter = asteroid.get("diameter_km_avg", 0)
-        if diameter > 1:
-            score += 3
-        elif diameter > 0.5:
-            score += 2
-        elif diameter > 0.1:
-            score += 1
-        
-        # Factor velocidad
-        velocity = asteroid.get("velocity_kms", 0)
-        if velocity > 20:
-            score += 3
-        elif velocity > 15:
-            score += 2
-        elif velocity > 10:
-            score += 1
-        
-        # Factor distancia
-        distance_au = asteroid.get("distance_au", float('inf'))
-        if distance_au < 0.05:  # < 0.05 AU
-            score += 3
-        elif distance_au < 0.1:   # < 0.1 AU
-            score += 2
-        elif distance_au < 0.2:   # < 0.2 AU
-            score += 1
-        
-        # Asteroide potencialmente peligroso
-        if asteroid.get("is_potentially_hazardous", False):
-            score += 2
-        
-        # Clasificar riesgo
-        if score >= 7:
-            return "HIGH"
-        elif score >= 4:
-            return "MEDIUM"
-        else:
-            return "LOW"
+        return self._calculate_risk_levels([asteroid])[0]
     
     def get_potentially_hazardous_asteroids(self, page: int = 0, size: int = 20) -> Dict[str, Any]:
         """
@@ -463,10 +632,8 @@ class NASAApiService:
         }
         
         try:
-            response = self.session.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self._get_json(url, params)
+        except REQUEST_ERRORS as e:
             logger.error(f"Error al obtener asteroides peligrosos: {e}")
             return {}
 
@@ -0,0 +1,288 @@
+"""
+Cliente asíncrono de las APIs de la NASA
+Variante no bloqueante de NASAApiService para el event loop de FastAPI
+"""
+
+import asyncio
+import os
+from typing import List, Dict, Any, Optional
+import logging
+
+import httpx
+
+from services.circuit_breaker import CircuitOpenError
+from services.nasa_api import NASAApiService
+
+logger = logging.getLogger(__name__)
+
+# Errores de red, HTTP o de decodificación JSON, y peticiones no realizadas por circuito abierto
+REQUEST_ERRORS = (httpx.HTTPError, ValueError, CircuitOpenError)
+
+
+class AsyncNASAApiService(NASAApiService):
+    """
+    Servicio asíncrono para las APIs de la NASA (NeoWs, CAD y SBDB).
+    Reutiliza el procesamiento y los caches de NASAApiService, pero las
+    descargas usan un cliente HTTP asíncrono con pool de conexiones,
+    timeouts por petición y concurrencia acotada.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, cache_ttl: Optional[float] = None,
+                 cache_max_entries: int = 16, feed_store=None, timeout: Optional[float] = None,
+                 max_concurrency: Optional[int] = None, max_connections: int = 20):
+        """
+        Inicializar el servicio asíncrono
+
+        Args:
+            api_key: Clave API de NASA (opcional, carga desde .env)
+            cache_ttl: Segundos de validez del cache del feed
+            cache_max_entries: Número máximo de ventanas de fechas cacheadas
+            feed_store: NeoFeedStore opcional para persistir el feed por fecha en disco
+            timeout: Timeout por petición en segundos (por defecto NASA_API_TIMEOUT o 10)
+            max_concurrency: Peticiones simultáneas máximas a NASA (por defecto NASA_API_MAX_CONCURRENCY o 4)
+            max_connections: Tamaño máximo del pool de conexiones HTTP
+        """
+        super().__init__(api_key=api_key, cache_ttl=cache_ttl, cache_max_entries=cache_max_entries,
+                         feed_store=feed_store, request_timeout=timeout)
+
+        timeout = self.request_timeout
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv('NASA_API_MAX_CONCURRENCY', 4))
+
+        self.timeout = httpx.Timeout(timeout, connect=min(timeout, 5.0))
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Crear el cliente HTTP de forma perezosa (dentro del event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        """Cerrar el pool de conexiones HTTP"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_json(self, url: str, params: Dict[str, Any] = None,
+                        use_api_key: bool = True) -> Any:
+        """
+        Realizar un GET respetando el límite de concurrencia y el circuito del servidor
+
+        Args:
+            url: URL a consultar
+            params: Parámetros de la petición
+            use_api_key: Añadir la clave de NASA (solo para api.nasa.gov)
+
+        Returns:
+            Respuesta JSON decodificada
+
+        Raises:
+            CircuitOpenError: si el servidor está en pausa (no se hace la petición)
+        """
+        params = dict(params or {})
+        if use_api_key:
+            params["api_key"] = self.api_key
+
+        breaker = self._circuit_breaker(url)
+        breaker.check()
+        try:
+            async with self._semaphore:
+                response = await self._get_client().get(url, params=params)
+        except httpx.HTTPError:
+            breaker.record_failure()
+            raise
+        breaker.record_response(response.status_code, response.headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_neo_feed(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
+        """
+        Obtener feed de objetos cercanos a la Tierra (NEO)
+
+        Args:
+            start_date: Fecha de inicio en formato YYYY-MM-DD
+            end_date: Fecha final en formato YYYY-MM-DD
+
+        Returns:
+            Dict con datos de asteroides cercanos
+        """
+        start_date, end_date = self._default_feed_window(start_date, end_date)
+
+        return await self.feed_cache.get_or_load_async(
+            (start_date, end_date),
+            lambda: self._load_neo_feed(start_date, end_date)
+        )
+
+    async def _load_neo_feed(self, start_date: str, end_date: str, strict: bool = False) -> Dict[str, Any]:
+        """
+        Combinar el almacén en disco con la descarga de los días que faltan
+
+        Las operaciones de SQLite se ejecutan en un hilo para no bloquear el event loop.
+        """
+        if self.feed_store is None:
+            return await self._fetch_neo_feed(start_date, end_date)
+
+        for range_start, range_end in await asyncio.to_thread(self.feed_store.plan_fetch, start_date, end_date):
+            raw_data = await self._fetch_neo_feed(range_start, range_end)
+            if raw_data:
+                await asyncio.to_thread(self.feed_store.save_feed, raw_data, range_start, range_end)
+            elif strict:
+                return {}
+            else:
+                logger.warning(f"No se pudo descargar {range_start}..{range_end}, usando datos guardados")
+
+        return await asyncio.to_thread(self.feed_store.load_feed, start_date, end_date)
+
+    async def _fetch_neo_feed(self, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Descargar el feed NEO de NASA sin pasar por el cache"""
+        url = f"{self.base_urls['neo']}/feed"
+        params = {
+            "start_date": start_date,
+            "end_date": end_date,
+            "detailed": "true"
+        }
+
+        try:
+            return await self._get_json(url, params)
+        except REQUEST_ERRORS as e:
+            logger.error(f"Error al obtener NEO feed: {e!r}")
+            return {}
+
+    async def get_processed_asteroids(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Obtener asteroides procesados y limitados para la aplicación
+
+        Args:
+            limit: Número máximo de asteroides a devolver
+
+        Returns:
+            Lista de asteroides procesados y listos para usar
+        """
+        try:
+            start_date, end_date = self._default_feed_window()
+
+            async def load():
+                # El procesado y los listeners (repuntuación del catálogo) van en un hilo
+                return await asyncio.to_thread(self._process_feed, await self.get_neo_feed(start_date, end_date))
+
+            _, unique_asteroids = await self.processed_cache.get_or_load_async(
+                (start_date, end_date), load, should_cache=lambda entry: bool(entry[0])
+            )
+
+            return self._limit_processed(unique_asteroids, limit)
+
+        except Exception as e:
+            logger.error(f"Error procesando asteroides: {e}")
+            return []
+
+    async def refresh_processed_asteroids(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Descargar de nuevo el feed de la ventana actual ignorando el cache
+        (solo los días caducados si hay almacén en disco) y actualizar los
+        caches con el resultado
+
+        Returns:
+            Lista completa de asteroides procesados o None si la descarga falló
+        """
+        start_date, end_date = self._default_feed_window()
+        raw_data = await self._load_neo_feed(start_date, end_date, strict=True)
+        if not raw_data:
+            return None
+
+        entry = await asyncio.to_thread(self._process_feed, raw_data)
+        self.feed_cache.set((start_date, end_date), raw_data)
+        self.processed_cache.set((start_date, end_date), entry)
+        return entry[1]
+
+    async def get_asteroid_details(self, asteroid_id: str) -> Dict[str, Any]:
+        """
+        Obtener detalles específicos de un asteroide
+
+        Args:
+            asteroid_id: ID del asteroide (ej: "3542519")
+
+        Returns:
+            Dict con detalles del asteroide
+        """
+        url = f"{self.base_urls['neo']}/neo/{asteroid_id}"
+
+        try:
+            return await self._get_json(url)
+        except REQUEST_ERRORS as e:
+            logger.error(f"Error al obtener detalles del asteroide {asteroid_id}: {e!r}")
+            return {}
+
+    async def get_close_approach_data(self, date_min: str = None, date_max: str = None,
+                                      dist_max: str = "0.2") -> List[Dict[str, Any]]:
+        """
+        Obtener datos de aproximaciones cercanas usando JPL CAD API
+
+        Args:
+            date_min: Fecha mínima (YYYY-MM-DD)
+            date_max: Fecha máxima (YYYY-MM-DD)
+            dist_max: Distancia máxima en AU (por defecto 0.2 AU)
+
+        Returns:
+            Lista de objetos con datos de aproximación
+        """
+        params = {
+            "dist-max": dist_max,
+            "date-min": date_min or "2024-01-01",
+            "date-max": date_max or "2026-01-01",
+            "sort": "date"
+        }
+
+        try:
+            data = await self._get_json(self.base_urls["cad"], params, use_api_key=False)
+            return self._parse_cad_response(data)
+        except REQUEST_ERRORS as e:
+            logger.error(f"Error al obtener datos CAD: {e!r}")
+            return []
+
+    async def get_small_body_data(self, designation: str) -> Dict[str, Any]:
+        """
+        Obtener datos detallados de un cuerpo pequeño usando JPL SBDB
+
+        Args:
+            designation: Designación del objeto (ej: "2025 RR")
+
+        Returns:
+            Dict con datos físicos y orbitales
+        """
+        params = {
+            "sstr": designation,
+            "full-prec": "true"
+        }
+
+        try:
+            return await self._get_json(self.base_urls["sbdb"], params, use_api_key=False)
+        except REQUEST_ERRORS as e:
+            logger.error(f"Error al obtener datos SBDB para {designation}: {e!r}")
+            return {}
+
+    async def get_potentially_hazardous_asteroids(self, page: int = 0, size: int = 20) -> Dict[str, Any]:
+        """
+        Obtener lista de asteroides potencialmente peligrosos
+
+        Args:
+            page: Página de resultados
+            size: Tamaño de página
+
+        Returns:
+            Dict con asteroides peligrosos
+        """
+        url = f"{self.base_urls['neo']}/neo/browse"
+        params = {
+            "page": page,
+            "size": size
+        }
+
+        try:
+            return await self._get_json(url, params)
+        except REQUEST_ERRORS as e:
+            logger.error(f"Error al obtener asteroides peligrosos: {e!r}")
+            return {}
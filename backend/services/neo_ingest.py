@@ -0,0 +1,303 @@
+"""
+Descarga completa del catálogo NeoWs (/neo/browse) a un almacén columnar
+Cada página se guarda como un .npz de arrays NumPy; el catálogo entero nunca
+se mantiene en memoria como diccionarios anidados
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date
+from typing import Any, Dict, List, Optional
+import logging
+
+import numpy as np
+
+from services.paths import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+# NeoWs no sirve páginas de más de 20 objetos
+BROWSE_PAGE_SIZE = 20
+
+# Columnas del almacén: campo de _process_asteroid_data -> tipo NumPy
+CATALOG_COLUMNS = {
+    "id": np.str_,
+    "name": np.str_,
+    "estimated_diameter_km_min": np.float64,
+    "estimated_diameter_km_max": np.float64,
+    "relative_velocity_km_s": np.float64,
+    "miss_distance_km": np.float64,
+    "is_potentially_hazardous_asteroid": np.bool_,
+    "close_approach_date": np.str_,
+    "absolute_magnitude_h": np.float64
+}
+
+
+def default_catalog_dir() -> str:
+    """Directorio del almacén (NEO_CATALOG_DIR o data/cache/neo_catalog)"""
+    return os.getenv('NEO_CATALOG_DIR', os.path.join(CACHE_DIR, 'neo_catalog'))
+
+
+def records_to_columns(records: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Convertir asteroides procesados en un array por columna"""
+    columns = {}
+    for name, dtype in CATALOG_COLUMNS.items():
+        values = [record.get(name) for record in records]
+        if dtype is np.str_:
+            columns[name] = np.array([value or "" for value in values], dtype=np.str_)
+        elif dtype is np.bool_:
+            columns[name] = np.array([bool(value) for value in values], dtype=np.bool_)
+        else:
+            columns[name] = np.array([np.nan if value is None else value for value in values], dtype=dtype)
+    return columns
+
+
+def select_close_approach(approaches: List[Dict[str, Any]], today: str) -> Optional[Dict[str, Any]]:
+    """
+    Elegir la aproximación que se guarda en el catálogo
+
+    /neo/browse devuelve todo el historial de aproximaciones (desde ~1900) en
+    orden cronológico y a todos los cuerpos (Mercurio, Venus, la Luna, Marte,
+    Júpiter...); solo cuentan las aproximaciones a la Tierra y la primera no
+    representa el estado actual del objeto.
+
+    Args:
+        approaches: Lista close_approach_data del objeto
+        today: Fecha de referencia YYYY-MM-DD
+
+    Returns:
+        La próxima aproximación a la Tierra, la más reciente si todas son pasadas
+        o None si no hay ninguna
+    """
+    dated = sorted((approach for approach in approaches
+                    if approach.get("orbiting_body") == "Earth" and approach.get("close_approach_date")),
+                   key=lambda approach: approach["close_approach_date"])
+    if not dated:
+        return None
+    upcoming = [approach for approach in dated if approach["close_approach_date"] >= today]
+    return upcoming[0] if upcoming else dated[-1]
+
+
+def load_catalog_columns(directory: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Unir las páginas guardadas en un único conjunto de columnas
+
+    Los objetos que aparecen en más de una página (el catálogo puede cambiar
+    durante la descarga) se conservan una sola vez, en su primera aparición.
+
+    Returns:
+        {columna: array} (arrays vacíos si no hay páginas)
+    """
+    directory = directory or default_catalog_dir()
+    pages = sorted(name for name in os.listdir(directory)
+                   if name.startswith("page_") and name.endswith(".npz")) if os.path.isdir(directory) else []
+
+    parts = {name: [] for name in CATALOG_COLUMNS}
+    for page in pages:
+        with np.load(os.path.join(directory, page)) as data:
+            for name in CATALOG_COLUMNS:
+                parts[name].append(data[name])
+
+    if not pages:
+        return records_to_columns([])
+    columns = {name: np.concatenate(arrays) for name, arrays in parts.items()}
+    _, first = np.unique(columns["id"], return_index=True)
+    keep = np.sort(first)
+    return {name: values[keep] for name, values in columns.items()}
+
+
+class NeoBrowseIngester:
+    """
+    Recorre todas las páginas de /neo/browse con paralelismo acotado.
+
+    Un fichero checkpoint.json registra las páginas completadas, de modo que
+    una descarga interrumpida continúa donde se quedó. Si el circuito de
+    api.nasa.gov se abre (cuota agotada, HTTP 429 o fallos seguidos), la
+    descarga se detiene sin marcar páginas y puede reanudarse más tarde.
+    """
+
+    def __init__(self, nasa_service, directory: Optional[str] = None, max_workers: Optional[int] = None,
+                 page_size: int = BROWSE_PAGE_SIZE):
+        """
+        Inicializar el ingestor
+
+        Args:
+            nasa_service: NASAApiService síncrono (usa get_potentially_hazardous_asteroids)
+            directory: Directorio del almacén (NEO_CATALOG_DIR o data/cache/neo_catalog)
+            max_workers: Páginas descargadas a la vez (NEO_INGEST_CONCURRENCY o 4)
+            page_size: Objetos por página (máximo 20 en NeoWs)
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv('NEO_INGEST_CONCURRENCY', 4))
+
+        self.nasa_service = nasa_service
+        self.directory = directory or default_catalog_dir()
+        self.max_workers = max(1, max_workers)
+        self.page_size = min(page_size, BROWSE_PAGE_SIZE)
+        self.checkpoint_path = os.path.join(self.directory, "checkpoint.json")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _page_path(self, page: int) -> str:
+        return os.path.join(self.directory, f"page_{page:05d}.npz")
+
+    def load_checkpoint(self) -> Dict[str, Any]:
+        """Estado guardado (páginas completadas y total) o uno vacío"""
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get("page_size") == self.page_size:
+                return checkpoint
+            logger.warning("Checkpoint con otro tamaño de página: se empieza de nuevo")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Checkpoint ilegible en {self.checkpoint_path}: {e}")
+        return {"page_size": self.page_size, "total_pages": None, "total_elements": None, "completed": []}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        """Escritura atómica del checkpoint (requiere el lock)"""
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _is_rate_limited(self) -> bool:
+        breaker = self.nasa_service._circuit_breaker(self.nasa_service.base_urls["neo"])
+        return breaker.state == "open"
+
+    def _ingest_page(self, page: int) -> Optional[Dict[str, Any]]:
+        """
+        Descargar una página, procesarla y guardarla en columnas
+
+        Returns:
+            Bloque `page` de la respuesta (totales del catálogo) o None si falló
+        """
+        data = self.nasa_service.get_potentially_hazardous_asteroids(page=page, size=self.page_size)
+        if not data or "near_earth_objects" not in data:
+            return None
+
+        today = date.today().isoformat()
+        records = []
+        for asteroid in data["near_earth_objects"]:
+            approach = select_close_approach(asteroid.get("close_approach_data") or [], today)
+            processed = self.nasa_service._process_asteroid_data(
+                dict(asteroid, close_approach_data=[approach or {}]))
+            if not processed:
+                continue
+            if approach is None:
+                # Sin aproximaciones: el objeto se guarda con velocidad y distancia ausentes
+                processed.update(relative_velocity_km_s=None, miss_distance_km=None, close_approach_date="")
+            records.append(processed)
+
+        tmp_path = f"{self._page_path(page)}.tmp.npz"
+        np.savez(tmp_path, **records_to_columns(records))
+        os.replace(tmp_path, self._page_path(page))
+        return data.get("page", {})
+
+    def stop(self):
+        """Pedir que no se lancen más páginas (las que están en curso terminan)"""
+        self._stop.set()
+
+    def run(self, max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Descargar las páginas que faltan
+
+        Args:
+            max_pages: Páginas nuevas como máximo en esta ejecución (None = todas)
+
+        Returns:
+            Dict con páginas completadas, pendientes, fallidas y si se interrumpió
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        checkpoint = self.load_checkpoint()
+        completed = {page for page in checkpoint["completed"] if os.path.exists(self._page_path(page))}
+        failed: List[int] = []
+        ingested = 0
+
+        def record(page: int, info: Optional[Dict[str, Any]]):
+            nonlocal ingested
+            with self._lock:
+                if info is None:
+                    failed.append(page)
+                    return
+                completed.add(page)
+                ingested += 1
+                if info.get("total_pages") is not None:
+                    checkpoint["total_pages"] = info["total_pages"]
+                    checkpoint["total_elements"] = info.get("total_elements")
+                checkpoint["completed"] = sorted(completed)
+                self._save_checkpoint(checkpoint)
+
+        # La primera página pendiente se descarga sola para conocer el total
+        if checkpoint["total_pages"] is None:
+            record(0, self._ingest_page(0))
+            if checkpoint["total_pages"] is None:
+                return self._summary(checkpoint, completed, failed, ingested, interrupted=True)
+
+        pending = (page for page in range(checkpoint["total_pages"]) if page not in completed)
+        budget = None if max_pages is None else max(0, max_pages - ingested)
+        interrupted = False
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="neo-ingest") as executor:
+            in_flight = {}
+            while True:
+                # Mantener como mucho max_workers páginas en curso
+                while len(in_flight) < self.max_workers and not self._stop.is_set() and budget != 0:
+                    page = next(pending, None)
+                    if page is None:
+                        break
+                    in_flight[executor.submit(self._ingest_page, page)] = page
+                    if budget is not None:
+                        budget -= 1
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = in_flight.pop(future)
+                    try:
+                        info = future.result()
+                    except Exception as e:
+                        logger.warning(f"Error guardando la página {page} del catálogo: {e}")
+                        info = None
+                    record(page, info)
+
+                if failed and self._is_rate_limited():
+                    logger.warning("Límite de peticiones de NASA alcanzado: la descarga se reanudará más tarde")
+                    interrupted = True
+                    self._stop.set()
+
+        interrupted = interrupted or self._stop.is_set()
+        return self._summary(checkpoint, completed, failed, ingested, interrupted)
+
+    def _summary(self, checkpoint, completed, failed, ingested, interrupted) -> Dict[str, Any]:
+        total_pages = checkpoint["total_pages"]
+        return {
+            "directory": self.directory,
+            "total_pages": total_pages,
+            "total_elements": checkpoint["total_elements"],
+            "completed_pages": len(completed),
+            "ingested_pages": ingested,
+            "failed_pages": sorted(failed),
+            "remaining_pages": None if total_pages is None else total_pages - len(completed),
+            "interrupted": interrupted
+        }
+
+
+if __name__ == "__main__":
+    # Uso (desde backend/): python -m services.neo_ingest --max-pages 100
+    import argparse
+    from services.nasa_api import NASAApiService
+
+    parser = argparse.ArgumentParser(description="Descargar el catálogo completo de NeoWs")
+    parser.add_argument("--directory", default=None)
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    ingester = NeoBrowseIngester(NASAApiService(), directory=args.directory, max_workers=args.workers)
+    print(json.dumps(ingester.run(max_pages=args.max_pages), indent=2))
@@ -0,0 +1,12 @@
+"""
+Rutas de datos compartidas por los servicios
+"""
+
+import os
+
+# Raíz del repositorio (backend/services/ -> raíz)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Directorio data/ descrito en data/README.md
+DATA_DIR = os.getenv('METEOR_DATA_DIR', os.path.join(PROJECT_ROOT, 'data'))
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
@@ -0,0 +1,269 @@
+"""
+Rejilla global de densidad de población en disco
+Sustituye las consultas por petición a Nominatim por búsquedas locales sobre
+un array NumPy mapeado en memoria
+"""
+
+import math
+import os
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+import numpy as np
+
+from services.paths import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Resolución por defecto de la rejilla sintética (grados por celda)
+DEFAULT_RESOLUTION_DEG = 0.25
+
+# Puntos por lado con que se muestrea cada celda al integrar por radios
+SUBSAMPLES = 4
+
+# Densidad de fondo de la rejilla sintética (personas/km²)
+BACKGROUND_DENSITY = {"land": 25.0, "polar": 0.1}
+
+
+def default_grid_path() -> str:
+    """Ruta del fichero de rejilla (POPULATION_GRID_PATH o data/cache/population_density.npy)"""
+    return os.getenv('POPULATION_GRID_PATH', os.path.join(CACHE_DIR, 'population_density.npy'))
+
+
+class PopulationGrid:
+    """
+    Densidad de población (personas/km²) en celdas regulares de latitud/longitud.
+    La fila 0 empieza en -90° de latitud y la columna 0 en -180° de longitud;
+    la resolución se deduce de la forma del array (filas = 180 / resolución).
+    """
+
+    def __init__(self, density: np.ndarray, path: Optional[str] = None):
+        """
+        Args:
+            density: Array 2D (filas de latitud × columnas de longitud)
+            path: Fichero de origen (solo informativo)
+        """
+        rows, cols = density.shape
+        if cols != 2 * rows:
+            raise ValueError(f"Forma de rejilla inválida {density.shape}: se esperaban columnas = 2 × filas")
+
+        self.density = density
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.resolution = 180.0 / rows
+
+        # Área de cada celda por fila de latitud (km²): R² · Δλ · (sin φ2 - sin φ1)
+        edges = np.radians(np.linspace(-90.0, 90.0, rows + 1))
+        self.cell_area_km2 = EARTH_RADIUS_KM ** 2 * math.radians(self.resolution) * np.diff(np.sin(edges))
+        self.row_lat = -90.0 + (np.arange(rows) + 0.5) * self.resolution
+        self.col_lon = -180.0 + (np.arange(cols) + 0.5) * self.resolution
+
+        # Núcleos de distancia cacheados por (fila, semialto, semiancho)
+        self._kernel = lru_cache(maxsize=512)(self._build_kernel)
+
+    @classmethod
+    def load(cls, path: str) -> "PopulationGrid":
+        """Abrir un fichero .npy mapeado en memoria (no se lee entero a RAM)"""
+        return cls(np.load(path, mmap_mode='r'), path=path)
+
+    @classmethod
+    def load_or_build(cls, path: Optional[str] = None, cities: Optional[Dict[str, Dict]] = None,
+                      is_land: Optional[Callable] = None) -> Optional["PopulationGrid"]:
+        """
+        Abrir la rejilla o, si no existe y se dan ciudades, generar la sintética
+
+        Returns:
+            PopulationGrid o None si no hay fichero ni datos para construirlo
+        """
+        path = path or default_grid_path()
+        try:
+            if not os.path.exists(path):
+                if cities is None:
+                    return None
+                logger.info(f"Generando rejilla de población sintética en {path}")
+                save_grid(build_synthetic_grid(cities, is_land=is_land), path)
+            return cls.load(path)
+        except Exception as e:
+            logger.warning(f"No se pudo cargar la rejilla de población {path}: {e}")
+            return None
+
+    def cell_index(self, lat, lon):
+        """Fila y columna de las celdas que contienen los puntos (acepta escalares o arrays)"""
+        row = np.clip(((np.asarray(lat) + 90.0) / self.resolution).astype(np.int64), 0, self.rows - 1)
+        col = (((np.asarray(lon) + 180.0) / self.resolution).astype(np.int64)) % self.cols
+        return row, col
+
+    def density_at(self, lat, lon):
+        """Densidad (personas/km²) en la celda de cada punto"""
+        row, col = self.cell_index(lat, lon)
+        values = np.asarray(self.density[row, col], dtype=np.float64)
+        return float(values) if values.ndim == 0 else values
+
+    def window(self, lat: float, lon: float, radius_km: float):
+        """
+        Celdas que rodean un punto dentro de un radio
+
+        Returns:
+            Tupla (filas, columnas, distancias_km) con las distancias de los
+            centros de celda al punto, forma (len(filas), len(columnas))
+        """
+        half_rows, half_cols = self._window_size(lat, radius_km)
+        row, col = self.cell_index(lat, lon)
+        rows = np.arange(max(0, int(row) - half_rows), min(self.rows, int(row) + half_rows + 1))
+        if 2 * half_cols + 1 >= self.cols:
+            cols = np.arange(self.cols)
+        else:
+            cols = np.arange(int(col) - half_cols, int(col) + half_cols + 1) % self.cols
+
+        lat1 = math.radians(lat)
+        lat2 = np.radians(self.row_lat[rows])[:, None]
+        dlon = np.radians(self.col_lon[cols] - lon)[None, :]
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        return rows, cols, distances
+
+    def _window_size(self, lat: float, radius_km: float) -> Tuple[int, int]:
+        """Semialto y semiancho (en celdas) de la ventana que cubre un radio"""
+        radius_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+        max_lat = min(89.9, abs(lat) + radius_deg)
+        lon_span = radius_deg / max(math.cos(math.radians(max_lat)), 1e-6)
+        half_rows = int(math.ceil(radius_deg / self.resolution)) + 1
+        half_cols = min(int(math.ceil(lon_span / self.resolution)) + 1, self.cols)
+        return half_rows, half_cols
+
+    def _build_kernel(self, row: int, half_rows: int, half_cols: int):
+        """
+        Distancias desde el centro de una celda de la fila `row` a sus vecinas
+
+        Cada celda vecina se representa con SUBSAMPLES × SUBSAMPLES puntos para
+        que los bordes de las zonas no dependan de si cae el centro de la celda.
+        Las distancias solo dependen de la fila (no de la columna), así que el
+        núcleo se reutiliza para cualquier punto de la misma latitud.
+
+        Returns:
+            Tupla (filas, desplazamientos_de_columna, distancias_km) con
+            distancias de forma (filas, columnas, SUBSAMPLES²)
+        """
+        rows = np.arange(max(0, row - half_rows), min(self.rows, row + half_rows + 1))
+        if 2 * half_cols + 1 >= self.cols:
+            offsets = np.arange(-(self.cols // 2), self.cols - self.cols // 2)
+        else:
+            offsets = np.arange(-half_cols, half_cols + 1)
+
+        sub = ((np.arange(SUBSAMPLES) + 0.5) / SUBSAMPLES - 0.5) * self.resolution
+        sub_lat, sub_lon = (grid.ravel() for grid in np.meshgrid(sub, sub, indexing='ij'))
+
+        lat1 = math.radians(self.row_lat[row])
+        lat2 = np.radians(self.row_lat[rows][:, None, None] + sub_lat[None, None, :])
+        dlon = np.radians(offsets[None, :, None] * self.resolution + sub_lon[None, None, :])
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        distances.setflags(write=False)
+        return rows, offsets, distances
+
+    def radial_profile(self, lat: float, lon: float, radius_km: float,
+                       center_rings: int = 64) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Población por distancia al punto dentro de un radio
+
+        Las celdas vecinas se toman con su distancia desde el centro de la
+        celda del punto (núcleo cacheado por fila). La celda central se trata
+        como un disco uniforme de igual área dividido en anillos, de modo que
+        los radios menores que una celda también se integran correctamente.
+
+        Returns:
+            Tupla (distancias_km, poblaciones) con un elemento por subcelda o anillo
+        """
+        row, col = self.cell_index(lat, lon)
+        row, col = int(row), int(col)
+        rows, offsets, distances = self._kernel(row, *self._window_size(lat, radius_km))
+
+        inside = distances <= radius_km
+        inside[row - rows[0], offsets == 0] = False
+        row_idx, col_idx, _ = np.nonzero(inside)
+        cell_rows = rows[row_idx]
+        cells = np.asarray(self.density[cell_rows, (col + offsets[col_idx]) % self.cols], dtype=np.float64)
+        cell_populations = cells * (self.cell_area_km2[cell_rows] / SUBSAMPLES ** 2)
+
+        center_radius = math.sqrt(self.cell_area_km2[row] / math.pi)
+        edges = np.linspace(0.0, min(center_radius, radius_km), center_rings + 1)
+        ring_populations = float(self.density[row, col]) * math.pi * np.diff(edges ** 2)
+        ring_distances = (edges[:-1] + edges[1:]) / 2
+
+        return (np.concatenate([ring_distances, distances[inside]]),
+                np.concatenate([ring_populations, cell_populations]))
+
+    def population_within(self, lat: float, lon: float, radius_km: float) -> float:
+        """Población total dentro de un radio"""
+        if radius_km <= 0:
+            return 0.0
+        return float(self.radial_profile(lat, lon, radius_km)[1].sum())
+
+    def get_stats(self) -> Dict[str, object]:
+        return {"path": self.path, "shape": list(self.density.shape), "resolution_deg": self.resolution}
+
+
+def build_synthetic_grid(cities: Dict[str, Dict], resolution: float = DEFAULT_RESOLUTION_DEG,
+                         is_land: Optional[Callable] = None) -> np.ndarray:
+    """
+    Construir una rejilla aproximada a partir de un diccionario de ciudades
+
+    Cada ciudad aporta un perfil exponencial d(r) = d0 · e^(-r/s) con
+    s = √(población / 2π·d0), de modo que su integral coincide con la
+    población de la ciudad. Sobre tierra se añade una densidad rural de fondo.
+
+    Args:
+        cities: {nombre: {"lat", "lon", "population", "density"}}
+        resolution: Grados por celda (180 debe ser múltiplo)
+        is_land: Función vectorizada (lats, lons) -> array bool; sin ella todo es tierra
+
+    Returns:
+        Array float32 de forma (180/res, 360/res)
+    """
+    rows = int(round(180.0 / resolution))
+    grid = PopulationGrid(np.zeros((rows, 2 * rows), dtype=np.float32))
+
+    lats, lons = np.meshgrid(grid.row_lat, grid.col_lon, indexing='ij')
+    land = np.ones(lats.shape, dtype=bool) if is_land is None else np.asarray(is_land(lats, lons), dtype=bool)
+    background = np.where(np.abs(lats) > 66.5, BACKGROUND_DENSITY["polar"], BACKGROUND_DENSITY["land"])
+    density = np.where(land, background, 0.0)
+
+    for city in cities.values():
+        peak = float(city["density"])
+        scale_km = math.sqrt(city["population"] / (2 * math.pi * peak))
+        city_rows, city_cols, distances = grid.window(city["lat"], city["lon"], 8 * scale_km)
+        profile = peak * np.exp(-distances / scale_km)
+        density[city_rows[:, None], city_cols[None, :]] += profile
+
+    return density.astype(np.float32)
+
+
+def save_grid(density: np.ndarray, path: str):
+    """Guardar la rejilla como .npy (escritura atómica)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, density)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    # Uso (desde backend/): python -m services.population_grid --resolution 0.1
+    import argparse
+    from services.demographic_service import DemographicService
+
+    parser = argparse.ArgumentParser(description="Generar la rejilla sintética de población")
+    parser.add_argument("--output", default=default_grid_path())
+    parser.add_argument("--resolution", type=float, default=DEFAULT_RESOLUTION_DEG)
+    args = parser.parse_args()
+
+    service = DemographicService(use_population_grid=False)
+    save_grid(build_synthetic_grid(service.major_cities, args.resolution, is_land=service.is_land), args.output)
+    print(f"Rejilla guardada en {args.output}")
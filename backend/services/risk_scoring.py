@@ -0,0 +1,84 @@
+"""
+Puntuación de riesgo vectorizada
+Las mismas reglas que NASAApiService._calculate_risk_level y /api/risk-analysis,
+aplicadas a arrays NumPy en una sola pasada
+"""
+
+from typing import Dict
+
+import numpy as np
+
+# Kilómetros por unidad astronómica
+AU_KM = 149597870.7
+
+# Umbrales de _calculate_risk_level: cada umbral superado suma un punto
+DIAMETER_THRESHOLDS_KM = np.array([0.1, 0.5, 1.0])   # diámetro medio > umbral
+VELOCITY_THRESHOLDS_KMS = np.array([10.0, 15.0, 20.0])  # velocidad > umbral
+DISTANCE_THRESHOLDS_AU = np.array([0.05, 0.1, 0.2])  # distancia < umbral
+HAZARDOUS_POINTS = 2
+
+# Puntuación mínima de cada nivel
+HIGH_SCORE = 7
+MEDIUM_SCORE = 4
+
+# Normalización de los factores de /api/risk-analysis
+SIZE_NORMALIZATION_KM = 10.0
+VELOCITY_NORMALIZATION_KMS = 30.0
+PROXIMITY_THRESHOLD_KM = 50000000.0
+
+
+def risk_scores(diameter_km_avg, velocity_kms, distance_au, hazardous) -> np.ndarray:
+    """
+    Puntuación de riesgo (0-11) de cada asteroide
+
+    Args:
+        diameter_km_avg: Diámetro medio (km); NaN cuenta como 0
+        velocity_kms: Velocidad relativa (km/s); NaN cuenta como 0
+        distance_au: Distancia de aproximación (AU); NaN cuenta como infinita
+        hazardous: Marca de asteroide potencialmente peligroso
+
+    Returns:
+        Array int con la puntuación
+    """
+    diameter = np.nan_to_num(np.asarray(diameter_km_avg, dtype=np.float64), nan=0.0)
+    velocity = np.nan_to_num(np.asarray(velocity_kms, dtype=np.float64), nan=0.0)
+    distance = np.nan_to_num(np.asarray(distance_au, dtype=np.float64), nan=np.inf)
+
+    # searchsorted(side='left') cuenta los umbrales estrictamente menores que el valor
+    score = np.searchsorted(DIAMETER_THRESHOLDS_KM, diameter, side='left')
+    score = score + np.searchsorted(VELOCITY_THRESHOLDS_KMS, velocity, side='left')
+    # ... y side='right' los menores o iguales: el resto son mayores que la distancia
+    score = score + len(DISTANCE_THRESHOLDS_AU) - np.searchsorted(DISTANCE_THRESHOLDS_AU, distance, side='right')
+    return score + HAZARDOUS_POINTS * np.asarray(hazardous, dtype=bool)
+
+
+def risk_levels(scores) -> np.ndarray:
+    """Nivel "HIGH", "MEDIUM" o "LOW" de cada puntuación"""
+    scores = np.asarray(scores)
+    return np.where(scores >= HIGH_SCORE, "HIGH", np.where(scores >= MEDIUM_SCORE, "MEDIUM", "LOW"))
+
+
+def risk_factors(diameter_km, velocity_kms, distance_km) -> Dict[str, np.ndarray]:
+    """
+    Factores de tamaño, velocidad y proximidad de /api/risk-analysis
+
+    Los valores ausentes (NaN) se tratan como en risk_scores: diámetro y
+    velocidad 0 y distancia infinita, así que su factor es 0.
+
+    Returns:
+        Dict con arrays size, velocity, proximity, overall y mitigation_urgency
+    """
+    diameter = np.nan_to_num(np.asarray(diameter_km, dtype=np.float64), nan=0.0)
+    velocity = np.nan_to_num(np.asarray(velocity_kms, dtype=np.float64), nan=0.0)
+    distance = np.nan_to_num(np.asarray(distance_km, dtype=np.float64), nan=np.inf)
+    size = np.minimum(diameter / SIZE_NORMALIZATION_KM, 1.0)
+    velocity = np.minimum(velocity / VELOCITY_NORMALIZATION_KMS, 1.0)
+    proximity = np.maximum(0, 1 - (distance / PROXIMITY_THRESHOLD_KM))
+    overall = (size + velocity + proximity) / 3
+    return {
+        "size": size,
+        "velocity": velocity,
+        "proximity": proximity,
+        "overall": overall,
+        "mitigation_urgency": np.where(overall > 0.7, "HIGH", np.where(overall > 0.4, "MEDIUM", "LOW"))
+    }
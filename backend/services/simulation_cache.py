@@ -0,0 +1,239 @@
+"""
+Cache de resultados de simulación direccionado por contenido
+La clave es el hash de los parámetros del escenario (normalizados y
+cuantizados) junto con una versión del modelo, así que cualquier cambio en la
+física, en el código de víctimas o en los datos de población invalida las
+entradas antiguas sin tener que borrarlas
+"""
+
+import hashlib
+import inspect
+import json
+import os
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import logging
+
+from services.cache import TTLCache
+from services.paths import CACHE_DIR
+from services.sqlite_store import SQLiteKeyValueStore
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato de las entradas (subirla si cambia lo que se guarda)
+CACHE_SCHEMA = 1
+
+# Cuantización de los parámetros, muy por debajo de lo que cambia un resultado
+LOCATION_DECIMALS = 4      # ~11 m
+ANGLE_DECIMALS = 2         # grados
+VELOCITY_DECIMALS = 4      # 0.1 m/s
+DENSITY_DECIMALS = 1       # kg/m³
+DIAMETER_DIGITS = 6        # cifras significativas
+
+
+def _source_fingerprint(component: Any) -> str:
+    """Código fuente de un módulo, clase o función (repr si no está disponible)"""
+    try:
+        return inspect.getsource(component)
+    except (OSError, TypeError):
+        return repr(component)
+
+
+def _file_fingerprint(path: Optional[str]) -> str:
+    """Identidad de un fichero de datos: ruta, tamaño y fecha de modificación"""
+    if not path:
+        return "none"
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return f"{path}:missing"
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def model_version(code: Iterable[Any] = (), data_paths: Iterable[Optional[str]] = (),
+                  settings: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Hash corto del modelo que produce los resultados
+
+    Args:
+        code: Módulos, clases o funciones cuyo código interviene en el cálculo
+        data_paths: Ficheros de datos (rejilla de población, máscara, ciudades...)
+        settings: Opciones de configuración que alteran el resultado
+
+    Returns:
+        16 caracteres hexadecimales
+    """
+    digest = hashlib.sha256(f"schema:{CACHE_SCHEMA}".encode())
+    for component in code:
+        digest.update(_source_fingerprint(component).encode())
+    for path in data_paths:
+        digest.update(_file_fingerprint(path).encode())
+    digest.update(json.dumps(settings or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:16]
+
+
+def normalize_scenario(lat: float, lon: float, angle: float, velocity: float, diameter: float,
+                       composition: Optional[str] = "rocky", density: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Parámetros canónicos de un escenario
+
+    Las coordenadas se redondean (y la longitud se lleva a -180..180), el
+    diámetro se limita a DIAMETER_DIGITS cifras significativas y las densidades
+    no positivas se tratan como ausentes. Dos peticiones con los mismos
+    parámetros canónicos comparten resultado.
+    """
+    lon = (float(lon) + 180.0) % 360.0 - 180.0
+    return {
+        "lat": round(float(lat), LOCATION_DECIMALS),
+        "lon": round(lon, LOCATION_DECIMALS) + 0.0,  # sin -0.0
+        "angle": round(float(angle), ANGLE_DECIMALS),
+        "velocity": round(float(velocity), VELOCITY_DECIMALS),
+        "diameter": float(f"{float(diameter):.{DIAMETER_DIGITS}g}"),
+        "composition": (composition or "rocky").strip().lower(),
+        "density": round(float(density), DENSITY_DECIMALS) if density is not None and density > 0 else None
+    }
+
+
+class SimulationResultCache:
+    """
+    Cache en dos niveles (LRU en memoria + SQLite opcional en disco) de
+    resultados de simulación. Las claves tienen la forma
+    "<versión del modelo>-<hash de parámetros>" y sirven también como ETag.
+    """
+
+    def __init__(self, model_version: str, path: Optional[str] = None,
+                 memory_entries: Optional[int] = None, persist: Optional[bool] = None):
+        """
+        Inicializar el cache
+
+        Args:
+            model_version: Hash del modelo (ver model_version())
+            path: Fichero SQLite (SIMULATION_CACHE_PATH o data/cache/simulation_results.sqlite3)
+            memory_entries: Entradas máximas en memoria (SIMULATION_CACHE_ENTRIES o 4096)
+            persist: Usar el nivel en disco (SIMULATION_CACHE_PERSIST, activado por defecto)
+        """
+        if memory_entries is None:
+            memory_entries = int(os.getenv('SIMULATION_CACHE_ENTRIES', 4096))
+        if persist is None:
+            persist = os.getenv('SIMULATION_CACHE_PERSIST', 'true').lower() in ('1', 'true', 'yes')
+
+        self.model_version = model_version
+        self.memory = TTLCache(ttl_seconds=None, max_entries=memory_entries)
+
+        self.path = None
+        self._store = None
+        if persist:
+            self.path = path or os.getenv('SIMULATION_CACHE_PATH',
+                                          os.path.join(CACHE_DIR, 'simulation_results.sqlite3'))
+            try:
+                self._store = SQLiteKeyValueStore(self.path, table="simulation_results")
+            except Exception as e:
+                logger.warning(f"Cache de simulaciones solo en memoria ({self.path}): {e}")
+
+        # Contadores de uso
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.computations = 0
+        self.not_modified = 0
+
+    def key(self, params: Dict[str, Any]) -> str:
+        """Clave de unos parámetros ya normalizados"""
+        encoded = json.dumps(params, sort_keys=True, separators=(",", ":")).encode()
+        return f"{self.model_version}-{hashlib.sha256(encoded).hexdigest()[:32]}"
+
+    @staticmethod
+    def etag(key: str) -> str:
+        """ETag fuerte de una clave"""
+        return f'"{key}"'
+
+    def matches(self, if_none_match: Optional[str], key: str) -> bool:
+        """
+        Comprobar la cabecera If-None-Match contra la clave
+
+        El ETag depende solo de los parámetros y del modelo, así que si el
+        cliente lo tiene ya dispone del resultado y basta con un 304.
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if "*" in tags or self.etag(key) in tags:
+            self.not_modified += 1
+            return True
+        return False
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[Any, bool]]) -> Tuple[Any, bool]:
+        """
+        Obtener un resultado del cache o calcularlo
+
+        Las peticiones simultáneas de la misma clave comparten un único cálculo.
+
+        Args:
+            key: Clave de SimulationResultCache.key
+            compute: Función sin argumentos que devuelve (resultado, cacheable);
+                     los resultados no cacheables (p. ej. con datos degradados)
+                     se devuelven sin guardarse
+
+        Returns:
+            Tupla (resultado JSON-serializable, cacheable); solo los resultados
+            cacheables pueden llevar ETag
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory_hits += 1
+            return entry["value"], True
+        entry = self.memory.get_or_load(key, lambda: self._load(key, compute),
+                                        should_cache=lambda loaded: loaded["cacheable"])
+        return entry["value"], entry["cacheable"]
+
+    def _load(self, key: str, compute) -> Dict[str, Any]:
+        """Buscar en disco y, si no está, calcular y guardar"""
+        if self._store is not None:
+            try:
+                stored = self._store.get(key)
+            except Exception as e:
+                logger.warning(f"No se pudo leer la simulación {key} del disco: {e}")
+                stored = None
+            if stored is not None:
+                self.disk_hits += 1
+                return {"value": stored[0], "cacheable": True}
+
+        self.computations += 1
+        value, cacheable = compute()
+        if cacheable and self._store is not None:
+            try:
+                self._store.put(key, value)
+            except Exception as e:
+                logger.warning(f"No se pudo guardar la simulación {key}: {e}")
+        return {"value": value, "cacheable": cacheable}
+
+    def prune(self) -> int:
+        """Eliminar del disco las entradas de otras versiones del modelo"""
+        if self._store is None:
+            return 0
+        removed = 0
+        try:
+            for key in self._store.keys():
+                if not key.startswith(f"{self.model_version}-"):
+                    self._store.delete(key)
+                    removed += 1
+        except Exception as e:
+            logger.warning(f"No se pudo depurar el cache de simulaciones: {e}")
+        return removed
+
+    def clear(self):
+        """Vaciar el nivel en memoria (el disco se conserva)"""
+        self.memory.invalidate()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso, incluida la tasa de aciertos"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.computations
+        return {
+            "model_version": self.model_version,
+            "memory_entries": self.memory.get_stats()["entries"],
+            "stored_entries": len(self._store) if self._store is not None else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "computations": self.computations,
+            "not_modified": self.not_modified,
+            "hit_rate": round(hits / total, 3) if total else 0.0
+        }
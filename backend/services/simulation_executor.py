@@ -0,0 +1,549 @@
+"""
+Ejecutor de simulaciones en procesos
+Mantiene procesos de trabajo calientes con la rejilla de población y la
+máscara tierra/agua en memoria compartida, y reparte los trabajos desde una
+cola con prioridades. Cada trabajo tiene plazo y se puede cancelar; como cada
+proceso ejecuta un solo trabajo a la vez, cancelar o agotar el plazo de uno en
+curso termina su proceso y lo sustituye sin afectar a los demás.
+"""
+
+import asyncio
+import atexit
+import heapq
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+from multiprocessing import connection as mp_connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from services.demographic_service import DemographicService
+from services.land_mask import LandMask
+from services.population_grid import PopulationGrid
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = antes): peticiones interactivas por delante de los lotes
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class SimulationTimeout(TimeoutError):
+    """El trabajo superó su plazo (en cola o en ejecución)"""
+
+
+def without_service(service, fn: Callable, *args, **kwargs) -> Any:
+    """Trabajo que no usa el DemographicService del proceso (p. ej. bloques Monte Carlo)"""
+    return fn(*args, **kwargs)
+
+
+def _attach(spec: Tuple[str, Tuple[int, ...], str]) -> Tuple[SharedMemory, np.ndarray]:
+    """Abrir un bloque de memoria compartida como array de solo lectura"""
+    name, shape, dtype = spec
+    # El hijo usa el resource_tracker del proceso principal, que es quien libera el bloque
+    block = SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+    array.flags.writeable = False
+    return block, array
+
+
+def _worker_main(conn, shared: Dict[str, Any], city_index):
+    """
+    Bucle de un proceso de trabajo (función de módulo para poder lanzarla con spawn)
+
+    Reconstruye un DemographicService sobre la memoria compartida y ejecuta
+    fn(servicio, *args, **kwargs) para cada mensaje hasta recibir None.
+    """
+    # Ctrl+C llega a todo el grupo de procesos: el cierre lo ordena el proceso principal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    blocks = []
+    population_grid = land_mask = None
+    if "population" in shared:
+        block, density = _attach(shared["population"]["spec"])
+        blocks.append(block)
+        population_grid = PopulationGrid(density, path=shared["population"]["path"])
+    if "land" in shared:
+        block, packed = _attach(shared["land"]["spec"])
+        blocks.append(block)
+        land_mask = LandMask(packed, path=shared["land"]["path"])
+    # Los datos demográficos remotos los resuelve el proceso principal
+    service = DemographicService(population_grid=population_grid, use_population_grid=population_grid is not None,
+                                 land_mask=land_mask, use_land_mask=land_mask is not None,
+                                 city_index=city_index, enable_nominatim=False)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        job_id, fn, args, kwargs = message
+        try:
+            outcome = (job_id, True, fn(service, *args, **kwargs))
+        except Exception as e:
+            outcome = (job_id, False, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            conn.send((job_id, False, RuntimeError(f"Resultado no serializable: {e}")))
+
+    service.resolver.shutdown()
+    for block in blocks:
+        block.close()
+
+
+class SimulationJob:
+    """Trabajo enviado al ejecutor; se puede esperar con `await` o con result()"""
+
+    def __init__(self, executor: "SimulationExecutor", job_id: int, fn: Callable, args: tuple,
+                 kwargs: Dict[str, Any], priority: int, timeout: Optional[float]):
+        self.id = job_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.submitted = time.monotonic()
+        self.deadline = self.submitted + timeout if timeout else None
+        self.future: Future = Future()
+        self._executor = executor
+
+    def cancel(self) -> bool:
+        """Cancelar el trabajo (si está en curso se termina su proceso)"""
+        return self._executor.cancel(self)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        return self.future.result(timeout)
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+
+class _Worker:
+    """Proceso de trabajo y el trabajo que está ejecutando"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.job: Optional[SimulationJob] = None
+
+
+class SimulationExecutor:
+    """
+    Grupo de procesos calientes para simulaciones CPU-intensivas
+
+    Los trabajos son funciones de módulo (o métodos de DemographicService) que
+    reciben como primer argumento el DemographicService del proceso. Con
+    workers=0 se ejecutan en el hilo que los envía (sin prioridades ni plazos).
+    """
+
+    def __init__(self, service: DemographicService, workers: Optional[int] = None,
+                 timeout: Optional[float] = None, start_method: Optional[str] = None):
+        """
+        Inicializar el ejecutor (los procesos se lanzan con start() o con el primer trabajo)
+
+        Args:
+            service: DemographicService cuyos datos se comparten con los procesos
+            workers: Procesos (SIMULATION_WORKERS o número de núcleos; 0 = en el propio proceso)
+            timeout: Plazo por defecto en segundos (SIMULATION_TIMEOUT_S o 60; 0 = sin plazo)
+            start_method: Método de multiprocessing (SIMULATION_START_METHOD o spawn:
+                          el servidor tiene hilos y no conviene hacer fork)
+        """
+        if workers is None:
+            workers = int(os.getenv('SIMULATION_WORKERS', os.cpu_count() or 1))
+        if timeout is None:
+            timeout = float(os.getenv('SIMULATION_TIMEOUT_S', 60))
+        self.service = service
+        self.workers = max(0, workers)
+        self.timeout = timeout or None
+        self._context = multiprocessing.get_context(start_method or os.getenv('SIMULATION_START_METHOD', 'spawn'))
+
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int, SimulationJob]] = []
+        self._ids = itertools.count()
+        self._pool: List[_Worker] = []
+        self._retired = []
+        self._blocks: List[SharedMemory] = []
+        self._shared: Dict[str, Any] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup_reader = self._wakeup_writer = None
+        self._started = False
+        self._closed = False
+
+        # Contadores
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.cancelled = 0
+        self.restarts = 0
+
+    @property
+    def inline(self) -> bool:
+        """True si los trabajos se ejecutan en el propio proceso"""
+        return self.workers == 0
+
+    def start(self):
+        """Copiar los datos a memoria compartida y lanzar los procesos"""
+        with self._lock:
+            if self._started or self._closed or self.inline:
+                return
+            try:
+                self._share_data()
+                self._wakeup_reader, self._wakeup_writer = self._context.Pipe(duplex=False)
+                for _ in range(self.workers):
+                    self._pool.append(self._spawn())
+            except Exception as e:
+                logger.warning(f"Ejecutor de simulaciones en el propio proceso: {e}")
+                for worker in self._pool:
+                    worker.process.kill()
+                self._pool = []
+                self._release_data()
+                self.workers = 0
+                return
+            self._started = True
+            self._thread = threading.Thread(target=self._dispatch_loop, name="simulation-executor", daemon=True)
+            self._thread.start()
+        atexit.register(self.shutdown)
+        logger.info(f"Ejecutor de simulaciones: {self.workers} procesos")
+
+    def _share_data(self):
+        """Rejilla de población y máscara tierra/agua en bloques de memoria compartida"""
+        sources = {
+            "population": (self.service.population_grid, "density"),
+            "land": (self.service.land_mask, "packed")
+        }
+        for key, (holder, attribute) in sources.items():
+            if holder is None:
+                continue
+            array = np.ascontiguousarray(getattr(holder, attribute))
+            block = SharedMemory(create=True, size=max(1, array.nbytes))
+            self._blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self._shared[key] = {"spec": (block.name, array.shape, array.dtype.str), "path": holder.path}
+
+    def _release_data(self):
+        for block in self._blocks:
+            try:
+                block.close()
+                block.unlink()
+            except Exception as e:
+                logger.warning(f"No se pudo liberar la memoria compartida {block.name}: {e}")
+        self._blocks = []
+        self._shared = {}
+
+    def _spawn(self) -> _Worker:
+        parent, child = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child, self._shared, self.service.city_index),
+                                        name="simulation-worker", daemon=True)
+        process.start()
+        child.close()
+        return _Worker(process, parent)
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_INTERACTIVE,
+               timeout: Optional[float] = None, **kwargs) -> SimulationJob:
+        """
+        Encolar fn(servicio, *args, **kwargs)
+
+        Args:
+            fn: Función serializable por referencia (de módulo o método de clase)
+            priority: Menor valor = antes (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+            timeout: Plazo en segundos desde el envío (por defecto el del ejecutor)
+
+        Returns:
+            SimulationJob; su resultado lanza SimulationTimeout si vence el plazo
+            y CancelledError si se cancela
+        """
+        if not self._started:
+            self.start()
+        job = SimulationJob(self, next(self._ids), fn, args, kwargs, priority,
+                            timeout if timeout is not None else self.timeout)
+        if self.inline:
+            job.future.set_running_or_notify_cancel()
+            try:
+                job.future.set_result(fn(self.service, *args, **kwargs))
+                self.completed += 1
+            except Exception as e:
+                job.future.set_exception(e)
+                self.failed += 1
+            return job
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("El ejecutor de simulaciones está cerrado")
+            heapq.heappush(self._queue, (priority, job.id, job))
+        self._wake()
+        return job
+
+    async def run(self, fn: Callable, *args, priority: int = PRIORITY_INTERACTIVE,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Versión awaitable de submit: espera el resultado sin bloquear el event loop
+
+        Si la tarea que espera se cancela (p. ej. el cliente se desconecta),
+        el trabajo se cancela también.
+        """
+        if self.inline:
+            # Sin procesos el trabajo ocupa un hilo, no el event loop
+            job = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: self.submit(fn, *args, priority=priority, timeout=timeout, **kwargs)
+            )
+            return job.result()
+        job = self.submit(fn, *args, priority=priority, timeout=timeout, **kwargs)
+        try:
+            return await job
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    def map(self, fn: Callable, arguments: Iterable[tuple], priority: int = PRIORITY_INTERACTIVE,
+            timeout: Optional[float] = None) -> List[Any]:
+        """
+        Repartir fn(servicio, *args) para cada tupla de argumentos entre los procesos
+
+        Bloquea el hilo que llama hasta tener todos los resultados (en el orden
+        de `arguments`); si uno falla, los demás se cancelan.
+
+        Args:
+            fn: Función serializable por referencia
+            arguments: Tuplas de argumentos, una por trabajo
+            priority: Prioridad de todos los trabajos
+            timeout: Plazo de cada trabajo (por defecto el del ejecutor; 0 = sin plazo)
+
+        Returns:
+            Lista de resultados
+        """
+        jobs = [self.submit(fn, *args, priority=priority, timeout=timeout) for args in arguments]
+        try:
+            return [job.result() for job in jobs]
+        finally:
+            for job in jobs:
+                job.cancel()
+
+    def cancel(self, job: SimulationJob) -> bool:
+        """Cancelar un trabajo en cola o en curso; False si ya había terminado"""
+        with self._lock:
+            if job.future.done():
+                return False
+            if job.future.cancel():
+                # Seguía en la cola: se descarta al sacarlo
+                self.cancelled += 1
+                return True
+            worker = next((worker for worker in self._pool if worker.job is job), None)
+            if worker is None:
+                return False
+            self._retire(worker)
+            job.future.set_exception(CancelledError())
+            self.cancelled += 1
+        self._replace([worker])
+        return True
+
+    def _wake(self):
+        try:
+            if self._wakeup_writer is not None:
+                self._wakeup_writer.send_bytes(b"")
+        except OSError:
+            pass
+
+    def _retire(self, worker: _Worker):
+        """Sacar un proceso del grupo (con el lock tomado); _replace lo termina después"""
+        self._pool.remove(worker)
+        # El hilo repartidor puede estar esperando en esta conexión: se cierra en su siguiente vuelta
+        self._retired.append(worker.conn)
+        worker.job = None
+
+    def _replace(self, retired: List[_Worker]):
+        """Terminar procesos retirados y lanzar otros en su lugar (sin el lock)"""
+        for worker in retired:
+            worker.process.kill()
+            worker.process.join()
+        for _ in retired:
+            if self._closed:
+                return
+            try:
+                worker = self._spawn()
+            except Exception as e:
+                logger.error(f"No se pudo relanzar un proceso de simulación: {e}")
+                continue
+            with self._lock:
+                if not self._closed:
+                    self._pool.append(worker)
+                    self.restarts += 1
+                    worker = None
+            if worker is not None:
+                # El ejecutor se cerró mientras arrancaba
+                worker.process.kill()
+                worker.process.join()
+                worker.conn.close()
+        self._wake()
+
+    def _dispatch_loop(self):
+        """Hilo que reparte la cola, recoge resultados y aplica los plazos"""
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                for conn in self._retired:
+                    conn.close()
+                self._retired = []
+                now = time.monotonic()
+                retired = self._expire(now)
+                self._assign()
+                waiting = [self._wakeup_reader] + [worker.conn for worker in self._pool]
+                deadlines = [job.deadline for _, _, job in self._queue if job.deadline is not None]
+                deadlines += [worker.job.deadline for worker in self._pool
+                              if worker.job is not None and worker.job.deadline is not None]
+                wait = max(0.0, min(deadlines) - now) if deadlines else None
+            if retired:
+                # Los procesos sustituidos vuelven a la espera en la siguiente vuelta
+                self._replace(retired)
+                continue
+
+            for ready in mp_connection.wait(waiting, timeout=wait):
+                if ready is self._wakeup_reader:
+                    while self._wakeup_reader.poll():
+                        self._wakeup_reader.recv_bytes()
+                    continue
+                with self._lock:
+                    worker = next((worker for worker in self._pool if worker.conn is ready), None)
+                    if worker is None or not self._collect(worker):
+                        continue
+                self._replace([worker])
+
+    def _expire(self, now: float) -> List[_Worker]:
+        """
+        Fallar los trabajos con el plazo vencido (en cola o en curso)
+
+        Returns:
+            Procesos retirados por tener un trabajo vencido (para _replace)
+        """
+        expired = [entry for entry in self._queue if entry[2].deadline is not None and entry[2].deadline <= now]
+        if expired:
+            self._queue = [entry for entry in self._queue if entry not in expired]
+            heapq.heapify(self._queue)
+            for _, _, job in expired:
+                if job.future.set_running_or_notify_cancel():
+                    self._time_out(job)
+        retired = []
+        for worker in list(self._pool):
+            job = worker.job
+            if job is not None and job.deadline is not None and job.deadline <= now:
+                self._retire(worker)
+                self._time_out(job)
+                retired.append(worker)
+        return retired
+
+    def _time_out(self, job: SimulationJob):
+        elapsed = time.monotonic() - job.submitted
+        job.future.set_exception(SimulationTimeout(f"Trabajo {job.id} sin terminar tras {elapsed:.1f} s"))
+        self.timeouts += 1
+
+    def _assign(self):
+        """Enviar los trabajos más prioritarios a los procesos libres"""
+        for worker in self._pool:
+            if worker.job is not None:
+                continue
+            while self._queue:
+                _, _, job = heapq.heappop(self._queue)
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    worker.conn.send((job.id, job.fn, job.args, job.kwargs))
+                except Exception as e:
+                    job.future.set_exception(e)
+                    self.failed += 1
+                    continue
+                worker.job = job
+                break
+
+    def _collect(self, worker: _Worker) -> bool:
+        """
+        Leer el resultado de un proceso (o detectar que ha muerto)
+
+        Returns:
+            True si el proceso ha muerto y se ha retirado (hay que sustituirlo)
+        """
+        try:
+            job_id, ok, value = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            job = worker.job
+            if self._closed:
+                # Salida normal durante el cierre: no se sustituye
+                return False
+            logger.warning(f"Proceso de simulación terminado inesperadamente: {e!r}")
+            self._retire(worker)
+            if job is not None and not job.future.done():
+                job.future.set_exception(RuntimeError("El proceso de simulación terminó inesperadamente"))
+                self.failed += 1
+            return True
+        job, worker.job = worker.job, None
+        if job is None or job.id != job_id or job.future.done():
+            return False
+        if ok:
+            job.future.set_result(value)
+            self.completed += 1
+        else:
+            job.future.set_exception(value)
+            self.failed += 1
+        return False
+
+    def shutdown(self, wait: bool = True):
+        """Cancelar lo pendiente, parar los procesos y liberar la memoria compartida"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for _, _, job in self._queue:
+                job.future.cancel()
+            self._queue = []
+        self._wake()
+        if self._thread is not None:
+            self._thread.join()
+
+        for worker in self._pool:
+            if worker.job is not None and not worker.job.future.done():
+                worker.job.future.set_exception(CancelledError())
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self._pool:
+            worker.process.join(timeout=5 if wait else 0)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.conn.close()
+        for conn in self._retired:
+            conn.close()
+        self._pool = []
+        self._retired = []
+        for end in (self._wakeup_reader, self._wakeup_writer):
+            if end is not None:
+                end.close()
+        self._release_data()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado de la cola y de los procesos"""
+        with self._lock:
+            return {
+                "mode": "inline" if self.inline else "processes",
+                "workers": self.workers,
+                "alive": sum(worker.process.is_alive() for worker in self._pool),
+                "queued": sum(not job.future.done() for _, _, job in self._queue),
+                "running": sum(worker.job is not None for worker in self._pool),
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "cancelled": self.cancelled,
+                "restarts": self.restarts,
+                "shared_memory_mb": round(sum(block.size for block in self._blocks) / 1e6, 1)
+            }
@@ -0,0 +1,168 @@
+"""
+Índice espacial de ciudades por cubetas de latitud/longitud
+Permite búsquedas de k vecinos y por radio sin recorrer toda la tabla
+"""
+
+import csv
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Nombres de columna aceptados al cargar tablas de ciudades (p. ej. worldcities.csv)
+CSV_COLUMNS = {
+    "name": ("name", "city", "city_ascii", "asciiname"),
+    "lat": ("lat", "latitude"),
+    "lon": ("lon", "lng", "longitude"),
+    "population": ("population", "pop"),
+    "density": ("density",)
+}
+
+
+class CityIndex:
+    """
+    Ciudades agrupadas en cubetas de `bucket_deg` grados. Una consulta solo
+    calcula distancias haversine contra las ciudades de las cubetas que
+    cubren el radio buscado.
+    """
+
+    def __init__(self, cities: Dict[str, Dict[str, Any]], bucket_deg: float = 1.0):
+        """
+        Construir el índice
+
+        Args:
+            cities: {nombre: {"lat", "lon", "population", "density"(opcional)}}
+            bucket_deg: Tamaño de cubeta en grados
+        """
+        self.bucket_deg = bucket_deg
+        self.names = list(cities)
+        self.records = [cities[name] for name in self.names]
+        self.lats = np.array([record["lat"] for record in self.records], dtype=np.float64)
+        self.lons = np.array([record["lon"] for record in self.records], dtype=np.float64)
+
+        self.n_rows = int(math.ceil(180.0 / bucket_deg))
+        self.n_cols = int(math.ceil(360.0 / bucket_deg))
+        buckets = defaultdict(list)
+        for index, (row, col) in enumerate(zip(*self._bucket(self.lats, self.lons))):
+            buckets[(int(row), int(col))].append(index)
+        self._buckets = {key: np.array(indices) for key, indices in buckets.items()}
+
+    @classmethod
+    def from_csv(cls, path: str, base_cities: Optional[Dict[str, Dict[str, Any]]] = None,
+                 min_population: int = 0, bucket_deg: float = 1.0) -> "CityIndex":
+        """
+        Cargar una tabla de ciudades (name/city, lat, lon/lng, population, density opcional)
+
+        Args:
+            path: Fichero CSV
+            base_cities: Ciudades a incluir además de las del fichero
+            min_population: Descartar ciudades más pequeñas
+            bucket_deg: Tamaño de cubeta en grados
+        """
+        cities = dict(base_cities or {})
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            columns = {key: next((c for c in aliases if c in reader.fieldnames), None)
+                       for key, aliases in CSV_COLUMNS.items()}
+            missing = [key for key in ("name", "lat", "lon") if columns[key] is None]
+            if missing:
+                raise ValueError(f"Faltan columnas en {path}: {', '.join(missing)}")
+
+            for row in reader:
+                try:
+                    population = float(row.get(columns["population"]) or 0) if columns["population"] else 0
+                    if population < min_population:
+                        continue
+                    record = {"lat": float(row[columns["lat"]]), "lon": float(row[columns["lon"]]),
+                              "population": int(population)}
+                    if columns["density"] and row.get(columns["density"]):
+                        record["density"] = float(row[columns["density"]])
+                except ValueError:
+                    continue
+                name = row[columns["name"]]
+                key = name if name not in cities else f"{name} ({record['lat']:.2f}, {record['lon']:.2f})"
+                cities[key] = record
+
+        logger.info(f"Índice de ciudades cargado desde {path}: {len(cities)} ciudades")
+        return cls(cities, bucket_deg=bucket_deg)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _bucket(self, lat, lon):
+        row = np.clip(((np.asarray(lat) + 90.0) // self.bucket_deg).astype(np.int64), 0, self.n_rows - 1)
+        col = ((np.asarray(lon) + 180.0) // self.bucket_deg).astype(np.int64) % self.n_cols
+        return row, col
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Índices de las ciudades en las cubetas que cubren el radio"""
+        radius_deg = math.degrees(radius_km / EARTH_RADIUS_KM)
+        if radius_deg >= 90.0:
+            return np.arange(len(self.names))
+
+        row_lo, _ = self._bucket(max(-90.0, lat - radius_deg), lon)
+        row_hi, col = self._bucket(min(90.0, lat + radius_deg), lon)
+        max_lat = min(89.9, abs(lat) + radius_deg)
+        half_cols = int(math.ceil(radius_deg / max(math.cos(math.radians(max_lat)), 1e-6) / self.bucket_deg)) + 1
+        if 2 * half_cols + 1 >= self.n_cols:
+            cols = range(self.n_cols)
+        else:
+            cols = [c % self.n_cols for c in range(int(col) - half_cols, int(col) + half_cols + 1)]
+
+        found = [self._buckets[(row, c)] for row in range(int(row_lo), int(row_hi) + 1)
+                 for c in cols if (row, c) in self._buckets]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def _distances(self, lat: float, lon: float, indices: np.ndarray) -> np.ndarray:
+        lat1 = math.radians(lat)
+        lat2 = np.radians(self.lats[indices])
+        dlon = np.radians(self.lons[indices] - lon)
+        a = (np.sin((lat2 - lat1) / 2) ** 2 +
+             math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _results(self, indices: Iterable[int], distances: Iterable[float]) -> List[Dict[str, Any]]:
+        return [{"name": self.names[i], "distance_km": float(d), **self.records[i]}
+                for i, d in zip(indices, distances)]
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> List[Dict[str, Any]]:
+        """
+        Ciudades a menos de `radius_km` del punto, ordenadas por distancia
+
+        Returns:
+            Lista de dicts con name, distance_km y los datos de la ciudad
+        """
+        indices = self._candidates(lat, lon, radius_km)
+        distances = self._distances(lat, lon, indices)
+        inside = distances <= radius_km
+        indices, distances = indices[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return self._results(indices[order], distances[order])
+
+    def nearest(self, lat: float, lon: float, k: int = 1) -> List[Dict[str, Any]]:
+        """
+        Las k ciudades más cercanas al punto
+
+        Amplía el radio de búsqueda (duplicándolo) hasta reunir k candidatas
+        dentro del radio, lo que garantiza que no hay otras más cercanas.
+        """
+        k = min(k, len(self.names))
+        if k <= 0:
+            return []
+
+        radius_km = math.radians(self.bucket_deg) * EARTH_RADIUS_KM
+        while True:
+            indices = self._candidates(lat, lon, radius_km)
+            distances = self._distances(lat, lon, indices)
+            if np.count_nonzero(distances <= radius_km) >= k or len(indices) == len(self.names):
+                break
+            radius_km *= 2
+
+        order = np.argsort(distances, kind='stable')[:k]
+        return self._results(indices[order], distances[order])
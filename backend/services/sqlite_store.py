@@ -0,0 +1,119 @@
+"""
+Almacén clave-valor persistente sobre SQLite
+Los valores se guardan serializados en JSON junto a su fecha de actualización
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class SQLiteKeyValueStore:
+    """Tabla SQLite (clave, valor JSON, updated_at) segura entre hilos"""
+
+    def __init__(self, path: str, table: str = "kv"):
+        """
+        Abrir (o crear) el almacén
+
+        Args:
+            path: Ruta del fichero SQLite (se crean los directorios necesarios)
+            table: Nombre de la tabla dentro del fichero
+        """
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", table):
+            raise ValueError(f"Nombre de tabla inválido: {table}")
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Obtener un valor
+
+        Returns:
+            Tupla (valor, updated_at) o None si la clave no existe
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, updated_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Tuple[Any, float]]:
+        """Obtener varios valores a la vez (las claves ausentes se omiten)"""
+        keys = list(keys)
+        result = {}
+        # SQLite limita el número de parámetros por consulta
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value, updated_at FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            for key, value, updated_at in rows:
+                result[key] = (json.loads(value), updated_at)
+        return result
+
+    def get_updated_at(self, keys: Iterable[str]) -> Dict[str, float]:
+        """Obtener solo la fecha de actualización de varias claves (sin decodificar valores)"""
+        keys = list(keys)
+        result = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, updated_at FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            result.update(dict(rows))
+        return result
+
+    def put(self, key: str, value: Any, updated_at: Optional[float] = None):
+        """Guardar un valor"""
+        self.put_many({key: value}, updated_at=updated_at)
+
+    def put_many(self, items: Dict[str, Any], updated_at: Optional[float] = None):
+        """Guardar varios valores en una sola transacción"""
+        updated_at = time.time() if updated_at is None else updated_at
+        rows = [(key, json.dumps(value), updated_at) for key, value in items.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)", rows
+            )
+
+    def delete(self, key: str):
+        """Eliminar una clave"""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def keys(self) -> List[str]:
+        """Listar todas las claves"""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(f"SELECT key FROM {self.table}")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        """Cerrar la conexión"""
+        with self._lock:
+            self._conn.close()
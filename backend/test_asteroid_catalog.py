@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el catálogo de asteroides indexado por ID
+"""
+
+import sys
+sys.path.append('.')
+from services.asteroid_catalog import AsteroidCatalog
+from services.nasa_api import NASAApiService
+
+def make_neo(asteroid_id, diameter, hazardous=False):
+    return {
+        'id': asteroid_id,
+        'name': f'Test {asteroid_id}',
+        'estimated_diameter_km_min': diameter / 2,
+        'estimated_diameter_km_max': diameter,
+        'relative_velocity_km_s': 15.0,
+        'miss_distance_km': 1000000,
+        'is_potentially_hazardous_asteroid': hazardous,
+        'close_approach_date': '2025-10-01',
+        'nasa_jpl_url': '',
+        'absolute_magnitude_h': 22.0
+    }
+
+def test_catalog_lookup_priority():
+    samples = [{"id": "2023-BU", "name": "Apophis-like", "diameter": 0.34, "velocity": 12.8,
+                "distance_from_earth": 15000000, "risk_level": "MEDIUM", "impact_probability": 0.003}]
+    historical = NASAApiService(api_key="TEST")._get_historical_dangerous_asteroids()
+    catalog = AsteroidCatalog(sample_asteroids=samples, historical_asteroids=historical)
+    
+    assert catalog.get("2023-BU")["source"] == "sample"
+    assert catalog.get("99942")["source"] == "historical"
+    assert catalog.get("missing") is None
+    
+    # Un registro NASA con el mismo ID tiene prioridad sobre el sample
+    stats = catalog.update_nasa([make_neo("2023-BU", 0.5), make_neo("3542519", 0.2)] + historical)
+    print(f"Actualización: {stats}")
+    assert catalog.get("2023-BU")["source"] == "nasa"
+    assert catalog.get("2023-BU")["diameter"] == 0.5
+    assert catalog.get("99942")["source"] == "historical"
+    
+    # Al desaparecer del feed se recupera el registro de menor prioridad
+    stats = catalog.update_nasa([make_neo("3542519", 0.2)])
+    assert stats == {"changed": 0, "removed": 1, "total": len(catalog)}
+    assert catalog.get("2023-BU")["source"] == "sample"
+    print(f"Catálogo: {catalog.get_stats()}")
+
+def test_catalog_updated_on_feed_refresh():
+    service = NASAApiService(api_key="TEST")
+    catalog = AsteroidCatalog()
+    service.add_refresh_listener(catalog.update_nasa)
+    
+    raw_neo = {
+        "id": "3542519",
+        "name": "(2010 PK9)",
+        "estimated_diameter": {"kilometers": {"estimated_diameter_min": 0.1, "estimated_diameter_max": 0.3}},
+        "close_approach_data": [{
+            "close_approach_date": "2025-10-01",
+            "relative_velocity": {"kilometers_per_hour": "54000"},
+            "miss_distance": {"kilometers": "5000000"}
+        }],
+        "is_potentially_hazardous_asteroid": False
+    }
+    service._fetch_neo_feed = lambda start, end: {"near_earth_objects": {start: [raw_neo]}}
+    service.get_processed_asteroids(limit=1)
+    
+    asteroid = catalog.get("3542519")
+    assert asteroid is not None
+    assert asteroid["velocity"] == 15.0
+
+if __name__ == "__main__":
+    test_catalog_lookup_priority()
+    test_catalog_updated_on_feed_refresh()
+    print("✅ Pruebas del catálogo completadas")
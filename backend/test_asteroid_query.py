@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para las consultas filtradas y paginadas de /api/asteroids
+"""
+
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+import app as app_module
+from services.asteroid_query import AsteroidQuery, AsteroidQueryIndex
+from services.risk_scoring import AU_KM
+
+def make_asteroids(n, seed=0):
+    rng = np.random.default_rng(seed)
+    asteroids = []
+    for i in range(n):
+        diameter = float(rng.choice([0.05, 0.2, 0.5, 0.8, 1.5]))
+        asteroids.append({
+            "id": str(3000000 + i),
+            "name": f"Test {i}",
+            "estimated_diameter_km_min": diameter / 2,
+            "estimated_diameter_km_max": diameter,
+            "relative_velocity_km_s": round(float(rng.uniform(5, 30)), 2),
+            "miss_distance_km": round(float(rng.uniform(0.001, 0.5) * AU_KM)),
+            "is_potentially_hazardous_asteroid": bool(rng.random() < 0.2),
+            "close_approach_date": f"2025-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+            "absolute_magnitude_h": None if i % 50 == 0 else float(rng.uniform(15, 28))
+        })
+    return asteroids
+
+def collect_pages(index, **kwargs):
+    records, cursor, pages = [], None, 0
+    while True:
+        page, cursor = index.query(AsteroidQuery(cursor=cursor, **kwargs))
+        records.extend(page)
+        pages += 1
+        if cursor is None:
+            return records, pages
+
+def test_pages_match_brute_force():
+    asteroids = make_asteroids(3000)
+    index = AsteroidQueryIndex(asteroids)
+
+    records, pages = collect_pages(index, hazardous=True, min_diameter=0.5, max_distance_au=0.05,
+                                   date_from="2025-06-01", date_to="2025-06-30", sort="-diameter", limit=7)
+    expected = [neo for neo in asteroids
+                if neo["is_potentially_hazardous_asteroid"] and neo["estimated_diameter_km_max"] >= 0.5
+                and neo["miss_distance_km"] <= 0.05 * AU_KM and "2025-06-01" <= neo["close_approach_date"] <= "2025-06-30"]
+    expected.sort(key=lambda neo: (-neo["estimated_diameter_km_max"], neo["id"]))
+    print(f"{len(records)} resultados en {pages} páginas")
+    assert [record["id"] for record in records] == [neo["id"] for neo in expected]
+
+def test_sort_keys_and_missing_values():
+    asteroids = make_asteroids(500)
+    index = AsteroidQueryIndex(asteroids)
+    for sort in ("default", "velocity", "-velocity", "date", "magnitude", "-magnitude", "-risk"):
+        records, _ = collect_pages(index, sort=sort, limit=33)
+        assert len(records) == len(asteroids)
+        assert len({record["id"] for record in records}) == len(asteroids)
+    # Los valores ausentes van al final en ambos sentidos
+    for sort in ("magnitude", "-magnitude"):
+        records, _ = collect_pages(index, sort=sort, limit=50)
+        assert all(record["absolute_magnitude_h"] is None for record in records[-10:])
+        assert records[0]["absolute_magnitude_h"] is not None
+    # Orden por defecto: peligrosos primero y luego por diámetro descendente
+    records, _ = collect_pages(index, sort="default", limit=100)
+    expected = sorted(asteroids, key=lambda neo: (not neo["is_potentially_hazardous_asteroid"],
+                                                  -neo["estimated_diameter_km_max"], neo["id"]))
+    assert [record["id"] for record in records] == [neo["id"] for neo in expected]
+
+def test_cursor_survives_snapshot_change():
+    asteroids = make_asteroids(200)
+    first, cursor = AsteroidQueryIndex(asteroids).query(AsteroidQuery(sort="velocity", limit=20))
+    # Nueva instantánea con un objeto más lento que todos los ya devueltos
+    slow = dict(asteroids[0], id="slow", relative_velocity_km_s=0.1)
+    second, _ = AsteroidQueryIndex(asteroids + [slow]).query(AsteroidQuery(sort="velocity", limit=20, cursor=cursor))
+    assert second[0]["velocity"] >= first[-1]["velocity"]
+    assert not {record["id"] for record in first} & {record["id"] for record in second}
+
+    # También con el orden por defecto: el cursor no depende de la posición en la lista
+    first, cursor = AsteroidQueryIndex(asteroids).query(AsteroidQuery(limit=20))
+    second, _ = AsteroidQueryIndex(list(reversed(asteroids))).query(AsteroidQuery(limit=20, cursor=cursor))
+    assert second == AsteroidQueryIndex(asteroids).query(AsteroidQuery(limit=20, cursor=cursor))[0]
+    assert not {record["id"] for record in first} & {record["id"] for record in second}
+
+def test_sample_fallback_uses_query_path():
+    refresher = app_module.feed_refresher
+    saved = refresher._asteroids, refresher._fetched_at
+    refresher._asteroids, refresher._fetched_at = [], None
+    try:
+        client = TestClient(app_module.app)
+        response = client.get("/api/asteroids", params={"sort": "velocity"})
+        assert response.status_code == 200 and response.headers["X-Data-Source"] == "sample"
+        assert [record["id"] for record in response.json()] == ["2023-BU", "2025-IMPACT"]
+        limited = client.get("/api/asteroids", params={"limit": 1, "fields": "id,diameter"})
+        assert limited.json() == [{"id": "2025-IMPACT", "diameter": 1.2}]
+        assert "X-Next-Cursor" in limited.headers
+        assert client.get("/api/asteroids", params={"min_diameter": 2}).json() == []
+        assert client.get("/api/asteroids", params={"sort": "size"}).status_code == 400
+        assert client.get("/api/asteroids", params={"cursor": "garbage"}).status_code == 400
+    finally:
+        refresher._asteroids, refresher._fetched_at = saved
+
+def test_query_cost_scales_with_page():
+    index = AsteroidQueryIndex(make_asteroids(20000))
+    start = time.perf_counter()
+    for _ in range(100):
+        index.query(AsteroidQuery(sort="-diameter", min_diameter=0.5, limit=20))
+    elapsed = (time.perf_counter() - start) / 100
+    print(f"Consulta sobre 20000 objetos: {elapsed * 1000:.2f} ms")
+    assert elapsed < 0.01
+
+def test_endpoint_filters_projection_and_cursor():
+    refresher = app_module.feed_refresher
+    saved = refresher._asteroids, refresher._fetched_at
+    refresher._asteroids, refresher._fetched_at = make_asteroids(100), time.time()
+    try:
+        client = TestClient(app_module.app)
+        response = client.get("/api/asteroids", params={"sort": "-velocity", "limit": 10,
+                                                        "fields": "id,velocity,risk_score"})
+        assert response.status_code == 200
+        page = response.json()
+        assert set(page[0]) == {"id", "velocity", "risk_score"}
+        assert page == sorted(page, key=lambda record: -record["velocity"])
+
+        follow = client.get("/api/asteroids", params={"sort": "-velocity", "limit": 10,
+                                                      "cursor": response.headers["X-Next-Cursor"]})
+        assert follow.json()[0]["velocity"] <= page[-1]["velocity"]
+        assert "risk_level" in follow.json()[0]
+
+        assert len(client.get("/api/asteroids").json()) == 15
+        assert client.get("/api/asteroids", params={"sort": "size"}).status_code == 400
+        assert client.get("/api/asteroids", params={"fields": "secret"}).status_code == 400
+        assert client.get("/api/asteroids", params={"cursor": "garbage"}).status_code == 400
+    finally:
+        refresher._asteroids, refresher._fetched_at = saved
+
+if __name__ == "__main__":
+    print("🧪 Probando las consultas de asteroides\n")
+    test_pages_match_brute_force()
+    test_sort_keys_and_missing_values()
+    test_cursor_survives_snapshot_change()
+    test_sample_fallback_uses_query_path()
+    test_query_cost_scales_with_page()
+    test_endpoint_filters_projection_and_cursor()
+    print("\n✅ Pruebas de consultas de asteroides completadas")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el cache TTL del servicio de NASA
+"""
+
+import sys
+sys.path.append('.')
+import threading
+import time
+from services.cache import TTLCache
+from services.nasa_api import NASAApiService
+
+def test_ttl_cache_expiry_and_eviction():
+    cache = TTLCache(ttl_seconds=0.05, max_entries=2)
+    
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)  # Desaloja "a"
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
+    
+    time.sleep(0.06)
+    assert cache.get("c") is None
+    
+    stats = cache.get_stats()
+    print(f"Estadísticas: {stats}")
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+def test_single_flight():
+    cache = TTLCache(ttl_seconds=60, max_entries=4)
+    calls = []
+    
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"near_earth_objects": {}}
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    print(f"Cargas reales: {len(calls)} para {len(results)} peticiones")
+    assert len(calls) == 1
+    assert len(results) == 8
+
+def test_empty_results_not_cached():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+    
+    def failing_loader():
+        calls.append(1)
+        return {}
+    
+    cache.get_or_load("k", failing_loader)
+    cache.get_or_load("k", failing_loader)
+    assert len(calls) == 2
+
+def test_processed_asteroids_cached():
+    service = NASAApiService(api_key="TEST")
+    fetches = []
+    
+    def fake_fetch(start_date, end_date):
+        fetches.append((start_date, end_date))
+        return {"near_earth_objects": {start_date: []}}
+    
+    service._fetch_neo_feed = fake_fetch
+    first = service.get_processed_asteroids(limit=3)
+    second = service.get_processed_asteroids(limit=50)
+    
+    print(f"Descargas del feed: {len(fetches)} | Stats: {service.get_cache_stats()}")
+    assert len(fetches) == 1
+    assert len(first) == 3
+    assert len(second) == 5  # Solo asteroides históricos
+
+if __name__ == "__main__":
+    test_ttl_cache_expiry_and_eviction()
+    test_single_flight()
+    test_empty_results_not_cached()
+    test_processed_asteroids_cached()
+    print("✅ Pruebas de cache completadas")
@@ -3,10 +3,12 @@
 Script de prueba para verificar los cálculos de víctimas corregidos
 """
 
+import os
 import sys
 sys.path.append('.')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 from services.demographic_service import DemographicService
-import math
+from simulation.physics import impact_physics
 import logging
 
 # Activar logging para ver los debug messages
@@ -23,12 +25,8 @@ def test_casualties():
     print("\n1. METEORITO MUY PEQUEÑO (50 metros)")
     diameter_km = 0.05
     velocity = 15.0
-    crater_diameter_km = 1.8 * diameter_km * (velocity / 12)**0.78
-    
-    volume = (4/3) * math.pi * (diameter_km/2)**3
-    mass = volume * 2.5e12
-    energy_joules = 0.5 * mass * (velocity * 1000)**2
-    energy_megatons = energy_joules / 4.184e15
+    physics = impact_physics(diameter_km, velocity, angle_deg=45)
+    crater_diameter_km, energy_megatons = physics.crater_diameter_km, physics.energy_megatons
     
     print(f"Diámetro meteorito: {diameter_km} km ({diameter_km*1000} metros)")
     print(f"Velocidad: {velocity} km/s")
@@ -47,12 +45,8 @@ def test_casualties():
     print("\n2. METEORITO PEQUEÑO (100 metros)")
     diameter_km = 0.1
     velocity = 20.0
-    crater_diameter_km = 1.8 * diameter_km * (velocity / 12)**0.78
-    
-    volume = (4/3) * math.pi * (diameter_km/2)**3
-    mass = volume * 2.5e12
-    energy_joules = 0.5 * mass * (velocity * 1000)**2
-    energy_megatons = energy_joules / 4.184e15
+    physics = impact_physics(diameter_km, velocity, angle_deg=45)
+    crater_diameter_km, energy_megatons = physics.crater_diameter_km, physics.energy_megatons
     
     print(f"Diámetro meteorito: {diameter_km} km ({diameter_km*1000} metros)")
     print(f"Velocidad: {velocity} km/s")
@@ -71,12 +65,8 @@ def test_casualties():
     print("\n3. METEORITO MEDIANO (500 metros)")
     diameter_km = 0.5
     velocity = 25.0
-    crater_diameter_km = 1.8 * diameter_km * (velocity / 12)**0.78
-    
-    volume = (4/3) * math.pi * (diameter_km/2)**3
-    mass = volume * 2.5e12
-    energy_joules = 0.5 * mass * (velocity * 1000)**2
-    energy_megatons = energy_joules / 4.184e15
+    physics = impact_physics(diameter_km, velocity, angle_deg=45)
+    crater_diameter_km, energy_megatons = physics.crater_diameter_km, physics.energy_megatons
     
     print(f"Diámetro meteorito: {diameter_km} km ({diameter_km*1000} metros)")
     print(f"Velocidad: {velocity} km/s")
@@ -95,12 +85,8 @@ def test_casualties():
     print("\n4. METEORITO GRANDE (1 km)")
     diameter_km = 1.0
     velocity = 30.0
-    crater_diameter_km = 1.8 * diameter_km * (velocity / 12)**0.78
-    
-    volume = (4/3) * math.pi * (diameter_km/2)**3
-    mass = volume * 2.5e12
-    energy_joules = 0.5 * mass * (velocity * 1000)**2
-    energy_megatons = energy_joules / 4.184e15
+    physics = impact_physics(diameter_km, velocity, angle_deg=45)
+    crater_diameter_km, energy_megatons = physics.crater_diameter_km, physics.energy_megatons
     
     print(f"Diámetro meteorito: {diameter_km} km ({diameter_km*1000} metros)")
     print(f"Velocidad: {velocity} km/s")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el mapa global de víctimas
+"""
+
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+import app as app_module
+from services.casualty_heatmap import CasualtyHeatmapGenerator
+from services.demographic_service import DemographicService
+from services.simulation_executor import SimulationExecutor
+
+service = DemographicService(enable_nominatim=False)
+
+def test_matches_batch_estimates():
+    generator = CasualtyHeatmapGenerator(service)
+    for crater, energy in [(5.0, 30.0), (40.0, 20.0), (0.005, 1.0)]:
+        start = time.perf_counter()
+        heatmap = generator.compute(crater, energy, resolution_deg=1.0)
+        elapsed = time.perf_counter() - start
+        print(f"Rejilla global de 1° (cráter {crater} km) en {elapsed:.2f} s")
+        assert heatmap["total_casualties"].shape == (180, 360)
+        assert elapsed < 30
+
+        lats, lons = np.meshgrid(heatmap["lats"], heatmap["lons"], indexing='ij')
+        sample = np.random.default_rng(3).choice(lats.size, 300, replace=False)
+        batch = service.estimate_casualties_batch(lats.ravel()[sample], lons.ravel()[sample], crater, energy)
+        # Sin tsunamis (E < 50 Mt) la lógica es la misma: solo difiere el redondeo de la FFT
+        assert np.abs(heatmap["total_casualties"].ravel()[sample] - batch["total_casualties"]).max() <= 3
+        assert np.abs(heatmap["affected_population"].ravel()[sample] - batch["total_affected_population"]).max() <= 1
+
+    # Los focos están donde hay población
+    peak = np.unravel_index(heatmap["total_casualties"].argmax(), heatmap["total_casualties"].shape)
+    assert heatmap["total_casualties"].max() == 0 or service.population_grid.density_at(
+        heatmap["lats"][peak[0]], heatmap["lons"][peak[1]]) > 0
+
+def test_process_split_is_deterministic():
+    generator = CasualtyHeatmapGenerator(service)
+    single = generator.compute(20.0, 600.0, resolution_deg=2.0, chunks=1)
+    # Bloques de filas en los procesos del ejecutor (rejilla y máscara en memoria compartida)
+    executor = SimulationExecutor(service, workers=2, timeout=30)
+    try:
+        split = CasualtyHeatmapGenerator(service, executor=executor).compute(20.0, 600.0, resolution_deg=2.0, chunks=3)
+        assert executor.get_stats()["completed"] == 3
+    finally:
+        executor.shutdown()
+    for name in ("total_casualties", "tsunami_casualties", "affected_population"):
+        assert np.array_equal(single[name], split[name]), name
+    # Impactos grandes en el océano: solo víctimas por tsunami
+    assert single["tsunami_casualties"].max() > 0
+    try:
+        generator.compute(20.0, 600.0, resolution_deg=0.7)
+        assert False, "debía rechazar una resolución que no divide 180°"
+    except ValueError:
+        pass
+
+def test_tiles_and_metadata():
+    generator = CasualtyHeatmapGenerator(service, tile_size=64)
+    with tempfile.TemporaryDirectory() as directory:
+        metadata = generator.generate(8.0, 40.0, directory, resolution_deg=1.0)
+        # 360 columnas con teselas de 64 px: niveles 0..2 (128, 256 y 512 px de ancho)
+        assert metadata["max_zoom"] == 2
+        assert len(metadata["hotspots"]) == 10
+        assert metadata["hotspots"][0]["casualties"] == metadata["max_casualties"]
+        for level in range(3):
+            for x in range(2 ** (level + 1)):
+                for y in range(2 ** level):
+                    tile = np.load(os.path.join(directory, str(level), str(x), f"{y}.npy"))
+                    assert tile.shape == (64, 64) and tile.dtype == np.float32
+                    with open(os.path.join(directory, str(level), str(x), f"{y}.png"), "rb") as f:
+                        assert f.read(8) == b"\x89PNG\r\n\x1a\n"
+
+        # El máximo se conserva al agregar niveles (la fila 0 de las teselas está al norte)
+        level0 = np.concatenate([np.load(os.path.join(directory, "0", str(x), "0.npy")) for x in range(2)], axis=1)
+        assert level0.max() == metadata["max_casualties"]
+        hotspot = metadata["hotspots"][0]
+        row = int((90 - hotspot["lat"]) / 180 * 64)
+        col = int((hotspot["lon"] + 180) / 360 * 128)
+        assert level0[row, col] == metadata["max_casualties"]
+        with open(os.path.join(directory, "metadata.json")) as f:
+            assert json.load(f)["max_zoom"] == 2
+
+def test_heatmap_endpoint():
+    saved = app_module.HEATMAP_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        app_module.HEATMAP_DIR = directory
+        try:
+            client = TestClient(app_module.app)
+            body = {"asteroid_id": "custom-asteroid", "impact_velocity": 20.0, "asteroid_diameter": 0.3,
+                    "resolution": 2.0}
+            first = client.post("/api/heatmap", json=body)
+            assert first.status_code == 200
+            heatmap_id = first.json()["heatmap_id"]
+            assert first.json()["resolution_deg"] == 2.0
+
+            # El mismo impactor reutiliza las teselas
+            assert client.post("/api/heatmap", json=dict(body, asteroid_diameter=0.30000001)).json()["heatmap_id"] == heatmap_id
+            assert client.post("/api/heatmap", json=dict(body, impact_velocity=25.0)).json()["heatmap_id"] != heatmap_id
+            assert client.get(f"/api/heatmap/{heatmap_id}").json()["max_zoom"] == 0
+
+            tile = client.get(f"/api/heatmap/{heatmap_id}/tiles/0/1/0.png")
+            assert tile.status_code == 200 and tile.headers["content-type"] == "image/png"
+            assert tile.content.startswith(b"\x89PNG")
+            assert client.get(f"/api/heatmap/{heatmap_id}/tiles/0/1/0.npy").status_code == 200
+            assert client.get(f"/api/heatmap/{heatmap_id}/tiles/5/0/0.png").status_code == 404
+            assert client.get(f"/api/heatmap/{heatmap_id}/tiles/0/0/0.txt").status_code == 404
+            assert client.get("/api/heatmap/not-a-heatmap").status_code == 404
+            assert client.post("/api/heatmap", json=dict(body, resolution=0.1)).status_code == 400
+        finally:
+            app_module.HEATMAP_DIR = saved
+
+if __name__ == "__main__":
+    print("🧪 Probando el mapa global de víctimas\n")
+    test_matches_batch_estimates()
+    test_process_split_is_deterministic()
+    test_tiles_and_metadata()
+    test_heatmap_endpoint()
+    print("\n✅ Pruebas del mapa de víctimas completadas")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para los circuitos de NASA y Nominatim (sin acceso a la red)
+"""
+
+import os
+import sys
+sys.path.append('.')
+import asyncio
+import tempfile
+import time
+import httpx
+import requests
+from services.circuit_breaker import CircuitBreaker, parse_retry_after
+from services.demographic_service import DemographicService
+from services.geocode_cache import GeocodeCache
+from services.nasa_api import NASAApiService
+from services.nasa_api_async import AsyncNASAApiService
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+    def json(self):
+        return self._payload
+
+class FakeSession:
+    def __init__(self, response=None, error=None):
+        self.calls = 0
+        self.kwargs = None
+        self.response = response
+        self.error = error
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        self.kwargs = kwargs
+        if self.error:
+            raise self.error
+        return self.response
+
+def test_opens_after_failures_and_recovers():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=0.1)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    time.sleep(0.12)
+    assert breaker.state == "half_open"
+    assert breaker.allow_request()
+    # Solo una petición de prueba a la vez
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    print(f"Estadísticas: {breaker.get_stats()}")
+
+def test_failed_probe_doubles_pause():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.1)
+    breaker.record_failure()
+    time.sleep(0.12)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert 0.15 < breaker.retry_in() <= 0.2
+
+def test_rate_limit_headers():
+    breaker = CircuitBreaker("test", rate_limit_reserve=2, rate_limit_cooldown=60)
+    breaker.record_response(200, {"X-RateLimit-Remaining": "10"})
+    assert breaker.state == "closed"
+    breaker.record_response(200, {"X-RateLimit-Remaining": "2"})
+    assert breaker.state == "open"
+    assert breaker.retry_in() > 55
+
+    breaker = CircuitBreaker("test")
+    breaker.record_response(429, {"Retry-After": "120"})
+    assert breaker.state == "open"
+    assert 115 < breaker.retry_in() <= 120
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("soon") is None
+
+def test_client_errors_do_not_open():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    breaker.record_response(404)
+    assert breaker.state == "closed"
+    breaker.record_response(503)
+    assert breaker.state == "open"
+
+def test_sync_feed_has_timeout_and_skips_open_circuit():
+    service = NASAApiService(api_key="TEST", request_timeout=3)
+    service.session = FakeSession(error=requests.exceptions.ConnectTimeout("timeout"))
+    for day in range(1, 7):
+        assert service._fetch_neo_feed(f"2025-10-0{day}", f"2025-10-0{day}") == {}
+    assert service.session.kwargs["timeout"] == 3
+    # Tras 5 fallos el circuito de api.nasa.gov está abierto: sin más peticiones
+    assert service.session.calls == 5
+    stats = service.get_circuit_stats()
+    assert stats["api.nasa.gov"]["state"] == "open"
+    assert stats["ssd-api.jpl.nasa.gov"]["state"] == "closed"
+
+def test_async_429_stops_requests():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(429, headers={"Retry-After": "3600"})
+
+    async def run():
+        service = AsyncNASAApiService(api_key="TEST")
+        service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        first = await service.get_asteroid_details("3542519")
+        second = await service.get_asteroid_details("3542519")
+        await service.aclose()
+        return service, first, second
+
+    service, first, second = asyncio.run(run())
+    assert first == {} and second == {}
+    assert len(calls) == 1
+    assert service.get_circuit_stats()["api.nasa.gov"]["rate_limited"] == 1
+
+def test_open_nominatim_circuit_is_not_cached_as_failure():
+    cache = GeocodeCache(path=os.path.join(tempfile.mkdtemp(), "geocode.sqlite3"))
+    breaker = CircuitBreaker("nominatim", failure_threshold=1, recovery_timeout=60)
+    service = DemographicService(use_population_grid=False, enable_nominatim=True,
+                                 geocode_cache=cache, nominatim_breaker=breaker)
+    breaker.record_failure()
+
+    start = time.perf_counter()
+    assert service._get_real_demographic_data(40.4, -3.7) is None
+    assert time.perf_counter() - start < 0.1
+    assert cache.get_stats()["fetches"] == 0
+
+    # Al cerrarse el circuito la celda se consulta de verdad
+    breaker.record_success()
+    service._fetch_nominatim = lambda lat, lon: {"country": "Spain"}
+    assert service._get_real_demographic_data(40.4, -3.7)["country"] == "Spain"
+    service.resolver.shutdown()
+
+if __name__ == "__main__":
+    print("🧪 Probando los circuitos de servicios externos\n")
+    test_opens_after_failures_and_recovers()
+    test_failed_probe_doubles_pause()
+    test_rate_limit_headers()
+    test_client_errors_do_not_open()
+    test_sync_feed_has_timeout_and_skips_open_circuit()
+    test_async_429_stops_requests()
+    test_open_nominatim_circuit_is_not_cached_as_failure()
+    print("\n✅ Pruebas de circuitos completadas")
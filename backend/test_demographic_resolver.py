@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la consulta concurrente de fuentes demográficas
+"""
+
+import os
+import tempfile
+import time
+from services.demographic_resolver import DemographicResolver, DemographicSource
+from services.demographic_service import DemographicService
+from services.geocode_cache import GeocodeCache
+
+def slow_source(delay, result):
+    def fetch(lat, lon):
+        time.sleep(delay)
+        return result
+    return fetch
+
+def failing_source(lat, lon):
+    raise ConnectionError("sin red")
+
+def test_slow_source_is_abandoned_at_deadline():
+    resolver = DemographicResolver([
+        DemographicSource("fast", lambda lat, lon: {"density_per_km2": 10}),
+        DemographicSource("slow", slow_source(1.0, {"density_per_km2": 99}), remote=True)
+    ], deadline_seconds=0.1)
+
+    start = time.perf_counter()
+    results = resolver.resolve(0.0, 0.0)
+    elapsed = time.perf_counter() - start
+    print(f"Resuelto en {elapsed * 1000:.0f} ms: {sorted(results)}")
+    assert elapsed < 0.5
+    assert results == {"fast": {"density_per_km2": 10}}
+
+    stats = resolver.get_stats()["sources"]
+    assert stats["slow"]["timeouts"] == 1
+    assert stats["fast"]["successes"] == 1
+    resolver.shutdown()
+
+def test_remote_sources_run_in_parallel():
+    resolver = DemographicResolver([
+        DemographicSource(f"remote_{i}", slow_source(0.1, {"value": i}), remote=True) for i in range(4)
+    ], deadline_seconds=1.0)
+    start = time.perf_counter()
+    results = resolver.resolve(0.0, 0.0)
+    assert time.perf_counter() - start < 0.35
+    assert len(results) == 4
+    resolver.shutdown()
+
+def test_errors_and_empty_results_are_counted():
+    resolver = DemographicResolver([
+        DemographicSource("broken", failing_source, remote=True),
+        DemographicSource("empty", lambda lat, lon: None)
+    ], deadline_seconds=0.5)
+    for _ in range(3):
+        assert resolver.resolve(0.0, 0.0) == {}
+    stats = resolver.get_stats()["sources"]
+    assert stats["broken"]["errors"] == 3
+    assert stats["empty"]["empty"] == 3
+    assert stats["broken"]["success_rate"] == 0.0
+    resolver.shutdown()
+
+def test_service_keeps_grid_when_nominatim_is_slow():
+    cache = GeocodeCache(path=os.path.join(tempfile.mkdtemp(), "geocode.sqlite3"))
+    service = DemographicService(enable_nominatim=True, geocode_cache=cache, deadline_seconds=0.1)
+    service._fetch_nominatim = slow_source(1.0, {"country": "France", "location_info": {}})
+
+    start = time.perf_counter()
+    result = service.calculate_population_density(48.8566, 2.3522)
+    elapsed = time.perf_counter() - start
+    print(f"París en {elapsed * 1000:.0f} ms desde {result['data_source']}")
+    assert elapsed < 0.5
+    assert result["data_source"] in ("population_grid", "local_estimation")
+    assert result["density_per_km2"] > 0
+    stats = service.get_source_stats()["sources"]
+    assert stats["nominatim_osm"]["timeouts"] == 1
+    service.resolver.shutdown()
+
+def test_service_enriches_with_nominatim_in_time():
+    cache = GeocodeCache(path=os.path.join(tempfile.mkdtemp(), "geocode.sqlite3"))
+    service = DemographicService(enable_nominatim=True, geocode_cache=cache, deadline_seconds=1.0)
+    service._fetch_nominatim = lambda lat, lon: {"country": "Japan", "location_info": {"city": "Tokyo"}}
+
+    result = service.calculate_population_density(35.6762, 139.6503)
+    assert result["country"] == "Japan"
+    assert result["location_info"] == {"city": "Tokyo"}
+    assert result["data_source"].endswith("+nominatim_osm")
+    service.resolver.shutdown()
+
+if __name__ == "__main__":
+    print("🧪 Probando la consulta concurrente de fuentes demográficas\n")
+    test_slow_source_is_abandoned_at_deadline()
+    test_remote_sources_run_in_parallel()
+    test_errors_and_empty_results_are_counted()
+    test_service_keeps_grid_when_nominatim_is_slow()
+    test_service_enriches_with_nominatim_in_time()
+    print("\n✅ Pruebas de fuentes demográficas completadas")
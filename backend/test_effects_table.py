@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para las tablas precalculadas de efectos del impacto
+"""
+
+import json
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import tempfile
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+import app as app_module
+from simulation.effects_table import TABLE_OUTPUTS, ImpactEffectsTable
+from simulation.physics import impact_physics
+
+SMALL_AXES = {"diameter_km": (0.01, 10.0, 16), "density": (800.0, 8000.0, 6),
+              "velocity_kms": (11.0, 72.0, 10), "angle_deg": (10.0, 90.0, 8)}
+
+def test_interpolation_error_bounds():
+    table = ImpactEffectsTable.build(SMALL_AXES, validation_samples=5000)
+    for name, bound in table.error_bounds.items():
+        print(f"  {name}: error relativo máx. {bound['max_rel']:.2e}")
+    # Energía y cráter son leyes de potencia en las coordenadas de los ejes
+    assert table.error_bounds["energy_megatons"]["max_rel"] < 1e-9
+    assert table.error_bounds["crater_diameter_km"]["max_rel"] < 1e-9
+    assert table.error_bounds["seismic_magnitude"]["max_abs"] < 0.2
+
+    rng = np.random.default_rng(1)
+    d, rho, v, a = rng.uniform(0.02, 9, 500), rng.uniform(900, 7000, 500), rng.uniform(12, 70, 500), rng.uniform(15, 89, 500)
+    approx = table.interpolate(d, rho, v, a)
+    exact = impact_physics(d, v, a, rho)
+    for name in TABLE_OUTPUTS:
+        error = np.abs(approx[name] - getattr(exact, name))
+        assert np.all(error <= table.error_bounds[name]["max_abs"] * 1.5 + 1e-12), name
+
+    # El camino escalar coincide con el vectorizado
+    for k in range(20):
+        single = table.interpolate(d[k], rho[k], v[k], a[k])
+        for name in TABLE_OUTPUTS:
+            assert np.isclose(single[name], approx[name][k], rtol=1e-12, atol=1e-12)
+
+def test_out_of_domain_uses_exact_path():
+    table = ImpactEffectsTable.build(SMALL_AXES, validation_samples=0)
+    outside = table.impact_physics(50.0, 20.0, 45.0, composition="metallic")
+    assert outside.energy_megatons == impact_physics(50.0, 20.0, 45.0, composition="metallic").energy_megatons
+    batch = table.impact_physics(np.array([0.5, 50.0]), 20.0, np.array([45.0, 3.0]))
+    assert batch.energy_megatons[1] == impact_physics(50.0, 20.0, 3.0).energy_megatons
+
+def test_memory_mapped_storage():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "effects.npy")
+        table = ImpactEffectsTable.build(SMALL_AXES, validation_samples=1000)
+        table.save(path)
+        loaded = ImpactEffectsTable.load(path)
+        assert isinstance(loaded.values, np.memmap)
+        assert loaded.error_bounds == table.error_bounds
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            result = loaded.impact_physics(0.3, 17.0, 40.0)
+        elapsed = (time.perf_counter() - start) / 1000
+        print(f"Consulta escalar de la tabla: {elapsed * 1e6:.1f} µs")
+        assert elapsed < 1e-3
+        assert abs(result.crater_diameter_km / impact_physics(0.3, 17.0, 40.0).crater_diameter_km - 1) < 1e-9
+
+        # Una tabla de otra versión del núcleo se regenera
+        with open(f"{path}.json") as f:
+            metadata = json.load(f)
+        metadata["kernel_version"] = "stale"
+        with open(f"{path}.json", "w") as f:
+            json.dump(metadata, f)
+        try:
+            ImpactEffectsTable.load(path)
+            assert False, "debía rechazar una tabla obsoleta"
+        except ValueError:
+            pass
+        rebuilt = ImpactEffectsTable.load_or_build(path)
+        assert rebuilt.kernel_version != "stale" and ImpactEffectsTable.load(path) is not None
+
+def test_endpoint_physics_modes():
+    saved = app_module.effects_table
+    app_module.effects_table = ImpactEffectsTable.build(SMALL_AXES, validation_samples=0)
+    try:
+        client = TestClient(app_module.app)
+        body = {"asteroid_id": "custom-asteroid", "impact_location": {"lat": 48.85, "lon": 2.35},
+                "impact_velocity": 21.0, "impact_angle": 35, "asteroid_diameter": 0.2}
+        exact = client.post("/api/simulation", json=body)
+        table = client.post("/api/simulation", json=dict(body, physics_mode="table"))
+        assert exact.status_code == table.status_code == 200
+        assert exact.headers["etag"] != table.headers["etag"]
+        assert abs(table.json()["energy_released"] / exact.json()["energy_released"] - 1) < 1e-9
+        assert client.post("/api/simulation", json=dict(body, physics_mode="fast")).status_code == 400
+    finally:
+        app_module.effects_table = saved
+
+if __name__ == "__main__":
+    print("🧪 Probando las tablas de efectos\n")
+    test_interpolation_error_bounds()
+    test_out_of_domain_uses_exact_path()
+    test_memory_mapped_storage()
+    test_endpoint_physics_modes()
+    print("\n✅ Pruebas de las tablas de efectos completadas")
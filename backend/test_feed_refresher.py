@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el refresco en segundo plano del feed de NASA
+"""
+
+import sys
+sys.path.append('.')
+import asyncio
+import time
+from services.feed_refresher import FeedRefresher
+
+class FakeNasaService:
+    def __init__(self, responses):
+        self.responses = list(responses)
+    
+    async def refresh_processed_asteroids(self):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+def test_stale_snapshot_served_after_failure():
+    service = FakeNasaService([[{"id": "1"}], None, RuntimeError("timeout")])
+    refresher = FeedRefresher(service, interval_seconds=60, max_staleness_seconds=0.2, retry_seconds=1)
+    
+    async def run():
+        assert await refresher.refresh() is True
+        assert await refresher.refresh() is False
+        assert await refresher.refresh() is False
+    
+    asyncio.run(run())
+    snapshot = refresher.get_snapshot()
+    print(f"Estado: {refresher.get_status()}")
+    assert snapshot["usable"] and snapshot["asteroids"] == [{"id": "1"}]
+    assert refresher.failure_count == 2
+    assert refresher.last_error == "timeout"
+    
+    # Superada la antigüedad máxima la instantánea deja de servirse
+    time.sleep(0.25)
+    snapshot = refresher.get_snapshot()
+    assert not snapshot["usable"] and snapshot["asteroids"] == []
+
+def test_background_task_lifecycle():
+    service = FakeNasaService([[{"id": "1"}]] + [None] * 100)
+    refresher = FeedRefresher(service, interval_seconds=0.01, max_staleness_seconds=60, retry_seconds=0.01)
+    
+    async def run():
+        refresher.start()
+        await asyncio.sleep(0.05)
+        assert refresher.get_status()["running"]
+        await refresher.stop()
+    
+    asyncio.run(run())
+    assert refresher.refresh_count == 1
+    assert refresher.get_snapshot()["asteroids"] == [{"id": "1"}]
+
+def test_stored_feed_served_offline_after_max_staleness():
+    # Reinicio sin red dos horas después de la última descarga guardada
+    service = FakeNasaService([RuntimeError("offline")])
+    service.feed_store = object()
+    service.load_stored_processed_asteroids = lambda: ([{"id": "2"}], time.time() - 7200)
+    refresher = FeedRefresher(service, interval_seconds=60, max_staleness_seconds=3600, retry_seconds=1)
+    
+    # Por defecto la antigüedad máxima se respeta también para el feed guardado
+    assert refresher.warm_start()
+    assert asyncio.run(refresher.refresh()) is False
+    snapshot = refresher.get_snapshot()
+    assert not snapshot["usable"] and snapshot["asteroids"] == []
+    
+    # Solo con FEED_SERVE_STALE_OFFLINE se sirve, marcado como antiguo
+    refresher.serve_stale_offline = True
+    snapshot = refresher.get_snapshot()
+    assert snapshot["usable"] and snapshot["stale"] and snapshot["asteroids"] == [{"id": "2"}]
+    assert snapshot["age_seconds"] >= 7200
+
+if __name__ == "__main__":
+    test_stale_snapshot_served_after_failure()
+    test_background_task_lifecycle()
+    test_stored_feed_served_offline_after_max_staleness()
+    print("✅ Pruebas del refresco del feed completadas")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el almacén persistente del feed NEO
+"""
+
+import sys
+sys.path.append('.')
+import os
+import tempfile
+import time
+from services.feed_store import NeoFeedStore
+from services.nasa_api import NASAApiService
+
+def make_feed(dates):
+    return {"near_earth_objects": {date: [{"id": date.replace("-", "")}] for date in dates}}
+
+def test_only_missing_dates_are_fetched():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = NeoFeedStore(path=os.path.join(tmp, "feed.sqlite3"))
+        
+        print(f"Plan inicial: {store.plan_fetch('2025-01-01', '2025-01-20')}")
+        assert store.plan_fetch("2025-01-01", "2025-01-20") == [
+            ("2025-01-01", "2025-01-08"), ("2025-01-09", "2025-01-16"), ("2025-01-17", "2025-01-20")
+        ]
+        
+        store.save_feed(make_feed(["2025-01-02"]), "2025-01-01", "2025-01-05")
+        assert store.plan_fetch("2025-01-01", "2025-01-07") == [("2025-01-06", "2025-01-07")]
+        
+        feed = store.load_feed("2025-01-01", "2025-01-07")
+        assert list(feed["near_earth_objects"]) == ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-04", "2025-01-05"]
+        assert feed["element_count"] == 1
+        
+        # Los días recientes caducan antes que los pasados
+        now = time.time() + 2 * 3600
+        today = time.strftime("%Y-%m-%d", time.localtime(now))
+        store.save_feed(make_feed([today]), today, today)
+        assert store.stale_dates("2025-01-01", "2025-01-05", now=now) == []
+        assert store.stale_dates(today, today, now=now + 2 * 3600) == [today]
+
+def test_service_warm_start_without_network():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feed.sqlite3")
+        
+        service = NASAApiService(api_key="TEST", feed_store=NeoFeedStore(path=path))
+        fetches = []
+        service._fetch_neo_feed = lambda start, end: fetches.append((start, end)) or make_feed([start])
+        service.get_neo_feed()
+        assert len(fetches) == 1
+        
+        # Un servicio nuevo (reinicio) arranca desde disco sin descargar nada
+        restarted = NASAApiService(api_key="TEST", feed_store=NeoFeedStore(path=path))
+        restarted._fetch_neo_feed = lambda start, end: (_ for _ in ()).throw(AssertionError("red"))
+        asteroids, stored_at = restarted.load_stored_processed_asteroids()
+        print(f"Arranque en caliente: {len(asteroids)} asteroides guardados en {stored_at}")
+        assert asteroids and stored_at is not None
+
+if __name__ == "__main__":
+    test_only_missing_dates_are_fetched()
+    test_service_warm_start_without_network()
+    print("✅ Pruebas del almacén del feed completadas")
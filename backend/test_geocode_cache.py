@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el cache de geocodificación inversa
+"""
+
+import os
+import tempfile
+import threading
+import time
+from services.geocode_cache import GeocodeCache
+from services.demographic_service import DemographicService
+
+def make_cache(**kwargs):
+    return GeocodeCache(path=os.path.join(tempfile.mkdtemp(), "geocode.sqlite3"), **kwargs)
+
+class CountingFetcher:
+    def __init__(self, result=None, error=None, delay=0.0):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.delay = delay
+    
+    def __call__(self, lat, lon):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+def test_nearby_clicks_share_cell():
+    cache = make_cache(precision_deg=0.01)
+    fetcher = CountingFetcher({"country": "Mexico"})
+    assert cache.get_or_fetch(19.4326, -99.1332, fetcher) == {"country": "Mexico"}
+    # ~100 m más allá: misma celda
+    assert cache.get_or_fetch(19.4330, -99.1340, fetcher) == {"country": "Mexico"}
+    assert fetcher.calls == 1
+    cache.get_or_fetch(19.50, -99.1332, fetcher)
+    assert fetcher.calls == 2
+
+def test_persists_across_instances():
+    path = os.path.join(tempfile.mkdtemp(), "geocode.sqlite3")
+    fetcher = CountingFetcher({"country": "Japan"})
+    GeocodeCache(path=path).get_or_fetch(35.68, 139.65, fetcher)
+    
+    restarted = GeocodeCache(path=path)
+    assert restarted.get_or_fetch(35.68, 139.65, fetcher) == {"country": "Japan"}
+    assert fetcher.calls == 1
+    assert restarted.get_stats()["disk_hits"] == 1
+
+def test_negative_caching_with_shorter_ttl():
+    cache = make_cache(negative_ttl_seconds=0.2)
+    fetcher = CountingFetcher(error=TimeoutError("timeout"))
+    assert cache.get_or_fetch(0.0, 0.0, fetcher) is None
+    assert cache.get_or_fetch(0.0, 0.0, fetcher) is None
+    assert fetcher.calls == 1
+    assert cache.get_stats()["negative_hits"] == 1
+    
+    time.sleep(0.25)
+    cache.get_or_fetch(0.0, 0.0, fetcher)
+    assert fetcher.calls == 2
+
+def test_concurrent_requests_fetch_once():
+    cache = make_cache()
+    fetcher = CountingFetcher({"country": "France"}, delay=0.1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch(48.85, 2.35, fetcher)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fetcher.calls == 1
+    assert results == [{"country": "France"}] * 8
+
+def test_hit_rate_and_service_integration():
+    cache = make_cache()
+    service = DemographicService(use_population_grid=False, enable_nominatim=True, geocode_cache=cache)
+    service._fetch_nominatim = CountingFetcher({"country": "Spain", "coordinates": {"lat": 40.4, "lon": -3.7}})
+    for offset in range(10):
+        result = service._query_nominatim_api(40.4 + offset * 1e-4, -3.7)
+    assert result["coordinates"] == {"lat": 40.4 + 9 * 1e-4, "lon": -3.7}
+    stats = service.get_cache_stats()
+    print(f"Estadísticas: {stats}")
+    assert stats["fetches"] == 1
+    assert stats["hit_rate"] == 0.9
+
+if __name__ == "__main__":
+    print("🧪 Probando el cache de geocodificación\n")
+    test_nearby_clicks_share_cell()
+    test_persists_across_instances()
+    test_negative_caching_with_shorter_ttl()
+    test_concurrent_requests_fetch_once()
+    test_hit_rate_and_service_integration()
+    print("\n✅ Pruebas del cache de geocodificación completadas")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el modo por lotes de ImpactSimulator
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import time
+import numpy as np
+from simulation.impact_simulator import (
+    ImpactSimulator, AsteroidProperties, ImpactLocation,
+    COMPOSITION_CODES, TERRAIN_CODES
+)
+
+def test_batch_matches_scalar():
+    simulator = ImpactSimulator()
+    rng = np.random.default_rng(42)
+    n = 300
+    diameter = rng.uniform(0.001, 20, n)
+    density = np.where(rng.random(n) < 0.3, 0, rng.uniform(800, 8000, n))
+    velocity = rng.uniform(11, 72, n)
+    angle = rng.uniform(5, 90, n)
+    composition = rng.integers(0, len(COMPOSITION_CODES), n)
+    terrain = rng.integers(0, len(TERRAIN_CODES), n)
+    
+    batch = simulator.simulate_batch(diameter, density, velocity, angle, composition, terrain)
+    assert len(batch) == n
+    
+    for i in range(n):
+        expected = simulator.simulate_impact(
+            AsteroidProperties(diameter[i], density[i], velocity[i], angle[i], COMPOSITION_CODES[composition[i]]),
+            ImpactLocation(0, 0, TERRAIN_CODES[terrain[i]], 0)
+        )
+        actual = batch.row(i)
+        for field in ("crater_diameter", "crater_depth", "energy_released", "seismic_magnitude",
+                      "affected_area", "economic_damage"):
+            assert np.isclose(getattr(actual, field), getattr(expected, field), rtol=1e-9), field
+        assert abs(actual.casualties_estimate - expected.casualties_estimate) <= 1
+        assert actual.tsunami_risk == expected.tsunami_risk
+        for key, value in expected.atmospheric_effects.items():
+            assert np.isclose(actual.atmospheric_effects[key], value, rtol=1e-9), key
+
+def test_batch_throughput():
+    simulator = ImpactSimulator()
+    n = 500_000
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    batch = simulator.simulate_batch(rng.uniform(0.01, 5, n), 2500, rng.uniform(11, 40, n), 45, 0, 1)
+    elapsed = time.perf_counter() - start
+    print(f"{n:,} escenarios en {elapsed:.3f} s ({n / elapsed:,.0f} escenarios/s)")
+    assert len(batch) == n
+
+if __name__ == "__main__":
+    test_batch_matches_scalar()
+    test_batch_throughput()
+    print("✅ Pruebas del modo por lotes completadas")
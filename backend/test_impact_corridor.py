@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el corredor de impacto y las víctimas por lotes
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+import app as app_module
+from services.demographic_service import DemographicService
+from simulation.impact_corridor import (EARTH_RADIUS_KM, GM_EARTH, capture_radius, gmst, sample_impact_corridor,
+                                        trace_to_surface, velocity_from_radiant)
+from simulation.orbit_propagation import J2000_JD
+
+EPOCH = J2000_JD + 9000.3
+
+def test_central_and_grazing_trajectories():
+    v_inf = velocity_from_radiant(15.0, 100.0, 20.0)
+    lat, lon, angle = trace_to_surface(v_inf, np.zeros((1, 3)), EPOCH)
+    # Trayectoria central: cae en el punto subradiante, en vertical
+    assert abs(lat[0] - 20.0) < 1e-9 and angle[0] == 90.0
+    expected_lon = (100.0 - np.degrees(gmst(EPOCH)) + 180.0) % 360.0 - 180.0
+    assert abs(lon[0] - expected_lon) < 1e-9
+
+    # Perpendicular a la llegada, al borde del radio de captura: impacto rasante
+    perpendicular = np.cross(v_inf, [0.0, 0.0, 1.0])
+    perpendicular /= np.linalg.norm(perpendicular)
+    radius = capture_radius(15.0)
+    _, _, angles = trace_to_surface(v_inf, np.outer([0.999 * radius, 1.001 * radius], perpendicular), EPOCH)
+    assert angles[0] < 5 and np.isnan(angles[1])
+
+def test_corridor_samples_are_impacts():
+    v_inf = velocity_from_radiant(12.0, 250.0, -35.0)
+    corridor = sample_impact_corridor(v_inf, EPOCH, n_samples=5000, seed=3)
+    assert len(corridor) == 5000
+    assert not np.isnan(corridor.lat).any()
+    assert np.all((corridor.impact_angle >= 0) & (corridor.impact_angle <= 90))
+    assert np.all(np.hypot(corridor.xi, corridor.zeta) < corridor.capture_radius)
+    assert 0 < corridor.impact_fraction < 1
+    assert abs(corridor.impact_velocity - np.sqrt(12.0 ** 2 + 2 * GM_EARTH / EARTH_RADIUS_KM)) < 1e-9
+    # Reproducible con semilla
+    again = sample_impact_corridor(v_inf, EPOCH, n_samples=5000, seed=3)
+    assert np.array_equal(corridor.lon, again.lon)
+
+def test_earth_rotation_shifts_longitude():
+    v_inf = velocity_from_radiant(20.0, 30.0, 10.0)
+    rng = np.random.default_rng(1)
+    b_vectors = np.cross(v_inf, rng.normal(0, 1, (500, 3)))
+    b_vectors *= (rng.uniform(0, 0.95, 500) * capture_radius(20.0) / np.linalg.norm(b_vectors, axis=1))[:, None]
+    sidereal_hours = 6 / 1.00273790935
+    lat, lon, _ = trace_to_surface(v_inf, b_vectors, EPOCH)
+    later_lat, later_lon, _ = trace_to_surface(v_inf, b_vectors, EPOCH + sidereal_hours / 24)
+    # Un cuarto de vuelta sidérea: misma latitud, 90° más al oeste
+    assert np.allclose(lat, later_lat)
+    assert np.allclose((lon - later_lon) % 360.0, 90.0, atol=1e-6)
+
+    spread = sample_impact_corridor(v_inf, EPOCH, n_samples=2000, seed=1, sigma=(0.0, 0.0), time_sigma_hours=4)
+    assert np.ptp(spread.lat) < 1e-9 and np.ptp(spread.lon) > 60
+
+def test_batch_casualties_match_single_point():
+    service = DemographicService(enable_nominatim=False)
+    rng = np.random.default_rng(0)
+    lats = np.r_[40.71, 35.67, 0.0, rng.uniform(-60, 70, 30)]
+    lons = np.r_[-74.0, 139.65, -30.0, rng.uniform(-180, 180, 30)]
+    crater = np.r_[5.0, 20.0, 10.0, rng.uniform(0.005, 30, 30)]
+    energy = np.r_[100.0, 5000.0, 600.0, rng.uniform(0.1, 3000, 30)]
+
+    batch = service.estimate_casualties_batch(lats, lons, crater, energy)
+    for k in range(len(lats)):
+        single = service.estimate_casualties(lats[k], lons[k], crater[k], energy[k])
+        expected = single["total_casualties"]
+        assert abs(batch["total_casualties"][k] - expected) <= max(0.01 * expected, 100), k
+        if "additional_effects" in single:
+            assert batch["tsunami_risk"][k] == single["additional_effects"]["tsunami_risk"]
+
+def test_corridor_throughput():
+    service = DemographicService(enable_nominatim=False)
+    start = time.perf_counter()
+    corridor = sample_impact_corridor(velocity_from_radiant(17.0, 60.0, 25.0), EPOCH, n_samples=20000, seed=2)
+    casualties = service.estimate_casualties_batch(corridor.lat, corridor.lon, 8.0, 2000.0)
+    elapsed = time.perf_counter() - start
+    print(f"Corredor de 20000 impactos con víctimas: {elapsed:.2f} s")
+    assert len(casualties["total_casualties"]) == 20000
+    assert elapsed < 30
+
+def test_endpoint():
+    client = TestClient(app_module.app)
+    body = {"asteroid_id": "custom-asteroid", "asteroid_diameter": 0.3, "epoch": "2029-04-13T21:46",
+            "radiant": {"ra": 120, "dec": 10}, "v_inf": 7.4, "n_samples": 3000, "seed": 1, "max_points": 100}
+    result = client.post("/api/impact-corridor", json=body).json()
+    assert result["n_samples"] == 3000 and len(result["corridor"]) == 100
+    assert result["expected_casualties"] <= result["worst_case"]["casualties"]
+    assert result["casualty_percentiles"]["p50"] <= result["casualty_percentiles"]["p99"]
+    assert 0 <= result["ocean_fraction"] <= 1
+
+    catalog = client.post("/api/impact-corridor", json=dict(body, asteroid_id="2025-IMPACT", v_inf=None)).json()
+    assert catalog["v_inf_kms"] == 18.5
+
+    assert client.post("/api/impact-corridor", json=dict(body, radiant=None)).status_code == 400
+    assert client.post("/api/impact-corridor", json=dict(body, epoch="tomorrow")).status_code == 400
+    assert client.post("/api/impact-corridor", json=dict(body, asteroid_id="nope")).status_code == 404
+    assert client.post("/api/impact-corridor", json=dict(body, n_samples=10 ** 6)).status_code == 400
+
+if __name__ == "__main__":
+    print("🧪 Probando el corredor de impacto\n")
+    test_central_and_grazing_trajectories()
+    test_corridor_samples_are_impacts()
+    test_earth_rotation_shifts_longitude()
+    test_batch_casualties_match_single_point()
+    test_corridor_throughput()
+    test_endpoint()
+    print("\n✅ Pruebas del corredor de impacto completadas")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la máscara tierra/agua
+"""
+
+import os
+import tempfile
+import time
+import numpy as np
+from services.land_mask import LandMask, rasterize_geojson, save_mask, DEFAULT_GEOJSON_PATH
+
+_mask = None
+
+def get_mask():
+    global _mask
+    if _mask is None:
+        path = os.path.join(tempfile.mkdtemp(), "land_mask.npy")
+        save_mask(rasterize_geojson(DEFAULT_GEOJSON_PATH, 0.1), path)
+        _mask = LandMask.load(path)
+    return _mask
+
+def test_known_points():
+    mask = get_mask()
+    land = {"Nueva York": (40.71, -74.0), "Madrid": (40.4, -3.7), "Sahara": (23.0, 10.0),
+            "Delhi": (28.7, 77.1), "Sídney": (-33.87, 151.2), "Antártida": (-80.0, 0.0)}
+    water = {"Mediterráneo": (35.0, 18.0), "Golfo de México": (25.0, -90.0), "Atlántico": (10.0, -40.0),
+             "Índico": (-10.0, 75.0), "Mar Arábigo": (15.0, 65.0), "Mar Negro": (43.0, 34.0),
+             "Caspio": (42.0, 51.0), "Bahía de Hudson": (60.0, -85.0), "Pacífico": (0.0, -150.0)}
+    for name, (lat, lon) in land.items():
+        assert mask.is_land(lat, lon), name
+    for name, (lat, lon) in water.items():
+        assert not mask.is_land(lat, lon), name
+
+def test_packed_and_memory_mapped():
+    mask = get_mask()
+    assert isinstance(mask.packed, np.memmap)
+    assert mask.packed.dtype == np.uint8
+    assert mask.packed.shape == (1800, 450)
+    assert mask.resolution == 0.1
+
+def test_vectorized_matches_scalar():
+    mask = get_mask()
+    rng = np.random.default_rng(3)
+    lats, lons = rng.uniform(-90, 90, 20_000), rng.uniform(-180, 180, 20_000)
+    start = time.perf_counter()
+    vectorized = mask.is_land_array(lats, lons)
+    elapsed = time.perf_counter() - start
+    print(f"20.000 puntos en {elapsed * 1e3:.2f} ms, tierra: {vectorized.mean():.0%}")
+    assert list(vectorized[:500]) == [mask.is_land(a, b) for a, b in zip(lats[:500], lons[:500])]
+    assert 0.2 < vectorized.mean() < 0.4
+
+def test_water_fraction():
+    mask = get_mask()
+    assert mask.water_fraction(0.0, -150.0, 500) == 1.0
+    assert mask.water_fraction(23.0, 10.0, 500) == 0.0
+    coast = mask.water_fraction(40.71, -74.0, 300)
+    print(f"Agua a 300 km de Nueva York: {coast:.0%}")
+    assert 0.1 < coast < 0.9
+
+if __name__ == "__main__":
+    print("🧪 Probando la máscara tierra/agua\n")
+    test_known_points()
+    test_packed_and_memory_mapped()
+    test_vectorized_matches_scalar()
+    test_water_fraction()
+    print("\n✅ Pruebas de la máscara completadas")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el motor Monte Carlo de incertidumbre
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from simulation.monte_carlo import MonteCarloSimulator, Distribution
+
+def test_reproducible_with_seed():
+    simulator = MonteCarloSimulator(chunk_size=20_000)
+    kwargs = dict(
+        diameter={"type": "uniform", "low": 0.3, "high": 0.4},
+        density={"type": "normal", "mean": 2500, "std": 500, "low": 500, "high": 8000},
+        velocity={"type": "normal", "mean": 18, "std": 2, "low": 11.2, "high": 72},
+        n_samples=50_000, seed=1234
+    )
+    first = simulator.run(**kwargs)
+    # Los bloques repartidos (en cualquier orden de ejecución) dan el mismo resultado
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        second = simulator.run(**kwargs, map_chunks=lambda fn, tasks: list(pool.map(fn, tasks)))
+    
+    print(f"Energía p50: {first['metrics']['energy_megatons']['percentiles']['p50']:.1f} Mt")
+    assert first["metrics"] == second["metrics"]
+    
+    energy = first["metrics"]["energy_megatons"]["percentiles"]
+    assert energy["p5"] < energy["p50"] < energy["p95"]
+
+def test_fixed_inputs_collapse_percentiles():
+    result = MonteCarloSimulator().run(diameter=1.0, density=2500, velocity=20, angle=90, n_samples=1000, seed=0)
+    crater = result["metrics"]["crater_diameter_km"]
+    assert crater["std"] == 0 and crater["min"] == crater["max"]
+
+def test_impact_angle_distribution():
+    angles = Distribution("impact_angle").sample(np.random.default_rng(0), 200_000)
+    assert 0 <= angles.min() and angles.max() <= 90
+    assert abs(np.median(angles) - 45) < 0.5
+
+def test_million_samples():
+    start = time.perf_counter()
+    result = MonteCarloSimulator().run(diameter={"type": "lognormal", "median": 0.5, "sigma": 0.3},
+                                       density=2500, velocity=20, n_samples=1_000_000, seed=7)
+    elapsed = time.perf_counter() - start
+    print(f"1e6 muestras en {elapsed:.2f} s")
+    assert result["n_samples"] == 1_000_000
+
+if __name__ == "__main__":
+    test_reproducible_with_seed()
+    test_fixed_inputs_collapse_percentiles()
+    test_impact_angle_distribution()
+    test_million_samples()
+    print("✅ Pruebas Monte Carlo completadas")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el cliente asíncrono de NASA API (sin acceso a la red)
+"""
+
+import sys
+sys.path.append('.')
+import asyncio
+import time
+import httpx
+from services.nasa_api_async import AsyncNASAApiService
+
+def make_service(handler):
+    service = AsyncNASAApiService(api_key="TEST", max_concurrency=2)
+    service._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return service
+
+def test_concurrent_requests_share_one_fetch():
+    requests_seen = []
+    
+    async def handler(request):
+        requests_seen.append(request.url.path)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"near_earth_objects": {"2025-10-01": []}})
+    
+    async def run():
+        service = make_service(handler)
+        results = await asyncio.gather(*[service.get_processed_asteroids(limit=10) for _ in range(20)])
+        await service.aclose()
+        return service, results
+    
+    service, results = asyncio.run(run())
+    print(f"Peticiones a NASA: {len(requests_seen)} | Stats: {service.get_cache_stats()['processed_asteroids']}")
+    assert requests_seen == ["/neo/rest/v1/feed"]
+    assert all(len(result) == 5 for result in results)
+
+def test_errors_fall_back_to_empty():
+    async def handler(request):
+        return httpx.Response(503)
+    
+    async def run():
+        service = make_service(handler)
+        feed = await service.get_neo_feed()
+        details = await service.get_asteroid_details("3542519")
+        cad = await service.get_close_approach_data()
+        await service.aclose()
+        return feed, details, cad
+    
+    feed, details, cad = asyncio.run(run())
+    assert feed == {} and details == {} and cad == []
+
+def test_cad_rows_parsed():
+    async def handler(request):
+        assert "api_key" not in request.url.params
+        return httpx.Response(200, json={"fields": ["des", "dist"], "data": [["2025 RR", "0.01"]]})
+    
+    async def run():
+        service = make_service(handler)
+        cad = await service.get_close_approach_data()
+        await service.aclose()
+        return cad
+    
+    assert asyncio.run(run()) == [{"des": "2025 RR", "dist": "0.01"}]
+
+class SlowFeedStore:
+    """Almacén con E/S bloqueante lenta (como SQLite en un disco lento)"""
+    def plan_fetch(self, start_date, end_date):
+        time.sleep(0.2)
+        return [(start_date, end_date)]
+    
+    def save_feed(self, raw_data, start_date, end_date):
+        time.sleep(0.2)
+        self.raw_data = raw_data
+    
+    def load_feed(self, start_date, end_date):
+        time.sleep(0.2)
+        return self.raw_data
+
+def test_refresh_does_not_block_event_loop():
+    async def handler(request):
+        return httpx.Response(200, json={"near_earth_objects": {"2025-10-01": []}})
+    
+    async def run():
+        service = make_service(handler)
+        service.feed_store = SlowFeedStore()
+        # Los listeners (repuntuación del catálogo) también se ejecutan fuera del event loop
+        service.add_refresh_listener(lambda asteroids: time.sleep(0.2))
+        ticks = 0
+        task = asyncio.ensure_future(service.refresh_processed_asteroids())
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        await service.aclose()
+        return await task, ticks
+    
+    asteroids, ticks = asyncio.run(run())
+    assert len(asteroids) == 5 and ticks > 40
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_one_fetch()
+    test_errors_fall_back_to_empty()
+    test_cad_rows_parsed()
+    test_refresh_does_not_block_event_loop()
+    print("✅ Pruebas del cliente asíncrono completadas")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la descarga paginada del catálogo NeoWs (sin acceso a la red)
+"""
+
+import tempfile
+import threading
+import time
+import numpy as np
+from services.nasa_api import NASAApiService
+from services.neo_ingest import NeoBrowseIngester, load_catalog_columns, select_close_approach
+
+TOTAL_ELEMENTS = 95
+
+def make_neo(index):
+    return {
+        "id": str(2000000 + index),
+        "name": f"({index} TEST)",
+        "estimated_diameter": {"kilometers": {"estimated_diameter_min": 0.01 * index,
+                                              "estimated_diameter_max": 0.02 * index}},
+        "is_potentially_hazardous_asteroid": index % 7 == 0,
+        "absolute_magnitude_h": 20.0,
+        # Historial completo en orden cronológico; el objeto 5 no tiene aproximaciones
+        "close_approach_data": [] if index == 5 else [{
+            "close_approach_date": "1905-03-01",
+            "relative_velocity": {"kilometers_per_hour": 3600 * 99},
+            "miss_distance": {"kilometers": 5e7},
+            "orbiting_body": "Earth"
+        }, {
+            "close_approach_date": "2029-06-01",
+            "relative_velocity": {"kilometers_per_hour": 3600 * 40},
+            "miss_distance": {"kilometers": 9e7},
+            "orbiting_body": "Mars"
+        }, {
+            "close_approach_date": "2030-01-01",
+            "relative_velocity": {"kilometers_per_hour": 3600 * 10},
+            "miss_distance": {"kilometers": 1e6 + index},
+            "orbiting_body": "Earth"
+        }]
+    }
+
+class FakeBrowseService(NASAApiService):
+    def __init__(self, fail_from_page=None, delay=0.0):
+        super().__init__(api_key="TEST")
+        self.fail_from_page = fail_from_page
+        self.delay = delay
+        self.requested = []
+        self.active = 0
+        self.max_active = 0
+        self._count_lock = threading.Lock()
+
+    def get_potentially_hazardous_asteroids(self, page=0, size=20):
+        with self._count_lock:
+            self.requested.append(page)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.fail_from_page is not None and page >= self.fail_from_page:
+                # Cuota agotada: el circuito de api.nasa.gov se abre
+                self._circuit_breaker(self.base_urls["neo"]).record_response(429, {"Retry-After": "3600"})
+                return {}
+            total_pages = (TOTAL_ELEMENTS + size - 1) // size
+            objects = [make_neo(i) for i in range(page * size, min(TOTAL_ELEMENTS, (page + 1) * size))]
+            return {"page": {"size": size, "total_elements": TOTAL_ELEMENTS, "total_pages": total_pages,
+                             "number": page},
+                    "near_earth_objects": objects}
+        finally:
+            with self._count_lock:
+                self.active -= 1
+
+def test_full_ingest_is_columnar():
+    directory = tempfile.mkdtemp()
+    service = FakeBrowseService(delay=0.01)
+    summary = NeoBrowseIngester(service, directory=directory, max_workers=2, page_size=10).run()
+    print(f"Resumen: {summary}")
+    assert summary["completed_pages"] == summary["total_pages"] == 10
+    assert not summary["interrupted"]
+    assert service.max_active <= 2
+
+    columns = load_catalog_columns(directory)
+    assert len(columns["id"]) == TOTAL_ELEMENTS
+    assert columns["relative_velocity_km_s"].dtype.kind == "f"
+    assert columns["relative_velocity_km_s"][0] == 10.0
+    assert columns["is_potentially_hazardous_asteroid"].sum() == len(range(0, TOTAL_ELEMENTS, 7))
+    assert columns["name"][3] == "3 TEST"
+    # Se guarda la próxima aproximación, no la primera del historial
+    assert columns["close_approach_date"][0] == "2030-01-01" and columns["miss_distance_km"][0] == 1e6
+    assert columns["name"][5] == "5 TEST" and np.isnan(columns["relative_velocity_km_s"][5])
+
+def test_select_close_approach():
+    approaches = [{"close_approach_date": day, "orbiting_body": "Earth"}
+                  for day in ("1950-06-01", "2031-02-03", "2026-11-20")]
+    # Historial mezclado: las aproximaciones a otros cuerpos se ignoran
+    approaches += [{"close_approach_date": day, "orbiting_body": body}
+                   for day, body in (("2026-10-20", "Mars"), ("2035-01-01", "Juptr"), ("2027-03-03", "Moon"))]
+    assert select_close_approach(approaches, "2026-10-16")["close_approach_date"] == "2026-11-20"
+    # Si todas son pasadas, la más reciente
+    assert select_close_approach(approaches, "2040-01-01")["close_approach_date"] == "2031-02-03"
+    assert select_close_approach(approaches[3:], "2026-10-16") is None
+    assert select_close_approach([], "2026-10-16") is None
+
+def test_resume_after_interruption():
+    directory = tempfile.mkdtemp()
+    first = NeoBrowseIngester(FakeBrowseService(), directory=directory, page_size=10).run(max_pages=4)
+    assert first["completed_pages"] == 4
+    assert first["remaining_pages"] == 6
+
+    service = FakeBrowseService()
+    second = NeoBrowseIngester(service, directory=directory, page_size=10).run()
+    assert second["completed_pages"] == 10
+    assert sorted(service.requested) == list(range(4, 10))
+
+def test_stops_when_rate_limited():
+    directory = tempfile.mkdtemp()
+    service = FakeBrowseService(fail_from_page=3)
+    summary = NeoBrowseIngester(service, directory=directory, max_workers=1, page_size=10).run()
+    assert summary["interrupted"]
+    assert summary["completed_pages"] == 3
+    # Con el circuito abierto no se siguen pidiendo páginas
+    assert max(service.requested) == 3
+    assert len(load_catalog_columns(directory)["id"]) == 30
+
+if __name__ == "__main__":
+    print("🧪 Probando la descarga del catálogo NeoWs\n")
+    test_full_ingest_is_columnar()
+    test_select_close_approach()
+    test_resume_after_interruption()
+    test_stops_when_rate_limited()
+    print("\n✅ Pruebas de descarga del catálogo completadas")
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la propagación orbital y la búsqueda de aproximaciones
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import time
+import numpy as np
+from fastapi.testclient import TestClient
+import app as app_module
+from simulation.orbit_propagation import (AU_KM, J2000_JD, OrbitalElements, earth_state, find_close_approaches,
+                                          parse_sbdb_elements, propagate, solve_kepler)
+
+def grazing_orbit(jd, inclination=10.0):
+    """Órbita circular que cruza la posición de la Tierra justo en `jd`"""
+    position, _ = earth_state(np.array([jd]))
+    x, y, _ = position[0]
+    node = np.degrees(np.arctan2(y, x))
+    return {"designation": "grazer", "a": float(np.hypot(x, y)), "e": 0.0, "i": inclination,
+            "om": node, "w": 0.0, "ma": 0.0, "epoch": jd}
+
+def random_elements(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return OrbitalElements.from_arrays(rng.uniform(0.8, 3, n), rng.uniform(0, 0.7, n), rng.uniform(0, 30, n),
+                                       rng.uniform(0, 360, n), rng.uniform(0, 360, n), rng.uniform(0, 360, n),
+                                       J2000_JD, names=[str(k) for k in range(n)])
+
+def test_kepler_solver_residuals():
+    rng = np.random.default_rng(2)
+    M = rng.uniform(-10, 10, (200, 300))
+    e = rng.uniform(0, 0.99, (200, 1))
+    E = solve_kepler(M, e)
+    residual = E - e * np.sin(E) - np.remainder(M, 2 * np.pi)
+    assert E.shape == M.shape
+    assert np.abs(residual).max() < 1e-12
+
+def test_orbits_close_after_one_period():
+    elements = random_elements(50)
+    period = 2 * np.pi / elements.mean_motion
+    start = propagate(elements, [J2000_JD])[:, 0]
+    # Cada objeto vuelve al mismo punto tras su propio periodo
+    after = np.stack([propagate(elements.subset([k]), [J2000_JD + period[k]])[0, 0] for k in range(50)])
+    assert np.abs(after - start).max() < 1e-9
+
+    circular = OrbitalElements.from_arrays(1.5, 0.0, 20, 40, 0, 0, J2000_JD)
+    radius = np.linalg.norm(propagate(circular, np.linspace(J2000_JD, J2000_JD + 2000, 50)), axis=-1)
+    assert np.allclose(radius, 1.5)
+
+def test_earth_orbit():
+    jd = np.linspace(J2000_JD, J2000_JD + 365.25, 400)
+    position, velocity = earth_state(jd)
+    distance = np.linalg.norm(position, axis=-1)
+    speed = np.linalg.norm(velocity, axis=-1) * AU_KM / 86400
+    assert 0.982 < distance.min() < 0.984 and 1.016 < distance.max() < 1.018
+    assert 29.2 < speed.min() and speed.max() < 30.4
+    # Perihelio a principios de enero
+    assert jd[np.argmin(distance)] - J2000_JD < 5
+
+def test_finds_grazing_encounter():
+    encounter = J2000_JD + 1234.3
+    elements = OrbitalElements.from_records([grazing_orbit(encounter)])
+    approaches = find_close_approaches(elements, J2000_JD, J2000_JD + 3652.5, max_distance_au=0.01)
+    print(f"Encuentro rasante: {approaches}")
+    assert len(approaches) == 1
+    assert abs(approaches[0]["jd"] - encounter) < 0.05
+    assert approaches[0]["distance_au"] < 1e-4
+    # 2·v·sin(i/2) para dos órbitas casi circulares que se cruzan en el nodo
+    assert 4.5 < approaches[0]["relative_velocity_km_s"] < 5.8
+
+def test_matches_fine_brute_force():
+    elements = random_elements(300, seed=5)
+    start, end = J2000_JD, J2000_JD + 3 * 365.25
+    approaches = find_close_approaches(elements, start, end, max_distance_au=0.05)
+
+    jd = np.arange(start, end, 0.05)
+    earth, _ = earth_state(jd)
+    distance = np.linalg.norm(propagate(elements, jd) - earth[None], axis=-1)
+    closest = distance.min(axis=1)
+    found = {}
+    for approach in approaches:
+        found[approach["designation"]] = min(found.get(approach["designation"], 1.0), approach["distance_au"])
+    expected = {str(k) for k in np.nonzero(closest < 0.049)[0]}
+    print(f"{len(approaches)} aproximaciones de {len(expected)} objetos esperados")
+    assert expected <= set(found)
+    for name in expected:
+        # El refinado nunca es peor que la rejilla fina
+        assert found[name] <= closest[int(name)] + 1e-9
+
+def test_moid_prefilter_and_sbdb_parsing():
+    sbdb = {
+        "object": {"fullname": "99942 Apophis (2004 MN4)", "des": "99942"},
+        "orbit": {"epoch": "2461000.5", "moid": "0.000256",
+                  "elements": [{"name": name, "value": value} for name, value in
+                               [("e", "0.1911"), ("a", "0.9223"), ("q", "0.746"), ("i", "3.34"),
+                                ("om", "203.9"), ("w", "126.7"), ("ma", "142.2")]]}
+    }
+    record = parse_sbdb_elements(sbdb)
+    assert record["designation"] == "99942 Apophis (2004 MN4)" and record["moid"] == 0.000256
+    assert record["epoch"] == 2461000.5 and record["a"] == 0.9223
+
+    try:
+        parse_sbdb_elements({"orbit": {"epoch": "2461000.5", "elements": [{"name": "e", "value": "1.2"}]}})
+        assert False, "debía rechazar elementos incompletos"
+    except ValueError:
+        pass
+
+    grazer = dict(grazing_orbit(J2000_JD + 100), moid=0.3)
+    assert find_close_approaches(OrbitalElements.from_records([grazer]), J2000_JD, J2000_JD + 365) == []
+
+def test_screening_throughput():
+    elements = random_elements(2000, seed=9)
+    start = time.perf_counter()
+    approaches = find_close_approaches(elements, J2000_JD, J2000_JD + 10 * 365.25, max_distance_au=0.05)
+    elapsed = time.perf_counter() - start
+    print(f"2000 objetos × 10 años: {len(approaches)} aproximaciones en {elapsed:.2f} s")
+    assert elapsed < 60
+
+def test_endpoints():
+    client = TestClient(app_module.app)
+    grazer = grazing_orbit(J2000_JD + 9500.0)
+    response = client.post("/api/close-approaches/screen", json={
+        "objects": [grazer], "start_date": "2025-01-01", "years": 2, "max_distance_au": 0.01
+    })
+    assert response.status_code == 200
+    assert [approach["designation"] for approach in response.json()["close_approaches"]] == ["grazer"]
+    assert client.post("/api/close-approaches/screen", json={"objects": [grazer], "years": 500}).status_code == 400
+    assert client.post("/api/close-approaches/screen", json={"objects": [dict(grazer, e=1.5)]}).status_code == 400
+
+    async def fake_sbdb(designation):
+        return {"object": {"fullname": designation},
+                "orbit": {"epoch": str(grazer["epoch"]), "moid": "0.00001",
+                          "elements": [{"name": name, "value": str(grazer[name])}
+                                       for name in ("a", "e", "i", "om", "w", "ma")]}}
+
+    service = app_module.nasa_service
+    saved = service.get_small_body_data
+    service.get_small_body_data = fake_sbdb
+    try:
+        result = client.get("/api/close-approaches/grazer", params={"start_date": "2025-01-01", "years": 2}).json()
+        assert result["designation"] == "grazer" and len(result["close_approaches"]) == 1
+        assert client.get("/api/close-approaches/grazer", params={"start_date": "soon"}).status_code == 400
+    finally:
+        service.get_small_body_data = saved
+
+if __name__ == "__main__":
+    print("🧪 Probando la propagación orbital\n")
+    test_kepler_solver_residuals()
+    test_orbits_close_after_one_period()
+    test_earth_orbit()
+    test_finds_grazing_encounter()
+    test_matches_fine_brute_force()
+    test_moid_prefilter_and_sbdb_parsing()
+    test_screening_throughput()
+    test_endpoints()
+    print("\n✅ Pruebas de propagación orbital completadas")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el núcleo físico común de los impactos
+"""
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import numpy as np
+from fastapi.testclient import TestClient
+import app as app_module
+from simulation.impact_simulator import AsteroidProperties, ImpactLocation, ImpactSimulator
+from simulation.physics import COMPOSITION_CODES, atmospheric_effects, impact_physics
+
+FIELDS = ("mass_kg", "energy_joules", "energy_megatons", "crater_diameter_km", "crater_depth_km",
+          "seismic_magnitude", "affected_area_km2")
+
+def test_scalar_and_batch_paths_agree():
+    rng = np.random.default_rng(4)
+    n = 300
+    diameters = rng.uniform(0.001, 20, n)
+    velocities = rng.uniform(11, 72, n)
+    angles = rng.uniform(5, 90, n)
+    densities = np.where(rng.random(n) < 0.3, np.nan, rng.uniform(500, 8000, n))
+    densities[:10] = 0.0
+    codes = rng.integers(0, len(COMPOSITION_CODES), n)
+
+    batch = impact_physics(diameters, velocities, angles, densities, codes)
+    for k in range(n):
+        density = None if np.isnan(densities[k]) else densities[k]
+        single = impact_physics(diameters[k], velocities[k], angles[k], density, COMPOSITION_CODES[codes[k]])
+        for field in FIELDS:
+            assert np.isclose(getattr(batch, field)[k], getattr(single, field), rtol=1e-12, atol=0), (field, k)
+
+    effects = atmospheric_effects(batch.energy_megatons)
+    for k in np.argsort(batch.energy_megatons)[-5:]:
+        assert effects["global_cooling"][k] == atmospheric_effects(float(batch.energy_megatons[k]))["global_cooling"]
+
+def test_density_composition_and_angle():
+    rocky = impact_physics(1.0, 20.0)
+    metallic = impact_physics(1.0, 20.0, composition="metallic")
+    explicit = impact_physics(1.0, 20.0, density=7800.0)
+    assert metallic.crater_diameter_km > rocky.crater_diameter_km
+    assert metallic.energy_megatons == explicit.energy_megatons
+    assert impact_physics(1.0, 20.0, density=0).energy_megatons == rocky.energy_megatons
+    # Solo cuenta la componente normal de la velocidad
+    oblique = impact_physics(1.0, 20.0, angle_deg=30)
+    assert abs(oblique.energy_joules / rocky.energy_joules - 0.25) < 1e-12
+    assert isinstance(rocky.energy_megatons, float)
+
+def test_simulator_uses_kernel():
+    simulator = ImpactSimulator()
+    asteroid = AsteroidProperties(diameter=0.5, density=1200.0, velocity=25.0, angle=60.0, composition="icy")
+    result = simulator.simulate_impact(asteroid, ImpactLocation(10.0, 20.0, "land", 0.0))
+    physics = impact_physics(0.5, 25.0, 60.0, 1200.0, "icy")
+    assert result.energy_released == physics.energy_megatons
+    assert result.crater_diameter == physics.crater_diameter_km
+
+    batch = simulator.simulate_batch([0.5, 2.0], [1200.0, 0.0], 25.0, [60.0, 30.0], [2, 1])
+    assert np.isclose(batch.energy_released[0], result.energy_released, rtol=1e-12, atol=0)
+    assert np.isclose(batch.crater_diameter[1], impact_physics(2.0, 25.0, 30.0, composition="metallic").crater_diameter_km,
+                      rtol=1e-12, atol=0)
+
+def test_endpoint_honours_density_and_composition():
+    client = TestClient(app_module.app)
+    body = {"asteroid_id": "custom-asteroid", "impact_location": {"lat": 0.0, "lon": -30.0},
+            "impact_velocity": 20.0, "impact_angle": 45, "asteroid_diameter": 0.5}
+    rocky = client.post("/api/simulation", json=body).json()
+    metallic = client.post("/api/simulation", json=dict(body, asteroid_composition="metallic")).json()
+    dense = client.post("/api/simulation", json=dict(body, asteroid_density=7800.0)).json()
+    assert metallic["crater_diameter"] > rocky["crater_diameter"]
+    assert metallic["energy_released"] == dense["energy_released"]
+    assert rocky["energy_released"] == impact_physics(0.5, 20.0, 45).energy_megatons
+
+if __name__ == "__main__":
+    print("🧪 Probando el núcleo físico\n")
+    test_scalar_and_batch_paths_agree()
+    test_density_composition_and_angle()
+    test_simulator_uses_kernel()
+    test_endpoint_honours_density_and_composition()
+    print("\n✅ Pruebas del núcleo físico completadas")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la rejilla local de población
+"""
+
+import math
+import os
+import tempfile
+import time
+import numpy as np
+from services.population_grid import PopulationGrid, build_synthetic_grid, save_grid
+from services.demographic_service import DemographicService
+
+CITY = {"test_city": {"lat": 10.0, "lon": 20.0, "population": 5_000_000, "density": 8000}}
+
+def make_grid(resolution=0.5):
+    path = os.path.join(tempfile.mkdtemp(), "population.npy")
+    save_grid(build_synthetic_grid(CITY, resolution=resolution), path)
+    return PopulationGrid.load(path)
+
+def test_grid_is_memory_mapped_and_resolution_inferred():
+    grid = make_grid(0.5)
+    assert isinstance(grid.density, np.memmap)
+    assert grid.resolution == 0.5
+    assert grid.density.shape == (360, 720)
+
+def test_uniform_grid_population_matches_area():
+    grid = PopulationGrid(np.full((360, 720), 100.0, dtype=np.float32))
+    expected = 100.0 * math.pi * 500 ** 2
+    population = grid.population_within(0.0, 0.0, 500)
+    print(f"Población en 500 km: {population:,.0f} (esperada {expected:,.0f})")
+    assert abs(population - expected) / expected < 0.05
+    # Radios por debajo de una celda: la celda central se integra como disco
+    assert abs(grid.population_within(0.0, 0.0, 1) - 100.0 * math.pi) < 1e-6
+
+def test_city_population_integrates_to_census():
+    grid = make_grid(0.1)
+    background = 25.0 * math.pi * 300 ** 2
+    population = grid.population_within(10.0, 20.0, 300) - background
+    print(f"Población de la ciudad sintética: {population:,.0f}")
+    assert abs(population - 5_000_000) / 5_000_000 < 0.1
+    assert grid.density_at(10.0, 20.0) > grid.density_at(12.0, 20.0)
+
+def test_wraps_around_antimeridian():
+    grid = PopulationGrid(np.full((180, 360), 10.0, dtype=np.float32))
+    east = grid.population_within(0.0, 179.9, 300)
+    west = grid.population_within(0.0, -179.9, 300)
+    assert abs(east - west) / east < 0.05
+
+def test_service_uses_grid_without_network():
+    service = DemographicService(population_grid=make_grid(0.25), enable_nominatim=False)
+    start = time.perf_counter()
+    info = service.calculate_population_density(10.0, 20.0)
+    elapsed = time.perf_counter() - start
+    print(f"Consulta: {elapsed * 1e3:.2f} ms, tipo {info['region_type']}")
+    assert info["data_source"] == "population_grid"
+    assert info["region_type"].startswith("urban")
+    assert elapsed < 0.1
+
+def closed_form_casualties(density, inner, outer, base):
+    """∫ ρ·2πr·base·(1 - r/2R) dr entre inner y outer (R = outer)"""
+    return 2 * math.pi * density * base * ((outer ** 2 - inner ** 2) / 2 - (outer ** 3 - inner ** 3) / (6 * outer))
+
+def test_zone_integration_matches_closed_form():
+    radii, bases = [5.0, 20.0, 40.0], [0.85, 0.45, 0.08]
+    inner = [0.0] + radii[:-1]
+    expected = [closed_form_casualties(100.0, r0, r1, b) for r0, r1, b in zip(inner, radii, bases)]
+    
+    # Densidad uniforme sin rejilla (factor de distribución rural 0.9)
+    service = DemographicService(use_population_grid=False, enable_nominatim=False)
+    _, casualties = service._integrate_zones(0.0, 0.0, radii, bases, 1.0, 100.0 / 0.9)
+    for got, want in zip(casualties, expected):
+        assert abs(got - want) / want < 0.01
+    
+    # Rejilla uniforme: mismas zonas sumando celdas reales
+    grid = PopulationGrid(np.full((1800, 3600), 100.0, dtype=np.float32))
+    service = DemographicService(population_grid=grid, enable_nominatim=False)
+    populations, casualties = service._integrate_zones(0.0, 0.0, radii, bases, 1.0, 0.0)
+    print(f"Víctimas por zona: {casualties.round()} (analítico {[round(c) for c in expected]})")
+    assert abs(populations.sum() - 100.0 * math.pi * 40.0 ** 2) / populations.sum() < 0.05
+    for got, want in zip(casualties, expected):
+        assert abs(got - want) / want < 0.03
+
+def test_large_crater_single_pass():
+    service = DemographicService(population_grid=make_grid(0.1), enable_nominatim=False)
+    start = time.perf_counter()
+    result = service.estimate_casualties(10.0, 20.0, crater_diameter_km=200, energy_megatons=1e6)
+    elapsed = time.perf_counter() - start
+    print(f"Cráter de 200 km: {result['total_casualties']:,} víctimas en {elapsed * 1e3:.1f} ms")
+    zones = result["casualties_by_zone"]
+    assert zones["immediate_zone"]["population"] > 4_000_000
+    assert result["total_casualties"] <= result["total_affected_population"]
+    assert elapsed < 1.0
+
+if __name__ == "__main__":
+    print("🧪 Probando la rejilla de población\n")
+    test_grid_is_memory_mapped_and_resolution_inferred()
+    test_uniform_grid_population_matches_area()
+    test_city_population_integrates_to_census()
+    test_wraps_around_antimeridian()
+    test_service_uses_grid_without_network()
+    test_zone_integration_matches_closed_form()
+    test_large_crater_single_pass()
+    print("\n✅ Pruebas de la rejilla completadas")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la puntuación de riesgo vectorizada y el catálogo en columnas
+"""
+
+import sys
+sys.path.append('.')
+import json
+import time
+import numpy as np
+from services.asteroid_catalog import AsteroidCatalog, ColumnarCatalog
+from services.nasa_api import NASAApiService
+from services.neo_ingest import records_to_columns
+from services.risk_scoring import risk_factors, risk_levels, risk_scores
+
+def reference_risk_level(asteroid):
+    """Reglas originales de _calculate_risk_level, rama por rama"""
+    score = 0
+    diameter = asteroid.get("diameter_km_avg", 0)
+    if diameter > 1:
+        score += 3
+    elif diameter > 0.5:
+        score += 2
+    elif diameter > 0.1:
+        score += 1
+    velocity = asteroid.get("velocity_kms", 0)
+    if velocity > 20:
+        score += 3
+    elif velocity > 15:
+        score += 2
+    elif velocity > 10:
+        score += 1
+    distance_au = asteroid.get("distance_au", float('inf'))
+    if distance_au < 0.05:
+        score += 3
+    elif distance_au < 0.1:
+        score += 2
+    elif distance_au < 0.2:
+        score += 1
+    if asteroid.get("is_potentially_hazardous", False):
+        score += 2
+    return "HIGH" if score >= 7 else "MEDIUM" if score >= 4 else "LOW"
+
+def random_asteroids(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # Incluye los valores exactos de los umbrales
+    diameters = rng.choice([0.05, 0.1, 0.3, 0.5, 0.7, 1.0, 2.0], n) * rng.choice([1.0, 1.01], n)
+    velocities = rng.choice([5.0, 10.0, 12.0, 15.0, 18.0, 20.0, 25.0], n)
+    distances = rng.choice([0.01, 0.05, 0.07, 0.1, 0.15, 0.2, 0.5], n)
+    hazardous = rng.random(n) < 0.3
+    return [{"diameter_km_avg": float(d), "velocity_kms": float(v), "distance_au": float(a),
+             "is_potentially_hazardous": bool(h)}
+            for d, v, a, h in zip(diameters, velocities, distances, hazardous)]
+
+def test_matches_scalar_rules():
+    asteroids = random_asteroids(5000)
+    asteroids.append({})
+    expected = [reference_risk_level(asteroid) for asteroid in asteroids]
+    service = NASAApiService(api_key="TEST")
+    assert service._calculate_risk_levels(asteroids) == expected
+    assert [service._calculate_risk_level(asteroid) for asteroid in asteroids[:200]] == expected[:200]
+
+def test_risk_factors_match_endpoint_formula():
+    diameter, velocity, distance = 3.2, 17.5, 12000000.0
+    factors = risk_factors([diameter], [velocity], [distance])
+    size = min(diameter / 10, 1.0)
+    velocity_factor = min(velocity / 30, 1.0)
+    proximity = max(0, 1 - (distance / 50000000))
+    assert factors["size"][0] == size
+    assert factors["velocity"][0] == velocity_factor
+    assert factors["proximity"][0] == proximity
+    assert factors["overall"][0] == (size + velocity_factor + proximity) / 3
+    assert risk_levels(risk_scores([2.0], [25.0], [0.01], [True]))[0] == "HIGH"
+
+def test_catalog_rescoring_is_fast():
+    n = 50000
+    rng = np.random.default_rng(1)
+    columns = {
+        "id": np.arange(n).astype(np.str_),
+        "name": np.arange(n).astype(np.str_),
+        "diameter_km": rng.uniform(0.01, 5, n),
+        "diameter_km_avg": rng.uniform(0.01, 5, n),
+        "velocity_kms": rng.uniform(5, 30, n),
+        "distance_km": rng.uniform(1e5, 1e8, n),
+        "is_hazardous": rng.random(n) < 0.1,
+        "absolute_magnitude_h": rng.uniform(15, 28, n)
+    }
+    catalog = ColumnarCatalog(columns)
+    start = time.perf_counter()
+    catalog.rescore()
+    elapsed = time.perf_counter() - start
+    print(f"Repuntuación de {n} objetos: {elapsed * 1000:.1f} ms | {catalog.get_stats()}")
+    assert elapsed < 0.5
+
+    row = 1234
+    expected = reference_risk_level({
+        "diameter_km_avg": columns["diameter_km_avg"][row], "velocity_kms": columns["velocity_kms"][row],
+        "distance_au": columns["distance_km"][row] / 149597870.7,
+        "is_potentially_hazardous": bool(columns["is_hazardous"][row])
+    })
+    assert catalog.get_risk(str(row))["risk_level"] == expected
+
+def test_bulk_catalog_merged_with_index():
+    historical = NASAApiService(api_key="TEST")._get_historical_dangerous_asteroids()
+    catalog = AsteroidCatalog(historical_asteroids=historical)
+    bulk = [dict(historical[0], estimated_diameter_km_max=99.0),
+            {"id": "2000433", "name": "433 Eros", "estimated_diameter_km_min": 16.0,
+             "estimated_diameter_km_max": 36.0, "relative_velocity_km_s": 5.6,
+             "miss_distance_km": 2.6e7, "is_potentially_hazardous_asteroid": False,
+             "close_approach_date": "1900-12-27", "absolute_magnitude_h": 10.4}]
+    catalog.set_bulk_catalog(records_to_columns(bulk))
+
+    assert len(catalog.columnar) == len(historical) + 1
+    # El registro del índice tiene prioridad sobre el del catálogo completo
+    assert catalog.get_risk("99942")["size"] == min(0.375 / 10, 1.0)
+    eros = catalog.get_risk("2000433")
+    assert eros["size"] == 1.0
+    assert eros["risk_level"] == "MEDIUM"
+    assert catalog.get("2000433") is None
+
+def test_bulk_row_without_close_approach():
+    # Objeto del catálogo completo sin aproximaciones a la Tierra: velocidad y distancia ausentes
+    catalog = AsteroidCatalog()
+    catalog.set_bulk_catalog(records_to_columns([
+        {"id": "3000001", "name": "Sin aproximaciones", "estimated_diameter_km_min": 0.4,
+         "estimated_diameter_km_max": 0.8, "relative_velocity_km_s": None, "miss_distance_km": None,
+         "is_potentially_hazardous_asteroid": True, "absolute_magnitude_h": 20.1}
+    ]))
+    risk = catalog.get_risk("3000001")
+    assert risk["velocity"] == 0 and risk["proximity"] == 0 and risk["size"] == 0.08
+    assert risk["overall_risk_score"] == 0.08 / 3
+    # Serializable como JSON estricto (Starlette usa allow_nan=False)
+    json.dumps(risk, allow_nan=False)
+
+if __name__ == "__main__":
+    print("🧪 Probando la puntuación de riesgo vectorizada\n")
+    test_matches_scalar_rules()
+    test_risk_factors_match_endpoint_formula()
+    test_catalog_rescoring_is_fast()
+    test_bulk_catalog_merged_with_index()
+    test_bulk_row_without_close_approach()
+    print("\n✅ Pruebas de puntuación de riesgo completadas")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el endpoint de simulaciones por lotes (NDJSON)
+"""
+
+import json
+import time
+from fastapi.testclient import TestClient
+import app as app_module
+
+client = TestClient(app_module.app)
+
+def read_lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def test_grid_streams_one_line_per_scenario():
+    calls = []
+    original = app_module.demographic_service.calculate_population_density
+    
+    def counting(lat, lon):
+        calls.append((lat, lon))
+        return original(lat, lon)
+    
+    app_module.demographic_service.calculate_population_density = counting
+    try:
+        response = client.post("/api/simulation/batch", json={
+            "grid": {
+                "diameters": [0.1, 1.0],
+                "velocities": [15, 30],
+                "locations": [{"lat": 10, "lon": -40}, {"lat": 40.7, "lon": -74.0}]
+            }
+        })
+    finally:
+        app_module.demographic_service.calculate_population_density = original
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = read_lines(response)
+    print(f"Escenarios: {len(lines)}, consultas demográficas: {len(calls)}")
+    assert [line["index"] for line in lines] == list(range(8))
+    assert all("result" in line for line in lines)
+    # Una consulta demográfica por ubicación, no por escenario
+    assert len(calls) == 2
+
+def test_batch_matches_single_simulation():
+    scenario = {
+        "asteroid_id": "custom-asteroid",
+        "impact_location": {"lat": 0, "lon": -150},
+        "impact_angle": 45,
+        "impact_velocity": 20,
+        "asteroid_diameter": 0.5
+    }
+    single = client.post("/api/simulation", json=scenario).json()
+    batch = read_lines(client.post("/api/simulation/batch", json={"scenarios": [scenario]}))
+    assert batch[0]["result"] == single
+
+def test_errors_are_reported_per_line():
+    response = client.post("/api/simulation/batch", json={"scenarios": [
+        {"asteroid_id": "does-not-exist", "impact_location": {"lat": 0, "lon": 0},
+         "impact_angle": 45, "impact_velocity": 20}
+    ]})
+    lines = read_lines(response)
+    assert response.status_code == 200
+    assert "not found" in lines[0]["error"]
+
+def test_empty_and_oversized_batches_rejected():
+    assert client.post("/api/simulation/batch", json={}).status_code == 400
+    too_many = list(range(app_module.MAX_BATCH_SCENARIOS + 1))
+    response = client.post("/api/simulation/batch", json={
+        "grid": {"diameters": too_many, "velocities": [20], "locations": [{"lat": 0, "lon": 0}]}
+    })
+    assert response.status_code == 422
+
+    # 1000 × 1000 × 1000 combinaciones: se rechaza sin generar los escenarios
+    values = [float(i + 1) for i in range(1000)]
+    start = time.perf_counter()
+    response = client.post("/api/simulation/batch", json={
+        "grid": {"diameters": values, "velocities": values, "locations": [{"lat": 0, "lon": v} for v in values]}
+    })
+    assert response.status_code == 400 and "1000000000" in response.json()["detail"]
+    assert time.perf_counter() - start < 5
+
+if __name__ == "__main__":
+    print("🧪 Probando simulaciones por lotes\n")
+    test_grid_streams_one_line_per_scenario()
+    test_batch_matches_single_simulation()
+    test_errors_are_reported_per_line()
+    test_empty_and_oversized_batches_rejected()
+    print("\n✅ Pruebas de lotes completadas")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el cache de resultados de simulación
+"""
+
+import os
+import tempfile
+import time
+from fastapi.testclient import TestClient
+import app as app_module
+from services.simulation_cache import SimulationResultCache, model_version, normalize_scenario
+
+def test_normalized_keys():
+    cache = SimulationResultCache("v1", persist=False)
+    base = normalize_scenario(40.7128, -74.006, 45, 20.0, 0.5, "Rocky", None)
+    same = normalize_scenario(40.71280001, 285.994, 45.0001, 20.00001, 0.50000001, "rocky", 0)
+    assert base == same and cache.key(base) == cache.key(same)
+    assert cache.key(base) != cache.key(dict(base, density=3000.0))
+    assert SimulationResultCache("v2", persist=False).key(base) != cache.key(base)
+    assert cache.key(base).startswith("v1-")
+
+def test_model_version_tracks_code_and_data():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "grid.npy")
+        with open(path, "wb") as f:
+            f.write(b"0" * 10)
+        version = model_version(code=[normalize_scenario], data_paths=[path], settings={"nominatim": False})
+        assert version == model_version(code=[normalize_scenario], data_paths=[path], settings={"nominatim": False})
+        assert version != model_version(code=[model_version], data_paths=[path], settings={"nominatim": False})
+        assert version != model_version(code=[normalize_scenario], data_paths=[path], settings={"nominatim": True})
+        with open(path, "ab") as f:
+            f.write(b"1")
+        assert version != model_version(code=[normalize_scenario], data_paths=[path], settings={"nominatim": False})
+
+def test_memory_and_disk_tiers():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "results.sqlite3")
+        calls = []
+        def compute():
+            calls.append(1)
+            return {"casualties_estimate": 42}, True
+
+        cache = SimulationResultCache("v1", path=path, memory_entries=8)
+        key = cache.key({"lat": 1.0})
+        assert cache.get_or_compute(key, compute) == ({"casualties_estimate": 42}, True)
+        assert cache.get_or_compute(key, compute) == ({"casualties_estimate": 42}, True)
+        assert len(calls) == 1 and cache.memory_hits == 1
+
+        # Tras un reinicio el resultado sale del disco
+        restarted = SimulationResultCache("v1", path=path)
+        assert restarted.get_or_compute(key, compute)[0]["casualties_estimate"] == 42
+        assert len(calls) == 1 and restarted.disk_hits == 1
+
+        # Los resultados degradados no se guardan
+        degraded = restarted.key({"lat": 2.0})
+        assert restarted.get_or_compute(degraded, lambda: ({"casualties_estimate": 0}, False))[1] is False
+        assert restarted.get_or_compute(degraded, lambda: ({"casualties_estimate": 1}, False))[1] is False
+        assert restarted.computations == 2
+
+        # Una nueva versión del modelo no ve ni conserva las entradas antiguas
+        upgraded = SimulationResultCache("v2", path=path)
+        assert upgraded.prune() == 1
+        assert upgraded.get_stats()["stored_entries"] == 0
+
+def test_endpoint_etag_and_repeat_cost():
+    saved = app_module.simulation_cache
+    app_module.simulation_cache = SimulationResultCache(saved.model_version, persist=False)
+    try:
+        client = TestClient(app_module.app)
+        body = {"asteroid_id": "custom-asteroid", "impact_location": {"lat": 35.6762, "lon": 139.6503},
+                "impact_velocity": 19.0, "impact_angle": 45, "asteroid_diameter": 0.4}
+        first = client.post("/api/simulation", json=body)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+
+        # Mismo escenario con ruido por debajo de la cuantización: mismo ETag y sin recalcular
+        start = time.perf_counter()
+        again = client.post("/api/simulation", json=dict(body, impact_location={"lat": 35.67620001, "lon": 139.6503}))
+        elapsed = time.perf_counter() - start
+        print(f"Repetición servida desde el cache en {elapsed * 1000:.1f} ms")
+        assert again.headers["etag"] == etag and again.json() == first.json()
+        assert app_module.simulation_cache.computations == 1
+
+        not_modified = client.post("/api/simulation", json=body, headers={"If-None-Match": etag})
+        assert not_modified.status_code == 304 and not_modified.content == b""
+        assert not_modified.headers["etag"] == etag
+
+        other = client.post("/api/simulation", json=dict(body, impact_angle=60), headers={"If-None-Match": etag})
+        assert other.status_code == 200 and other.headers["etag"] != etag
+
+        catalog = client.post("/api/simulation", json={"asteroid_id": "2025-IMPACT", "impact_location": {"lat": 0, "lon": 0},
+                                                       "impact_velocity": 18.5, "impact_angle": 45})
+        assert catalog.status_code == 200
+        assert client.post("/api/simulation", json=dict(body, asteroid_id="nope")).status_code == 404
+        assert client.get("/api/cache-stats").json()["simulation_results"]["not_modified"] == 1
+
+        # Con los datos demográficos de emergencia no se envía ETag
+        density = app_module.demographic_service.calculate_population_density
+        def degraded(lat, lon):
+            info = density(lat, lon)
+            info.pop("data_source", None)
+            return info
+        app_module.demographic_service.calculate_population_density = degraded
+        try:
+            fallback = client.post("/api/simulation", json=dict(body, impact_angle=70))
+        finally:
+            del app_module.demographic_service.calculate_population_density
+        assert fallback.status_code == 200 and "etag" not in fallback.headers
+        assert fallback.headers["cache-control"] == "no-store"
+    finally:
+        app_module.simulation_cache = saved
+
+if __name__ == "__main__":
+    print("🧪 Probando el cache de simulaciones\n")
+    test_normalized_keys()
+    test_model_version_tracks_code_and_data()
+    test_memory_and_disk_tiers()
+    test_endpoint_etag_and_repeat_cost()
+    print("\n✅ Pruebas del cache de simulaciones completadas")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el ejecutor de simulaciones en procesos
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import CancelledError
+from functools import lru_cache
+import numpy as np
+from services.demographic_service import DemographicService
+from services.simulation_executor import (PRIORITY_BATCH, PRIORITY_INTERACTIVE, SimulationExecutor, SimulationTimeout,
+                                          without_service)
+
+# Trabajos de prueba: funciones de módulo para que los procesos puedan importarlas
+def sleep_and_return(service, seconds, tag):
+    time.sleep(seconds)
+    return tag
+
+def fail(service, message):
+    raise ValueError(message)
+
+def worker_pid(service, seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+def has_shared_grid(service):
+    return not service.population_grid.density.flags.writeable
+
+@lru_cache(maxsize=1)
+def service():
+    return DemographicService(enable_nominatim=False)
+
+def test_results_match_in_process():
+    executor = SimulationExecutor(service(), workers=1, timeout=30)
+    try:
+        for lat, lon, crater, energy in [(35.6762, 139.6503, 5.0, 30.0), (0.0, -140.0, 20.0, 800.0)]:
+            demo_info = service().calculate_population_density(lat, lon)
+            remote = executor.submit(DemographicService.estimate_casualties, lat, lon, crater, energy, demo_info).result()
+            assert remote == service().estimate_casualties(lat, lon, crater, energy, demo_info=demo_info)
+
+        lats, lons = np.linspace(-60, 60, 200), np.linspace(-170, 170, 200)
+        remote = executor.submit(DemographicService.estimate_casualties_batch, lats, lons, 3.0, 60.0).result()
+        local = service().estimate_casualties_batch(lats, lons, 3.0, 60.0)
+        assert all(np.array_equal(remote[name], local[name]) for name in local)
+
+        # Los procesos leen la rejilla de la memoria compartida (de solo lectura)
+        assert executor.submit(has_shared_grid).result()
+        stats = executor.get_stats()
+        assert stats["mode"] == "processes" and stats["shared_memory_mb"] > 0 and stats["completed"] == 4
+    finally:
+        executor.shutdown()
+    assert executor.get_stats()["alive"] == 0
+
+def test_priority_queue():
+    executor = SimulationExecutor(service(), workers=1, timeout=30)
+    try:
+        busy = executor.submit(sleep_and_return, 0.5, "busy")
+        order = []
+        jobs = [executor.submit(sleep_and_return, 0, f"batch-{i}", priority=PRIORITY_BATCH) for i in range(3)]
+        jobs.append(executor.submit(sleep_and_return, 0, "interactive", priority=PRIORITY_INTERACTIVE))
+        for job in jobs:
+            job.future.add_done_callback(lambda future: order.append(future.result()))
+        assert busy.result() == "busy"
+        for job in jobs:
+            job.result()
+        print(f"Orden de ejecución: {order}")
+        assert order == ["interactive", "batch-0", "batch-1", "batch-2"]
+    finally:
+        executor.shutdown()
+
+def test_timeouts_cancellation_and_errors():
+    executor = SimulationExecutor(service(), workers=1, timeout=30)
+    try:
+        # Un trabajo colgado se corta en su plazo y el proceso se sustituye
+        start = time.perf_counter()
+        hung = executor.submit(sleep_and_return, 60, "never", timeout=0.5)
+        try:
+            hung.result()
+            assert False, "debía agotar el plazo"
+        except SimulationTimeout:
+            pass
+        assert time.perf_counter() - start < 10
+        assert executor.submit(sleep_and_return, 0, "after").result() == "after"
+
+        # Cancelar uno en curso termina su proceso; uno en cola no llega a ejecutarse
+        running = executor.submit(sleep_and_return, 60, "running")
+        queued = executor.submit(sleep_and_return, 0, "queued")
+        time.sleep(0.2)
+        assert queued.cancel() and running.cancel()
+        for job in (running, queued):
+            try:
+                job.result(timeout=10)
+                assert False, "debía estar cancelado"
+            except CancelledError:
+                pass
+        assert not running.cancel()
+
+        try:
+            executor.submit(fail, "sin población").result()
+            assert False, "debía propagar la excepción"
+        except ValueError as e:
+            assert str(e) == "sin población"
+        stats = executor.get_stats()
+        assert stats["timeouts"] == 1 and stats["cancelled"] == 2 and stats["restarts"] == 2
+        assert stats["alive"] == 1
+    finally:
+        executor.shutdown()
+
+def test_map_fans_out():
+    executor = SimulationExecutor(service(), workers=2, timeout=30)
+    try:
+        results = executor.map(sleep_and_return, [(0.1, tag) for tag in "abcd"], priority=PRIORITY_BATCH)
+        assert results == list("abcd")
+        # Los trabajos se reparten entre los dos procesos
+        assert len(set(executor.map(worker_pid, [(0.3,)] * 4))) == 2
+        assert executor.map(without_service, [(max, 3, 5), (min, 3, 5)]) == [5, 3]
+
+        # Un fallo cancela el resto
+        try:
+            executor.map(fail, [("primero",)] + [("otro",)] * 3)
+            assert False, "debía propagar la excepción"
+        except ValueError as e:
+            assert str(e) == "primero"
+        time.sleep(0.2)
+        assert executor.get_stats()["queued"] == 0
+    finally:
+        executor.shutdown()
+
+def test_worker_death_and_shutdown():
+    executor = SimulationExecutor(service(), workers=1, timeout=30)
+    try:
+        # Un proceso que muere se sustituye y su trabajo falla
+        job = executor.submit(sleep_and_return, 60, "crash")
+        time.sleep(0.2)
+        executor._pool[0].process.kill()
+        try:
+            job.result(timeout=10)
+            assert False, "debía fallar"
+        except RuntimeError:
+            pass
+        assert executor.submit(sleep_and_return, 0, "after").result() == "after"
+        assert executor.get_stats()["restarts"] == 1
+
+        # Ctrl+C no llega a los procesos: el cierre lo decide el principal
+        os.kill(executor._pool[0].process.pid, signal.SIGINT)
+        assert executor.submit(sleep_and_return, 0.1, "still").result() == "still"
+        workers = list(executor._pool)
+    finally:
+        executor.shutdown()
+    # El cierre no se confunde con una caída ni relanza procesos
+    stats = executor.get_stats()
+    assert stats["restarts"] == 1 and stats["alive"] == 0
+    assert all(worker.process.exitcode == 0 for worker in workers)
+
+def test_awaitable_interface():
+    executor = SimulationExecutor(service(), workers=1, timeout=30)
+    inline = SimulationExecutor(service(), workers=0)
+
+    async def scenario():
+        results = await asyncio.gather(executor.run(sleep_and_return, 0.1, "a"),
+                                       executor.run(sleep_and_return, 0.1, "b", priority=PRIORITY_BATCH),
+                                       inline.run(sleep_and_return, 0, "inline"))
+        # El event loop sigue libre mientras un proceso trabaja
+        ticks = 0
+        task = asyncio.ensure_future(executor.run(sleep_and_return, 0.3, "slow"))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        # Cancelar la tarea que espera cancela el trabajo
+        pending = asyncio.ensure_future(executor.run(sleep_and_return, 60, "abandoned"))
+        await asyncio.sleep(0.2)
+        pending.cancel()
+        try:
+            await pending
+        except asyncio.CancelledError:
+            pass
+        return results, ticks, await task
+
+    try:
+        results, ticks, slow = asyncio.run(scenario())
+        assert results == ["a", "b", "inline"] and slow == "slow" and ticks > 5
+        assert executor.get_stats()["cancelled"] == 1
+        assert inline.get_stats()["mode"] == "inline"
+    finally:
+        executor.shutdown()
+
+def test_endpoints_use_executor():
+    from fastapi.testclient import TestClient
+    import app as app_module
+
+    client = TestClient(app_module.app)
+    completed = app_module.simulation_executor.get_stats()["completed"]
+    body = {"asteroid_id": "custom-asteroid", "impact_location": {"lat": 19.4326, "lon": -99.1332},
+            "impact_velocity": 23.5, "impact_angle": 37, "asteroid_diameter": 0.35}
+    single = client.post("/api/simulation", json=body)
+    assert single.status_code == 200
+
+    scenarios = [dict(body, impact_angle=angle) for angle in (37, 50, 65)] + [dict(body, physics_mode="fast")]
+    response = client.post("/api/simulation/batch", json={"scenarios": scenarios})
+    lines = [json.loads(line) for line in response.text.strip().split("\n")]
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert lines[0]["result"] == single.json()
+    assert "error" in lines[3]
+    stats = client.get("/api/cache-stats").json()["simulation_executor"]
+    # La simulación individual puede venir del cache en disco; el lote siempre se calcula
+    assert stats["completed"] >= completed + 3
+
+    # Monte Carlo: un trabajo por bloque de muestras
+    completed = stats["completed"]
+    monte_carlo = client.post("/api/simulation/monte-carlo", json={
+        "asteroid_id": "custom-asteroid", "impact_location": {"lat": 19.4326, "lon": -99.1332},
+        "impact_velocity": 20.0, "asteroid_diameter": 0.3, "n_samples": 300000, "seed": 5})
+    assert monte_carlo.status_code == 200 and monte_carlo.json()["n_samples"] == 300000
+    assert client.get("/api/cache-stats").json()["simulation_executor"]["completed"] == completed + 2
+
+if __name__ == "__main__":
+    print("🧪 Probando el ejecutor de simulaciones\n")
+    test_results_match_in_process()
+    test_priority_queue()
+    test_timeouts_cancellation_and_errors()
+    test_map_fans_out()
+    test_worker_death_and_shutdown()
+    test_awaitable_interface()
+    test_endpoints_use_executor()
+    print("\n✅ Pruebas del ejecutor de simulaciones completadas")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el índice espacial de ciudades
+"""
+
+import math
+import os
+import tempfile
+import time
+import numpy as np
+from services.spatial_index import CityIndex
+from services.demographic_service import DemographicService
+
+def random_cities(n, seed=7):
+    rng = np.random.default_rng(seed)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    lons = rng.uniform(-180, 180, n)
+    populations = rng.integers(1_000, 5_000_000, n)
+    return {f"city_{i}": {"lat": float(lat), "lon": float(lon), "population": int(pop)}
+            for i, (lat, lon, pop) in enumerate(zip(lats, lons, populations))}
+
+def haversine(lat1, lon1, lat2, lon2):
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(min(a, 1.0)))
+
+def test_matches_brute_force():
+    cities = random_cities(20_000)
+    index = CityIndex(cities)
+    for lat, lon in [(40.7, -74.0), (89.5, 10.0), (-0.5, 179.9), (-60.0, -179.5)]:
+        brute = sorted((haversine(lat, lon, c["lat"], c["lon"]), name) for name, c in cities.items())
+        nearest = index.nearest(lat, lon, k=5)
+        assert [city["name"] for city in nearest] == [name for _, name in brute[:5]]
+        within = index.within_radius(lat, lon, 300)
+        assert {city["name"] for city in within} == {name for d, name in brute if d <= 300}
+
+def test_query_speed():
+    index = CityIndex(random_cities(50_000))
+    rng = np.random.default_rng(1)
+    points = list(zip(rng.uniform(-60, 60, 500), rng.uniform(-180, 180, 500)))
+    start = time.perf_counter()
+    for lat, lon in points:
+        index.nearest(lat, lon)
+    elapsed = (time.perf_counter() - start) / len(points)
+    print(f"Vecino más cercano entre 50.000 ciudades: {elapsed * 1e6:.0f} µs por consulta")
+    assert elapsed < 0.005
+
+def test_csv_loader_accepts_worldcities_columns():
+    path = os.path.join(tempfile.mkdtemp(), "worldcities.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("city,lat,lng,population\nToluca,19.29,-99.66,910608\nHamlet,19.0,-99.0,50\nBroken,x,1,100\n")
+    index = CityIndex.from_csv(path, base_cities={"mexico_city": {"lat": 19.43, "lon": -99.13, "population": 21782000}},
+                               min_population=100)
+    assert len(index) == 2
+    assert index.nearest(19.3, -99.6)[0]["name"] == "Toluca"
+
+def test_classification_considers_all_nearby_cities():
+    # La ciudad más cercana es pequeña, pero una megaciudad está a 20 km
+    cities = {
+        "town": {"lat": 0.0, "lon": 0.05, "population": 50_000},
+        "megacity": {"lat": 0.0, "lon": 0.18, "population": 25_000_000}
+    }
+    service = DemographicService(use_population_grid=False, enable_nominatim=False, city_index=CityIndex(cities))
+    nearest = service._find_nearest_major_city(0.0, 0.0)
+    assert nearest["name"] == "town"
+    assert service._classify_region(0.0, 0.0, nearest)["type"] == "urban_major"
+    
+    result = service.estimate_casualties(0.0, 0.0, crater_diameter_km=12, energy_megatons=1e5)
+    zones = {city["name"]: city["zone"] for city in result["affected_cities"]}
+    print(f"Ciudades afectadas: {zones}")
+    assert zones == {"town": "immediate_zone", "megacity": "severe_damage_zone"}
+    assert result["additional_effects"]["infrastructure_damage"]
+
+if __name__ == "__main__":
+    print("🧪 Probando el índice espacial de ciudades\n")
+    test_matches_brute_force()
+    test_query_speed()
+    test_csv_loader_accepts_worldcities_columns()
+    test_classification_considers_all_nearby_cities()
+    print("\n✅ Pruebas del índice completadas")
@@ -0,0 +1,3 @@
+"""
+Motor de Simulación de Impactos de Asteroides
+"""
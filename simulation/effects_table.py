@@ -0,0 +1,317 @@
+"""
+Tablas precalculadas de efectos del impacto
+Evalúa el núcleo físico sobre una rejilla logarítmica 4D (diámetro, densidad,
+velocidad, ángulo), la guarda como array mapeado en memoria y responde con
+interpolación multilineal. Las cotas de error frente al cálculo exacto se
+miden al generar la tabla y viajan con ella.
+"""
+
+import bisect
+import hashlib
+import inspect
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from simulation import physics
+from simulation.physics import ImpactPhysics, TNT_MEGATON_JOULES
+
+# Ejes: (mínimo, máximo, puntos). Diámetro, densidad y velocidad se espacian
+# en logaritmo y el ángulo en log(sin θ): la energía y el cráter son leyes de
+# potencia de esas coordenadas y la interpolación apenas añade error
+AXIS_NAMES = ("diameter_km", "density", "velocity_kms", "angle_deg")
+DEFAULT_AXES = {
+    "diameter_km": (0.001, 100.0, 48),
+    "density": (500.0, 10000.0, 12),
+    "velocity_kms": (11.0, 75.0, 24),
+    "angle_deg": (5.0, 90.0, 18)
+}
+
+# Salidas tabuladas; las positivas se interpolan en logaritmo. Los efectos
+# atmosféricos tienen un salto en el umbral de 100 Mt, así que no se tabulan:
+# se calculan a partir de la energía interpolada
+TABLE_OUTPUTS = ("energy_megatons", "crater_diameter_km", "seismic_magnitude", "affected_area_km2")
+LOG_OUTPUTS = frozenset({"energy_megatons", "crater_diameter_km", "affected_area_km2"})
+
+# Puntos aleatorios con los que se miden las cotas de error al generar
+VALIDATION_SAMPLES = 20000
+
+
+def kernel_version() -> str:
+    """Hash del código del núcleo físico (una tabla de otra versión no es válida)"""
+    return hashlib.sha256(inspect.getsource(physics).encode()).hexdigest()[:16]
+
+
+def _axis_coordinate(axis: int, values):
+    """Coordenada de interpolación de un eje: log(x), o log(sin θ) para el ángulo"""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if AXIS_NAMES[axis] == "angle_deg":
+            return np.log(np.sin(np.radians(values)))
+        return np.log(values)
+
+
+def _axis_values(axis: int, low: float, high: float, points: int) -> np.ndarray:
+    """Nodos equiespaciados en la coordenada de interpolación del eje"""
+    if AXIS_NAMES[axis] == "angle_deg":
+        coordinate = np.linspace(*_axis_coordinate(axis, [low, high]), points)
+        return np.degrees(np.arcsin(np.exp(coordinate)))
+    return np.geomspace(low, high, points)
+
+
+def _exact_outputs(diameter, density, velocity, angle) -> Dict[str, np.ndarray]:
+    """Salidas tabuladas calculadas con el núcleo exacto (camino vectorizado)"""
+    result = physics.impact_physics(diameter, velocity, angle, density)
+    return {name: getattr(result, name) for name in TABLE_OUTPUTS}
+
+
+def _encode(name: str, values: np.ndarray) -> np.ndarray:
+    return np.log(values) if name in LOG_OUTPUTS else values
+
+
+def _decode(name: str, values: np.ndarray) -> np.ndarray:
+    return np.exp(values) if name in LOG_OUTPUTS else values
+
+
+@dataclass
+class ImpactEffectsTable:
+    """Tabla 4D de efectos con interpolación multilineal en coordenadas logarítmicas"""
+    axes: Tuple[np.ndarray, ...]           # valores de cada eje (AXIS_NAMES)
+    values: np.ndarray                     # (n_d, n_ρ, n_v, n_θ, len(TABLE_OUTPUTS)), salidas codificadas
+    error_bounds: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    kernel_version: str = ""
+    path: Optional[str] = None
+
+    def __post_init__(self):
+        self._coordinates = tuple(_axis_coordinate(k, axis) for k, axis in enumerate(self.axes))
+        self._coordinate_lists = tuple(nodes.tolist() for nodes in self._coordinates)
+
+    @classmethod
+    def build(cls, axes: Optional[Dict[str, Tuple[float, float, int]]] = None,
+              validation_samples: int = VALIDATION_SAMPLES, seed: int = 0) -> "ImpactEffectsTable":
+        """
+        Generar la tabla evaluando el núcleo exacto en todos los nodos
+
+        Args:
+            axes: Rango y número de puntos de cada eje (por defecto DEFAULT_AXES)
+            validation_samples: Puntos aleatorios para medir las cotas de error
+            seed: Semilla de los puntos de validación
+
+        Returns:
+            ImpactEffectsTable con error_bounds rellenas
+        """
+        axes = {**DEFAULT_AXES, **(axes or {})}
+        grid_axes = tuple(_axis_values(k, axes[name][0], axes[name][1], int(axes[name][2]))
+                          for k, name in enumerate(AXIS_NAMES))
+        mesh = np.meshgrid(*grid_axes, indexing="ij")
+        exact = _exact_outputs(*mesh)
+        values = np.stack([_encode(name, exact[name]) for name in TABLE_OUTPUTS], axis=-1)
+        table = cls(axes=grid_axes, values=values, kernel_version=kernel_version())
+        if validation_samples > 0:
+            table.error_bounds = table.measure_errors(validation_samples, seed)
+        return table
+
+    def measure_errors(self, samples: int = VALIDATION_SAMPLES, seed: int = 0) -> Dict[str, Dict[str, float]]:
+        """
+        Error máximo de la interpolación frente al núcleo exacto
+
+        La mitad de los puntos son centros de celda (donde la interpolación
+        multilineal se aleja más de los nodos) y la otra mitad aleatorios.
+
+        Returns:
+            {salida: {"max_abs": ..., "max_rel": ...}}
+        """
+        rng = np.random.default_rng(seed)
+        coordinates = []
+        for nodes in self._coordinates:
+            index = rng.integers(0, len(nodes) - 1, samples // 2)
+            coordinates.append(np.r_[(nodes[index] + nodes[index + 1]) / 2,
+                                     rng.uniform(nodes[0], nodes[-1], samples - samples // 2)])
+        points = [np.exp(c) for c in coordinates[:3]] + [np.degrees(np.arcsin(np.exp(coordinates[3])))]
+        approx, _ = self._interpolate(*points)
+        exact = _exact_outputs(*points)
+        bounds = {}
+        for name in TABLE_OUTPUTS:
+            error = np.abs(approx[name] - exact[name])
+            scale = np.abs(exact[name])
+            relative = np.divide(error, scale, out=np.zeros_like(error), where=scale > 0)
+            bounds[name] = {"max_abs": float(error.max()), "max_rel": float(relative.max())}
+        return bounds
+
+    def save(self, path: str):
+        """Guardar la tabla (.npy) y sus metadatos (.json al lado)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, np.ascontiguousarray(self.values))
+        metadata = {
+            "axis_names": list(AXIS_NAMES),
+            "axes": [axis.tolist() for axis in self.axes],
+            "outputs": list(TABLE_OUTPUTS),
+            "log_outputs": sorted(LOG_OUTPUTS),
+            "error_bounds": self.error_bounds,
+            "kernel_version": self.kernel_version
+        }
+        with open(f"{path}.json", "w") as f:
+            json.dump(metadata, f)
+        os.replace(tmp_path, path)
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str) -> "ImpactEffectsTable":
+        """
+        Cargar una tabla mapeada en memoria
+
+        Raises:
+            ValueError: si la tabla es de otra versión del núcleo o de otras salidas
+        """
+        with open(f"{path}.json") as f:
+            metadata = json.load(f)
+        if metadata.get("kernel_version") != kernel_version():
+            raise ValueError(f"La tabla {path} corresponde a otra versión del núcleo físico")
+        if metadata.get("outputs") != list(TABLE_OUTPUTS) or metadata.get("axis_names") != list(AXIS_NAMES):
+            raise ValueError(f"La tabla {path} tiene otro formato")
+        values = np.load(path, mmap_mode="r")
+        axes = tuple(np.asarray(axis, dtype=np.float64) for axis in metadata["axes"])
+        if values.shape != tuple(len(axis) for axis in axes) + (len(TABLE_OUTPUTS),):
+            raise ValueError(f"La tabla {path} no coincide con sus ejes")
+        return cls(axes=axes, values=values, error_bounds=metadata.get("error_bounds", {}),
+                   kernel_version=metadata["kernel_version"], path=path)
+
+    @classmethod
+    def load_or_build(cls, path: str) -> "ImpactEffectsTable":
+        """Cargar la tabla de `path` o generarla (y guardarla) si falta o está obsoleta"""
+        if os.path.exists(path) and os.path.exists(f"{path}.json"):
+            try:
+                return cls.load(path)
+            except ValueError:
+                pass  # tabla obsoleta o de otro formato: se regenera
+        table = cls.build()
+        table.save(path)
+        return cls.load(path)
+
+    def _interpolate(self, *coordinates):
+        """
+        Interpolación multilineal (16 vértices por punto) en las coordenadas de los ejes
+
+        Returns:
+            Tupla (salidas decodificadas, máscara de puntos dentro del dominio)
+        """
+        coordinates = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in coordinates))
+        shape = coordinates[0].shape
+        inside = np.ones(shape, dtype=bool)
+        indices, fractions = [], []
+        for axis, (nodes, value) in enumerate(zip(self._coordinates, coordinates)):
+            u = _axis_coordinate(axis, value)
+            inside &= (u >= nodes[0] - 1e-12) & (u <= nodes[-1] + 1e-12)
+            index = np.clip(np.searchsorted(nodes, u, side="right") - 1, 0, len(nodes) - 2)
+            fraction = np.clip((u - nodes[index]) / (nodes[index + 1] - nodes[index]), 0.0, 1.0)
+            indices.append(index)
+            fractions.append(fraction)
+
+        result = np.zeros(shape + (self.values.shape[-1],))
+        for corner in range(16):
+            weight = np.ones(shape)
+            vertex = []
+            for axis in range(4):
+                upper = (corner >> axis) & 1
+                weight = weight * (fractions[axis] if upper else 1.0 - fractions[axis])
+                vertex.append(indices[axis] + upper)
+            result += weight[..., None] * self.values[tuple(vertex)]
+        return {name: _decode(name, result[..., k]) for k, name in enumerate(TABLE_OUTPUTS)}, inside
+
+    def _interpolate_scalar(self, diameter_km, density, velocity_kms, angle_deg) -> Optional[Dict[str, float]]:
+        """Camino rápido para un único punto (None si está fuera del dominio)"""
+        try:
+            point = (math.log(diameter_km), math.log(density), math.log(velocity_kms),
+                     math.log(math.sin(math.radians(angle_deg))))
+        except ValueError:
+            return None
+        corner, fractions = [], []
+        for nodes, u in zip(self._coordinate_lists, point):
+            if not nodes[0] - 1e-12 <= u <= nodes[-1] + 1e-12:
+                return None
+            index = min(max(bisect.bisect_right(nodes, u) - 1, 0), len(nodes) - 2)
+            corner.append(slice(index, index + 2))
+            fractions.append(min(max((u - nodes[index]) / (nodes[index + 1] - nodes[index]), 0.0), 1.0))
+        # Bloque 2×2×2×2 de vértices, reducido eje a eje
+        block = np.asarray(self.values[tuple(corner)])
+        for t in fractions:
+            block = block[0] * (1.0 - t) + block[1] * t
+        return {name: float(_decode(name, block[k])) for k, name in enumerate(TABLE_OUTPUTS)}
+
+    def interpolate(self, diameter_km, density, velocity_kms, angle_deg) -> Dict[str, np.ndarray]:
+        """
+        Salidas tabuladas para uno o muchos puntos
+
+        Los puntos fuera del dominio de la tabla se calculan con el núcleo exacto.
+
+        Returns:
+            {salida: valor} (floats si todos los argumentos son escalares;
+            si no, arrays con la forma difundida de los argumentos)
+        """
+        if physics._is_scalar(diameter_km, density, velocity_kms, angle_deg):
+            outputs = self._interpolate_scalar(diameter_km, density, velocity_kms, angle_deg)
+            if outputs is None:
+                exact = physics.impact_physics(diameter_km, velocity_kms, angle_deg, density)
+                outputs = {name: getattr(exact, name) for name in TABLE_OUTPUTS}
+            return outputs
+        outputs, inside = self._interpolate(diameter_km, density, velocity_kms, angle_deg)
+        if not inside.all():
+            outside = ~inside
+            arrays = np.broadcast_arrays(*(np.asarray(c, dtype=np.float64)
+                                           for c in (diameter_km, density, velocity_kms, angle_deg)))
+            exact = _exact_outputs(*(array[outside] for array in arrays))
+            for name in TABLE_OUTPUTS:
+                outputs[name][outside] = exact[name]
+        return outputs
+
+    def impact_physics(self, diameter_km, velocity_kms, angle_deg=90.0, density=None,
+                       composition="rocky") -> ImpactPhysics:
+        """
+        Equivalente tabulado de physics.impact_physics (misma firma y resultado)
+
+        La masa y la profundidad del cráter se calculan exactas; energía,
+        cráter, magnitud sísmica y área salen de la tabla.
+        """
+        rho = physics.projectile_density(density, composition)
+        outputs = self.interpolate(diameter_km, rho, velocity_kms, angle_deg)
+        energy_megatons = outputs["energy_megatons"]
+        crater_km = outputs["crater_diameter_km"]
+        return ImpactPhysics(
+            mass_kg=physics.mass(diameter_km, rho),
+            energy_joules=energy_megatons * TNT_MEGATON_JOULES,
+            energy_megatons=energy_megatons,
+            crater_diameter_km=crater_km,
+            crater_depth_km=crater_km * 0.1,
+            seismic_magnitude=outputs["seismic_magnitude"],
+            affected_area_km2=outputs["affected_area_km2"]
+        )
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "path": self.path,
+            "shape": list(self.values.shape[:-1]),
+            "axes": {name: [float(axis[0]), float(axis[-1])] for name, axis in zip(AXIS_NAMES, self.axes)},
+            "error_bounds": self.error_bounds
+        }
+
+
+if __name__ == "__main__":
+    # Uso (desde la raíz): python -m simulation.effects_table --output data/cache/impact_effects_table.npy
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generar la tabla de efectos del impacto")
+    parser.add_argument("--output", default=os.path.join("data", "cache", "impact_effects_table.npy"))
+    args = parser.parse_args()
+
+    effects_table = ImpactEffectsTable.build()
+    effects_table.save(args.output)
+    print(f"Tabla {effects_table.values.shape} guardada en {args.output}")
+    for name, bound in effects_table.error_bounds.items():
+        print(f"  {name}: error máx. {bound['max_abs']:.3g} (relativo {bound['max_rel']:.2e})")
@@ -0,0 +1,213 @@
+"""
+Corredor de riesgo de impacto a partir de la geometría del encuentro
+Muestrea el plano B del encuentro, traza las hipérbolas geocéntricas hasta la
+superficie y aplica la rotación terrestre en la época elegida para obtener el
+conjunto de puntos de impacto plausibles (lat/lon) de forma vectorizada
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from simulation.orbit_propagation import AU_KM, DAY_SECONDS, J2000_JD, OrbitalElements, earth_state, geocentric_state
+
+# Constantes terrestres
+EARTH_RADIUS_KM = 6371.0
+GM_EARTH = 398600.4418  # km³/s²
+OBLIQUITY_J2000 = math.radians(23.4392911)
+
+# Incertidumbre por defecto en el plano B, en radios de captura: alargada a lo
+# largo de ζ (la dirección temporal, típica de la línea de variaciones)
+DEFAULT_SIGMA_XI = 0.05
+DEFAULT_SIGMA_ZETA = 3.0
+
+# Muestras generadas por tanda al rechazar las que no impactan
+SAMPLING_BATCH = 65536
+
+
+def gmst(jd) -> np.ndarray:
+    """Tiempo sidéreo medio de Greenwich (rad) para fechas julianas UT"""
+    degrees = 280.46061837 + 360.98564736629 * (np.asarray(jd, dtype=np.float64) - J2000_JD)
+    return np.radians(np.remainder(degrees, 360.0))
+
+
+def ecliptic_to_equatorial(vectors) -> np.ndarray:
+    """Rotar vectores (..., 3) de la eclíptica J2000 al ecuador J2000"""
+    vectors = np.asarray(vectors, dtype=np.float64)
+    cos_e, sin_e = math.cos(OBLIQUITY_J2000), math.sin(OBLIQUITY_J2000)
+    x, y, z = vectors[..., 0], vectors[..., 1], vectors[..., 2]
+    return np.stack([x, cos_e * y - sin_e * z, sin_e * y + cos_e * z], axis=-1)
+
+
+def velocity_from_radiant(speed_kms: float, ra_deg: float, dec_deg: float) -> np.ndarray:
+    """
+    Velocidad geocéntrica (km/s, ecuatorial) de un objeto que llega desde un radiante
+
+    Args:
+        speed_kms: Velocidad hiperbólica de exceso v∞
+        ra_deg: Ascensión recta del radiante (de donde viene el objeto)
+        dec_deg: Declinación del radiante
+    """
+    ra, dec = math.radians(ra_deg), math.radians(dec_deg)
+    direction = np.array([math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)])
+    return -speed_kms * direction
+
+
+def velocity_from_orbit(record: Dict[str, Any], jd: float) -> np.ndarray:
+    """
+    Velocidad relativa a la Tierra (km/s, ecuatorial) según los elementos orbitales
+
+    Args:
+        record: Elementos como los de parse_sbdb_elements
+        jd: Fecha juliana del encuentro
+    """
+    _, velocity = geocentric_state(OrbitalElements.from_records([record]), jd)
+    return ecliptic_to_equatorial(velocity[0] * AU_KM / DAY_SECONDS)
+
+
+def capture_radius(v_inf_kms: float) -> float:
+    """Radio de captura en el plano B (km): R·sqrt(1 + v_esc²/v∞²)"""
+    return EARTH_RADIUS_KM * math.sqrt(1 + 2 * GM_EARTH / (EARTH_RADIUS_KM * v_inf_kms ** 2))
+
+
+def bplane_frame(v_inf, jd: float):
+    """
+    Base (ξ̂, ζ̂, η̂) del plano B en coordenadas ecuatoriales
+
+    η̂ es la dirección de llegada, ζ̂ la opuesta a la proyección de la
+    velocidad heliocéntrica de la Tierra y ξ̂ = η̂ × ζ̂.
+    """
+    eta = np.asarray(v_inf, dtype=np.float64) / np.linalg.norm(v_inf)
+    _, earth_velocity = earth_state(np.array([jd]))
+    projected = ecliptic_to_equatorial(earth_velocity[0])
+    projected = projected - projected.dot(eta) * eta
+    if np.linalg.norm(projected) < 1e-12:
+        # Llegada paralela al movimiento terrestre: cualquier perpendicular sirve
+        projected = np.cross(eta, [0.0, 0.0, 1.0] if abs(eta[2]) < 0.9 else [1.0, 0.0, 0.0])
+    zeta = -projected / np.linalg.norm(projected)
+    xi = np.cross(eta, zeta)
+    return xi, zeta, eta
+
+
+@dataclass
+class ImpactCorridor:
+    """Puntos de impacto muestreados (un elemento por muestra)"""
+    jd: np.ndarray              # instante de cada impacto
+    lat: np.ndarray             # latitud geocéntrica (grados)
+    lon: np.ndarray             # longitud (grados, -180..180)
+    impact_angle: np.ndarray    # ángulo sobre la horizontal local (grados)
+    xi: np.ndarray              # coordenadas en el plano B (km)
+    zeta: np.ndarray
+    v_inf: float                # km/s
+    impact_velocity: float      # km/s en la superficie
+    capture_radius: float       # km
+    impact_fraction: float      # fracción de la nube de incertidumbre que impacta
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+
+def trace_to_surface(v_inf, b_vectors, jd):
+    """
+    Punto de entrada en la superficie de hipérbolas geocéntricas
+
+    Args:
+        v_inf: Velocidad de llegada (km/s, ecuatorial), vector (3,)
+        b_vectors: Parámetros de impacto en el plano B (km), array (N, 3)
+        jd: Instantes del impacto (para la rotación terrestre), escalar o (N,)
+
+    Returns:
+        Tupla (lat, lon, impact_angle) en grados; NaN donde la órbita no corta la Tierra
+    """
+    v = float(np.linalg.norm(v_inf))
+    eta = np.asarray(v_inf, dtype=np.float64) / v
+    b = np.linalg.norm(b_vectors, axis=-1)
+    # Con b = 0 la trayectoria es radial: cualquier dirección perpendicular sirve
+    fallback = np.cross(eta, [0.0, 0.0, 1.0] if abs(eta[2]) < 0.9 else [1.0, 0.0, 0.0])
+    b_hat = np.where(b[:, None] > 1e-9, b_vectors / np.maximum(b, 1e-9)[:, None], fallback / np.linalg.norm(fallback))
+
+    # Hipérbola: p = b²v∞²/μ, e = sqrt(1 + b²v∞⁴/μ²), asíntota en f∞ = acos(-1/e)
+    p = (b * v) ** 2 / GM_EARTH
+    e = np.sqrt(1 + (b * v ** 2 / GM_EARTH) ** 2)
+    f_inf = np.arccos(-1 / e)
+    cos_f = (p / EARTH_RADIUS_KM - 1) / e
+    hits = cos_f <= 1
+    f = -np.arccos(np.clip(cos_f, -1, 1))  # rama de llegada
+
+    # Periapsis en el lado de b y movimiento hacia delante (a lo largo de η̂)
+    P = -np.cos(f_inf)[:, None] * eta + np.sin(f_inf)[:, None] * b_hat
+    Q = np.sin(f_inf)[:, None] * eta + np.cos(f_inf)[:, None] * b_hat
+    position = EARTH_RADIUS_KM * (np.cos(f)[:, None] * P + np.sin(f)[:, None] * Q)
+
+    # Ángulo sobre la horizontal: cos γ = h / (R·v_superficie), h = b·v∞
+    surface_speed = math.sqrt(v ** 2 + 2 * GM_EARTH / EARTH_RADIUS_KM)
+    angle = np.degrees(np.arccos(np.clip(b * v / (EARTH_RADIUS_KM * surface_speed), 0, 1)))
+
+    lat = np.degrees(np.arcsin(np.clip(position[:, 2] / EARTH_RADIUS_KM, -1, 1)))
+    lon = np.degrees(np.arctan2(position[:, 1], position[:, 0]) - gmst(jd))
+    lon = (lon + 180.0) % 360.0 - 180.0
+    return (np.where(hits, lat, np.nan), np.where(hits, lon, np.nan), np.where(hits, angle, np.nan))
+
+
+def sample_impact_corridor(v_inf, epoch_jd: float, n_samples: int = 2000,
+                           center=(0.0, 0.0), sigma=(DEFAULT_SIGMA_XI, DEFAULT_SIGMA_ZETA),
+                           time_sigma_hours: float = 0.0, seed: Optional[int] = None,
+                           max_draws: int = 10_000_000) -> ImpactCorridor:
+    """
+    Muestrear el corredor de impacto de un encuentro
+
+    La incertidumbre del encuentro es una gaussiana en el plano B (centro y
+    sigmas en radios de captura, ejes ξ y ζ) más una gaussiana en el instante
+    del encuentro. Solo se conservan las muestras dentro del radio de captura,
+    así que todas las devueltas son impactos igual de probables.
+
+    Args:
+        v_inf: Velocidad geocéntrica de llegada (km/s, ecuatorial), vector (3,)
+        epoch_jd: Instante nominal del encuentro (fecha juliana UT)
+        n_samples: Impactos a generar
+        center: Centro (ξ, ζ) de la nube en radios de captura
+        sigma: Desviaciones (ξ, ζ) en radios de captura
+        time_sigma_hours: Incertidumbre temporal (desplaza el corredor en longitud)
+        seed: Semilla para resultados reproducibles
+        max_draws: Muestras máximas a generar antes de rendirse
+
+    Returns:
+        ImpactCorridor con n_samples puntos
+
+    Raises:
+        ValueError: si los parámetros no son válidos o la nube casi no toca la Tierra
+    """
+    v_inf = np.asarray(v_inf, dtype=np.float64)
+    speed = float(np.linalg.norm(v_inf))
+    if speed <= 0 or n_samples < 1:
+        raise ValueError("v_inf debe ser no nulo y n_samples positivo")
+    if min(sigma) < 0 or time_sigma_hours < 0:
+        raise ValueError("Las incertidumbres no pueden ser negativas")
+
+    radius = capture_radius(speed)
+    xi_hat, zeta_hat, _ = bplane_frame(v_inf, epoch_jd)
+    rng = np.random.default_rng(seed)
+
+    xi, zeta = np.empty(0), np.empty(0)
+    draws = accepted = 0
+    while len(xi) < n_samples:
+        if draws >= max_draws:
+            raise ValueError("La nube de incertidumbre apenas intersecta la Tierra")
+        batch = min(SAMPLING_BATCH, max_draws - draws)
+        x = rng.normal(center[0], sigma[0], batch) if sigma[0] > 0 else np.full(batch, float(center[0]))
+        z = rng.normal(center[1], sigma[1], batch) if sigma[1] > 0 else np.full(batch, float(center[1]))
+        inside = x ** 2 + z ** 2 < 1
+        xi = np.concatenate([xi, x[inside] * radius])
+        zeta = np.concatenate([zeta, z[inside] * radius])
+        draws += batch
+        accepted += int(inside.sum())
+    xi, zeta = xi[:n_samples], zeta[:n_samples]
+
+    jd = epoch_jd + (rng.normal(0, time_sigma_hours, n_samples) / 24 if time_sigma_hours > 0 else 0.0)
+    jd = np.broadcast_to(np.asarray(jd, dtype=np.float64), (n_samples,)).copy()
+    lat, lon, angle = trace_to_surface(v_inf, xi[:, None] * xi_hat + zeta[:, None] * zeta_hat, jd)
+    return ImpactCorridor(jd=jd, lat=lat, lon=lon, impact_angle=angle, xi=xi, zeta=zeta, v_inf=speed,
+                          impact_velocity=math.sqrt(speed ** 2 + 2 * GM_EARTH / EARTH_RADIUS_KM),
+                          capture_radius=radius, impact_fraction=accepted / draws)
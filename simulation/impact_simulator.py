@@ -5,8 +5,23 @@ Desarrollado para el NASA Hackathon 2025 - Equipo 42
 
 import numpy as np
 from dataclasses import dataclass
-from typing import Tuple, Dict, Any
-import math
+from typing import Tuple, Dict, Any, Sequence
+
+from simulation import physics
+from simulation.physics import COMPOSITION_CODES
+
+# Códigos numéricos para el modo por lotes (índice en la tupla)
+TERRAIN_CODES = ("ocean", "land", "urban", "desert", "forest")
+
+def encode_compositions(compositions: Sequence[str]) -> np.ndarray:
+    """Convertir nombres de composición a códigos (desconocidas -> rocky)"""
+    return np.array([COMPOSITION_CODES.index(c) if c in COMPOSITION_CODES else 0 for c in compositions],
+                    dtype=np.int8)
+
+def encode_terrains(terrains: Sequence[str]) -> np.ndarray:
+    """Convertir tipos de terreno a códigos (desconocidos -> land)"""
+    return np.array([TERRAIN_CODES.index(t) if t in TERRAIN_CODES else 1 for t in terrains],
+                    dtype=np.int8)
 
 @dataclass
 class AsteroidProperties:
@@ -37,22 +52,56 @@ class ImpactResult:
     economic_damage: float      # USD
     atmospheric_effects: Dict[str, Any]
     tsunami_risk: bool
+
+@dataclass
+class BatchImpactResult:
+    """Resultados de una simulación por lotes (un array por campo)"""
+    crater_diameter: np.ndarray      # km
+    crater_depth: np.ndarray         # km
+    energy_released: np.ndarray      # megatones TNT
+    seismic_magnitude: np.ndarray    # Escala Richter
+    affected_area: np.ndarray        # km²
+    casualties_estimate: np.ndarray  # int64
+    economic_damage: np.ndarray      # USD
+    tsunami_risk: np.ndarray         # bool
+    dust_cloud_height: np.ndarray    # km
+    dust_cloud_duration: np.ndarray  # días
+    global_cooling: np.ndarray       # grados Celsius
+    ozone_depletion: np.ndarray      # porcentaje
+    
+    def __len__(self) -> int:
+        return len(self.energy_released)
+    
+    def row(self, index: int) -> ImpactResult:
+        """Obtener un escenario del lote como ImpactResult"""
+        return ImpactResult(
+            crater_diameter=float(self.crater_diameter[index]),
+            crater_depth=float(self.crater_depth[index]),
+            energy_released=float(self.energy_released[index]),
+            seismic_magnitude=float(self.seismic_magnitude[index]),
+            affected_area=float(self.affected_area[index]),
+            casualties_estimate=int(self.casualties_estimate[index]),
+            economic_damage=float(self.economic_damage[index]),
+            atmospheric_effects={
+                "dust_cloud_height": float(self.dust_cloud_height[index]),
+                "dust_cloud_duration": float(self.dust_cloud_duration[index]),
+                "global_cooling": float(self.global_cooling[index]),
+                "ozone_depletion": float(self.ozone_depletion[index])
+            },
+            tsunami_risk=bool(self.tsunami_risk[index])
+        )
     
 class ImpactSimulator:
     """Simulador principal de impactos de asteroides"""
     
     def __init__(self):
-        # Constantes físicas
-        self.EARTH_GRAVITY = 9.81  # m/s²
-        self.TNT_ENERGY = 4.184e9  # Julios por tonelada de TNT
+        # Constantes físicas (las leyes viven en simulation.physics)
+        self.EARTH_GRAVITY = physics.EARTH_GRAVITY  # m/s²
+        self.TNT_ENERGY = physics.TNT_TON_JOULES    # Julios por tonelada de TNT
         self.EARTH_RADIUS = 6371   # km
         
         # Densidades típicas (kg/m³)
-        self.DENSITIES = {
-            "rocky": 2500,
-            "metallic": 7800,
-            "icy": 900
-        }
+        self.DENSITIES = dict(physics.COMPOSITION_DENSITIES)
         
         # Factores de población por tipo de terreno (personas/km²)
         self.POPULATION_DENSITY = {
@@ -62,77 +111,39 @@ class ImpactSimulator:
             "desert": 1,
             "forest": 10
         }
+        
+        # Valor económico por km² según el tipo de terreno (USD)
+        self.ECONOMIC_VALUES = {
+            "ocean": 1e6,      # $1M por km² (principalmente pesca, transporte)
+            "land": 1e8,       # $100M por km² (agricultura, infraestructura rural)
+            "urban": 1e10,     # $10B por km² (infraestructura urbana)
+            "desert": 1e5,     # $100K por km² (valor mínimo)
+            "forest": 1e7      # $10M por km² (recursos naturales)
+        }
     
     def calculate_mass(self, asteroid: AsteroidProperties) -> float:
         """Calcula la masa del asteroide"""
-        radius_m = (asteroid.diameter * 1000) / 2  # convertir a metros
-        volume_m3 = (4/3) * math.pi * (radius_m ** 3)
-        
-        if asteroid.density:
-            density = asteroid.density
-        else:
-            density = self.DENSITIES.get(asteroid.composition, 2500)
-        
-        return volume_m3 * density  # kg
+        return physics.mass(asteroid.diameter, physics.projectile_density(asteroid.density, asteroid.composition))
     
     def calculate_kinetic_energy(self, asteroid: AsteroidProperties) -> float:
-        """Calcula la energía cinética del impacto"""
-        mass_kg = self.calculate_mass(asteroid)
-        velocity_ms = asteroid.velocity * 1000  # convertir a m/s
-        
-        # Considerar el ángulo de impacto
-        angle_factor = math.sin(math.radians(asteroid.angle))
-        effective_velocity = velocity_ms * angle_factor
-        
-        energy_joules = 0.5 * mass_kg * (effective_velocity ** 2)
-        return energy_joules
+        """Calcula la energía cinética del impacto (componente normal de la velocidad)"""
+        return physics.kinetic_energy(self.calculate_mass(asteroid), asteroid.velocity, asteroid.angle)
     
     def calculate_crater_dimensions(self, energy_joules: float, asteroid: AsteroidProperties) -> Tuple[float, float]:
-        """Calcula las dimensiones del cráter usando ecuaciones empíricas"""
-        
-        # Convertir energía a megatones TNT
-        energy_mt = energy_joules / (self.TNT_ENERGY * 1e6)
-        
-        # Fórmula empírica para diámetro del cráter (Schmidt & Housen, 1987)
-        # D = 1.8 * (E/ρg)^0.22 * (ρp/ρt)^0.33
-        
-        gravity = self.EARTH_GRAVITY
-        projectile_density = self.DENSITIES.get(asteroid.composition, 2500)
-        target_density = 2500  # densidad promedio de la corteza terrestre
-        
-        # Simplificación de la fórmula
-        diameter_m = 1.8 * ((energy_joules / (target_density * gravity)) ** 0.22) * \
-                    ((projectile_density / target_density) ** 0.33)
-        
-        diameter_km = diameter_m / 1000
-        
+        """Calcula las dimensiones del cráter (Schmidt & Housen, 1987)"""
+        diameter_km = physics.crater_diameter(
+            energy_joules, physics.projectile_density(asteroid.density, asteroid.composition)
+        )
         # La profundidad típica es ~1/10 del diámetro
-        depth_km = diameter_km * 0.1
-        
-        return diameter_km, depth_km
+        return diameter_km, diameter_km * 0.1
     
     def calculate_seismic_effects(self, energy_joules: float) -> float:
         """Calcula la magnitud sísmica del impacto"""
-        # Relación empírica entre energía y magnitud sísmica
-        # M = (2/3) * log10(E) - 6.0 (donde E está en Julios)
-        
-        if energy_joules > 0:
-            magnitude = (2/3) * math.log10(energy_joules) - 6.0
-            return max(0, magnitude)  # No permitir magnitudes negativas
-        return 0
+        return physics.seismic_magnitude(energy_joules)
     
     def calculate_affected_area(self, crater_diameter_km: float, energy_mt: float) -> float:
         """Calcula el área total afectada por el impacto"""
-        
-        # Área del cráter
-        crater_area = math.pi * (crater_diameter_km / 2) ** 2
-        
-        # Área de destrucción extendida (aproximación)
-        # Basada en la energía liberada y efectos de onda expansiva
-        destruction_radius = crater_diameter_km * (1 + math.log10(max(1, energy_mt)))
-        destruction_area = math.pi * (destruction_radius / 2) ** 2
-        
-        return destruction_area
+        return physics.affected_area(crater_diameter_km, energy_mt)
     
     def estimate_casualties(self, affected_area_km2: float, location: ImpactLocation) -> int:
         """Estima el número de víctimas"""
@@ -155,16 +166,7 @@ class ImpactSimulator:
     def estimate_economic_damage(self, affected_area_km2: float, location: ImpactLocation) -> float:
         """Estima el daño económico en USD"""
         
-        # Valor económico por km² según el tipo de terreno
-        economic_values = {
-            "ocean": 1e6,      # $1M por km² (principalmente pesca, transporte)
-            "land": 1e8,       # $100M por km² (agricultura, infraestructura rural)
-            "urban": 1e10,     # $10B por km² (infraestructura urbana)
-            "desert": 1e5,     # $100K por km² (valor mínimo)
-            "forest": 1e7      # $10M por km² (recursos naturales)
-        }
-        
-        value_per_km2 = economic_values.get(location.terrain_type, 1e8)
+        value_per_km2 = self.ECONOMIC_VALUES.get(location.terrain_type, 1e8)
         return affected_area_km2 * value_per_km2
     
     def check_tsunami_risk(self, location: ImpactLocation, crater_diameter_km: float) -> bool:
@@ -179,33 +181,18 @@ class ImpactSimulator:
     
     def calculate_atmospheric_effects(self, energy_mt: float, asteroid: AsteroidProperties) -> Dict[str, Any]:
         """Calcula efectos atmosféricos del impacto"""
-        
-        effects = {
-            "dust_cloud_height": 0,      # km
-            "dust_cloud_duration": 0,    # días
-            "global_cooling": 0,         # grados Celsius
-            "ozone_depletion": 0         # porcentaje
-        }
-        
-        # Solo impactos grandes tienen efectos atmosféricos significativos
-        if energy_mt > 100:  # Más de 100 megatones
-            effects["dust_cloud_height"] = min(50, energy_mt / 1000 * 10)  # km
-            effects["dust_cloud_duration"] = min(365, energy_mt / 100)     # días
-            effects["global_cooling"] = min(5, energy_mt / 10000)          # °C
-            effects["ozone_depletion"] = min(10, energy_mt / 1000)         # %
-        
-        return effects
+        return physics.atmospheric_effects(energy_mt)
     
     def simulate_impact(self, asteroid: AsteroidProperties, location: ImpactLocation) -> ImpactResult:
         """Ejecuta la simulación completa del impacto"""
         
-        # Cálculos principales
-        energy_joules = self.calculate_kinetic_energy(asteroid)
-        energy_mt = energy_joules / (self.TNT_ENERGY * 1e6)  # Convertir a megatones
-        
-        crater_diameter, crater_depth = self.calculate_crater_dimensions(energy_joules, asteroid)
-        seismic_magnitude = self.calculate_seismic_effects(energy_joules)
-        affected_area = self.calculate_affected_area(crater_diameter, energy_mt)
+        # Cálculos principales (núcleo físico común, camino escalar)
+        result = physics.impact_physics(asteroid.diameter, asteroid.velocity, asteroid.angle,
+                                        asteroid.density, asteroid.composition)
+        energy_mt = result.energy_megatons
+        crater_diameter, crater_depth = result.crater_diameter_km, result.crater_depth_km
+        seismic_magnitude = result.seismic_magnitude
+        affected_area = result.affected_area_km2
         
         casualties = self.estimate_casualties(affected_area, location)
         economic_damage = self.estimate_economic_damage(affected_area, location)
@@ -225,6 +212,65 @@ class ImpactSimulator:
             tsunami_risk=tsunami_risk
         )
 
+    def simulate_batch(self, diameter, density, velocity, angle,
+                       composition=0, terrain=1) -> BatchImpactResult:
+        """
+        Simula muchos escenarios a la vez con operaciones vectorizadas de NumPy
+        
+        Los argumentos son arrays columnares (o escalares que se difunden) y
+        reproducen la lógica de simulate_impact escenario a escenario.
+        
+        Args:
+            diameter: Diámetros en km
+            density: Densidades en kg/m³ (0 o NaN = densidad de la composición)
+            velocity: Velocidades en km/s
+            angle: Ángulos de impacto en grados
+            composition: Códigos de COMPOSITION_CODES
+            terrain: Códigos de TERRAIN_CODES
+        
+        Returns:
+            BatchImpactResult con un array por campo
+        """
+        diameter, density, velocity, angle, composition, terrain = np.broadcast_arrays(
+            np.asarray(diameter, dtype=np.float64),
+            np.asarray(density, dtype=np.float64),
+            np.asarray(velocity, dtype=np.float64),
+            np.asarray(angle, dtype=np.float64),
+            np.asarray(composition, dtype=np.intp),
+            np.asarray(terrain, dtype=np.intp)
+        )
+        
+        # Tablas indexadas por código
+        population_density = np.array([self.POPULATION_DENSITY[t] for t in TERRAIN_CODES], dtype=np.float64)
+        economic_value = np.array([self.ECONOMIC_VALUES[t] for t in TERRAIN_CODES], dtype=np.float64)
+        mortality = np.array([0.3 if t == "urban" else 0.1 if t == "ocean" else 0.2 for t in TERRAIN_CODES])
+        
+        # Núcleo físico común (camino vectorizado)
+        result = physics.impact_physics(diameter, velocity, angle, density, composition)
+        energy_mt = result.energy_megatons
+        crater_diameter = result.crater_diameter_km
+        affected_area = result.affected_area_km2
+        
+        # Víctimas y daño económico por tipo de terreno
+        total_population = affected_area * population_density[terrain]
+        casualties = np.trunc(total_population * mortality[terrain]).astype(np.int64)
+        economic_damage = affected_area * economic_value[terrain]
+        
+        tsunami_risk = (terrain == TERRAIN_CODES.index("ocean")) & (crater_diameter > 1.0)
+        atmosphere = physics.atmospheric_effects(energy_mt)
+        
+        return BatchImpactResult(
+            crater_diameter=crater_diameter,
+            crater_depth=result.crater_depth_km,
+            energy_released=energy_mt,
+            seismic_magnitude=result.seismic_magnitude,
+            affected_area=affected_area,
+            casualties_estimate=casualties,
+            economic_damage=economic_damage,
+            tsunami_risk=tsunami_risk,
+            **atmosphere
+        )
+
 # Función de conveniencia para uso rápido
 def quick_simulation(diameter_km: float, velocity_kms: float, 
                     lat: float, lon: float, terrain: str = "land") -> ImpactResult:
@@ -0,0 +1,199 @@
+"""
+Motor Monte Carlo de incertidumbre para impactos de asteroides
+Muestrea diámetro, densidad, velocidad y ángulo y los propaga con el
+simulador vectorizado (ImpactSimulator.simulate_batch)
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from simulation.impact_simulator import ImpactSimulator, COMPOSITION_CODES, TERRAIN_CODES
+
+# Métricas que se resumen en percentiles
+METRICS = ("energy_megatons", "crater_diameter_km", "casualties", "economic_damage_usd")
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass
+class Distribution:
+    """
+    Distribución de un parámetro de entrada
+
+    Tipos soportados:
+        fixed: value
+        uniform: low, high
+        normal: mean, std (opcionalmente low/high para recortar)
+        lognormal: median, sigma (sigma en espacio logarítmico)
+        triangular: low, mode, high
+        impact_angle: ángulo natural de impacto, pdf sin(2θ) (sin parámetros)
+    """
+    kind: str
+    params: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def fixed(cls, value: float) -> "Distribution":
+        return cls("fixed", {"value": value})
+
+    @classmethod
+    def from_spec(cls, spec: Union["Distribution", Dict[str, Any], float, int]) -> "Distribution":
+        """Crear una distribución desde un número, un dict {"type": ..., ...} o una Distribution"""
+        if isinstance(spec, Distribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls.fixed(float(spec))
+        params = {key: float(value) for key, value in spec.items() if key != "type"}
+        distribution = cls(spec.get("type", "fixed"), params)
+        distribution.validate()
+        return distribution
+
+    def validate(self):
+        """Comprobar el tipo y los parámetros requeridos"""
+        required = {
+            "fixed": ("value",),
+            "uniform": ("low", "high"),
+            "normal": ("mean", "std"),
+            "lognormal": ("median", "sigma"),
+            "triangular": ("low", "mode", "high"),
+            "impact_angle": ()
+        }
+        if self.kind not in required:
+            raise ValueError(f"Distribución desconocida: {self.kind}")
+        missing = [name for name in required[self.kind] if name not in self.params]
+        if missing:
+            raise ValueError(f"Faltan parámetros para '{self.kind}': {', '.join(missing)}")
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Generar n muestras"""
+        p = self.params
+        if self.kind == "fixed":
+            values = np.full(n, p["value"], dtype=np.float64)
+        elif self.kind == "uniform":
+            values = rng.uniform(p["low"], p["high"], n)
+        elif self.kind == "normal":
+            values = rng.normal(p["mean"], p["std"], n)
+        elif self.kind == "lognormal":
+            values = rng.lognormal(math.log(p["median"]), p["sigma"], n)
+        elif self.kind == "triangular":
+            values = rng.triangular(p["low"], p["mode"], p["high"], n)
+        elif self.kind == "impact_angle":
+            # pdf 2·sin(θ)·cos(θ): θ = arcsin(√U), más probable a 45°
+            values = np.degrees(np.arcsin(np.sqrt(rng.random(n))))
+        else:
+            raise ValueError(f"Distribución desconocida: {self.kind}")
+
+        if "low" in p or "high" in p:
+            values = np.clip(values, p.get("low", -np.inf), p.get("high", np.inf))
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type": self.kind, **self.params}
+
+
+def _run_chunk(args) -> Dict[str, np.ndarray]:
+    """Simular un bloque de muestras (función de módulo para poder usarla en procesos)"""
+    seed_sequence, n, distributions, composition, terrain = args
+    rng = np.random.default_rng(seed_sequence)
+
+    # Orden de muestreo fijo para que los resultados sean reproducibles
+    diameter = np.maximum(distributions["diameter"].sample(rng, n), 0.0)
+    density = np.maximum(distributions["density"].sample(rng, n), 0.0)
+    velocity = np.maximum(distributions["velocity"].sample(rng, n), 0.0)
+    angle = np.clip(distributions["angle"].sample(rng, n), 0.0, 90.0)
+
+    batch = ImpactSimulator().simulate_batch(diameter, density, velocity, angle, composition, terrain)
+    return {
+        "energy_megatons": batch.energy_released,
+        "crater_diameter_km": batch.crater_diameter,
+        "casualties": batch.casualties_estimate.astype(np.float64),
+        "economic_damage_usd": batch.economic_damage,
+        "tsunami_risk": batch.tsunami_risk
+    }
+
+
+class MonteCarloSimulator:
+    """Propagación Monte Carlo de la incertidumbre de los parámetros del impacto"""
+
+    def __init__(self, chunk_size: int = 250_000, max_samples: int = 5_000_000):
+        """
+        Args:
+            chunk_size: Muestras por bloque (cada bloque tiene su propia semilla derivada)
+            max_samples: Límite de muestras por ejecución
+        """
+        self.chunk_size = chunk_size
+        self.max_samples = max_samples
+
+    def run(self, diameter, density, velocity, angle=None,
+            composition: str = "rocky", terrain: str = "land",
+            n_samples: int = 100_000, seed: Optional[int] = None,
+            map_chunks: Optional[Callable[[Callable, List[tuple]], List[Dict[str, np.ndarray]]]] = None,
+            percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """
+        Ejecutar la simulación Monte Carlo
+
+        Args:
+            diameter: Distribución del diámetro en km (número, dict o Distribution)
+            density: Distribución de la densidad en kg/m³
+            velocity: Distribución de la velocidad en km/s
+            angle: Distribución del ángulo en grados (por defecto la natural, sin(2θ))
+            composition: Composición del asteroide ("rocky", "metallic", "icy")
+            terrain: Tipo de terreno del impacto ("ocean", "land", "urban"...)
+            n_samples: Número de muestras (1e5 - 1e6 habitual)
+            seed: Semilla para reproducibilidad (None = aleatoria)
+            map_chunks: Función map(fn, bloques) -> resultados en orden con que repartir
+                        los bloques (p. ej. entre los procesos del ejecutor de
+                        simulaciones); por defecto se calculan en el proceso actual
+            percentiles: Percentiles a calcular
+
+        Returns:
+            Dict con percentiles, media y desviación de cada métrica
+        """
+        if not 0 < n_samples <= self.max_samples:
+            raise ValueError(f"n_samples debe estar entre 1 y {self.max_samples}")
+
+        distributions = {
+            "diameter": Distribution.from_spec(diameter),
+            "density": Distribution.from_spec(density),
+            "velocity": Distribution.from_spec(velocity),
+            "angle": Distribution.from_spec(angle if angle is not None else {"type": "impact_angle"})
+        }
+        composition_code = COMPOSITION_CODES.index(composition) if composition in COMPOSITION_CODES else 0
+        terrain_code = TERRAIN_CODES.index(terrain) if terrain in TERRAIN_CODES else 1
+
+        # Una semilla derivada por bloque: el resultado no depende del número de procesos
+        root = np.random.SeedSequence(seed)
+        sizes = [min(self.chunk_size, n_samples - start) for start in range(0, n_samples, self.chunk_size)]
+        tasks = [(child, size, distributions, composition_code, terrain_code)
+                 for child, size in zip(root.spawn(len(sizes)), sizes)]
+
+        if map_chunks is not None:
+            chunks = list(map_chunks(_run_chunk, tasks))
+        else:
+            chunks = [_run_chunk(task) for task in tasks]
+
+        summary = {}
+        for metric in METRICS:
+            values = np.concatenate([chunk[metric] for chunk in chunks])
+            quantiles = np.percentile(values, percentiles)
+            summary[metric] = {
+                "mean": float(values.mean()),
+                "std": float(values.std()),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "percentiles": {f"p{p:g}": float(q) for p, q in zip(percentiles, quantiles)}
+            }
+
+        tsunami = np.concatenate([chunk["tsunami_risk"] for chunk in chunks])
+
+        return {
+            "n_samples": n_samples,
+            "seed": root.entropy if seed is None else seed,
+            "composition": COMPOSITION_CODES[composition_code],
+            "terrain": TERRAIN_CODES[terrain_code],
+            "distributions": {name: dist.to_dict() for name, dist in distributions.items()},
+            "metrics": summary,
+            "tsunami_probability": float(tsunami.mean())
+        }
@@ -0,0 +1,392 @@
+"""
+Propagación kepleriana vectorizada y búsqueda de aproximaciones a la Tierra
+Resuelve la ecuación de Kepler para muchos objetos e instantes a la vez a
+partir de los elementos orbitales de SBDB, sin consultar CAD objeto a objeto
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Parámetro gravitacional del Sol (k², AU³/día²) y constantes de conversión
+GM_SUN = 0.01720209895 ** 2
+AU_KM = 149597870.7
+DAY_SECONDS = 86400.0
+J2000_JD = 2451545.0
+
+# Elementos medios del baricentro Tierra-Luna (J2000, eclíptica) y su variación
+# por siglo juliano: a (AU), e, i, L, ϖ, Ω (grados)
+EARTH_ELEMENTS = {
+    "a": (1.00000261, 0.00000562),
+    "e": (0.01671123, -0.00004392),
+    "i": (-0.00001531, -0.01294668),
+    "L": (100.46457166, 35999.37244981),
+    "varpi": (102.93768193, 0.32327364),
+    "node": (0.0, 0.0)
+}
+
+# Velocidad relativa máxima esperable (AU/día, ~70 km/s) para el margen del muestreo
+MAX_RELATIVE_SPEED_AU_DAY = 0.04
+
+# Distancias al Sol mínima y máxima de la Tierra (AU) durante los próximos siglos
+EARTH_PERIHELION_AU = 0.9832
+EARTH_APHELION_AU = 1.0168
+
+# Tolerancia de Kepler en el muestreo grueso (el refinado usa la completa)
+SCAN_TOLERANCE = 1e-8
+
+# Presupuesto de puntos objeto × instante evaluados por bloque
+POINTS_PER_CHUNK = 4_000_000
+
+
+def jd_to_datetime(jd: float) -> datetime:
+    """Fecha juliana a datetime (escala TDB tratada como UTC)"""
+    return datetime(2000, 1, 1, 12) + timedelta(days=float(jd) - J2000_JD)
+
+
+def datetime_to_jd(value) -> float:
+    """datetime o cadena YYYY-MM-DD a fecha juliana"""
+    if isinstance(value, str):
+        value = datetime.strptime(value[:10], "%Y-%m-%d")
+    return J2000_JD + (value - datetime(2000, 1, 1, 12)).total_seconds() / DAY_SECONDS
+
+
+def solve_kepler(mean_anomaly, eccentricity, tolerance: float = 1e-12, max_iterations: int = 30) -> np.ndarray:
+    """
+    Resolver E - e·sin E = M para arrays de cualquier forma
+
+    Usa el método de Halley (convergencia cúbica) y, tras cada iteración,
+    sigue iterando solo sobre los elementos que aún no han convergido.
+
+    Args:
+        mean_anomaly: Anomalía media (rad)
+        eccentricity: Excentricidad (0 <= e < 1), difundible con mean_anomaly
+        tolerance: Corrección máxima admitida en la última iteración (rad)
+
+    Returns:
+        Anomalía excéntrica (rad) con la forma difundida de las entradas
+    """
+    M, e = np.broadcast_arrays(np.asarray(mean_anomaly, dtype=np.float64),
+                               np.asarray(eccentricity, dtype=np.float64))
+    shape = M.shape
+    M = np.remainder(M, 2 * np.pi).reshape(-1)
+    e = np.ascontiguousarray(e).reshape(-1)
+    # Semilla de segundo orden; para excentricidades altas, π es más robusta
+    E = np.where(e < 0.8, M + e * np.sin(M) * (1 + e * np.cos(M)), np.pi)
+
+    active = np.arange(E.size)
+    E_active, M_active, e_active = E, M, e
+    for _ in range(max_iterations):
+        e_sin = e_active * np.sin(E_active)
+        derivative = 1 - e_active * np.cos(E_active)
+        residual = E_active - e_sin - M_active
+        delta = residual / (derivative - 0.5 * residual * e_sin / derivative)
+        E_active = E_active - delta
+        E[active] = E_active
+        pending = np.abs(delta) >= tolerance
+        if not pending.any():
+            break
+        active = active[pending]
+        E_active, M_active, e_active = E_active[pending], M_active[pending], e_active[pending]
+    return E.reshape(shape)
+
+
+@dataclass
+class OrbitalElements:
+    """
+    Elementos keplerianos heliocéntricos (eclíptica J2000) de N objetos
+
+    Todos los ángulos en radianes; `epoch` es la fecha juliana en la que la
+    anomalía media vale `mean_anomaly`.
+    """
+    a: np.ndarray               # semieje mayor (AU)
+    e: np.ndarray               # excentricidad
+    i: np.ndarray               # inclinación
+    node: np.ndarray            # longitud del nodo ascendente (Ω)
+    peri: np.ndarray            # argumento del perihelio (ω)
+    mean_anomaly: np.ndarray    # anomalía media en la época
+    epoch: np.ndarray           # fecha juliana
+    names: Optional[List[str]] = None
+    moid: Optional[np.ndarray] = None  # MOID con la Tierra (AU), si se conoce
+
+    def __len__(self) -> int:
+        return len(self.a)
+
+    @property
+    def mean_motion(self) -> np.ndarray:
+        """Movimiento medio (rad/día)"""
+        return np.sqrt(GM_SUN / self.a ** 3)
+
+    @classmethod
+    def from_arrays(cls, a, e, i_deg, node_deg, peri_deg, mean_anomaly_deg, epoch,
+                    names: Optional[Sequence[str]] = None, moid=None) -> "OrbitalElements":
+        """Construir desde arrays con los ángulos en grados"""
+        a = np.atleast_1d(np.asarray(a, dtype=np.float64))
+        shape = a.shape
+
+        def column(values):
+            return np.broadcast_to(np.asarray(values, dtype=np.float64), shape).copy()
+
+        e = column(e)
+        if np.any(e >= 1) or np.any(a <= 0):
+            raise ValueError("Solo se admiten órbitas elípticas (e < 1, a > 0)")
+        return cls(a=a, e=e, i=np.radians(column(i_deg)), node=np.radians(column(node_deg)),
+                   peri=np.radians(column(peri_deg)), mean_anomaly=np.radians(column(mean_anomaly_deg)),
+                   epoch=column(epoch), names=list(names) if names is not None else None,
+                   moid=None if moid is None else column(moid))
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "OrbitalElements":
+        """
+        Construir desde dicts con a, e, i, om, w, ma (grados), epoch (JD),
+        y opcionalmente designation y moid
+        """
+        return cls.from_arrays(
+            [record["a"] for record in records], [record["e"] for record in records],
+            [record["i"] for record in records], [record["om"] for record in records],
+            [record["w"] for record in records], [record["ma"] for record in records],
+            [record["epoch"] for record in records],
+            names=[str(record.get("designation", index)) for index, record in enumerate(records)],
+            moid=[np.nan if record.get("moid") is None else record["moid"] for record in records]
+        )
+
+    def subset(self, mask) -> "OrbitalElements":
+        """Elementos de los objetos seleccionados por una máscara o índices"""
+        index = np.nonzero(mask)[0] if np.asarray(mask).dtype == bool else np.asarray(mask)
+        return OrbitalElements(
+            a=self.a[index], e=self.e[index], i=self.i[index], node=self.node[index],
+            peri=self.peri[index], mean_anomaly=self.mean_anomaly[index], epoch=self.epoch[index],
+            names=[self.names[k] for k in index] if self.names is not None else None,
+            moid=self.moid[index] if self.moid is not None else None
+        )
+
+
+def parse_sbdb_elements(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extraer los elementos orbitales de una respuesta de SBDB (sbdb.api)
+
+    Returns:
+        Dict con designation, a, e, i, om, w, ma (grados), epoch (JD) y moid (AU o None)
+
+    Raises:
+        ValueError: si la respuesta no trae una órbita elíptica completa
+    """
+    orbit = data.get("orbit") or {}
+    values = {}
+    for element in orbit.get("elements", []):
+        try:
+            values[element["name"]] = float(element["value"])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+    missing = [name for name in ("e", "a", "i", "om", "w", "ma") if name not in values]
+    if missing or "epoch" not in orbit:
+        raise ValueError(f"Elementos orbitales incompletos en SBDB: faltan {', '.join(missing) or 'epoch'}")
+    if values["e"] >= 1:
+        raise ValueError("Órbita no elíptica (e >= 1)")
+
+    obj = data.get("object") or {}
+    try:
+        moid = float(orbit["moid"]) if orbit.get("moid") is not None else None
+    except (TypeError, ValueError):
+        moid = None
+    return {
+        "designation": obj.get("fullname") or obj.get("des", ""),
+        "a": values["a"], "e": values["e"], "i": values["i"],
+        "om": values["om"], "w": values["w"], "ma": values["ma"],
+        "epoch": float(orbit["epoch"]),
+        "moid": moid
+    }
+
+
+def earth_elements(jd) -> Dict[str, np.ndarray]:
+    """Elementos medios de la Tierra en las fechas julianas dadas (radianes salvo a)"""
+    T = (np.asarray(jd, dtype=np.float64) - J2000_JD) / 36525.0
+    values = {name: base + rate * T for name, (base, rate) in EARTH_ELEMENTS.items()}
+    return {
+        "a": values["a"],
+        "e": values["e"],
+        "i": np.radians(values["i"]),
+        "node": np.radians(values["node"]),
+        "peri": np.radians(values["varpi"] - values["node"]),
+        "mean_anomaly": np.radians(values["L"] - values["varpi"])
+    }
+
+
+def _orientation(i, node, peri):
+    """Vectores unitarios P (hacia el perihelio) y Q del plano orbital, eje final de tamaño 3"""
+    cos_w, sin_w = np.cos(peri), np.sin(peri)
+    cos_O, sin_O = np.cos(node), np.sin(node)
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    P = np.stack([cos_w * cos_O - sin_w * sin_O * cos_i,
+                  cos_w * sin_O + sin_w * cos_O * cos_i,
+                  sin_w * sin_i], axis=-1)
+    Q = np.stack([-sin_w * cos_O - cos_w * sin_O * cos_i,
+                  -sin_w * sin_O + cos_w * cos_O * cos_i,
+                  cos_w * sin_i], axis=-1)
+    return P, Q
+
+
+def _state(a, e, i, node, peri, mean_anomaly, mean_motion, tolerance: float = 1e-12):
+    """
+    Posición (AU) y velocidad (AU/día) heliocéntricas eclípticas
+
+    Todas las entradas se difunden entre sí; devuelve dos arrays con un eje
+    final de tamaño 3.
+    """
+    E = solve_kepler(mean_anomaly, e, tolerance)
+    cos_E, sin_E = np.cos(E), np.sin(E)
+    root = np.sqrt(1 - e ** 2)
+    rate = a * mean_motion / (1 - e * cos_E)
+    P, Q = _orientation(i, node, peri)
+    # Coordenadas en el plano orbital rotadas a la eclíptica
+    position = (a * (cos_E - e))[..., None] * P + (a * root * sin_E)[..., None] * Q
+    velocity = (-rate * sin_E)[..., None] * P + (rate * root * cos_E)[..., None] * Q
+    return position, velocity
+
+
+def propagate(elements: OrbitalElements, jd, tolerance: float = 1e-12) -> np.ndarray:
+    """
+    Posiciones heliocéntricas de todos los objetos en todas las fechas
+
+    Returns:
+        Array (objetos, fechas, 3) en AU
+    """
+    jd = np.atleast_1d(np.asarray(jd, dtype=np.float64))
+    mean_motion = elements.mean_motion[:, None]
+    mean_anomaly = elements.mean_anomaly[:, None] + mean_motion * (jd[None, :] - elements.epoch[:, None])
+    E = solve_kepler(mean_anomaly, elements.e[:, None], tolerance)
+    a, e = elements.a[:, None], elements.e[:, None]
+    # La orientación es constante por objeto: (objetos, 1, 3)
+    P, Q = _orientation(elements.i, elements.node, elements.peri)
+    x = a * (np.cos(E) - e)
+    y = a * np.sqrt(1 - e ** 2) * np.sin(E)
+    return x[..., None] * P[:, None, :] + y[..., None] * Q[:, None, :]
+
+
+def earth_state(jd):
+    """Posición (AU) y velocidad (AU/día) de la Tierra en las fechas dadas"""
+    earth = earth_elements(jd)
+    mean_motion = np.sqrt(GM_SUN / earth["a"] ** 3)
+    return _state(earth["a"], earth["e"], earth["i"], earth["node"], earth["peri"],
+                  earth["mean_anomaly"], mean_motion)
+
+
+def _relative_state(elements: OrbitalElements, index: np.ndarray, jd: np.ndarray):
+    """Posición y velocidad relativas a la Tierra de pares (objeto, fecha)"""
+    mean_motion = elements.mean_motion[index]
+    mean_anomaly = elements.mean_anomaly[index] + mean_motion * (jd - elements.epoch[index])
+    position, velocity = _state(elements.a[index], elements.e[index], elements.i[index], elements.node[index],
+                                elements.peri[index], mean_anomaly, mean_motion)
+    earth_position, earth_velocity = earth_state(jd)
+    return position - earth_position, velocity - earth_velocity
+
+
+def geocentric_state(elements: OrbitalElements, jd):
+    """
+    Posición (AU) y velocidad (AU/día) de cada objeto respecto a la Tierra
+
+    Args:
+        elements: Elementos de N objetos
+        jd: Fecha juliana común o una por objeto
+
+    Returns:
+        Tupla de arrays (N, 3) en la eclíptica J2000
+    """
+    jd = np.broadcast_to(np.asarray(jd, dtype=np.float64), (len(elements),))
+    return _relative_state(elements, np.arange(len(elements)), jd)
+
+
+def _refine_minima(elements: OrbitalElements, index: np.ndarray, low: np.ndarray, high: np.ndarray,
+                   iterations: int = 40):
+    """Búsqueda de sección áurea simultánea del mínimo de distancia en [low, high]"""
+    ratio = (math.sqrt(5) - 1) / 2
+    distance = lambda jd: np.linalg.norm(_relative_state(elements, index, jd)[0], axis=-1)
+    c = high - ratio * (high - low)
+    d = low + ratio * (high - low)
+    fc, fd = distance(c), distance(d)
+    for _ in range(iterations):
+        left = fc < fd
+        high = np.where(left, d, high)
+        low = np.where(left, low, c)
+        c = high - ratio * (high - low)
+        d = low + ratio * (high - low)
+        fc, fd = distance(c), distance(d)
+    return (low + high) / 2
+
+
+def find_close_approaches(elements: OrbitalElements, start_jd: float, end_jd: float,
+                          max_distance_au: float = 0.05, step_days: float = 1.0) -> List[Dict[str, Any]]:
+    """
+    Aproximaciones a la Tierra por debajo de `max_distance_au` en una ventana
+
+    Se muestrea la distancia de todos los objetos cada `step_days`, se toman
+    los mínimos locales cercanos al umbral y se refinan por sección áurea.
+    Los objetos cuyo perihelio/afelio no cruzan la franja de la órbita
+    terrestre, o con MOID conocido mayor que el umbral, se descartan sin
+    propagar. Modelo de dos cuerpos sin perturbaciones: sirve para cribar,
+    no para predecir encuentros muy cercanos con precisión.
+
+    Returns:
+        Lista de dicts (designation, jd, date, distance_au, distance_km,
+        relative_velocity_km_s) ordenada por fecha
+    """
+    if end_jd <= start_jd:
+        raise ValueError("El final de la ventana debe ser posterior al inicio")
+
+    # Criba geométrica: órbitas cuyo perihelio o afelio no llegan a la franja
+    # de la órbita terrestre nunca se acercan a menos del umbral
+    perihelion = elements.a * (1 - elements.e)
+    aphelion = elements.a * (1 + elements.e)
+    reachable = (perihelion <= EARTH_APHELION_AU + max_distance_au) & \
+                (aphelion >= EARTH_PERIHELION_AU - max_distance_au)
+    if elements.moid is not None:
+        reachable &= ~(elements.moid > max_distance_au)
+    candidates = np.nonzero(reachable)[0]
+    if not len(candidates):
+        return []
+
+    jd = np.arange(start_jd, end_jd + step_days, step_days)
+    earth_position, _ = earth_state(jd)
+    margin = MAX_RELATIVE_SPEED_AU_DAY * step_days
+    chunk = max(1, POINTS_PER_CHUNK // len(jd))
+
+    hit_objects, hit_times = [], []
+    for offset in range(0, len(candidates), chunk):
+        objects = candidates[offset:offset + chunk]
+        distance = np.linalg.norm(propagate(elements.subset(objects), jd, SCAN_TOLERANCE) - earth_position[None, :, :], axis=-1)
+        # Mínimos locales interiores (los extremos de la ventana también cuentan)
+        padded = np.pad(distance, ((0, 0), (1, 1)), constant_values=np.inf)
+        is_min = (padded[:, 1:-1] <= padded[:, :-2]) & (padded[:, 1:-1] < padded[:, 2:])
+        rows, cols = np.nonzero(is_min & (distance < max_distance_au + margin))
+        hit_objects.append(objects[rows])
+        hit_times.append(jd[cols])
+
+    index = np.concatenate(hit_objects)
+    if not len(index):
+        return []
+    centers = np.concatenate(hit_times)
+    low = np.maximum(centers - step_days, start_jd)
+    high = np.minimum(centers + step_days, end_jd)
+    best = _refine_minima(elements, index, low, high)
+
+    position, velocity = _relative_state(elements, index, best)
+    distance = np.linalg.norm(position, axis=-1)
+    speed = np.linalg.norm(velocity, axis=-1) * AU_KM / DAY_SECONDS
+
+    approaches = []
+    for k in np.nonzero(distance <= max_distance_au)[0]:
+        obj = int(index[k])
+        approaches.append({
+            "designation": elements.names[obj] if elements.names is not None else str(obj),
+            "jd": round(float(best[k]), 5),
+            "date": jd_to_datetime(best[k]).strftime("%Y-%m-%d %H:%M"),
+            "distance_au": float(distance[k]),
+            "distance_km": float(distance[k] * AU_KM),
+            "relative_velocity_km_s": round(float(speed[k]), 3)
+        })
+    approaches.sort(key=lambda approach: approach["jd"])
+    return approaches
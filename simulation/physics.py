@@ -0,0 +1,182 @@
+"""
+Núcleo físico común de los impactos
+Masa, energía, cráter, sismicidad, área afectada y efectos atmosféricos con la
+misma ley para el endpoint /api/simulation, ImpactSimulator y el modo por lotes.
+Cada función acepta escalares (camino rápido con `math`) o arrays NumPy
+(camino vectorizado); ambos caminos evalúan las mismas expresiones.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Union
+
+import numpy as np
+
+# Constantes físicas
+EARTH_GRAVITY = 9.81          # m/s²
+TNT_TON_JOULES = 4.184e9      # Julios por tonelada de TNT
+TNT_MEGATON_JOULES = TNT_TON_JOULES * 1e6
+TARGET_DENSITY = 2500.0       # densidad promedio de la corteza terrestre (kg/m³)
+
+# Composiciones admitidas (el índice es el código del modo por lotes) y densidades típicas (kg/m³)
+COMPOSITION_CODES = ("rocky", "metallic", "icy")
+COMPOSITION_DENSITIES = {"rocky": 2500.0, "metallic": 7800.0, "icy": 900.0}
+_DENSITY_BY_CODE = np.array([COMPOSITION_DENSITIES[c] for c in COMPOSITION_CODES])
+
+# Umbral (Mt) a partir del cual hay efectos atmosféricos significativos
+ATMOSPHERIC_THRESHOLD_MT = 100
+
+Number = Union[float, np.ndarray]
+
+
+@dataclass
+class ImpactPhysics:
+    """Magnitudes físicas de uno o muchos impactos (floats o arrays)"""
+    mass_kg: Number
+    energy_joules: Number
+    energy_megatons: Number
+    crater_diameter_km: Number
+    crater_depth_km: Number
+    seismic_magnitude: Number
+    affected_area_km2: Number
+
+
+def _is_scalar(*values) -> bool:
+    return all(np.ndim(value) == 0 and not isinstance(value, np.ndarray) for value in values)
+
+
+def composition_density(composition) -> Number:
+    """Densidad típica de una composición (nombre o código; desconocidas -> rocky)"""
+    if isinstance(composition, str):
+        return COMPOSITION_DENSITIES.get(composition, COMPOSITION_DENSITIES["rocky"])
+    if _is_scalar(composition):
+        code = int(composition)
+        return float(_DENSITY_BY_CODE[code]) if 0 <= code < len(_DENSITY_BY_CODE) else COMPOSITION_DENSITIES["rocky"]
+    return _DENSITY_BY_CODE[np.asarray(composition, dtype=np.intp)]
+
+
+def projectile_density(density, composition="rocky") -> Number:
+    """Densidad explícita si es positiva; si no (0, None o NaN), la de la composición"""
+    if _is_scalar(density, composition):
+        if density is not None and density > 0:
+            return float(density)
+        return composition_density(composition)
+    density = np.asarray(np.nan if density is None else density, dtype=np.float64)
+    return np.where(density > 0, density, composition_density(composition))
+
+
+def mass(diameter_km, density) -> Number:
+    """Masa (kg) de una esfera de diámetro `diameter_km` y densidad en kg/m³"""
+    radius_m = (diameter_km * 1000) / 2
+    if _is_scalar(diameter_km, density):
+        return (4 / 3) * math.pi * (radius_m ** 3) * density
+    return (4 / 3) * math.pi * (np.asarray(radius_m, dtype=np.float64) ** 3) * density
+
+
+def kinetic_energy(mass_kg, velocity_kms, angle_deg) -> Number:
+    """Energía (J) con la componente de la velocidad normal a la superficie"""
+    if _is_scalar(mass_kg, velocity_kms, angle_deg):
+        effective_velocity = (velocity_kms * 1000) * math.sin(math.radians(angle_deg))
+    else:
+        effective_velocity = (np.asarray(velocity_kms, dtype=np.float64) * 1000) * \
+            np.sin(np.radians(np.asarray(angle_deg, dtype=np.float64)))
+    return 0.5 * mass_kg * (effective_velocity ** 2)
+
+
+def crater_diameter(energy_joules, density) -> Number:
+    """
+    Diámetro del cráter (km), ley de Schmidt & Housen (1987)
+
+    D = 1.8 · (E / ρt·g)^0.22 · (ρp / ρt)^0.33
+    """
+    if _is_scalar(energy_joules, density):
+        return 1.8 * ((energy_joules / (TARGET_DENSITY * EARTH_GRAVITY)) ** 0.22) * \
+            ((density / TARGET_DENSITY) ** 0.33) / 1000
+    return 1.8 * (np.power(np.asarray(energy_joules, dtype=np.float64) / (TARGET_DENSITY * EARTH_GRAVITY), 0.22) *
+                  np.power(np.asarray(density, dtype=np.float64) / TARGET_DENSITY, 0.33)) / 1000
+
+
+def seismic_magnitude(energy_joules) -> Number:
+    """Magnitud sísmica M = (2/3)·log10(E) - 6.0, sin valores negativos (0 si E <= 0)"""
+    if _is_scalar(energy_joules):
+        if energy_joules > 0:
+            return max(0, (2 / 3) * math.log10(energy_joules) - 6.0)
+        return 0
+    energy_joules = np.asarray(energy_joules, dtype=np.float64)
+    positive = energy_joules > 0
+    log_energy = np.log10(np.where(positive, energy_joules, 1.0))
+    return np.where(positive, np.maximum(0, (2 / 3) * log_energy - 6.0), 0.0)
+
+
+def affected_area(crater_diameter_km, energy_megatons) -> Number:
+    """Área de destrucción extendida (km²) por onda expansiva"""
+    if _is_scalar(crater_diameter_km, energy_megatons):
+        destruction_radius = crater_diameter_km * (1 + math.log10(max(1, energy_megatons)))
+        return math.pi * (destruction_radius / 2) ** 2
+    destruction_radius = crater_diameter_km * (1 + np.log10(np.maximum(1, energy_megatons)))
+    return math.pi * (destruction_radius / 2) ** 2
+
+
+def atmospheric_effects(energy_megatons) -> Dict[str, Any]:
+    """Nube de polvo, enfriamiento y pérdida de ozono (solo por encima de 100 Mt)"""
+    if _is_scalar(energy_megatons):
+        if energy_megatons > ATMOSPHERIC_THRESHOLD_MT:
+            return {
+                "dust_cloud_height": min(50, energy_megatons / 1000 * 10),  # km
+                "dust_cloud_duration": min(365, energy_megatons / 100),     # días
+                "global_cooling": min(5, energy_megatons / 10000),          # °C
+                "ozone_depletion": min(10, energy_megatons / 1000)          # %
+            }
+        return {"dust_cloud_height": 0, "dust_cloud_duration": 0, "global_cooling": 0, "ozone_depletion": 0}
+    energy_megatons = np.asarray(energy_megatons, dtype=np.float64)
+    large = energy_megatons > ATMOSPHERIC_THRESHOLD_MT
+    return {
+        "dust_cloud_height": np.where(large, np.minimum(50, energy_megatons / 1000 * 10), 0.0),
+        "dust_cloud_duration": np.where(large, np.minimum(365, energy_megatons / 100), 0.0),
+        "global_cooling": np.where(large, np.minimum(5, energy_megatons / 10000), 0.0),
+        "ozone_depletion": np.where(large, np.minimum(10, energy_megatons / 1000), 0.0)
+    }
+
+
+def impact_physics(diameter_km, velocity_kms, angle_deg=90.0, density=None, composition="rocky") -> ImpactPhysics:
+    """
+    Magnitudes físicas de un impacto o de un lote de impactos
+
+    Con todos los argumentos escalares devuelve floats (camino rápido);
+    si alguno es un array, los argumentos se difunden y devuelve arrays.
+
+    Args:
+        diameter_km: Diámetro del asteroide (km)
+        velocity_kms: Velocidad de impacto (km/s)
+        angle_deg: Ángulo de impacto sobre la horizontal (grados)
+        density: Densidad del proyectil (kg/m³); 0, None o NaN = la de la composición
+        composition: Nombre ("rocky", "metallic", "icy") o códigos de COMPOSITION_CODES
+
+    Returns:
+        ImpactPhysics
+    """
+    if not _is_scalar(diameter_km, velocity_kms, angle_deg, density, composition):
+        if isinstance(composition, str):
+            composition = COMPOSITION_CODES.index(composition) if composition in COMPOSITION_CODES else 0
+        diameter_km, velocity_kms, angle_deg, density, composition = np.broadcast_arrays(
+            np.asarray(diameter_km, dtype=np.float64),
+            np.asarray(velocity_kms, dtype=np.float64),
+            np.asarray(angle_deg, dtype=np.float64),
+            np.asarray(np.nan if density is None else density, dtype=np.float64),
+            np.asarray(composition, dtype=np.intp)
+        )
+
+    rho = projectile_density(density, composition)
+    mass_kg = mass(diameter_km, rho)
+    energy_joules = kinetic_energy(mass_kg, velocity_kms, angle_deg)
+    energy_megatons = energy_joules / TNT_MEGATON_JOULES
+    crater_km = crater_diameter(energy_joules, rho)
+    return ImpactPhysics(
+        mass_kg=mass_kg,
+        energy_joules=energy_joules,
+        energy_megatons=energy_megatons,
+        crater_diameter_km=crater_km,
+        crater_depth_km=crater_km * 0.1,  # la profundidad típica es ~1/10 del diámetro
+        seismic_magnitude=seismic_magnitude(energy_joules),
+        affected_area_km2=affected_area(crater_km, energy_megatons)
+    )